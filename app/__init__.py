@@ -46,9 +46,13 @@ def create_app(config_class=Config):
     mail.init_app(app)
     csrf.init_app(app)
     limiter.init_app(app)
+
+    # Opt-in per-request SQL profiling (PERF_PROFILING)
+    from app.services.request_profiler import request_profiler
+    request_profiler.init_app(app)
     
     # Register blueprints
-    from app.routes import auth, main, distributor, inventory, orders, payment, users, accounting, analytics, ai_chat, email_notifications, advanced_analytics, purchasing, gst, qc, whatsapp, documents, settings, barcode, goods
+    from app.routes import auth, main, distributor, inventory, orders, payment, users, accounting, analytics, ai_chat, email_notifications, advanced_analytics, purchasing, gst, qc, whatsapp, documents, settings, barcode, goods, perf
     app.register_blueprint(auth.bp)
     app.register_blueprint(main.bp)
     app.register_blueprint(distributor.bp)
@@ -69,6 +73,14 @@ def create_app(config_class=Config):
     app.register_blueprint(settings.bp)
     app.register_blueprint(barcode.bp)
     app.register_blueprint(goods.bp)
+    app.register_blueprint(perf.bp)
+
+    # CLI commands
+    from app.cli import register_cli
+    register_cli(app)
+
+    # Cached session-user loading; imported here so every process registers its invalidation hooks
+    from app.services import user_cache  # noqa: F401
     
     # Initialize database tables if AUTO_CREATE_DB is enabled
     import os
@@ -0,0 +1,138 @@
+"""
+Flask CLI commands (run with `flask <group> <command>`)
+"""
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+
+from app import db
+
+ledger_cli = AppGroup('ledger', help='Ledger maintenance commands.')
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+@ledger_cli.command('rebuild-balances')
+@click.option('--start-date', help='First day to rebuild (YYYY-MM-DD). Defaults to the beginning of the ledger.')
+@click.option('--end-date', help='Last day to rebuild (YYYY-MM-DD). Defaults to the end of the ledger.')
+def rebuild_balances_command(start_date, end_date):
+    """Recompute account_daily_balances from accounting_entries."""
+    from app.services.account_balances import refresh_daily_balances
+
+    start = _parse_date(start_date)
+    end = _parse_date(end_date)
+    if start and end and end < start:
+        raise click.BadParameter('--end-date must be on or after --start-date.')
+
+    rows = refresh_daily_balances(start, end)
+    db.session.commit()
+    click.echo(f'Rebuilt {rows} daily balance row(s).')
+
+
+@ledger_cli.command('rebuild-account-tree')
+def rebuild_account_tree_command():
+    """Renumber the chart of accounts nested-set columns (lft/rgt)."""
+    from app.services.account_tree import rebuild_account_tree
+
+    changed = rebuild_account_tree()
+    db.session.commit()
+    click.echo(f'Renumbered {changed} account(s).')
+
+
+@ledger_cli.command('close-year')
+@click.argument('name')
+def close_year_command(name):
+    """Freeze balances at the end of fiscal year NAME and lock postings in it."""
+    from app.models.accounting import FiscalYear
+    from app.services.fiscal_close import close_fiscal_year
+
+    fiscal_year = FiscalYear.query.filter_by(name=name).first()
+    if fiscal_year is None:
+        raise click.BadParameter(f'No fiscal year named {name!r}.')
+    try:
+        rows = close_fiscal_year(fiscal_year)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    db.session.commit()
+    click.echo(f'Closed {fiscal_year.name}; froze {rows} account balance(s).')
+
+
+notifications_cli = AppGroup('notifications', help='Notification outbox commands.')
+
+
+@notifications_cli.command('worker')
+@click.option('--concurrency', type=int, help='Concurrent sends. Defaults to NOTIFICATION_WORKERS.')
+@click.option('--once', is_flag=True, help='Exit once nothing is due instead of polling.')
+def notifications_worker_command(concurrency, once):
+    """Send queued WhatsApp messages and emails."""
+    import signal
+
+    from flask import current_app
+    from app.services.notification_outbox import OutboxWorker
+
+    worker = OutboxWorker(current_app._get_current_object(), concurrency=concurrency)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    click.echo(f'Notification worker started ({worker.concurrency} concurrent sends).')
+    stats = worker.run(once=once)
+    click.echo(f'Sent {stats.sent}, will retry {stats.retried}, dead-lettered {stats.dead}.')
+
+
+@notifications_cli.command('status')
+def notifications_status_command():
+    """Count outbox messages by status."""
+    from app.services.notification_outbox import outbox_counts
+
+    for status, count in outbox_counts().items():
+        click.echo(f'{status:<8} {count}')
+
+
+@notifications_cli.command('requeue')
+@click.argument('ids', nargs=-1, type=int)
+def notifications_requeue_command(ids):
+    """Retry dead-lettered messages (all, or the given IDS)."""
+    from app.services.notification_outbox import requeue_dead
+
+    click.echo(f'Requeued {requeue_dead(ids)} message(s).')
+
+
+invoices_cli = AppGroup('invoices', help='Invoice PDF commands.')
+
+
+@invoices_cli.command('export')
+@click.option('--start-date', required=True, help='First invoice date (YYYY-MM-DD).')
+@click.option('--end-date', required=True, help='Last invoice date (YYYY-MM-DD).')
+@click.option('--format', 'fmt', type=click.Choice(['zip', 'pdf']), default='zip', show_default=True,
+              help='One PDF per invoice in a ZIP, or all invoices merged into one PDF.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Defaults to Invoices_<start>_<end>.<format>.')
+@click.option('--workers', type=int, help='Render processes. Defaults to INVOICE_PDF_WORKERS.')
+def invoices_export_command(start_date, end_date, fmt, output, workers):
+    """Render every invoice dated in a range to one ZIP or merged PDF."""
+    import shutil
+
+    from app.services.invoice_pdf import export_invoices
+
+    start = _parse_date(start_date)
+    end = _parse_date(end_date)
+    if end < start:
+        raise click.BadParameter('--end-date must be on or after --start-date.')
+    try:
+        export = export_invoices(start, end, fmt, workers=workers)
+    except (ImportError, OSError) as e:
+        raise click.ClickException(f'WeasyPrint is not available: {e}')
+
+    path = output or export.filename
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(export.file, f)
+    for failure in export.failed:
+        click.echo(f'Failed: {failure}', err=True)
+    click.echo(f'Wrote {export.rendered} invoice(s) to {path}.')
+
+
+def register_cli(app):
+    app.cli.add_command(ledger_cli)
+    app.cli.add_command(notifications_cli)
+    app.cli.add_command(invoices_cli)
@@ -6,31 +6,35 @@ from app.models.company import Company
 from app.models.distributor import Distributor
 from app.models.product import Product, ProductCategory
 from app.models.inventory import Inventory, Batch, Warehouse
-from app.models.order import Order, OrderItem
+from app.models.order import Order, OrderItem, InvoiceExportJob
 from app.models.payment import Payment
 from app.models.document import Document
 from app.models.accounting import (
     Account, JournalEntry, JournalEntryAccount, FiscalYear, AccountingSettings,
-    AccountingEntry, Expense, ExpenseCategory,  # Backward compatibility models
+    AccountingEntry, AccountDailyBalance, AccountBalanceSnapshot, Expense, ExpenseCategory,  # Backward compatibility models
+    LedgerRebuildJob, LedgerRebuildPartition,
     ChartOfAccounts, FinancialYear  # Aliases
 )
 from app.models.purchasing import Vendor, PurchaseOrder, PurchaseOrderItem, VendorBill, VendorBillItem, VendorPayment
 from app.models.qc import QualityCheckTemplate, QualityCheckItem, BatchQualityCheck
-from app.models.settings import AppSettings, UserSettings
+from app.models.settings import AppSettings, UserSettings, CacheVersion, KpiSnapshot, DocumentCounter
 from app.models.goods import Goods
+from app.models.notification import OutboxMessage
 
 __all__ = [
     'User', 'Company', 'Distributor',
     'Product', 'ProductCategory',
     'Inventory', 'Batch', 'Warehouse',
-    'Order', 'OrderItem',
+    'Order', 'OrderItem', 'InvoiceExportJob',
     'Payment',
     'Document',
     'Account', 'JournalEntry', 'JournalEntryAccount', 'FiscalYear', 'AccountingSettings',
-    'AccountingEntry', 'Expense', 'ExpenseCategory',  # Backward compatibility
+    'AccountingEntry', 'AccountDailyBalance', 'AccountBalanceSnapshot', 'Expense', 'ExpenseCategory',  # Backward compatibility
+    'LedgerRebuildJob', 'LedgerRebuildPartition',
     'ChartOfAccounts', 'FinancialYear',  # Aliases
     'Vendor', 'PurchaseOrder', 'PurchaseOrderItem', 'VendorBill', 'VendorBillItem', 'VendorPayment',
     'QualityCheckTemplate', 'QualityCheckItem', 'BatchQualityCheck',
-    'AppSettings', 'UserSettings',
-    'Goods'
+    'AppSettings', 'UserSettings', 'CacheVersion', 'KpiSnapshot', 'DocumentCounter',
+    'Goods',
+    'OutboxMessage'
 ]
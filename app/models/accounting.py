@@ -4,7 +4,7 @@ Based on Frappe Books accounting structure
 """
 from app import db
 from datetime import datetime
-from sqlalchemy import CheckConstraint, Index, func
+from sqlalchemy import CheckConstraint, Index, UniqueConstraint, func
 from decimal import Decimal
 
 class Account(db.Model):
@@ -46,10 +46,10 @@ class Account(db.Model):
     
     @property
     def current_balance(self):
-        """Get current balance from accounting entries"""
+        """Get current balance from the daily balance rollup"""
         result = db.session.query(
-            func.sum(AccountingEntry.debit - AccountingEntry.credit)
-        ).filter(AccountingEntry.account_id == self.id).scalar()
+            func.sum(AccountDailyBalance.debit - AccountDailyBalance.credit)
+        ).filter(AccountDailyBalance.account_id == self.id).scalar()
         return result or Decimal('0')
     
     @property
@@ -224,11 +224,39 @@ class FiscalYear(db.Model):
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
+
+    # Year-end close: postings dated in a closed year are rejected and reports
+    # start from its AccountBalanceSnapshot rows
+    is_closed = db.Column(db.Boolean, default=False, nullable=False)
+    closed_at = db.Column(db.DateTime)
+    closed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     
     def __repr__(self):
         return f'<FiscalYear {self.name}>'
 
 
+class AccountBalanceSnapshot(db.Model):
+    """
+    Frozen cumulative balance of an account at the end of a closed fiscal year
+    Signed as debit - credit, like AccountDailyBalance
+    """
+    __tablename__ = 'account_balance_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    fiscal_year_id = db.Column(db.Integer, db.ForeignKey('fiscal_years.id'), nullable=False)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False)
+    as_of = db.Column(db.Date, nullable=False)
+    balance = db.Column(db.Numeric(15, 2), default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('fiscal_year_id', 'account_id', name='uq_account_balance_snapshot'),
+        Index('idx_account_balance_snapshot_as_of', 'as_of'),
+    )
+
+    def __repr__(self):
+        return f'<AccountBalanceSnapshot {self.account_id} {self.as_of} {self.balance}>'
+
+
 class AccountingSettings(db.Model):
     """Accounting configuration and settings"""
     __tablename__ = 'accounting_settings'
@@ -295,11 +323,107 @@ class AccountingEntry(db.Model):
     
     # Relationships
     account = db.relationship('Account', foreign_keys=[account_id])
+
+    __table_args__ = (
+        # Account ledger pages seek on (account_id, entry_date, id)
+        Index('idx_accounting_entry_account_date', 'account_id', 'entry_date', 'id'),
+    )
     
     def __repr__(self):
         return f'<AccountingEntry {self.entry_date} {self.account_head}>'
 
 
+class AccountDailyBalance(db.Model):
+    """
+    Materialized per-account, per-day ledger totals
+    Kept in step with AccountingEntry writes by app.services.account_balances
+    """
+    __tablename__ = 'account_daily_balances'
+
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+
+    # Summed amounts of all entries for the account on that day
+    debit = db.Column(db.Numeric(15, 2), default=0, nullable=False)
+    credit = db.Column(db.Numeric(15, 2), default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('account_id', 'date', name='uq_account_daily_balance'),
+        Index('idx_account_daily_balance_date', 'date'),
+    )
+
+    def __repr__(self):
+        return f'<AccountDailyBalance {self.account_id} {self.date}>'
+
+
+class LedgerRebuildJob(db.Model):
+    """
+    A ledger rebuild run split into date partitions
+    Tracked so the admin page can show progress across worker processes
+    """
+    __tablename__ = 'ledger_rebuild_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+
+    # Options passed to rebuild_ledger for every partition
+    include_orders = db.Column(db.Boolean, default=True)
+    include_payments = db.Column(db.Boolean, default=True)
+    include_expenses = db.Column(db.Boolean, default=True)
+    include_vendor = db.Column(db.Boolean, default=True)
+    dry_run = db.Column(db.Boolean, default=True)
+
+    workers = db.Column(db.Integer, default=1)
+    status = db.Column(db.String(20), default='pending')  # pending, running, completed, failed
+
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    partitions = db.relationship(
+        'LedgerRebuildPartition',
+        backref='job',
+        order_by='LedgerRebuildPartition.start_date',
+        cascade='all, delete-orphan',
+    )
+
+    def __repr__(self):
+        return f'<LedgerRebuildJob {self.id} {self.start_date}..{self.end_date} {self.status}>'
+
+
+class LedgerRebuildPartition(db.Model):
+    """
+    One date range of a LedgerRebuildJob, rebuilt in its own transaction
+    """
+    __tablename__ = 'ledger_rebuild_partitions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('ledger_rebuild_jobs.id'), nullable=False, index=True)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+
+    status = db.Column(db.String(20), default='pending')  # pending, running, completed, failed
+    attempts = db.Column(db.Integer, default=0)
+
+    # Source documents in the range / handled so far
+    docs_total = db.Column(db.Integer, default=0)
+    docs_done = db.Column(db.Integer, default=0)
+
+    summary = db.Column(db.Text)  # JSON LedgerRebuildSummary once completed
+    error = db.Column(db.Text)
+
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Bumped with every progress write; a running partition that stops beating was interrupted
+    heartbeat_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<LedgerRebuildPartition {self.job_id} {self.start_date}..{self.end_date} {self.status}>'
+
+
 class Expense(db.Model):
     """
     Expense tracking model for backward compatibility
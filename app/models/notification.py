@@ -0,0 +1,46 @@
+"""Notification outbox.
+
+WhatsApp messages and emails are written here in the same transaction as the business
+event that triggers them and sent later by `flask notifications worker` (see
+services/notification_outbox.py), so request handlers never wait on a provider.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from app import db
+
+
+class OutboxMessage(db.Model):
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        db.Index('ix_notification_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    channel = db.Column(db.String(20), nullable=False)  # whatsapp, email
+    recipient = db.Column(db.String(255), nullable=False)  # phone number or comma-separated addresses
+    subject = db.Column(db.String(255), nullable=True)
+    body = db.Column(db.Text, nullable=False)  # message text, or email HTML
+    payload = db.Column(db.Text, nullable=True)  # JSON: media_url, cc, plain-text body, attachments
+
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+
+    # Claim held by a worker while sending; expires after NOTIFICATION_LEASE seconds
+    claim_token = db.Column(db.String(32), nullable=True, index=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
+    provider = db.Column(db.String(20), nullable=True)
+    provider_message_id = db.Column(db.String(255), nullable=True)
+
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f'<OutboxMessage {self.id} {self.channel} {self.recipient} {self.status}>'
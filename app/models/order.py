@@ -107,3 +107,33 @@ class OrderItem(db.Model):
     
     def __repr__(self):
         return f'<OrderItem O:{self.order_id} P:{self.product_id}>'
+
+class InvoiceExportJob(db.Model):
+    """
+    A date-range invoice export rendered in the background
+    The finished ZIP/PDF is written under INVOICE_EXPORT_DIR and downloaded from the job page
+    """
+    __tablename__ = 'invoice_export_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    format = db.Column(db.String(10), nullable=False)  # zip, pdf
+    
+    status = db.Column(db.String(20), default='pending')  # pending, running, completed, failed
+    invoices_total = db.Column(db.Integer, default=0)
+    invoices_done = db.Column(db.Integer, default=0)  # rendered or failed so far
+    failed = db.Column(db.Text)  # one "Invoice_<number>.pdf: error" per line
+    error = db.Column(db.Text)
+    
+    file_path = db.Column(db.String(500))  # cleared when the file is pruned
+    filename = db.Column(db.String(100))
+    
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # bumped after every rendered chunk
+    
+    def __repr__(self):
+        return f'<InvoiceExportJob {self.id} {self.start_date}..{self.end_date} {self.status}>'
@@ -4,6 +4,20 @@ Application Settings Model
 from app import db
 from datetime import datetime
 
+
+def _typed_value(setting):
+    """Setting row value converted per its setting_type (MISSING if no row)"""
+    from app.services.settings_cache import MISSING
+
+    if setting is None:
+        return MISSING
+    if setting.setting_type == 'boolean':
+        return setting.setting_value.lower() in ('true', '1', 'yes')
+    elif setting.setting_type == 'integer':
+        return int(setting.setting_value)
+    return setting.setting_value
+
+
 class AppSettings(db.Model):
     """Application-wide settings"""
     __tablename__ = 'app_settings'
@@ -21,20 +35,20 @@ class AppSettings(db.Model):
     
     @staticmethod
     def get(key, default=None):
-        """Get setting value by key"""
-        setting = AppSettings.query.filter_by(setting_key=key).first()
-        if setting:
-            # Type conversion
-            if setting.setting_type == 'boolean':
-                return setting.setting_value.lower() in ('true', '1', 'yes')
-            elif setting.setting_type == 'integer':
-                return int(setting.setting_value)
-            return setting.setting_value
-        return default
+        """Get setting value by key (cached per process, see services.settings_cache)"""
+        from app.services.settings_cache import settings_cache
+
+        def load():
+            setting = AppSettings.query.filter_by(setting_key=key).first()
+            return _typed_value(setting)
+
+        return settings_cache.get(('app', key), load, default)
     
     @staticmethod
     def set(key, value, setting_type='string', description=None, user_id=None):
         """Set or update setting value"""
+        from app.services.settings_cache import invalidate_settings
+
         setting = AppSettings.query.filter_by(setting_key=key).first()
         if setting:
             setting.setting_value = str(value)
@@ -51,6 +65,7 @@ class AppSettings(db.Model):
                 updated_by=user_id
             )
             db.session.add(setting)
+        invalidate_settings()
         db.session.commit()
         return setting
 
@@ -75,19 +90,20 @@ class UserSettings(db.Model):
     
     @staticmethod
     def get(user_id, key, default=None):
-        """Get user setting value"""
-        setting = UserSettings.query.filter_by(user_id=user_id, setting_key=key).first()
-        if setting:
-            if setting.setting_type == 'boolean':
-                return setting.setting_value.lower() in ('true', '1', 'yes')
-            elif setting.setting_type == 'integer':
-                return int(setting.setting_value)
-            return setting.setting_value
-        return default
+        """Get user setting value (cached per process, see services.settings_cache)"""
+        from app.services.settings_cache import settings_cache
+
+        def load():
+            setting = UserSettings.query.filter_by(user_id=user_id, setting_key=key).first()
+            return _typed_value(setting)
+
+        return settings_cache.get(('user', user_id, key), load, default)
     
     @staticmethod
     def set(user_id, key, value, setting_type='string'):
         """Set or update user setting"""
+        from app.services.settings_cache import invalidate_settings
+
         setting = UserSettings.query.filter_by(user_id=user_id, setting_key=key).first()
         if setting:
             setting.setting_value = str(value)
@@ -100,5 +116,49 @@ class UserSettings(db.Model):
                 setting_type=setting_type
             )
             db.session.add(setting)
+        invalidate_settings()
         db.session.commit()
         return setting
+
+
+class CacheVersion(db.Model):
+    """Version stamps for process-local caches (bump a key to invalidate it in every process)"""
+    __tablename__ = 'cache_versions'
+
+    key = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.key}={self.version}>'
+
+
+class KpiSnapshot(db.Model):
+    """Precomputed dashboard KPIs (one row per snapshot key, refreshed in place)"""
+    __tablename__ = 'kpi_snapshots'
+
+    key = db.Column(db.String(64), primary_key=True)
+    total_distributors = db.Column(db.Integer, nullable=False, default=0)
+    total_products = db.Column(db.Integer, nullable=False, default=0)
+    pending_orders = db.Column(db.Integer, nullable=False, default=0)
+    sales_last_30d = db.Column(db.Float, nullable=False, default=0.0)
+    total_receivable = db.Column(db.Float, nullable=False, default=0.0)
+    total_collected = db.Column(db.Float, nullable=False, default=0.0)
+    avg_satisfaction = db.Column(db.Float, nullable=False, default=0.0)
+    source_version = db.Column(db.Integer, nullable=False, default=0)  # 'dashboard_kpis' cache version it reflects
+    computed_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<KpiSnapshot {self.key} @ {self.computed_at}>'
+
+
+class DocumentCounter(db.Model):
+    """Last number issued per document series and period (row-locked while allocating)"""
+    __tablename__ = 'document_counters'
+
+    series = db.Column(db.String(32), primary_key=True)  # order, payment, expense, ...
+    period = db.Column(db.String(16), primary_key=True)  # e.g. 20261018 for daily series, '' for none
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DocumentCounter {self.series}/{self.period}={self.value}>'
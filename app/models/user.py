@@ -8,7 +8,9 @@ from datetime import datetime
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Cached per worker; None for deleted, deactivated or re-secured users (see services.user_cache)
+    from app.services.user_cache import load_session_user
+    return load_session_user(user_id)
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -20,11 +22,22 @@ class User(UserMixin, db.Model):
     full_name = db.Column(db.String(128))
     role = db.Column(db.String(32), default='user')  # admin, manager, user
     is_active = db.Column(db.Boolean, default=True)
+    security_version = db.Column(db.Integer, nullable=False, default=0)  # bumped to revoke existing sessions
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    def get_id(self):
+        # Session token; changes whenever the security version is bumped
+        return f'{self.id}:{self.security_version or 0}'
+
+    def bump_security_version(self):
+        """Invalidate every session issued to this user so far"""
+        self.security_version = (self.security_version or 0) + 1
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
+        if self.id is not None:
+            self.bump_security_version()
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -3,21 +3,60 @@
 import base64
 import os
 
-from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for, send_file
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import login_required, current_user
 from app import db
-from app.models.accounting import ChartOfAccounts, Expense, ExpenseCategory, JournalEntry, AccountingEntry, FinancialYear
-from app.services.accounting_utils import post_opening_balance, resolve_payment_account
+from app.models.accounting import (
+    AccountBalanceSnapshot,
+    AccountDailyBalance,
+    AccountingEntry,
+    ChartOfAccounts,
+    Expense,
+    ExpenseCategory,
+    FinancialYear,
+    JournalEntry,
+    LedgerRebuildJob,
+)
+from app.services.accounting_utils import (
+    create_accounting_entry,
+    delete_posting,
+    post_opening_balance,
+    resolve_payment_account,
+)
+from app.services.account_ledger import DEFAULT_PER_PAGE, iter_ledger, ledger_page, ledger_totals
+from app.services.account_registry import invalidate_system_accounts
+from app.services.account_tree import is_descendant, rebuild_account_tree
+from app.services.aging import default_bucket_bounds, parse_bucket_bounds, payables_aging, receivables_aging
+from app.services.financial_reports import balance_sheet_data, cash_flow_data, profit_loss_data, trial_balance_data
+from app.services.document_numbers import allocate_number
+from app.services.fiscal_close import close_fiscal_year, reopen_fiscal_year
 from app.services.ledger_rebuild import rebuild_ledger
+from app.services.ledger_rebuild_jobs import (
+    create_rebuild_job,
+    fail_stale_partitions,
+    job_progress,
+    job_summary,
+    retry_failed_partitions,
+    start_rebuild_job,
+)
 from app.services.permissions import role_required
-from app.models import Order, Payment, Distributor, VendorBill, Vendor
+from app.services.report_cache import report_cache
+from app.models import Order, Payment, Distributor, Vendor
 from app.services.email_service import EmailService
+from app.services.excel_export import (
+    BOLD_FONT,
+    TOTAL_FONT,
+    Column,
+    Styled,
+    excel_response,
+    format_date,
+    timestamped_filename,
+    workbook_response,
+)
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 from sqlalchemy import func, and_, or_
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from io import BytesIO
+from sqlalchemy.orm import selectinload
 
 bp = Blueprint('accounting', __name__, url_prefix='/accounting')
 
@@ -91,6 +130,21 @@ def rebuild_ledger_admin():
                 flash('End date must be on or after start date.', 'error')
                 return redirect(url_for('accounting.rebuild_ledger_admin'))
 
+            if request.form.get('run_in_background') == 'on':
+                job = create_rebuild_job(
+                    start_date=start_date,
+                    end_date=end_date,
+                    include_orders=include_orders,
+                    include_payments=include_payments,
+                    include_expenses=include_expenses,
+                    include_vendor=include_vendor,
+                    dry_run=dry_run,
+                    created_by=current_user.id,
+                )
+                start_rebuild_job(job.id)
+                flash(f'Ledger rebuild started in {len(job.partitions)} monthly partition(s).', 'info')
+                return redirect(url_for('accounting.rebuild_ledger_admin', job_id=job.id))
+
             summary = rebuild_ledger(
                 start_date=start_date,
                 end_date=end_date,
@@ -123,18 +177,140 @@ def rebuild_ledger_admin():
             db.session.rollback()
             flash(f'Error rebuilding ledger: {str(e)}', 'error')
 
+    job = None
+    job_id = request.args.get('job_id', type=int)
+    if job_id:
+        job = LedgerRebuildJob.query.get_or_404(job_id)
+        summary = job_summary(job)
+    recent_jobs = LedgerRebuildJob.query.order_by(LedgerRebuildJob.id.desc()).limit(5).all()
+
     return render_template(
         'accounting/rebuild_ledger.html',
-        start_date=default_start,
-        end_date=default_end,
-        include_orders=True,
-        include_payments=True,
-        include_expenses=True,
-        include_vendor=True,
-        dry_run=True,
+        start_date=job.start_date if job else default_start,
+        end_date=job.end_date if job else default_end,
+        include_orders=job.include_orders if job else True,
+        include_payments=job.include_payments if job else True,
+        include_expenses=job.include_expenses if job else True,
+        include_vendor=job.include_vendor if job else True,
+        dry_run=job.dry_run if job else True,
         summary=summary,
+        job=job,
+        progress=job_progress(job) if job else None,
+        recent_jobs=recent_jobs,
+    )
+
+
+@bp.route('/admin/rebuild-ledger/jobs/<int:job_id>')
+@login_required
+@role_required(['admin'])
+def rebuild_ledger_job_status(job_id):
+    """Live progress of a partitioned ledger rebuild (polled by the admin page)."""
+    job = LedgerRebuildJob.query.get_or_404(job_id)
+    return jsonify(job_progress(job))
+
+
+@bp.route('/admin/rebuild-ledger/jobs/<int:job_id>/retry', methods=['POST'])
+@login_required
+@role_required(['admin'])
+def rebuild_ledger_job_retry(job_id):
+    """Re-run the failed partitions of a ledger rebuild job."""
+    job = LedgerRebuildJob.query.get_or_404(job_id)
+    fail_stale_partitions(job)
+    if job.status == 'running':
+        flash('This rebuild is still running.', 'error')
+    else:
+        retried = retry_failed_partitions(job.id)
+        if retried:
+            flash(f'Retrying {len(retried)} failed partition(s).', 'info')
+        else:
+            flash('No failed partitions to retry.', 'info')
+    return redirect(url_for('accounting.rebuild_ledger_admin', job_id=job.id))
+
+
+@bp.route('/admin/fiscal-years', methods=['GET', 'POST'])
+@login_required
+@role_required(['admin'])
+def fiscal_years_admin():
+    """List fiscal years and add new ones."""
+    if request.method == 'POST':
+        try:
+            name = (request.form.get('name') or '').strip()
+            start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.form.get('end_date'), '%Y-%m-%d').date()
+            if not name:
+                raise ValueError('Name is required.')
+            if end_date < start_date:
+                raise ValueError('End date must be on or after start date.')
+            overlapping = FinancialYear.query.filter(
+                FinancialYear.start_date <= end_date,
+                FinancialYear.end_date >= start_date,
+            ).first()
+            if overlapping is not None:
+                raise ValueError(f'Overlaps {overlapping.name}.')
+
+            db.session.add(FinancialYear(name=name, start_date=start_date, end_date=end_date, is_active=True))
+            db.session.commit()
+            flash(f'Fiscal year {name} added.', 'success')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error adding fiscal year: {str(e)}', 'error')
+        return redirect(url_for('accounting.fiscal_years_admin'))
+
+    fiscal_years = FinancialYear.query.order_by(FinancialYear.start_date.desc()).all()
+    snapshot_counts = dict(
+        db.session.query(AccountBalanceSnapshot.fiscal_year_id, func.count(AccountBalanceSnapshot.id))
+        .group_by(AccountBalanceSnapshot.fiscal_year_id)
+        .all()
+    )
+    return render_template(
+        'accounting/fiscal_years.html',
+        fiscal_years=fiscal_years,
+        snapshot_counts=snapshot_counts,
     )
 
+
+@bp.route('/admin/fiscal-years/<int:fiscal_year_id>/close', methods=['POST'])
+@login_required
+@role_required(['admin'])
+def close_fiscal_year_admin(fiscal_year_id):
+    """Snapshot balances at the year end and lock postings in the year."""
+    fiscal_year = FinancialYear.query.get_or_404(fiscal_year_id)
+    try:
+        rows = close_fiscal_year(fiscal_year, closed_by=current_user.id)
+        db.session.commit()
+        flash(f'{fiscal_year.name} closed; {rows} account balance(s) frozen.', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error closing fiscal year: {str(e)}', 'error')
+    return redirect(url_for('accounting.fiscal_years_admin'))
+
+
+@bp.route('/admin/fiscal-years/<int:fiscal_year_id>/reopen', methods=['POST'])
+@login_required
+@role_required(['admin'])
+def reopen_fiscal_year_admin(fiscal_year_id):
+    """Drop the year's snapshot and allow postings in it again."""
+    fiscal_year = FinancialYear.query.get_or_404(fiscal_year_id)
+    try:
+        reopen_fiscal_year(fiscal_year)
+        db.session.commit()
+        flash(f'{fiscal_year.name} reopened.', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error reopening fiscal year: {str(e)}', 'error')
+    return redirect(url_for('accounting.fiscal_years_admin'))
+
+@bp.route('/admin/report-cache', methods=['GET', 'POST'])
+@login_required
+@role_required(['admin'])
+def report_cache_admin():
+    """Hit/miss statistics of this worker's financial report cache."""
+    if request.method == 'POST':
+        report_cache.clear()
+        flash('Report cache cleared for this worker.', 'success')
+        return redirect(url_for('accounting.report_cache_admin'))
+    return render_template('accounting/report_cache.html', stats=report_cache.stats())
+
 # ==================== OPENING BALANCES ====================
 
 @bp.route('/opening-balances')
@@ -178,10 +354,8 @@ def opening_balances():
 @login_required
 def export_opening_balances_excel():
     """Export Opening Balances to Excel"""
-    from flask import make_response
     import openpyxl
     from openpyxl.styles import Font, Alignment, PatternFill
-    from io import BytesIO
     
     accounts = ChartOfAccounts.query.filter_by(is_active=True).order_by(
         ChartOfAccounts.root_type, ChartOfAccounts.account_number
@@ -269,15 +443,7 @@ def export_opening_balances_excel():
     ws.column_dimensions['C'].width = 20
     ws.column_dimensions['D'].width = 15
     
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = make_response(output.read())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = 'attachment; filename=Opening_Balances.xlsx'
-    
-    return response
+    return workbook_response(wb, 'Opening_Balances.xlsx')
 
 
 @bp.route('/opening-balances/print')
@@ -485,6 +651,20 @@ def chart_of_accounts():
     return render_template('accounting/chart_of_accounts.html', grouped_accounts=grouped_accounts)
 
 
+def _parent_account_choices() -> list:
+    """Active accounts that can be picked as a parent, in tree order."""
+    return ChartOfAccounts.query.filter_by(is_active=True).order_by(
+        ChartOfAccounts.lft, ChartOfAccounts.root_type, ChartOfAccounts.name
+    ).all()
+
+
+def _parent_account_from_form():
+    parent_id = request.form.get('parent_account_id', type=int)
+    if not parent_id:
+        return None
+    return ChartOfAccounts.query.get(parent_id)
+
+
 @bp.route('/chart-of-accounts/add', methods=['GET', 'POST'])
 @login_required
 def add_account():
@@ -520,8 +700,17 @@ def add_account():
                 account.gst_rate = float(request.form.get('gst_rate'))
             if hasattr(account, 'is_gst_applicable'):
                 account.is_gst_applicable = request.form.get('is_gst_applicable') == 'on'
+
+            account.is_group = request.form.get('is_group') == 'on'
+            parent = _parent_account_from_form()
+            if parent:
+                account.parent_account_id = parent.id
+                account.root_type = parent.root_type
+                parent.is_group = True
             
             db.session.add(account)
+            rebuild_account_tree()
+            invalidate_system_accounts()
             db.session.commit()
             
             flash(f'Account {account.name} created successfully!', 'success')
@@ -531,7 +720,7 @@ def add_account():
             db.session.rollback()
             flash(f'Error creating account: {str(e)}', 'error')
     
-    return render_template('accounting/add_account.html')
+    return render_template('accounting/add_account.html', parent_accounts=_parent_account_choices())
 
 
 @bp.route('/chart-of-accounts/<int:id>/edit', methods=['GET', 'POST'])
@@ -567,7 +756,21 @@ def edit_account(id):
                 account.gst_rate = float(request.form.get('gst_rate'))
             if hasattr(account, 'is_gst_applicable'):
                 account.is_gst_applicable = request.form.get('is_gst_applicable') == 'on'
+
+            parent = _parent_account_from_form()
+            if parent and is_descendant(account, parent):
+                flash('An account cannot be moved under itself or one of its sub-accounts.', 'error')
+                return redirect(url_for('accounting.edit_account', id=account.id))
+            account.parent_account_id = parent.id if parent else None
+            account.is_group = request.form.get('is_group') == 'on' or bool(
+                ChartOfAccounts.query.filter_by(parent_account_id=account.id).first()
+            )
+            if parent:
+                account.root_type = parent.root_type
+                parent.is_group = True
             
+            rebuild_account_tree()
+            invalidate_system_accounts()
             db.session.commit()
             flash(f'Account {account.name} updated successfully!', 'success')
             return redirect(url_for('accounting.chart_of_accounts'))
@@ -576,7 +779,11 @@ def edit_account(id):
             db.session.rollback()
             flash(f'Error updating account: {str(e)}', 'error')
     
-    return render_template('accounting/edit_account.html', account=account)
+    return render_template(
+        'accounting/edit_account.html',
+        account=account,
+        parent_accounts=[a for a in _parent_account_choices() if not is_descendant(account, a)],
+    )
 
 
 @bp.route('/chart-of-accounts/<int:id>/delete', methods=['POST'])
@@ -587,12 +794,18 @@ def delete_account(id):
     
     try:
         # Check if account has transactions
-        if account.journal_entries.count() > 0:
+        if AccountingEntry.query.filter_by(account_id=account.id).first():
             flash(f'Cannot delete account {account.name} - it has transactions!', 'error')
             return redirect(url_for('accounting.chart_of_accounts'))
+
+        if ChartOfAccounts.query.filter_by(parent_account_id=account.id, is_active=True).first():
+            flash(f'Cannot delete account {account.name} - it still has active sub-accounts!', 'error')
+            return redirect(url_for('accounting.chart_of_accounts'))
         
         account_name = account.name
         account.is_active = False  # Soft delete
+        rebuild_account_tree()
+        invalidate_system_accounts()
         db.session.commit()
         flash(f'Account {account_name} deactivated successfully!', 'success')
     except Exception as e:
@@ -665,6 +878,36 @@ def _ensure_expense_category(name: str, *, allow_create: bool) -> ExpenseCategor
     db.session.flush()
     return cat
 
+def _post_expense_entries(expense: Expense, account: ChartOfAccounts, *, created_by: int | None = None) -> None:
+    """Debit the expense account and credit cash/bank for the expense total."""
+    amount = _to_decimal(expense.total_amount)
+
+    # Debit: Expense Account
+    create_accounting_entry(
+        entry_date=expense.expense_date,
+        reference_type='expense',
+        reference_id=expense.id,
+        account=account,
+        debit=amount,
+        credit=Decimal('0'),
+        description=f'Expense: {expense.description or expense.vendor_name}',
+        created_by=created_by,
+    )
+
+    # Credit: Cash/Bank Account
+    payment_account = resolve_payment_account(expense.payment_mode)
+    create_accounting_entry(
+        entry_date=expense.expense_date,
+        reference_type='expense',
+        reference_id=expense.id,
+        account=payment_account,
+        debit=Decimal('0'),
+        credit=amount,
+        description=f'Payment for: {expense.description or expense.vendor_name}',
+        created_by=created_by,
+    )
+
+
 @bp.route('/expenses')
 @login_required
 def list_expenses():
@@ -708,17 +951,7 @@ def add_expense():
     if request.method == 'POST':
         try:
             # Generate expense number
-            today = date.today()
-            expense_prefix = f'EXP{today.strftime("%Y%m%d")}'
-            last_expense = Expense.query.filter(
-                Expense.expense_number.like(f'{expense_prefix}%')
-            ).order_by(Expense.id.desc()).first()
-            
-            if last_expense:
-                last_num = int(last_expense.expense_number[-4:])
-                expense_number = f'{expense_prefix}{last_num+1:04d}'
-            else:
-                expense_number = f'{expense_prefix}0001'
+            expense_number = allocate_number('expense')
             
             # Resolve & validate category (controlled dropdown)
             raw_category = _normalize_expense_category_name(request.form.get('expense_category'))
@@ -807,35 +1040,7 @@ def add_expense():
             db.session.flush()
             
             # Create accounting entries
-            # Debit: Expense Account
-            debit_entry = AccountingEntry(
-                entry_date=expense.expense_date,
-                reference_type='expense',
-                reference_id=expense.id,
-                account_id=account.id,
-                account_head=account.name,
-                debit=expense.total_amount,
-                credit=0.0,
-                description=f'Expense: {expense.description or expense.vendor_name}',
-                created_by=current_user.id
-            )
-            
-            # Credit: Cash/Bank Account
-            payment_account = resolve_payment_account(expense.payment_mode)
-            credit_entry = AccountingEntry(
-                entry_date=expense.expense_date,
-                reference_type='expense',
-                reference_id=expense.id,
-                account_id=payment_account.id,
-                account_head=payment_account.name,
-                debit=0.0,
-                credit=expense.total_amount,
-                description=f'Payment for: {expense.description or expense.vendor_name}',
-                created_by=current_user.id
-            )
-            
-            db.session.add(debit_entry)
-            db.session.add(credit_entry)
+            _post_expense_entries(expense, account, created_by=current_user.id)
             
             # Balance is calculated from journal entries automatically
             
@@ -948,22 +1153,9 @@ def edit_expense(id):
             
             expense.total_amount = expense.amount + expense.total_gst
             
-            # Update accounting entries
-            entries = AccountingEntry.query.filter_by(
-                reference_type='expense',
-                reference_id=expense.id
-            ).all()
-            
-            for entry in entries:
-                if entry.debit > 0:  # Expense account entry
-                    entry.account_id = account.id
-                    entry.account_head = account.name
-                    entry.debit = expense.total_amount
-                else:  # Payment account entry
-                    payment_account = resolve_payment_account(expense.payment_mode)
-                    entry.account_id = payment_account.id
-                    entry.account_head = payment_account.name
-                    entry.credit = expense.total_amount
+            # Re-post accounting entries (account, amount, mode or date may have changed)
+            delete_posting('expense', expense.id)
+            _post_expense_entries(expense, account, created_by=current_user.id)
             
             # Balance is calculated from journal entries automatically
             
@@ -1060,10 +1252,7 @@ def delete_expense(id):
         expense_number = expense.expense_number
         
         # Delete accounting entries
-        AccountingEntry.query.filter_by(
-            reference_type='expense',
-            reference_id=expense.id
-        ).delete()
+        delete_posting('expense', expense.id)
         
         # Balance is calculated from journal entries automatically
         
@@ -1095,7 +1284,7 @@ def export_expenses_excel():
     end_date = request.args.get('end_date')
     category = request.args.get('category')
     
-    query = Expense.query
+    query = Expense.query.options(selectinload(Expense.account))
     
     if start_date:
         query = query.filter(Expense.expense_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
@@ -1104,27 +1293,7 @@ def export_expenses_excel():
     if category:
         query = query.filter(Expense.expense_category == category)
     
-    expenses = query.order_by(Expense.expense_date.desc()).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Expenses"
-    
-    # Styles
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    title_font = Font(bold=True, size=16, color="D00000")
-    bold_font = Font(bold=True)
-    
-    # Title
-    ws.merge_cells('A1:M1')
-    ws['A1'] = 'MOHI INDUSTRIES - EXPENSES REPORT'
-    ws['A1'].font = title_font
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    # Filter info
-    row = 2
+    subtitles = []
     if start_date or end_date or category:
         filter_text = 'Filters: '
         if start_date:
@@ -1133,88 +1302,31 @@ def export_expenses_excel():
             filter_text += f'To {end_date} '
         if category:
             filter_text += f'Category: {category}'
-        ws.merge_cells(f'A{row}:M{row}')
-        ws[f'A{row}'] = filter_text
-        ws[f'A{row}'].alignment = Alignment(horizontal='center')
-        row += 1
-    
-    # Headers
-    row += 1
-    headers = ['Expense #', 'Date', 'Vendor', 'Category', 'Account', 'Description', 'Remarks', 'Amount', 'CGST', 'SGST', 'IGST', 'Total GST', 'Total Amount']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=row, column=col)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Data
-    row += 1
-    total_amount = 0
-    total_gst = 0
-    total_with_gst = 0
-    
-    for expense in expenses:
-        ws.cell(row=row, column=1).value = expense.expense_number
-        ws.cell(row=row, column=2).value = expense.expense_date.strftime('%d-%m-%Y')
-        ws.cell(row=row, column=3).value = expense.vendor_name or '-'
-        ws.cell(row=row, column=4).value = expense.expense_category or 'General'
-        ws.cell(row=row, column=5).value = expense.account.name
-        ws.cell(row=row, column=6).value = (expense.description or '').strip() or '-'
-        ws.cell(row=row, column=7).value = (expense.remarks or '').strip() or '-'
-        ws.cell(row=row, column=8).value = float(expense.amount)
-        ws.cell(row=row, column=9).value = float(expense.cgst_amount or 0)
-        ws.cell(row=row, column=10).value = float(expense.sgst_amount or 0)
-        ws.cell(row=row, column=11).value = float(expense.igst_amount or 0)
-        ws.cell(row=row, column=12).value = float(expense.total_gst)
-        ws.cell(row=row, column=13).value = float(expense.total_amount)
-        
-        total_amount += expense.amount
-        total_gst += expense.total_gst
-        total_with_gst += expense.total_amount
-        
-        row += 1
-    
-    # Totals
-    row += 1
-    ws.cell(row=row, column=5).value = 'TOTALS:'
-    ws.cell(row=row, column=5).font = bold_font
-    ws.cell(row=row, column=8).value = float(total_amount)
-    ws.cell(row=row, column=8).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=12).value = float(total_gst)
-    ws.cell(row=row, column=12).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=13).value = float(total_with_gst)
-    ws.cell(row=row, column=13).font = Font(bold=True, color="D00000")
-    
-    # Column widths
-    ws.column_dimensions['A'].width = 15
-    ws.column_dimensions['B'].width = 12
-    ws.column_dimensions['C'].width = 25
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 25
-    ws.column_dimensions['F'].width = 35
-    ws.column_dimensions['G'].width = 30
-    ws.column_dimensions['H'].width = 12
-    ws.column_dimensions['I'].width = 10
-    ws.column_dimensions['J'].width = 10
-    ws.column_dimensions['K'].width = 10
-    ws.column_dimensions['L'].width = 12
-    ws.column_dimensions['M'].width = 15
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # Generate filename with timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'Expenses_Report_{timestamp}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+        subtitles.append(filter_text)
+    
+    return excel_response(
+        query.order_by(Expense.expense_date.desc()),
+        [
+            Column('Expense #', 'expense_number', width=15),
+            Column('Date', lambda e: format_date(e.expense_date), width=12),
+            Column('Vendor', lambda e: e.vendor_name or '-', width=25),
+            Column('Category', lambda e: e.expense_category or 'General', width=15),
+            Column('Account', 'account.name', width=25),
+            Column('Description', lambda e: (e.description or '').strip() or '-', width=35),
+            Column('Remarks', lambda e: (e.remarks or '').strip() or '-', width=30),
+            Column('Amount', lambda e: float(e.amount), width=12, total=True),
+            Column('CGST', lambda e: float(e.cgst_amount or 0), width=10),
+            Column('SGST', lambda e: float(e.sgst_amount or 0), width=10),
+            Column('IGST', lambda e: float(e.igst_amount or 0), width=10),
+            Column('Total GST', lambda e: float(e.total_gst), width=12, total=True),
+            Column('Total Amount', lambda e: float(e.total_amount), width=15, total=True),
+        ],
+        sheet_title='Expenses',
+        filename=timestamped_filename('Expenses_Report'),
+        title='MOHI INDUSTRIES - EXPENSES REPORT',
+        subtitles=subtitles,
+        preamble=[[]],
+        totals_label='TOTALS:',
     )
 
 
@@ -1284,191 +1396,79 @@ def ledger():
     return render_template('accounting/ledger.html', accounts=accounts)
 
 
+def _ledger_range():
+    """(start_date, end_date) from the ledger query string, as strings and dates."""
+    start_date = request.args.get('start_date') or None
+    end_date = request.args.get('end_date') or None
+    start_dt = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+    end_dt = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    return start_date, end_date, start_dt, end_dt
+
+
 @bp.route('/ledger/<int:account_id>')
 @login_required
 def account_ledger(account_id):
     """View ledger for specific account"""
     account = ChartOfAccounts.query.get_or_404(account_id)
+    start_date, end_date, start_dt, end_dt = _ledger_range()
+
+    totals = ledger_totals(account_id, start_dt, end_dt)
+    page = ledger_page(
+        account_id,
+        start_dt,
+        end_dt,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=request.args.get('per_page', DEFAULT_PER_PAGE, type=int),
+    )
 
-    def to_decimal(value) -> Decimal:
-        if value is None:
-            return Decimal('0')
-        if isinstance(value, Decimal):
-            return value
-        return Decimal(str(value))
-    
-    # Get date range
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    query = AccountingEntry.query.filter_by(account_id=account_id)
-    
-    if start_date:
-        query = query.filter(AccountingEntry.entry_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
-    if end_date:
-        query = query.filter(AccountingEntry.entry_date <= datetime.strptime(end_date, '%Y-%m-%d').date())
-    
-    # Opening balance is the sum of all entries before the range start
-    opening_balance = Decimal('0')
-    if start_date:
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d').date()
-        opening_balance = to_decimal(db.session.query(
-            func.sum(AccountingEntry.debit - AccountingEntry.credit)
-        ).filter(
-            AccountingEntry.account_id == account_id,
-            AccountingEntry.entry_date < start_dt,
-        ).scalar())
-
-    entries = query.order_by(AccountingEntry.entry_date, AccountingEntry.id).all()
-
-    # Calculate running balance
-    running_balance = to_decimal(opening_balance)
-    entries_with_balance = []
-    
-    for entry in entries:
-        running_balance += to_decimal(entry.debit) - to_decimal(entry.credit)
-        entries_with_balance.append({
-            'entry': entry,
-            'balance': float(running_balance)
-        })
-    
     return render_template('accounting/account_ledger.html', 
                          account=account,
-                         entries_with_balance=entries_with_balance,
-                         opening_balance=float(opening_balance),
-                         closing_balance=float(running_balance))
+                         entries_with_balance=[{'entry': entry, 'balance': float(balance)} for entry, balance in page.rows],
+                         page=page,
+                         total_entries=totals.entries,
+                         opening_balance=float(totals.opening),
+                         closing_balance=float(totals.closing))
 
 
 @bp.route('/ledger/<int:account_id>/export-excel')
 @login_required
 def export_ledger_excel(account_id):
     """Export ledger to Excel"""
-    from flask import make_response
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from io import BytesIO
-    
     account = ChartOfAccounts.query.get_or_404(account_id)
-    
-    def to_decimal(value) -> Decimal:
-        if value is None:
-            return Decimal('0')
-        if isinstance(value, Decimal):
-            return value
-        return Decimal(str(value))
-    
-    # Get date range
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    query = AccountingEntry.query.filter_by(account_id=account_id)
-    
-    if start_date:
-        query = query.filter(AccountingEntry.entry_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
-    if end_date:
-        query = query.filter(AccountingEntry.entry_date <= datetime.strptime(end_date, '%Y-%m-%d').date())
-    
-    # Opening balance
-    opening_balance = Decimal('0')
-    if start_date:
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d').date()
-        opening_balance = to_decimal(db.session.query(
-            func.sum(AccountingEntry.debit - AccountingEntry.credit)
-        ).filter(
-            AccountingEntry.account_id == account_id,
-            AccountingEntry.entry_date < start_dt,
-        ).scalar())
+    start_date, end_date, start_dt, end_dt = _ledger_range()
+    totals = ledger_totals(account_id, start_dt, end_dt)
 
-    entries = query.order_by(AccountingEntry.entry_date, AccountingEntry.id).all()
-    
-    # Create workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Ledger"
-    
-    # Styles
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    title_font = Font(bold=True, size=16, color="D00000")
-    bold_font = Font(bold=True)
-    
-    # Title
-    ws.merge_cells('A1:G1')
-    ws['A1'] = 'MOHI INDUSTRIES - LEDGER'
-    ws['A1'].font = title_font
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    # Account details
-    ws.merge_cells('A2:G2')
-    ws['A2'] = f'Account: {account.name} ({account.account_number})'
-    ws['A2'].font = bold_font
-    ws['A2'].alignment = Alignment(horizontal='center')
-    
-    # Date range
-    row = 3
+    subtitles = [Styled(f'Account: {account.name} ({account.account_number})', font=BOLD_FONT)]
     if start_date and end_date:
-        ws.merge_cells(f'A{row}:G{row}')
-        ws[f'A{row}'] = f'Period: {start_date} to {end_date}'
-        ws[f'A{row}'].alignment = Alignment(horizontal='center')
-        row += 1
-    
-    # Opening balance
-    row += 1
-    ws[f'A{row}'] = 'Opening Balance:'
-    ws[f'A{row}'].font = bold_font
-    ws[f'G{row}'] = float(opening_balance)
-    ws[f'G{row}'].font = bold_font
-    
-    # Headers
-    row += 2
-    headers = ['Date', 'Reference', 'Description', 'Debit', 'Credit', 'Balance']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=row, column=col)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Data
-    running_balance = float(opening_balance)
-    row += 1
-    for entry in entries:
-        running_balance += float(entry.debit) - float(entry.credit)
-        
-        ws.cell(row=row, column=1).value = entry.entry_date.strftime('%d-%m-%Y')
-        ws.cell(row=row, column=2).value = f"{entry.reference_type}-{entry.reference_id}"
-        ws.cell(row=row, column=3).value = entry.description
-        ws.cell(row=row, column=4).value = float(entry.debit) if entry.debit > 0 else ''
-        ws.cell(row=row, column=5).value = float(entry.credit) if entry.credit > 0 else ''
-        ws.cell(row=row, column=6).value = running_balance
-        
-        row += 1
-    
-    # Closing balance
-    row += 1
-    ws.cell(row=row, column=1).value = 'Closing Balance:'
-    ws.cell(row=row, column=1).font = bold_font
-    ws.cell(row=row, column=6).value = running_balance
-    ws.cell(row=row, column=6).font = Font(bold=True, color="D00000")
-    
-    # Column widths
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 40
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-    
-    # Save
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = make_response(output.read())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename=Ledger_{account.name.replace(" ", "_")}.xlsx'
-    
-    return response
+        subtitles.append(f'Period: {start_date} to {end_date}')
+
+    return excel_response(
+        iter_ledger(account_id, start_dt, end_dt, opening=totals.opening),
+        [
+            Column('Date', lambda r: format_date(r[0].entry_date), width=12),
+            Column('Reference', lambda r: f"{r[0].reference_type}-{r[0].reference_id}", width=15),
+            Column('Description', lambda r: r[0].description, width=40),
+            Column('Debit', lambda r: float(r[0].debit) if r[0].debit > 0 else '', width=15),
+            Column('Credit', lambda r: float(r[0].credit) if r[0].credit > 0 else '', width=15),
+            Column('Balance', lambda r: float(r[1]), width=15),
+        ],
+        sheet_title='Ledger',
+        filename=f'Ledger_{account.name.replace(" ", "_")}.xlsx',
+        title='MOHI INDUSTRIES - LEDGER',
+        subtitles=subtitles,
+        preamble=[
+            [],
+            [Styled('Opening Balance:', font=BOLD_FONT), None, None, None, None,
+             Styled(float(totals.opening), font=BOLD_FONT)],
+            [],
+        ],
+        footer=lambda _: [
+            [],
+            [Styled('Closing Balance:', font=BOLD_FONT), None, None, None, None,
+             Styled(float(totals.closing), font=TOTAL_FONT)],
+        ],
+    )
 
 
 @bp.route('/ledger/<int:account_id>/print')
@@ -1476,55 +1476,20 @@ def export_ledger_excel(account_id):
 def print_ledger(account_id):
     """Print ledger"""
     account = ChartOfAccounts.query.get_or_404(account_id)
-    
-    def to_decimal(value) -> Decimal:
-        if value is None:
-            return Decimal('0')
-        if isinstance(value, Decimal):
-            return value
-        return Decimal(str(value))
-    
-    # Get date range
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    query = AccountingEntry.query.filter_by(account_id=account_id)
-    
-    if start_date:
-        query = query.filter(AccountingEntry.entry_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
-    if end_date:
-        query = query.filter(AccountingEntry.entry_date <= datetime.strptime(end_date, '%Y-%m-%d').date())
-    
-    # Opening balance
-    opening_balance = Decimal('0')
-    if start_date:
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d').date()
-        opening_balance = to_decimal(db.session.query(
-            func.sum(AccountingEntry.debit - AccountingEntry.credit)
-        ).filter(
-            AccountingEntry.account_id == account_id,
-            AccountingEntry.entry_date < start_dt,
-        ).scalar())
-
-    entries = query.order_by(AccountingEntry.entry_date, AccountingEntry.id).all()
-
-    # Calculate running balance
-    running_balance = to_decimal(opening_balance)
-    entries_with_balance = []
-    
-    for entry in entries:
-        running_balance += to_decimal(entry.debit) - to_decimal(entry.credit)
-        entries_with_balance.append({
-            'entry': entry,
-            'balance': float(running_balance)
-        })
+    start_date, end_date, start_dt, end_dt = _ledger_range()
+    totals = ledger_totals(account_id, start_dt, end_dt)
+
+    entries_with_balance = (
+        {'entry': entry, 'balance': float(balance)}
+        for entry, balance in iter_ledger(account_id, start_dt, end_dt, opening=totals.opening)
+    )
     
     return render_template(
         'accounting/ledger_print.html',
         account=account,
         entries_with_balance=entries_with_balance,
-        opening_balance=float(opening_balance),
-        closing_balance=float(running_balance),
+        opening_balance=float(totals.opening),
+        closing_balance=float(totals.closing),
         start_date=start_date,
         end_date=end_date,
         company_name=_company_name(),
@@ -1532,84 +1497,33 @@ def print_ledger(account_id):
     )
 
 
-
 # ==================== TRIAL BALANCE ====================
 
+def _financial_year_range(source) -> tuple[date, date]:
+    """`start_date`/`end_date` from `source` (args or form); defaults to the current Apr-Mar year."""
+    start_date = source.get('start_date')
+    end_date = source.get('end_date')
+    if start_date and end_date:
+        return (
+            datetime.strptime(start_date, '%Y-%m-%d').date(),
+            datetime.strptime(end_date, '%Y-%m-%d').date(),
+        )
+    today = date.today()
+    if today.month >= 4:
+        return date(today.year, 4, 1), date(today.year + 1, 3, 31)
+    return date(today.year - 1, 4, 1), date(today.year, 3, 31)
+
+
 @bp.route('/reports/trial-balance')
 @login_required
 def trial_balance():
     """Trial Balance"""
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-
-    if not start_date or not end_date:
-        today = date.today()
-        if today.month >= 4:
-            start_date = date(today.year, 4, 1)
-            end_date = date(today.year + 1, 3, 31)
-        else:
-            start_date = date(today.year - 1, 4, 1)
-            end_date = date(today.year, 3, 31)
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-
-    accounts = ChartOfAccounts.query.filter_by(is_active=True).order_by(
-        ChartOfAccounts.root_type, ChartOfAccounts.name
-    ).all()
-
-    # Opening balances from all entries before start_date
-    opening_rows = db.session.query(
-        AccountingEntry.account_id,
-        func.sum(AccountingEntry.debit - AccountingEntry.credit).label('signed')
-    ).filter(
-        AccountingEntry.account_id.isnot(None),
-        AccountingEntry.entry_date < start_date,
-    ).group_by(AccountingEntry.account_id).all()
-    opening_signed_map = {r.account_id: float(r.signed or 0.0) for r in opening_rows}
-
-    # Period movement within range
-    period_rows = db.session.query(
-        AccountingEntry.account_id,
-        func.sum(AccountingEntry.debit).label('debit'),
-        func.sum(AccountingEntry.credit).label('credit'),
-    ).filter(
-        AccountingEntry.account_id.isnot(None),
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date,
-    ).group_by(AccountingEntry.account_id).all()
-    debit_map = {r.account_id: float(r.debit or 0.0) for r in period_rows}
-    credit_map = {r.account_id: float(r.credit or 0.0) for r in period_rows}
-
-    rows = []
-    total_debit = 0.0
-    total_credit = 0.0
-    for account in accounts:
-        opening = float(opening_signed_map.get(account.id, 0.0))
-        debits = debit_map.get(account.id, 0.0)
-        credits = credit_map.get(account.id, 0.0)
-        closing = opening + debits - credits
-
-        debit_balance = closing if closing >= 0 else 0.0
-        credit_balance = abs(closing) if closing < 0 else 0.0
-
-        total_debit += debit_balance
-        total_credit += credit_balance
-
-        rows.append({
-            'account': account,
-            'opening': opening,
-            'debit': debits,
-            'credit': credits,
-            'closing': closing,
-            'debit_balance': debit_balance,
-            'credit_balance': credit_balance
-        })
-
+    start_date, end_date = _financial_year_range(request.args)
+    report = trial_balance_data(start_date, end_date)
     return render_template('accounting/trial_balance.html',
-                         rows=rows,
-                         total_debit=total_debit,
-                         total_credit=total_credit,
+                         rows=report['rows'],
+                         total_debit=report['total_debit'],
+                         total_credit=report['total_credit'],
                          start_date=start_date,
                          end_date=end_date)
 
@@ -1618,72 +1532,15 @@ def trial_balance():
 @login_required
 def export_trial_balance_excel():
     """Export Trial Balance to Excel"""
-    from flask import make_response
     import openpyxl
     from openpyxl.styles import Font, Alignment, PatternFill
-    from io import BytesIO
-    
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-
-    if not start_date or not end_date:
-        today = date.today()
-        if today.month >= 4:
-            start_date = date(today.year, 4, 1)
-            end_date = date(today.year + 1, 3, 31)
-        else:
-            start_date = date(today.year - 1, 4, 1)
-            end_date = date(today.year, 3, 31)
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-
-    accounts = ChartOfAccounts.query.filter_by(is_active=True).order_by(
-        ChartOfAccounts.root_type, ChartOfAccounts.name
-    ).all()
-
-    opening_rows = db.session.query(
-        AccountingEntry.account_id,
-        func.sum(AccountingEntry.debit - AccountingEntry.credit).label('signed')
-    ).filter(
-        AccountingEntry.account_id.isnot(None),
-        AccountingEntry.entry_date < start_date,
-    ).group_by(AccountingEntry.account_id).all()
-    opening_signed_map = {r.account_id: float(r.signed or 0.0) for r in opening_rows}
-
-    period_rows = db.session.query(
-        AccountingEntry.account_id,
-        func.sum(AccountingEntry.debit).label('debit'),
-        func.sum(AccountingEntry.credit).label('credit'),
-    ).filter(
-        AccountingEntry.account_id.isnot(None),
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date,
-    ).group_by(AccountingEntry.account_id).all()
-    debit_map = {r.account_id: float(r.debit or 0.0) for r in period_rows}
-    credit_map = {r.account_id: float(r.credit or 0.0) for r in period_rows}
-
-    rows = []
-    total_debit = 0.0
-    total_credit = 0.0
-    for account in accounts:
-        opening = float(opening_signed_map.get(account.id, 0.0))
-        debits = debit_map.get(account.id, 0.0)
-        credits = credit_map.get(account.id, 0.0)
-        closing = opening + debits - credits
-
-        debit_balance = closing if closing >= 0 else 0.0
-        credit_balance = abs(closing) if closing < 0 else 0.0
 
-        total_debit += debit_balance
-        total_credit += credit_balance
+    start_date, end_date = _financial_year_range(request.args)
+    report = trial_balance_data(start_date, end_date)
+    rows = report['rows']
+    total_debit = report['total_debit']
+    total_credit = report['total_credit']
 
-        rows.append({
-            'account': account,
-            'debit_balance': debit_balance,
-            'credit_balance': credit_balance
-        })
-    
     # Create Excel
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -1733,87 +1590,20 @@ def export_trial_balance_excel():
     ws.column_dimensions['C'].width = 15
     ws.column_dimensions['D'].width = 15
     
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = make_response(output.read())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename=Trial_Balance_{start_date.strftime("%Y%m%d")}.xlsx'
-    
-    return response
+    return workbook_response(wb, f'Trial_Balance_{start_date.strftime("%Y%m%d")}.xlsx')
 
 
 @bp.route('/reports/trial-balance/print')
 @login_required
 def print_trial_balance():
     """Print Trial Balance"""
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-
-    if not start_date or not end_date:
-        today = date.today()
-        if today.month >= 4:
-            start_date = date(today.year, 4, 1)
-            end_date = date(today.year + 1, 3, 31)
-        else:
-            start_date = date(today.year - 1, 4, 1)
-            end_date = date(today.year, 3, 31)
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-
-    accounts = ChartOfAccounts.query.filter_by(is_active=True).order_by(
-        ChartOfAccounts.root_type, ChartOfAccounts.name
-    ).all()
-
-    opening_rows = db.session.query(
-        AccountingEntry.account_id,
-        func.sum(AccountingEntry.debit - AccountingEntry.credit).label('signed')
-    ).filter(
-        AccountingEntry.account_id.isnot(None),
-        AccountingEntry.entry_date < start_date,
-    ).group_by(AccountingEntry.account_id).all()
-    opening_signed_map = {r.account_id: float(r.signed or 0.0) for r in opening_rows}
-
-    period_rows = db.session.query(
-        AccountingEntry.account_id,
-        func.sum(AccountingEntry.debit).label('debit'),
-        func.sum(AccountingEntry.credit).label('credit'),
-    ).filter(
-        AccountingEntry.account_id.isnot(None),
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date,
-    ).group_by(AccountingEntry.account_id).all()
-    debit_map = {r.account_id: float(r.debit or 0.0) for r in period_rows}
-    credit_map = {r.account_id: float(r.credit or 0.0) for r in period_rows}
-
-    rows = []
-    total_debit = 0.0
-    total_credit = 0.0
-    for account in accounts:
-        opening = float(opening_signed_map.get(account.id, 0.0))
-        debits = debit_map.get(account.id, 0.0)
-        credits = credit_map.get(account.id, 0.0)
-        closing = opening + debits - credits
-
-        debit_balance = closing if closing >= 0 else 0.0
-        credit_balance = abs(closing) if closing < 0 else 0.0
-
-        total_debit += debit_balance
-        total_credit += credit_balance
-
-        rows.append({
-            'account': account,
-            'debit_balance': debit_balance,
-            'credit_balance': credit_balance
-        })
-
+    start_date, end_date = _financial_year_range(request.args)
+    report = trial_balance_data(start_date, end_date)
     return render_template(
         'accounting/trial_balance_print.html',
-        rows=rows,
-        total_debit=total_debit,
-        total_credit=total_credit,
+        rows=report['rows'],
+        total_debit=report['total_debit'],
+        total_credit=report['total_credit'],
         start_date=start_date,
         end_date=end_date,
         company_name=_company_name(),
@@ -1830,68 +1620,11 @@ def email_trial_balance():
         flash('Please provide a recipient email (or set COMPANY_EMAIL).', 'error')
         return redirect(request.referrer or url_for('accounting.trial_balance'))
 
-    start_date = request.form.get('start_date')
-    end_date = request.form.get('end_date')
-    if start_date:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-    if end_date:
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-
-    # Reuse the same logic as trial_balance()
-    if not start_date or not end_date:
-        today = date.today()
-        if today.month >= 4:
-            start_date = date(today.year, 4, 1)
-            end_date = date(today.year + 1, 3, 31)
-        else:
-            start_date = date(today.year - 1, 4, 1)
-            end_date = date(today.year, 3, 31)
-
-    accounts = ChartOfAccounts.query.filter_by(is_active=True).order_by(
-        ChartOfAccounts.root_type, ChartOfAccounts.name
-    ).all()
-
-    opening_rows = db.session.query(
-        AccountingEntry.account_id,
-        func.sum(AccountingEntry.debit - AccountingEntry.credit).label('signed')
-    ).filter(
-        AccountingEntry.account_id.isnot(None),
-        AccountingEntry.entry_date < start_date,
-    ).group_by(AccountingEntry.account_id).all()
-    opening_signed_map = {r.account_id: float(r.signed or 0.0) for r in opening_rows}
-
-    period_rows = db.session.query(
-        AccountingEntry.account_id,
-        func.sum(AccountingEntry.debit).label('debit'),
-        func.sum(AccountingEntry.credit).label('credit'),
-    ).filter(
-        AccountingEntry.account_id.isnot(None),
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date,
-    ).group_by(AccountingEntry.account_id).all()
-    debit_map = {r.account_id: float(r.debit or 0.0) for r in period_rows}
-    credit_map = {r.account_id: float(r.credit or 0.0) for r in period_rows}
-
-    rows = []
-    total_debit = 0.0
-    total_credit = 0.0
-    for account in accounts:
-        opening = float(opening_signed_map.get(account.id, 0.0))
-        debits = debit_map.get(account.id, 0.0)
-        credits = credit_map.get(account.id, 0.0)
-        closing = opening + debits - credits
-
-        debit_balance = closing if closing >= 0 else 0.0
-        credit_balance = abs(closing) if closing < 0 else 0.0
-
-        total_debit += debit_balance
-        total_credit += credit_balance
-
-        rows.append({
-            'account': account,
-            'debit_balance': debit_balance,
-            'credit_balance': credit_balance,
-        })
+    start_date, end_date = _financial_year_range(request.form)
+    report = trial_balance_data(start_date, end_date)
+    rows = report['rows']
+    total_debit = report['total_debit']
+    total_credit = report['total_credit']
 
     html = render_template(
         'accounting/trial_balance_print.html',
@@ -1920,451 +1653,113 @@ def email_trial_balance():
         attachments = [{'filename': filename, 'content_type': 'application/pdf', 'data': pdf_bytes}]
 
     ok = EmailService.send_html_email(email_to, subject, html, attachments=attachments)
-    flash('Trial Balance emailed successfully.' if ok else 'Failed to send Trial Balance email.', 'success' if ok else 'error')
+    db.session.commit()
+    flash('Trial Balance email queued.' if ok else 'Failed to queue Trial Balance email.', 'success' if ok else 'error')
     return redirect(url_for('accounting.trial_balance', start_date=start_date, end_date=end_date))
 
 
 
 # ==================== AR/AP AGING ====================
 
+def _aging_params():
+    """As-on date and bucket bounds from the query string (today / configured buckets)."""
+    as_on_str = request.args.get('as_on')
+    try:
+        as_on = datetime.strptime(as_on_str, '%Y-%m-%d').date() if as_on_str else date.today()
+    except ValueError:
+        flash('Invalid as-on date; showing today.', 'error')
+        as_on = date.today()
+    try:
+        bounds = parse_bucket_bounds(request.args.get('buckets'))
+    except ValueError as e:
+        flash(str(e), 'error')
+        bounds = default_bucket_bounds()
+    return as_on, bounds
+
+
+def _aging_excel(report, *, title: str, party_header: str, filename_prefix: str):
+    columns = [Column(party_header, 'name', width=35)]
+    for index, label in enumerate(report.labels):
+        columns.append(Column(f'{label} Days', lambda row, index=index: row.amounts[index], width=15, total=True))
+    columns.append(Column('Total', 'total', width=15, total=True))
+    return excel_response(
+        report.rows,
+        columns,
+        sheet_title=title.title(),
+        filename=f'{filename_prefix}_{report.as_of.strftime("%Y%m%d")}.xlsx',
+        title=f'MOHI INDUSTRIES - {title.upper()}',
+        subtitles=[f'As on: {report.as_of.strftime("%d-%m-%Y")}'],
+        totals_label='TOTAL:',
+    )
+
+
 @bp.route('/reports/ar-aging')
 @login_required
 def ar_aging():
     """Accounts Receivable aging"""
-    today = date.today()
-    open_orders = Order.query.filter(Order.payment_status.in_(['pending', 'partial'])).all()
-
-    buckets = {
-        '0-30': 0.0,
-        '31-60': 0.0,
-        '61-90': 0.0,
-        '90+': 0.0
-    }
-    per_customer = {}
-
-    for order in open_orders:
-        outstanding = (order.total_amount or 0.0) - (order.paid_amount or 0.0)
-        if outstanding <= 0:
-            continue
-        age = (today - order.order_date).days
-
-        if age <= 30:
-            bucket = '0-30'
-        elif age <= 60:
-            bucket = '31-60'
-        elif age <= 90:
-            bucket = '61-90'
-        else:
-            bucket = '90+'
-
-        buckets[bucket] += outstanding
-
-        key = order.distributor_id
-        if key not in per_customer:
-            per_customer[key] = {
-                'distributor': order.distributor,
-                'total': 0.0,
-                '0-30': 0.0,
-                '31-60': 0.0,
-                '61-90': 0.0,
-                '90+': 0.0
-            }
-        per_customer[key][bucket] += outstanding
-        per_customer[key]['total'] += outstanding
-
-    rows = sorted(per_customer.values(), key=lambda x: x['total'], reverse=True)
-
-    return render_template('accounting/ar_aging.html',
-                         buckets=buckets,
-                         rows=rows,
-                         as_on=today)
+    as_on, bounds = _aging_params()
+    report = receivables_aging(as_on, bounds)
+    return render_template('accounting/ar_aging.html', report=report, as_on=as_on)
 
 
 @bp.route('/reports/ar-aging/export-excel')
 @login_required
 def export_ar_aging_excel():
     """Export AR Aging to Excel"""
-    from flask import make_response
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill
-    from io import BytesIO
-    
-    today = date.today()
-    open_orders = Order.query.filter(Order.payment_status.in_(['pending', 'partial'])).all()
-
-    buckets = {'0-30': 0.0, '31-60': 0.0, '61-90': 0.0, '90+': 0.0}
-    per_customer = {}
-
-    for order in open_orders:
-        outstanding = (order.total_amount or 0.0) - (order.paid_amount or 0.0)
-        if outstanding <= 0:
-            continue
-        age = (today - order.order_date).days
-
-        if age <= 30:
-            bucket = '0-30'
-        elif age <= 60:
-            bucket = '31-60'
-        elif age <= 90:
-            bucket = '61-90'
-        else:
-            bucket = '90+'
-
-        buckets[bucket] += outstanding
-
-        key = order.distributor_id
-        if key not in per_customer:
-            per_customer[key] = {
-                'distributor': order.distributor,
-                'total': 0.0,
-                '0-30': 0.0,
-                '31-60': 0.0,
-                '61-90': 0.0,
-                '90+': 0.0
-            }
-        per_customer[key][bucket] += outstanding
-        per_customer[key]['total'] += outstanding
-
-    rows = sorted(per_customer.values(), key=lambda x: x['total'], reverse=True)
-    
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "AR Aging"
-    
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    title_font = Font(bold=True, size=16, color="D00000")
-    bold_font = Font(bold=True)
-    
-    ws.merge_cells('A1:F1')
-    ws['A1'] = 'MOHI INDUSTRIES - ACCOUNTS RECEIVABLE AGING'
-    ws['A1'].font = title_font
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    ws.merge_cells('A2:F2')
-    ws['A2'] = f'As on: {today.strftime("%d-%m-%Y")}'
-    ws['A2'].alignment = Alignment(horizontal='center')
-    
-    row = 4
-    headers = ['Customer', '0-30 Days', '31-60 Days', '61-90 Days', '90+ Days', 'Total']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=row, column=col)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-    
-    row += 1
-    for r in rows:
-        ws.cell(row=row, column=1).value = r['distributor'].business_name
-        ws.cell(row=row, column=2).value = r['0-30']
-        ws.cell(row=row, column=3).value = r['31-60']
-        ws.cell(row=row, column=4).value = r['61-90']
-        ws.cell(row=row, column=5).value = r['90+']
-        ws.cell(row=row, column=6).value = r['total']
-        row += 1
-    
-    row += 1
-    ws.cell(row=row, column=1).value = 'TOTAL:'
-    ws.cell(row=row, column=1).font = bold_font
-    ws.cell(row=row, column=2).value = buckets['0-30']
-    ws.cell(row=row, column=2).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=3).value = buckets['31-60']
-    ws.cell(row=row, column=3).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=4).value = buckets['61-90']
-    ws.cell(row=row, column=4).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=5).value = buckets['90+']
-    ws.cell(row=row, column=5).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=6).value = sum(buckets.values())
-    ws.cell(row=row, column=6).font = Font(bold=True, size=12, color="D00000")
-    
-    ws.column_dimensions['A'].width = 35
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = make_response(output.read())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename=AR_Aging_{today.strftime("%Y%m%d")}.xlsx'
-    
-    return response
+    as_on, bounds = _aging_params()
+    return _aging_excel(
+        receivables_aging(as_on, bounds),
+        title='Accounts Receivable Aging',
+        party_header='Customer',
+        filename_prefix='AR_Aging',
+    )
 
 
 @bp.route('/reports/ar-aging/print')
 @login_required
 def print_ar_aging():
     """Print AR Aging"""
-    today = date.today()
-    open_orders = Order.query.filter(Order.payment_status.in_(['pending', 'partial'])).all()
-
-    buckets = {'0-30': 0.0, '31-60': 0.0, '61-90': 0.0, '90+': 0.0}
-    per_customer = {}
-
-    for order in open_orders:
-        outstanding = (order.total_amount or 0.0) - (order.paid_amount or 0.0)
-        if outstanding <= 0:
-            continue
-        age = (today - order.order_date).days
-
-        if age <= 30:
-            bucket = '0-30'
-        elif age <= 60:
-            bucket = '31-60'
-        elif age <= 90:
-            bucket = '61-90'
-        else:
-            bucket = '90+'
-
-        buckets[bucket] += outstanding
-
-        key = order.distributor_id
-        if key not in per_customer:
-            per_customer[key] = {
-                'distributor': order.distributor,
-                'total': 0.0,
-                '0-30': 0.0,
-                '31-60': 0.0,
-                '61-90': 0.0,
-                '90+': 0.0
-            }
-        per_customer[key][bucket] += outstanding
-        per_customer[key]['total'] += outstanding
-
-    rows = sorted(per_customer.values(), key=lambda x: x['total'], reverse=True)
-
+    as_on, bounds = _aging_params()
     return render_template(
         'accounting/ar_aging_print.html',
-        buckets=buckets,
-        rows=rows,
-        as_on=today,
+        report=receivables_aging(as_on, bounds),
+        as_on=as_on,
         company_name=_company_name(),
         logo_data_uri=_logo_data_uri(),
     )
 
 
-
 @bp.route('/reports/ap-aging')
 @login_required
 def ap_aging():
     """Accounts Payable aging"""
-    today = date.today()
-    open_bills = VendorBill.query.filter(VendorBill.status.in_(['pending', 'partial'])).all()
-
-    buckets = {
-        '0-30': 0.0,
-        '31-60': 0.0,
-        '61-90': 0.0,
-        '90+': 0.0
-    }
-    per_vendor = {}
-
-    for bill in open_bills:
-        outstanding = (bill.total_amount or 0.0) - (bill.paid_amount or 0.0)
-        if outstanding <= 0:
-            continue
-        age = (today - bill.bill_date).days
-
-        if age <= 30:
-            bucket = '0-30'
-        elif age <= 60:
-            bucket = '31-60'
-        elif age <= 90:
-            bucket = '61-90'
-        else:
-            bucket = '90+'
-
-        buckets[bucket] += outstanding
-
-        key = bill.vendor_id
-        if key not in per_vendor:
-            per_vendor[key] = {
-                'vendor': bill.vendor,
-                'total': 0.0,
-                '0-30': 0.0,
-                '31-60': 0.0,
-                '61-90': 0.0,
-                '90+': 0.0
-            }
-        per_vendor[key][bucket] += outstanding
-        per_vendor[key]['total'] += outstanding
-
-    rows = sorted(per_vendor.values(), key=lambda x: x['total'], reverse=True)
-
-    return render_template('accounting/ap_aging.html',
-                         buckets=buckets,
-                         rows=rows,
-                         as_on=today)
+    as_on, bounds = _aging_params()
+    report = payables_aging(as_on, bounds)
+    return render_template('accounting/ap_aging.html', report=report, as_on=as_on)
 
 
 @bp.route('/reports/ap-aging/export-excel')
 @login_required
 def export_ap_aging_excel():
     """Export AP Aging to Excel"""
-    from flask import make_response
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill
-    from io import BytesIO
-    
-    today = date.today()
-    open_bills = VendorBill.query.filter(VendorBill.status.in_(['pending', 'partial'])).all()
-
-    buckets = {'0-30': 0.0, '31-60': 0.0, '61-90': 0.0, '90+': 0.0}
-    per_vendor = {}
-
-    for bill in open_bills:
-        outstanding = (bill.total_amount or 0.0) - (bill.paid_amount or 0.0)
-        if outstanding <= 0:
-            continue
-        age = (today - bill.bill_date).days
-
-        if age <= 30:
-            bucket = '0-30'
-        elif age <= 60:
-            bucket = '31-60'
-        elif age <= 90:
-            bucket = '61-90'
-        else:
-            bucket = '90+'
-
-        buckets[bucket] += outstanding
-
-        key = bill.vendor_id
-        if key not in per_vendor:
-            per_vendor[key] = {
-                'vendor': bill.vendor,
-                'total': 0.0,
-                '0-30': 0.0,
-                '31-60': 0.0,
-                '61-90': 0.0,
-                '90+': 0.0
-            }
-        per_vendor[key][bucket] += outstanding
-        per_vendor[key]['total'] += outstanding
-
-    rows = sorted(per_vendor.values(), key=lambda x: x['total'], reverse=True)
-    
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "AP Aging"
-    
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    title_font = Font(bold=True, size=16, color="D00000")
-    bold_font = Font(bold=True)
-    
-    ws.merge_cells('A1:F1')
-    ws['A1'] = 'MOHI INDUSTRIES - ACCOUNTS PAYABLE AGING'
-    ws['A1'].font = title_font
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    ws.merge_cells('A2:F2')
-    ws['A2'] = f'As on: {today.strftime("%d-%m-%Y")}'
-    ws['A2'].alignment = Alignment(horizontal='center')
-    
-    row = 4
-    headers = ['Vendor', '0-30 Days', '31-60 Days', '61-90 Days', '90+ Days', 'Total']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=row, column=col)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-    
-    row += 1
-    for r in rows:
-        ws.cell(row=row, column=1).value = r['vendor'].business_name
-        ws.cell(row=row, column=2).value = r['0-30']
-        ws.cell(row=row, column=3).value = r['31-60']
-        ws.cell(row=row, column=4).value = r['61-90']
-        ws.cell(row=row, column=5).value = r['90+']
-        ws.cell(row=row, column=6).value = r['total']
-        row += 1
-    
-    row += 1
-    ws.cell(row=row, column=1).value = 'TOTAL:'
-    ws.cell(row=row, column=1).font = bold_font
-    ws.cell(row=row, column=2).value = buckets['0-30']
-    ws.cell(row=row, column=2).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=3).value = buckets['31-60']
-    ws.cell(row=row, column=3).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=4).value = buckets['61-90']
-    ws.cell(row=row, column=4).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=5).value = buckets['90+']
-    ws.cell(row=row, column=5).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=6).value = sum(buckets.values())
-    ws.cell(row=row, column=6).font = Font(bold=True, size=12, color="D00000")
-    
-    ws.column_dimensions['A'].width = 35
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = make_response(output.read())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename=AP_Aging_{today.strftime("%Y%m%d")}.xlsx'
-    
-    return response
+    as_on, bounds = _aging_params()
+    return _aging_excel(
+        payables_aging(as_on, bounds),
+        title='Accounts Payable Aging',
+        party_header='Vendor',
+        filename_prefix='AP_Aging',
+    )
 
 
 @bp.route('/reports/ap-aging/print')
 @login_required
 def print_ap_aging():
     """Print AP Aging"""
-    today = date.today()
-    open_bills = VendorBill.query.filter(VendorBill.status.in_(['pending', 'partial'])).all()
-
-    buckets = {'0-30': 0.0, '31-60': 0.0, '61-90': 0.0, '90+': 0.0}
-    per_vendor = {}
-
-    for bill in open_bills:
-        outstanding = (bill.total_amount or 0.0) - (bill.paid_amount or 0.0)
-        if outstanding <= 0:
-            continue
-        age = (today - bill.bill_date).days
-
-        if age <= 30:
-            bucket = '0-30'
-        elif age <= 60:
-            bucket = '31-60'
-        elif age <= 90:
-            bucket = '61-90'
-        else:
-            bucket = '90+'
-
-        buckets[bucket] += outstanding
-
-        key = bill.vendor_id
-        if key not in per_vendor:
-            per_vendor[key] = {
-                'vendor': bill.vendor,
-                'total': 0.0,
-                '0-30': 0.0,
-                '31-60': 0.0,
-                '61-90': 0.0,
-                '90+': 0.0
-            }
-        per_vendor[key][bucket] += outstanding
-        per_vendor[key]['total'] += outstanding
-
-    rows = sorted(per_vendor.values(), key=lambda x: x['total'], reverse=True)
-
+    as_on, bounds = _aging_params()
     return render_template(
         'accounting/ap_aging_print.html',
-        buckets=buckets,
-        rows=rows,
-        as_on=today,
+        report=payables_aging(as_on, bounds),
+        as_on=as_on,
         company_name=_company_name(),
         logo_data_uri=_logo_data_uri(),
     )
@@ -2377,58 +1772,9 @@ def print_ap_aging():
 @login_required
 def profit_loss():
     """Profit & Loss Statement"""
-    # Get date range
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    if not start_date or not end_date:
-        # Default to current financial year (Apr 1 to Mar 31)
-        today = date.today()
-        if today.month >= 4:
-            start_date = date(today.year, 4, 1)
-            end_date = date(today.year + 1, 3, 31)
-        else:
-            start_date = date(today.year - 1, 4, 1)
-            end_date = date(today.year, 3, 31)
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    # Calculate Income
-    income_entries = db.session.query(
-        AccountingEntry.account_head,
-        func.sum(AccountingEntry.credit - AccountingEntry.debit).label('amount')
-    ).join(ChartOfAccounts, AccountingEntry.account_id == ChartOfAccounts.id
-    ).filter(
-        ChartOfAccounts.root_type == 'Income',
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date
-    ).group_by(AccountingEntry.account_head).all()
-    
-    total_income = sum(entry.amount for entry in income_entries)
-    
-    # Calculate Expenses
-    expense_entries = db.session.query(
-        AccountingEntry.account_head,
-        func.sum(AccountingEntry.debit - AccountingEntry.credit).label('amount')
-    ).join(ChartOfAccounts, AccountingEntry.account_id == ChartOfAccounts.id
-    ).filter(
-        ChartOfAccounts.root_type == 'Expense',
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date
-    ).group_by(AccountingEntry.account_head).all()
-    
-    total_expenses = sum(entry.amount for entry in expense_entries)
-    
-    # Calculate Profit/Loss
-    net_profit = total_income - total_expenses
-    
+    start_date, end_date = _financial_year_range(request.args)
     return render_template('accounting/profit_loss.html',
-                         income_entries=income_entries,
-                         expense_entries=expense_entries,
-                         total_income=total_income,
-                         total_expenses=total_expenses,
-                         net_profit=net_profit,
+                         **profit_loss_data(start_date, end_date),
                          start_date=start_date,
                          end_date=end_date)
 
@@ -2437,51 +1783,17 @@ def profit_loss():
 @login_required
 def export_profit_loss_excel():
     """Export Profit & Loss to Excel"""
-    from flask import make_response
     import openpyxl
     from openpyxl.styles import Font, Alignment, PatternFill
-    from io import BytesIO
-    
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    if not start_date or not end_date:
-        today = date.today()
-        if today.month >= 4:
-            start_date = date(today.year, 4, 1)
-            end_date = date(today.year + 1, 3, 31)
-        else:
-            start_date = date(today.year - 1, 4, 1)
-            end_date = date(today.year, 3, 31)
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    income_entries = db.session.query(
-        AccountingEntry.account_head,
-        func.sum(AccountingEntry.credit - AccountingEntry.debit).label('amount')
-    ).join(ChartOfAccounts, AccountingEntry.account_id == ChartOfAccounts.id
-    ).filter(
-        ChartOfAccounts.root_type == 'Income',
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date
-    ).group_by(AccountingEntry.account_head).all()
-    
-    total_income = sum(entry.amount for entry in income_entries)
-    
-    expense_entries = db.session.query(
-        AccountingEntry.account_head,
-        func.sum(AccountingEntry.debit - AccountingEntry.credit).label('amount')
-    ).join(ChartOfAccounts, AccountingEntry.account_id == ChartOfAccounts.id
-    ).filter(
-        ChartOfAccounts.root_type == 'Expense',
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date
-    ).group_by(AccountingEntry.account_head).all()
-    
-    total_expenses = sum(entry.amount for entry in expense_entries)
-    net_profit = total_income - total_expenses
-    
+
+    start_date, end_date = _financial_year_range(request.args)
+    report = profit_loss_data(start_date, end_date)
+    income_entries = report['income_entries']
+    expense_entries = report['expense_entries']
+    total_income = report['total_income']
+    total_expenses = report['total_expenses']
+    net_profit = report['net_profit']
+
     # Create Excel
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -2543,68 +1855,17 @@ def export_profit_loss_excel():
     ws.column_dimensions['B'].width = 15
     ws.column_dimensions['C'].width = 20
     
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = make_response(output.read())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename=Profit_Loss_{start_date.strftime("%Y%m%d")}.xlsx'
-    
-    return response
+    return workbook_response(wb, f'Profit_Loss_{start_date.strftime("%Y%m%d")}.xlsx')
 
 
 @bp.route('/reports/profit-loss/print')
 @login_required
 def print_profit_loss():
     """Print Profit & Loss"""
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    if not start_date or not end_date:
-        today = date.today()
-        if today.month >= 4:
-            start_date = date(today.year, 4, 1)
-            end_date = date(today.year + 1, 3, 31)
-        else:
-            start_date = date(today.year - 1, 4, 1)
-            end_date = date(today.year, 3, 31)
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    income_entries = db.session.query(
-        AccountingEntry.account_head,
-        func.sum(AccountingEntry.credit - AccountingEntry.debit).label('amount')
-    ).join(ChartOfAccounts, AccountingEntry.account_id == ChartOfAccounts.id
-    ).filter(
-        ChartOfAccounts.root_type == 'Income',
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date
-    ).group_by(AccountingEntry.account_head).all()
-    
-    total_income = sum(entry.amount for entry in income_entries)
-    
-    expense_entries = db.session.query(
-        AccountingEntry.account_head,
-        func.sum(AccountingEntry.debit - AccountingEntry.credit).label('amount')
-    ).join(ChartOfAccounts, AccountingEntry.account_id == ChartOfAccounts.id
-    ).filter(
-        ChartOfAccounts.root_type == 'Expense',
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date
-    ).group_by(AccountingEntry.account_head).all()
-    
-    total_expenses = sum(entry.amount for entry in expense_entries)
-    net_profit = total_income - total_expenses
-    
+    start_date, end_date = _financial_year_range(request.args)
     return render_template(
         'accounting/profit_loss_print.html',
-        income_entries=income_entries,
-        expense_entries=expense_entries,
-        total_income=total_income,
-        total_expenses=total_expenses,
-        net_profit=net_profit,
+        **profit_loss_data(start_date, end_date),
         start_date=start_date,
         end_date=end_date,
         company_name=_company_name(),
@@ -2621,52 +1882,11 @@ def email_profit_loss():
         flash('Please provide a recipient email (or set COMPANY_EMAIL).', 'error')
         return redirect(request.referrer or url_for('accounting.profit_loss'))
 
-    start_date = request.form.get('start_date')
-    end_date = request.form.get('end_date')
-    if start_date:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-    if end_date:
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-
-    if not start_date or not end_date:
-        today = date.today()
-        if today.month >= 4:
-            start_date = date(today.year, 4, 1)
-            end_date = date(today.year + 1, 3, 31)
-        else:
-            start_date = date(today.year - 1, 4, 1)
-            end_date = date(today.year, 3, 31)
-
-    income_entries = db.session.query(
-        AccountingEntry.account_head,
-        func.sum(AccountingEntry.credit - AccountingEntry.debit).label('amount')
-    ).join(ChartOfAccounts, AccountingEntry.account_id == ChartOfAccounts.id
-    ).filter(
-        ChartOfAccounts.root_type == 'Income',
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date
-    ).group_by(AccountingEntry.account_head).all()
-    total_income = sum(entry.amount for entry in income_entries)
-
-    expense_entries = db.session.query(
-        AccountingEntry.account_head,
-        func.sum(AccountingEntry.debit - AccountingEntry.credit).label('amount')
-    ).join(ChartOfAccounts, AccountingEntry.account_id == ChartOfAccounts.id
-    ).filter(
-        ChartOfAccounts.root_type == 'Expense',
-        AccountingEntry.entry_date >= start_date,
-        AccountingEntry.entry_date <= end_date
-    ).group_by(AccountingEntry.account_head).all()
-    total_expenses = sum(entry.amount for entry in expense_entries)
-    net_profit = total_income - total_expenses
+    start_date, end_date = _financial_year_range(request.form)
 
     html = render_template(
         'accounting/profit_loss_print.html',
-        income_entries=income_entries,
-        expense_entries=expense_entries,
-        total_income=total_income,
-        total_expenses=total_expenses,
-        net_profit=net_profit,
+        **profit_loss_data(start_date, end_date),
         start_date=start_date,
         end_date=end_date,
         company_name=_company_name(),
@@ -2689,11 +1909,21 @@ def email_profit_loss():
         attachments = [{'filename': filename, 'content_type': 'application/pdf', 'data': pdf_bytes}]
 
     ok = EmailService.send_html_email(email_to, subject, html, attachments=attachments)
-    flash('Profit & Loss emailed successfully.' if ok else 'Failed to send Profit & Loss email.', 'success' if ok else 'error')
+    db.session.commit()
+    flash('Profit & Loss email queued.' if ok else 'Failed to queue Profit & Loss email.', 'success' if ok else 'error')
     return redirect(url_for('accounting.profit_loss', start_date=start_date, end_date=end_date))
 
 
 
+def _balance_sheet_data(as_on_date: date) -> dict:
+    """Balance sheet sections as on a date (cached per ledger version)."""
+    # Charts created before the tree was maintained have no numbering yet.
+    if ChartOfAccounts.query.filter(or_(ChartOfAccounts.lft.is_(None), ChartOfAccounts.lft == 0)).first():
+        rebuild_account_tree()
+        db.session.commit()
+    return balance_sheet_data(as_on_date)
+
+
 @bp.route('/reports/balance-sheet')
 @login_required
 def balance_sheet():
@@ -2705,71 +1935,11 @@ def balance_sheet():
     else:
         as_on_date = datetime.strptime(as_on_date, '%Y-%m-%d').date()
     
-    # Calculate Assets
-    asset_accounts = ChartOfAccounts.query.filter_by(
-        root_type='Asset',
-        is_active=True
-    ).all()
-    
-    assets = []
-    total_assets = Decimal('0')
-    
-    for account in asset_accounts:
-        balance = Decimal('0')
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date
-        ).all()
-        
-        for entry in entries:
-            balance += _to_decimal(entry.debit) - _to_decimal(entry.credit)
-        
-        assets.append({'account': account, 'balance': balance})
-        total_assets += balance
-    
-    # Calculate Liabilities
-    liability_accounts = ChartOfAccounts.query.filter_by(
-        root_type='Liability',
-        is_active=True
-    ).all()
-    
-    liabilities = []
-    total_liabilities = Decimal('0')
-    
-    for account in liability_accounts:
-        balance = Decimal('0')
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date
-        ).all()
-        
-        for entry in entries:
-            balance += _to_decimal(entry.credit) - _to_decimal(entry.debit)
-        
-        liabilities.append({'account': account, 'balance': balance})
-        total_liabilities += balance
-    
-    # Calculate Equity
-    equity_accounts = ChartOfAccounts.query.filter_by(
-        root_type='Equity',
-        is_active=True
-    ).all()
-    
-    equity = []
-    total_equity = Decimal('0')
-    
-    for account in equity_accounts:
-        balance = Decimal('0')
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date
-        ).all()
-        
-        for entry in entries:
-            balance += _to_decimal(entry.credit) - _to_decimal(entry.debit)
-        
-        equity.append({'account': account, 'balance': balance})
-        total_equity += balance
+    sheet = _balance_sheet_data(as_on_date)
+    assets, liabilities, equity = sheet['assets'], sheet['liabilities'], sheet['equity']
+    total_assets = sheet['total_assets']
+    total_liabilities = sheet['total_liabilities']
+    total_equity = sheet['total_equity']
     
     return render_template('accounting/balance_sheet.html',
                          assets=assets,
@@ -2785,10 +1955,8 @@ def balance_sheet():
 @login_required  
 def export_balance_sheet_excel():
     """Export Balance Sheet to Excel"""
-    from flask import make_response
     import openpyxl
     from openpyxl.styles import Font, Alignment, PatternFill
-    from io import BytesIO
     
     as_on_date = request.args.get('as_on_date')
     if not as_on_date:
@@ -2796,47 +1964,11 @@ def export_balance_sheet_excel():
     else:
         as_on_date = datetime.strptime(as_on_date, '%Y-%m-%d').date()
     
-    asset_accounts = ChartOfAccounts.query.filter_by(root_type='Asset', is_active=True).all()
-    assets = []
-    total_assets = Decimal('0')
-    for account in asset_accounts:
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date,
-        ).all()
-        balance = Decimal('0')
-        for e in entries:
-            balance += _to_decimal(e.debit) - _to_decimal(e.credit)
-        assets.append({'account': account, 'balance': balance})
-        total_assets += balance
-    
-    liability_accounts = ChartOfAccounts.query.filter_by(root_type='Liability', is_active=True).all()
-    liabilities = []
-    total_liabilities = Decimal('0')
-    for account in liability_accounts:
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date,
-        ).all()
-        balance = Decimal('0')
-        for e in entries:
-            balance += _to_decimal(e.credit) - _to_decimal(e.debit)
-        liabilities.append({'account': account, 'balance': balance})
-        total_liabilities += balance
-    
-    equity_accounts = ChartOfAccounts.query.filter_by(root_type='Equity', is_active=True).all()
-    equity = []
-    total_equity = Decimal('0')
-    for account in equity_accounts:
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date,
-        ).all()
-        balance = Decimal('0')
-        for e in entries:
-            balance += _to_decimal(e.credit) - _to_decimal(e.debit)
-        equity.append({'account': account, 'balance': balance})
-        total_equity += balance
+    sheet = _balance_sheet_data(as_on_date)
+    assets, liabilities, equity = sheet['assets'], sheet['liabilities'], sheet['equity']
+    total_assets = sheet['total_assets']
+    total_liabilities = sheet['total_liabilities']
+    total_equity = sheet['total_equity']
     
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -2869,11 +2001,11 @@ def export_balance_sheet_excel():
     
     for i in range(max_rows):
         if i < len(assets):
-            ws.cell(row=row+i, column=1).value = assets[i]['account'].name
+            ws.cell(row=row+i, column=1).value = '    ' * assets[i]['depth'] + assets[i]['account'].name
             ws.cell(row=row+i, column=2).value = float(assets[i]['balance'])
         
         if i < len(liabilities):
-            ws.cell(row=row+i, column=3).value = liabilities[i]['account'].name
+            ws.cell(row=row+i, column=3).value = '    ' * liabilities[i]['depth'] + liabilities[i]['account'].name
             ws.cell(row=row+i, column=4).value = float(liabilities[i]['balance'])
         elif i == len(liabilities) + 1:
             ws.cell(row=row+i, column=3).value = 'EQUITY'
@@ -2881,7 +2013,7 @@ def export_balance_sheet_excel():
         elif i > len(liabilities) + 1 and i < len(liabilities) + len(equity) + 2:
             eq_idx = i - len(liabilities) - 2
             if eq_idx < len(equity):
-                ws.cell(row=row+i, column=3).value = equity[eq_idx]['account'].name
+                ws.cell(row=row+i, column=3).value = '    ' * equity[eq_idx]['depth'] + equity[eq_idx]['account'].name
                 ws.cell(row=row+i, column=4).value = float(equity[eq_idx]['balance'])
     
     row += max_rows + 1
@@ -2900,15 +2032,7 @@ def export_balance_sheet_excel():
     ws.column_dimensions['C'].width = 30
     ws.column_dimensions['D'].width = 20
     
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = make_response(output.read())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename=Balance_Sheet_{as_on_date.strftime("%Y%m%d")}.xlsx'
-    
-    return response
+    return workbook_response(wb, f'Balance_Sheet_{as_on_date.strftime("%Y%m%d")}.xlsx')
 
 
 @bp.route('/reports/balance-sheet/print')
@@ -2921,47 +2045,11 @@ def print_balance_sheet():
     else:
         as_on_date = datetime.strptime(as_on_date, '%Y-%m-%d').date()
     
-    asset_accounts = ChartOfAccounts.query.filter_by(root_type='Asset', is_active=True).all()
-    assets = []
-    total_assets = Decimal('0')
-    for account in asset_accounts:
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date,
-        ).all()
-        balance = Decimal('0')
-        for e in entries:
-            balance += _to_decimal(e.debit) - _to_decimal(e.credit)
-        assets.append({'account': account, 'balance': balance})
-        total_assets += balance
-    
-    liability_accounts = ChartOfAccounts.query.filter_by(root_type='Liability', is_active=True).all()
-    liabilities = []
-    total_liabilities = Decimal('0')
-    for account in liability_accounts:
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date,
-        ).all()
-        balance = Decimal('0')
-        for e in entries:
-            balance += _to_decimal(e.credit) - _to_decimal(e.debit)
-        liabilities.append({'account': account, 'balance': balance})
-        total_liabilities += balance
-    
-    equity_accounts = ChartOfAccounts.query.filter_by(root_type='Equity', is_active=True).all()
-    equity = []
-    total_equity = Decimal('0')
-    for account in equity_accounts:
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date,
-        ).all()
-        balance = Decimal('0')
-        for e in entries:
-            balance += _to_decimal(e.credit) - _to_decimal(e.debit)
-        equity.append({'account': account, 'balance': balance})
-        total_equity += balance
+    sheet = _balance_sheet_data(as_on_date)
+    assets, liabilities, equity = sheet['assets'], sheet['liabilities'], sheet['equity']
+    total_assets = sheet['total_assets']
+    total_liabilities = sheet['total_liabilities']
+    total_equity = sheet['total_equity']
     
     return render_template(
         'accounting/balance_sheet_print.html',
@@ -2992,47 +2080,11 @@ def email_balance_sheet():
     else:
         as_on_date = datetime.strptime(as_on_date, '%Y-%m-%d').date()
 
-    asset_accounts = ChartOfAccounts.query.filter_by(root_type='Asset', is_active=True).all()
-    assets = []
-    total_assets = Decimal('0')
-    for account in asset_accounts:
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date,
-        ).all()
-        balance = Decimal('0')
-        for e in entries:
-            balance += _to_decimal(e.debit) - _to_decimal(e.credit)
-        assets.append({'account': account, 'balance': balance})
-        total_assets += balance
-
-    liability_accounts = ChartOfAccounts.query.filter_by(root_type='Liability', is_active=True).all()
-    liabilities = []
-    total_liabilities = Decimal('0')
-    for account in liability_accounts:
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date,
-        ).all()
-        balance = Decimal('0')
-        for e in entries:
-            balance += _to_decimal(e.credit) - _to_decimal(e.debit)
-        liabilities.append({'account': account, 'balance': balance})
-        total_liabilities += balance
-
-    equity_accounts = ChartOfAccounts.query.filter_by(root_type='Equity', is_active=True).all()
-    equity = []
-    total_equity = Decimal('0')
-    for account in equity_accounts:
-        entries = AccountingEntry.query.filter(
-            AccountingEntry.account_id == account.id,
-            AccountingEntry.entry_date <= as_on_date,
-        ).all()
-        balance = Decimal('0')
-        for e in entries:
-            balance += _to_decimal(e.credit) - _to_decimal(e.debit)
-        equity.append({'account': account, 'balance': balance})
-        total_equity += balance
+    sheet = _balance_sheet_data(as_on_date)
+    assets, liabilities, equity = sheet['assets'], sheet['liabilities'], sheet['equity']
+    total_assets = sheet['total_assets']
+    total_liabilities = sheet['total_liabilities']
+    total_equity = sheet['total_equity']
 
     html = render_template(
         'accounting/balance_sheet_print.html',
@@ -3063,7 +2115,8 @@ def email_balance_sheet():
         attachments = [{'filename': filename, 'content_type': 'application/pdf', 'data': pdf_bytes}]
 
     ok = EmailService.send_html_email(email_to, subject, html, attachments=attachments)
-    flash('Balance Sheet emailed successfully.' if ok else 'Failed to send Balance Sheet email.', 'success' if ok else 'error')
+    db.session.commit()
+    flash('Balance Sheet email queued.' if ok else 'Failed to queue Balance Sheet email.', 'success' if ok else 'error')
     return redirect(url_for('accounting.balance_sheet', as_on_date=as_on_date))
 
 
@@ -3099,83 +2152,29 @@ def day_book():
 @login_required
 def export_day_book_excel():
     """Export Day Book to Excel"""
-    from flask import make_response
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill
-    from io import BytesIO
-    
     selected_date = request.args.get('date')
     if not selected_date:
         selected_date = date.today()
     else:
         selected_date = datetime.strptime(selected_date, '%Y-%m-%d').date()
     
-    entries = AccountingEntry.query.filter_by(entry_date=selected_date).order_by(AccountingEntry.id).all()
-    total_debit = sum(e.debit for e in entries)
-    total_credit = sum(e.credit for e in entries)
-    
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Day Book"
-    
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    title_font = Font(bold=True, size=16, color="D00000")
-    bold_font = Font(bold=True)
-    
-    ws.merge_cells('A1:F1')
-    ws['A1'] = 'MOHI INDUSTRIES - DAY BOOK'
-    ws['A1'].font = title_font
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    ws.merge_cells('A2:F2')
-    ws['A2'] = f'Date: {selected_date.strftime("%d-%m-%Y")}'
-    ws['A2'].font = bold_font
-    ws['A2'].alignment = Alignment(horizontal='center')
-    
-    row = 4
-    headers = ['Entry ID', 'Account', 'Reference', 'Description', 'Debit', 'Credit']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=row, column=col)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-    
-    row += 1
-    for entry in entries:
-        ws.cell(row=row, column=1).value = entry.id
-        ws.cell(row=row, column=2).value = entry.account_head
-        ws.cell(row=row, column=3).value = f"{entry.reference_type}-{entry.reference_id}"
-        ws.cell(row=row, column=4).value = entry.description
-        ws.cell(row=row, column=5).value = float(entry.debit) if entry.debit > 0 else ''
-        ws.cell(row=row, column=6).value = float(entry.credit) if entry.credit > 0 else ''
-        row += 1
-    
-    row += 1
-    ws.cell(row=row, column=4).value = 'TOTAL:'
-    ws.cell(row=row, column=4).font = bold_font
-    ws.cell(row=row, column=5).value = total_debit
-    ws.cell(row=row, column=5).font = Font(bold=True, color="D00000")
-    ws.cell(row=row, column=6).value = total_credit
-    ws.cell(row=row, column=6).font = Font(bold=True, color="D00000")
-    
-    ws.column_dimensions['A'].width = 10
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 40
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = make_response(output.read())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename=Day_Book_{selected_date.strftime("%Y%m%d")}.xlsx'
-    
-    return response
+    return excel_response(
+        AccountingEntry.query.filter_by(entry_date=selected_date).order_by(AccountingEntry.id),
+        [
+            Column('Entry ID', 'id', width=10),
+            Column('Account', 'account_head', width=30),
+            Column('Reference', lambda e: f"{e.reference_type}-{e.reference_id}", width=15),
+            Column('Description', 'description', width=40),
+            Column('Debit', lambda e: float(e.debit) if e.debit > 0 else '', width=15, total=True),
+            Column('Credit', lambda e: float(e.credit) if e.credit > 0 else '', width=15, total=True),
+        ],
+        sheet_title='Day Book',
+        filename=f'Day_Book_{selected_date.strftime("%Y%m%d")}.xlsx',
+        title='MOHI INDUSTRIES - DAY BOOK',
+        subtitles=[Styled(f'Date: {selected_date.strftime("%d-%m-%Y")}', font=BOLD_FONT)],
+        preamble=[[]],
+        totals_label='TOTAL:',
+    )
 
 
 @bp.route('/reports/day-book/print')
@@ -3204,47 +2203,26 @@ def print_day_book():
 
 
 
-@bp.route('/reports/cash-flow')
-@login_required
-def cash_flow():
-    """Cash Flow Statement"""
+def _cash_flow_range() -> tuple[date, date]:
+    """`start_date`/`end_date` from the query string; defaults to the last 30 days."""
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
-    
     if not start_date or not end_date:
         end_date = date.today()
-        start_date = end_date - timedelta(days=30)
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    # Cash Inflows (Payments received)
-    cash_inflows = Payment.query.filter(
-        Payment.payment_date >= start_date,
-        Payment.payment_date <= end_date,
-        Payment.status == 'cleared'
-    ).all()
-    
-    total_inflow = sum(p.amount for p in cash_inflows)
-    
-    # Cash Outflows (Expenses)
-    cash_outflows = Expense.query.filter(
-        Expense.expense_date >= start_date,
-        Expense.expense_date <= end_date,
-        Expense.payment_status == 'paid'
-    ).all()
-    
-    total_outflow = sum(e.total_amount for e in cash_outflows)
-    
-    # Net Cash Flow
-    net_cash_flow = total_inflow - total_outflow
-    
+        return end_date - timedelta(days=30), end_date
+    return (
+        datetime.strptime(start_date, '%Y-%m-%d').date(),
+        datetime.strptime(end_date, '%Y-%m-%d').date(),
+    )
+
+
+@bp.route('/reports/cash-flow')
+@login_required
+def cash_flow():
+    """Cash Flow Statement"""
+    start_date, end_date = _cash_flow_range()
     return render_template('accounting/cash_flow.html',
-                         cash_inflows=cash_inflows,
-                         cash_outflows=cash_outflows,
-                         total_inflow=total_inflow,
-                         total_outflow=total_outflow,
-                         net_cash_flow=net_cash_flow,
+                         **cash_flow_data(start_date, end_date),
                          start_date=start_date,
                          end_date=end_date)
 
@@ -3253,36 +2231,17 @@ def cash_flow():
 @login_required
 def export_cash_flow_excel():
     """Export Cash Flow to Excel"""
-    from flask import make_response
     import openpyxl
     from openpyxl.styles import Font, Alignment, PatternFill
-    from io import BytesIO
-    
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    if not start_date or not end_date:
-        end_date = date.today()
-        start_date = end_date - timedelta(days=30)
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    cash_inflows = Payment.query.filter(
-        Payment.payment_date >= start_date,
-        Payment.payment_date <= end_date,
-        Payment.status == 'cleared'
-    ).all()
-    total_inflow = sum(p.amount for p in cash_inflows)
-    
-    cash_outflows = Expense.query.filter(
-        Expense.expense_date >= start_date,
-        Expense.expense_date <= end_date,
-        Expense.payment_status == 'paid'
-    ).all()
-    total_outflow = sum(e.total_amount for e in cash_outflows)
-    net_cash_flow = total_inflow - total_outflow
-    
+
+    start_date, end_date = _cash_flow_range()
+    report = cash_flow_data(start_date, end_date)
+    cash_inflows = report['cash_inflows']
+    cash_outflows = report['cash_outflows']
+    total_inflow = report['total_inflow']
+    total_outflow = report['total_outflow']
+    net_cash_flow = report['net_cash_flow']
+
     wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = "Cash Flow"
@@ -3318,7 +2277,7 @@ def export_cash_flow_excel():
     for payment in cash_inflows:
         ws.cell(row=row, column=1).value = payment.payment_date.strftime('%d-%m-%Y')
         ws.cell(row=row, column=2).value = payment.payment_number
-        ws.cell(row=row, column=3).value = payment.order.distributor.business_name if payment.order else ''
+        ws.cell(row=row, column=3).value = payment.customer or ''
         ws.cell(row=row, column=4).value = float(payment.amount)
         row += 1
     
@@ -3364,53 +2323,17 @@ def export_cash_flow_excel():
     ws.column_dimensions['C'].width = 40
     ws.column_dimensions['D'].width = 15
     
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = make_response(output.read())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename=Cash_Flow_{start_date.strftime("%Y%m%d")}.xlsx'
-    
-    return response
+    return workbook_response(wb, f'Cash_Flow_{start_date.strftime("%Y%m%d")}.xlsx')
 
 
 @bp.route('/reports/cash-flow/print')
 @login_required
 def print_cash_flow():
     """Print Cash Flow"""
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    if not start_date or not end_date:
-        end_date = date.today()
-        start_date = end_date - timedelta(days=30)
-    else:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    cash_inflows = Payment.query.filter(
-        Payment.payment_date >= start_date,
-        Payment.payment_date <= end_date,
-        Payment.status == 'cleared'
-    ).all()
-    total_inflow = sum(p.amount for p in cash_inflows)
-    
-    cash_outflows = Expense.query.filter(
-        Expense.expense_date >= start_date,
-        Expense.expense_date <= end_date,
-        Expense.payment_status == 'paid'
-    ).all()
-    total_outflow = sum(e.total_amount for e in cash_outflows)
-    net_cash_flow = total_inflow - total_outflow
-    
+    start_date, end_date = _cash_flow_range()
     return render_template(
         'accounting/cash_flow_print.html',
-        cash_inflows=cash_inflows,
-        cash_outflows=cash_outflows,
-        total_inflow=total_inflow,
-        total_outflow=total_outflow,
-        net_cash_flow=net_cash_flow,
+        **cash_flow_data(start_date, end_date),
         start_date=start_date,
         end_date=end_date,
         company_name=_company_name(),
@@ -3418,7 +2341,6 @@ def print_cash_flow():
     )
 
 
-
 # ==================== DASHBOARD ====================
 
 @bp.route('/dashboard')
@@ -3435,20 +2357,20 @@ def dashboard():
     # This month's income
     month_start = date(today.year, today.month, 1)
     month_income = db.session.query(
-        func.sum(AccountingEntry.credit - AccountingEntry.debit)
-    ).join(ChartOfAccounts, AccountingEntry.account_id == ChartOfAccounts.id
+        func.sum(AccountDailyBalance.credit - AccountDailyBalance.debit)
+    ).join(ChartOfAccounts, AccountDailyBalance.account_id == ChartOfAccounts.id
     ).filter(
         ChartOfAccounts.root_type == 'Income',
-        AccountingEntry.entry_date >= month_start
+        AccountDailyBalance.date >= month_start
     ).scalar() or 0.0
     
     # This month's expenses
     month_expenses = db.session.query(
-        func.sum(AccountingEntry.debit - AccountingEntry.credit)
-    ).join(ChartOfAccounts, AccountingEntry.account_id == ChartOfAccounts.id
+        func.sum(AccountDailyBalance.debit - AccountDailyBalance.credit)
+    ).join(ChartOfAccounts, AccountDailyBalance.account_id == ChartOfAccounts.id
     ).filter(
         ChartOfAccounts.root_type == 'Expense',
-        AccountingEntry.entry_date >= month_start
+        AccountDailyBalance.date >= month_start
     ).scalar() or 0.0
     
     # Pending expenses
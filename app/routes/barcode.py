@@ -12,18 +12,15 @@ from typing import Optional
 # Try to import barcode libraries, make them optional
 try:
     from app.utils.barcode_generator import BarcodeGenerator
+    from app.services.ean_allocator import allocate_eans
     BARCODE_AVAILABLE = True
 except ImportError:
     BARCODE_AVAILABLE = False
     BarcodeGenerator = None
 
-# Try to import PDF libraries
+# Try to import PDF libraries (label sheets need reportlab and pypdf)
 try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.units import mm
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.utils import ImageReader
-    from PIL import Image
+    from app.services.label_sheets import LabelRun, LabelSpec, render_print_job, render_sheets
     PDF_AVAILABLE = True
 except ImportError:
     PDF_AVAILABLE = False
@@ -35,32 +32,6 @@ def _default_company_prefix() -> str:
     return str(current_app.config.get('BARCODE_COMPANY_PREFIX', '890123456'))
 
 
-def _extract_product_code_from_ean(company_prefix: str, ean_barcode: str) -> Optional[str]:
-    if not ean_barcode or not company_prefix:
-        return None
-    if not ean_barcode.startswith(company_prefix) or len(ean_barcode) != 13:
-        return None
-    # strip prefix and check digit
-    product_code = ean_barcode[len(company_prefix):-1]
-    if not product_code.isdigit():
-        return None
-    return product_code
-
-
-def _get_last_product_code_for_prefix(company_prefix: str) -> Optional[str]:
-    if not company_prefix:
-        return None
-    last_product = (
-        Product.query
-        .filter(Product.ean_barcode.isnot(None), Product.ean_barcode.startswith(company_prefix))
-        .order_by(Product.ean_barcode.desc())
-        .first()
-    )
-    if not last_product or not last_product.ean_barcode:
-        return None
-    return _extract_product_code_from_ean(company_prefix, last_product.ean_barcode)
-
-
 def _safe_next_url() -> Optional[str]:
     """Return a safe local redirect target if provided via request."""
     next_url = request.values.get('next')
@@ -76,6 +47,22 @@ def _safe_next_url() -> Optional[str]:
     return next_url
 
 
+def _png_response(etag: str, render, download_name: str):
+    """PNG with a strong ETag, revalidated on every use.
+    
+    `etag` is a hash of everything drawn (see `BarcodeGenerator.label_key`), so a
+    client that already has it gets a 304 without `render()` being called.
+    """
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = send_file(BytesIO(render()), mimetype='image/png', download_name=download_name)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 def check_barcode_available():
     """Check if barcode functionality is available"""
     if not BARCODE_AVAILABLE:
@@ -119,37 +106,9 @@ def generate_product_barcode(product_id):
         # Get company prefix from form or use default
         company_prefix = request.form.get('company_prefix') or _default_company_prefix()
 
-        # Find last used code *for this prefix* and generate next.
-        last_code = _get_last_product_code_for_prefix(company_prefix)
-        product_code = BarcodeGenerator.generate_next_product_code(company_prefix, last_code)
+        # Next unused code for this prefix (counter row is locked until commit)
+        ean_code = allocate_eans(company_prefix, 1)[0]
 
-        # Generate EAN-13 (skip duplicates if any exist)
-        ean_code = None
-        for _ in range(2000):
-            candidate = BarcodeGenerator.generate_ean13(company_prefix, product_code)
-            existing = Product.query.filter_by(ean_barcode=candidate).first()
-            if not existing:
-                ean_code = candidate
-                break
-            product_code = BarcodeGenerator.generate_next_product_code(company_prefix, product_code)
-
-        if not ean_code:
-            flash('❌ Could not find an available barcode number. Please check your prefix or existing barcodes.', 'error')
-            next_url = _safe_next_url()
-            return redirect(next_url or url_for('barcode.view_product_barcode', product_id=product_id))
-        
-        # Validate
-        if not BarcodeGenerator.validate_ean13(ean_code):
-            flash('❌ Generated barcode is invalid!', 'error')
-            return redirect(url_for('barcode.view_product_barcode', product_id=product_id))
-        
-        # Defensive check (should be prevented by loop)
-        existing = Product.query.filter_by(ean_barcode=ean_code).first()
-        if existing:
-            flash(f"❌ Barcode already exists (assigned to {existing.sku} - {existing.name}).", 'error')
-            next_url = _safe_next_url()
-            return redirect(next_url or url_for('barcode.view_product_barcode', product_id=product_id))
-        
         # Save to product
         product.ean_barcode = ean_code
         product.barcode_source = request.form.get('barcode_source', 'internal')
@@ -229,8 +188,11 @@ def get_barcode_image(product_id):
         return "No barcode", 404
     
     try:
-        img_io = BarcodeGenerator.generate_barcode_image(product.ean_barcode)
-        return send_file(img_io, mimetype='image/png', download_name=f'{product.sku}_barcode.png')
+        return _png_response(
+            BarcodeGenerator.barcode_key(product.ean_barcode),
+            lambda: BarcodeGenerator.barcode_png(product.ean_barcode),
+            f'{product.sku}_barcode.png',
+        )
     except Exception as e:
         return f"Error: {str(e)}", 500
 
@@ -250,14 +212,11 @@ def get_product_label(product_id):
         batch = Batch.query.get(batch_id)
     
     try:
-        label_img = BarcodeGenerator.generate_product_label(product, batch)
-        
-        # Convert to BytesIO
-        img_io = BytesIO()
-        label_img.save(img_io, 'PNG')
-        img_io.seek(0)
-        
-        return send_file(img_io, mimetype='image/png', download_name=f'{product.sku}_label.png')
+        return _png_response(
+            BarcodeGenerator.label_key(product, batch),
+            lambda: BarcodeGenerator.product_label_png(product, batch),
+            f'{product.sku}_label.png',
+        )
     except Exception as e:
         return f"Error: {str(e)}", 500
 
@@ -279,54 +238,8 @@ def print_product_labels(product_id):
         batch = Batch.query.get(batch_id)
     
     try:
-        # Create PDF
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        page_width, page_height = A4
-        
-        # Label dimensions (40mm x 25mm)
-        label_width = 40 * mm
-        label_height = 25 * mm
-        
-        # Margins
-        margin_x = 10 * mm
-        margin_y = 10 * mm
-        
-        # Calculate labels per row and column
-        labels_per_row = int((page_width - 2 * margin_x) / label_width)
-        labels_per_col = int((page_height - 2 * margin_y) / label_height)
-        
-        # Generate label image
-        label_img = BarcodeGenerator.generate_product_label(product, batch, label_size=(int(label_width * 2.83), int(label_height * 2.83)))
-        
-        # Convert PIL image to ReportLab ImageReader
-        img_buffer = BytesIO()
-        label_img.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
-        img_reader = ImageReader(img_buffer)
-        
-        # Draw labels
-        label_count = 0
-        for page in range((count // (labels_per_row * labels_per_col)) + 1):
-            for row in range(labels_per_col):
-                for col in range(labels_per_row):
-                    if label_count >= count:
-                        break
-                    
-                    x = margin_x + col * label_width
-                    y = page_height - margin_y - (row + 1) * label_height
-                    
-                    c.drawImage(img_reader, x, y, width=label_width, height=label_height)
-                    label_count += 1
-                
-                if label_count >= count:
-                    break
-            
-            if label_count < count:
-                c.showPage()
-        
-        c.save()
-        buffer.seek(0)
+        # The label is rendered once and referenced from every cell
+        buffer = BytesIO(render_sheets([LabelRun(LabelSpec.for_product(product, batch), count)]))
         
         filename = f'{product.sku}_labels_{count}pcs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
         return send_file(buffer, mimetype='application/pdf', download_name=filename, as_attachment=True)
@@ -336,6 +249,72 @@ def print_product_labels(product_id):
         return redirect(url_for('barcode.view_product_barcode', product_id=product_id))
 
 
+
+@bp.route('/print-job', methods=['POST'])
+@login_required
+def print_label_job():
+    """Print labels for several products/batches as one PDF
+    
+    JSON: {"items": [{"product_id": 1, "batch_id": 7, "count": 200}, ...]}
+    or form lists product_id[], batch_id[] (may be blank) and count[].
+    """
+    if not BARCODE_AVAILABLE or not PDF_AVAILABLE:
+        return jsonify({'error': 'Label printing not available. Please install python-barcode, reportlab and pypdf.'}), 503
+    
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if items is None:
+        items = [
+            {'product_id': product_id, 'batch_id': batch_id, 'count': count}
+            for product_id, batch_id, count in zip(
+                request.form.getlist('product_id[]'),
+                request.form.getlist('batch_id[]'),
+                request.form.getlist('count[]'),
+            )
+        ]
+    
+    try:
+        items = [
+            (int(item['product_id']), int(item['batch_id']) if item.get('batch_id') else None, int(item['count']))
+            for item in items
+        ]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Each item needs a product_id, a count and optionally a batch_id'}), 400
+    if not items or any(count < 1 for _, _, count in items):
+        return jsonify({'error': 'No labels requested'}), 400
+    
+    total = sum(count for _, _, count in items)
+    max_labels = current_app.config.get('LABEL_PRINT_MAX_LABELS', 20000)
+    if total > max_labels:
+        return jsonify({'error': f'At most {max_labels} labels per print job'}), 400
+    
+    products = {p.id: p for p in Product.query.filter(Product.id.in_({product_id for product_id, _, _ in items}))}
+    batch_ids = {batch_id for _, batch_id, _ in items if batch_id}
+    batches = {b.id: b for b in Batch.query.filter(Batch.id.in_(batch_ids))} if batch_ids else {}
+    
+    runs = []
+    for product_id, batch_id, count in items:
+        product = products.get(product_id)
+        batch = batches.get(batch_id) if batch_id else None
+        if not product:
+            return jsonify({'error': f'Product {product_id} not found'}), 404
+        if batch_id and (not batch or batch.product_id != product_id):
+            return jsonify({'error': f'Batch {batch_id} not found for product {product_id}'}), 404
+        runs.append(LabelRun(LabelSpec.for_product(product, batch), count))
+    
+    try:
+        pdf = render_print_job(
+            runs,
+            workers=current_app.config.get('LABEL_PRINT_WORKERS', 1),
+            pages_per_chunk=current_app.config.get('LABEL_PRINT_PAGES_PER_CHUNK', 25),
+        )
+    except Exception as e:
+        return jsonify({'error': f'Error generating labels: {str(e)}'}), 500
+    
+    filename = f'labels_{total}pcs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+    return send_file(pdf, mimetype='application/pdf', download_name=filename, as_attachment=True)
+
+
 @bp.route('/bulk-generate')
 @login_required
 def bulk_generate_page():
@@ -364,53 +343,28 @@ def bulk_generate_barcodes():
             flash('❌ No products selected!', 'error')
             return redirect(url_for('barcode.bulk_generate_page'))
         
-        success_count = 0
-        error_count = 0
-
-        # Start from last used code for this prefix, then increment sequentially.
-        current_code = BarcodeGenerator.generate_next_product_code(
-            company_prefix,
-            _get_last_product_code_for_prefix(company_prefix)
+        ids = [int(product_id) for product_id in product_ids if str(product_id).isdigit()]
+        order = {product_id: position for position, product_id in enumerate(ids)}
+        products = sorted(
+            Product.query.filter(Product.id.in_(ids), Product.ean_barcode.is_(None)).all(),
+            key=lambda product: order[product.id],
         )
-        
-        for product_id in product_ids:
-            try:
-                product = Product.query.get(int(product_id))
-                if not product or product.ean_barcode:
-                    continue
-
-                # Generate EAN-13 and skip duplicates if necessary
-                ean_code = None
-                for _ in range(2000):
-                    candidate = BarcodeGenerator.generate_ean13(company_prefix, current_code)
-                    if not Product.query.filter_by(ean_barcode=candidate).first():
-                        ean_code = candidate
-                        break
-                    current_code = BarcodeGenerator.generate_next_product_code(company_prefix, current_code)
-
-                if not ean_code:
-                    raise ValueError('Unable to find available barcode number')
-                
-                # Save
-                product.ean_barcode = ean_code
-                product.barcode_source = 'internal'
-                product.barcode_registered_date = date.today()
-                
-                db.session.commit()
-                success_count += 1
-
-                # Prepare next code for next product
-                current_code = BarcodeGenerator.generate_next_product_code(company_prefix, current_code)
-                
-            except Exception as e:
-                error_count += 1
-                print(f"Error generating barcode for product {product_id}: {str(e)}")
-                continue
+
+        # One counter update for the whole selection, one flush for all products
+        today = date.today()
+        for product, ean_code in zip(products, allocate_eans(company_prefix, len(products))):
+            product.ean_barcode = ean_code
+            product.barcode_source = 'internal'
+            product.barcode_registered_date = today
+        db.session.commit()
+
+        success_count = len(products)
+        error_count = len(set(product_ids)) - success_count
         
         if success_count > 0:
             flash(f'✅ Generated {success_count} barcodes successfully!', 'success')
         if error_count > 0:
-            flash(f'⚠️ {error_count} products failed', 'warning')
+            flash(f'⚠️ {error_count} products skipped (missing or already barcoded)', 'warning')
         
     except Exception as e:
         db.session.rollback()
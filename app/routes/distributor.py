@@ -1,14 +1,13 @@
 """
 Distributor Management Routes - Complete CRUD
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required
 from app import db
 from app.models import Distributor
-from datetime import datetime, date
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from io import BytesIO
+from datetime import date
+from app.services.document_numbers import allocate_number
+from app.services.excel_export import Column, excel_response, format_date, timestamped_filename
 
 bp = Blueprint('distributor', __name__, url_prefix='/distributors')
 
@@ -23,83 +22,29 @@ def list_distributors():
 @login_required
 def export_excel():
     """Export all distributors to Excel"""
-    distributors = Distributor.query.order_by(Distributor.code).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Distributors"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = [
-        'Code', 'Business Name', 'Contact Person', 'Phone', 'Email',
-        'GSTIN', 'PAN', 'City', 'State', 'Pincode',
-        'Territory', 'Margin %', 'Credit Limit', 'Credit Days',
-        'Payment Terms', 'Status', 'Onboarding Date'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, dist in enumerate(distributors, 2):
-        ws.cell(row=row_idx, column=1, value=dist.code)
-        ws.cell(row=row_idx, column=2, value=dist.business_name)
-        ws.cell(row=row_idx, column=3, value=dist.contact_person)
-        ws.cell(row=row_idx, column=4, value=dist.phone)
-        ws.cell(row=row_idx, column=5, value=dist.email)
-        ws.cell(row=row_idx, column=6, value=dist.gstin)
-        ws.cell(row=row_idx, column=7, value=dist.pan)
-        ws.cell(row=row_idx, column=8, value=dist.city)
-        ws.cell(row=row_idx, column=9, value=dist.state)
-        ws.cell(row=row_idx, column=10, value=dist.pincode)
-        ws.cell(row=row_idx, column=11, value=dist.territory)
-        ws.cell(row=row_idx, column=12, value=dist.margin_percentage)
-        ws.cell(row=row_idx, column=13, value=dist.credit_limit)
-        ws.cell(row=row_idx, column=14, value=dist.credit_days)
-        ws.cell(row=row_idx, column=15, value=dist.payment_terms)
-        ws.cell(row=row_idx, column=16, value=dist.status)
-        ws.cell(row=row_idx, column=17, value=dist.onboarding_date.strftime('%d-%m-%Y') if dist.onboarding_date else '')
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 25
-    ws.column_dimensions['F'].width = 18
-    ws.column_dimensions['G'].width = 15
-    ws.column_dimensions['H'].width = 15
-    ws.column_dimensions['I'].width = 15
-    ws.column_dimensions['J'].width = 10
-    ws.column_dimensions['K'].width = 15
-    ws.column_dimensions['L'].width = 10
-    ws.column_dimensions['M'].width = 15
-    ws.column_dimensions['N'].width = 12
-    ws.column_dimensions['O'].width = 15
-    ws.column_dimensions['P'].width = 10
-    ws.column_dimensions['Q'].width = 15
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'distributors_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    return excel_response(
+        Distributor.query.order_by(Distributor.code),
+        [
+            Column('Code', 'code', width=12),
+            Column('Business Name', 'business_name', width=30),
+            Column('Contact Person', 'contact_person', width=20),
+            Column('Phone', 'phone', width=15),
+            Column('Email', 'email', width=25),
+            Column('GSTIN', 'gstin', width=18),
+            Column('PAN', 'pan', width=15),
+            Column('City', 'city', width=15),
+            Column('State', 'state', width=15),
+            Column('Pincode', 'pincode', width=10),
+            Column('Territory', 'territory', width=15),
+            Column('Margin %', 'margin_percentage', width=10),
+            Column('Credit Limit', 'credit_limit', width=15),
+            Column('Credit Days', 'credit_days', width=12),
+            Column('Payment Terms', 'payment_terms', width=15),
+            Column('Status', 'status', width=10),
+            Column('Onboarding Date', lambda d: format_date(d.onboarding_date), width=15),
+        ],
+        sheet_title='Distributors',
+        filename=timestamped_filename('distributors'),
     )
 
 @bp.route('/add', methods=['GET', 'POST'])
@@ -109,9 +54,7 @@ def add_distributor():
     if request.method == 'POST':
         try:
             # Generate distributor code
-            last_dist = Distributor.query.order_by(Distributor.id.desc()).first()
-            next_num = (last_dist.id + 1) if last_dist else 1
-            code = f'DIST{next_num:04d}'
+            code = allocate_number('distributor')
             
             distributor = Distributor(
                 code=code,
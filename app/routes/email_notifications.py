@@ -34,11 +34,12 @@ def test_email():
 def send_order_confirmation(order_id):
     """Send order confirmation email"""
     success = EmailService.send_order_confirmation(order_id)
+    db.session.commit()
     
     if success:
-        flash('Order confirmation email sent successfully!', 'success')
+        flash('Order confirmation email queued.', 'success')
     else:
-        flash('Failed to send order confirmation email.', 'error')
+        flash('Failed to queue order confirmation email.', 'error')
     
     return redirect(request.referrer or url_for('orders.view_order', id=order_id))
 
@@ -48,11 +49,12 @@ def send_order_confirmation(order_id):
 def send_payment_receipt(payment_id):
     """Send payment receipt email"""
     success = EmailService.send_payment_receipt(payment_id)
+    db.session.commit()
     
     if success:
-        flash('Payment receipt sent successfully!', 'success')
+        flash('Payment receipt queued.', 'success')
     else:
-        flash('Failed to send payment receipt.', 'error')
+        flash('Failed to queue payment receipt.', 'error')
     
     return redirect(request.referrer or url_for('payment.list_payments'))
 
@@ -62,11 +64,12 @@ def send_payment_receipt(payment_id):
 def send_payment_reminder(order_id):
     """Send payment reminder email"""
     success = EmailService.send_payment_reminder(order_id)
+    db.session.commit()
     
     if success:
-        flash('Payment reminder sent successfully!', 'success')
+        flash('Payment reminder queued.', 'success')
     else:
-        flash('Failed to send payment reminder.', 'error')
+        flash('Failed to queue payment reminder.', 'error')
     
     return redirect(request.referrer or url_for('orders.view_order', id=order_id))
 
@@ -76,10 +79,11 @@ def send_payment_reminder(order_id):
 def send_bulk_payment_reminders():
     """Send payment reminders to all overdue orders"""
     count = EmailService.send_bulk_payment_reminders()
+    db.session.commit()
     
     return jsonify({
         'success': True,
-        'message': f'Sent {count} payment reminders successfully',
+        'message': f'Queued {count} payment reminders',
         'count': count
     })
 
@@ -89,10 +93,11 @@ def send_bulk_payment_reminders():
 def send_bulk_low_stock_alerts():
     """Send low stock alerts for all products below reorder level"""
     count = EmailService.send_bulk_low_stock_alerts()
+    db.session.commit()
     
     return jsonify({
         'success': True,
-        'message': f'Sent {count} low stock alerts successfully',
+        'message': f'Queued {count} low stock alerts',
         'count': count
     })
 
@@ -106,10 +111,11 @@ def send_monthly_statement(distributor_id):
     year = data.get('year', datetime.now().year)
     
     success = EmailService.send_monthly_statement(distributor_id, month, year)
+    db.session.commit()
     
     return jsonify({
         'success': success,
-        'message': 'Monthly statement sent successfully' if success else 'Failed to send monthly statement'
+        'message': 'Monthly statement queued' if success else 'Failed to queue monthly statement'
     })
 
 
@@ -1,13 +1,13 @@
 """
 Goods Inventory Routes - Complete CRUD with Export, Email, WhatsApp
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.models import Goods
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
 from io import BytesIO
+from app.services.excel_export import Column, excel_response, format_date, timestamped_filename
 from datetime import datetime, date
 
 bp = Blueprint('goods', __name__, url_prefix='/goods')
@@ -122,69 +122,23 @@ def delete_goods(id):
 @login_required
 def export_excel():
     """Export goods inventory to Excel"""
-    goods_list = Goods.query.filter_by(is_active=True).order_by(Goods.item_number).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Goods Inventory"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = [
-        'Item #', 'Name', 'Category', 'Quantity', 'Unit',
-        'Location', 'Condition', 'Purchase Date', 'Purchase Price', 'Supplier', 'Notes'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, goods in enumerate(goods_list, 2):
-        ws.cell(row=row_idx, column=1, value=goods.item_number)
-        ws.cell(row=row_idx, column=2, value=goods.name)
-        ws.cell(row=row_idx, column=3, value=goods.category)
-        ws.cell(row=row_idx, column=4, value=goods.quantity)
-        ws.cell(row=row_idx, column=5, value=goods.unit)
-        ws.cell(row=row_idx, column=6, value=goods.location)
-        ws.cell(row=row_idx, column=7, value=goods.condition)
-        ws.cell(row=row_idx, column=8, value=goods.purchase_date.strftime('%d-%m-%Y') if goods.purchase_date else '')
-        ws.cell(row=row_idx, column=9, value=goods.purchase_price)
-        ws.cell(row=row_idx, column=10, value=goods.supplier)
-        ws.cell(row=row_idx, column=11, value=goods.notes)
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 10
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 10
-    ws.column_dimensions['E'].width = 10
-    ws.column_dimensions['F'].width = 20
-    ws.column_dimensions['G'].width = 12
-    ws.column_dimensions['H'].width = 15
-    ws.column_dimensions['I'].width = 15
-    ws.column_dimensions['J'].width = 25
-    ws.column_dimensions['K'].width = 30
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'goods_inventory_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    return excel_response(
+        Goods.query.filter_by(is_active=True).order_by(Goods.item_number),
+        [
+            Column('Item #', 'item_number', width=10),
+            Column('Name', 'name', width=30),
+            Column('Category', 'category', width=20),
+            Column('Quantity', 'quantity', width=10),
+            Column('Unit', 'unit', width=10),
+            Column('Location', 'location', width=20),
+            Column('Condition', 'condition', width=12),
+            Column('Purchase Date', lambda g: format_date(g.purchase_date), width=15),
+            Column('Purchase Price', 'purchase_price', width=15),
+            Column('Supplier', 'supplier', width=25),
+            Column('Notes', 'notes', width=30),
+        ],
+        sheet_title='Goods Inventory',
+        filename=timestamped_filename('goods_inventory'),
     )
 
 @bp.route('/print')
@@ -1,100 +1,101 @@
 """
 Inventory Management Routes - Complete CRUD
 """
-from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash
 from flask_login import login_required
 from app import db
 from app.models import Product, ProductCategory, Inventory, Batch, Warehouse
+from sqlalchemy import func, or_
+from sqlalchemy.orm import contains_eager, selectinload
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
 from io import BytesIO
+from app.services.excel_export import Column, excel_response, format_date, timestamped_filename
+from app.services.list_view import ListView, Sort
 from datetime import datetime
 
 bp = Blueprint('inventory', __name__, url_prefix='/inventory')
 
+
+def _stock_filter(level):
+    available = func.coalesce(Inventory.available_quantity, 0)
+    if level == 'out':
+        return available <= 0
+    if level == 'low':
+        return (available > 0) & (available < Product.min_stock_level)
+    return None
+
+
+inventory_list = ListView(
+    lambda: (
+        Inventory.query.join(Inventory.product).join(Inventory.warehouse)
+        .options(contains_eager(Inventory.product), contains_eager(Inventory.warehouse))
+    ),
+    sorts={
+        'product': Sort('Product', (Product.name, Inventory.id)),
+        'available': Sort('Available (low to high)', (func.coalesce(Inventory.available_quantity, 0), Inventory.id)),
+    },
+    filters={
+        'q': lambda q: or_(Product.name.ilike(f'%{q}%'), Product.sku.ilike(f'%{q}%')),
+        'warehouse': lambda warehouse_id: Inventory.warehouse_id == int(warehouse_id) if warehouse_id.isdigit() else None,
+        'stock': _stock_filter,
+    },
+)
+
+batch_list = ListView(
+    lambda: Batch.query.join(Batch.product).options(contains_eager(Batch.product)),
+    sorts={
+        'expiry': Sort('Expiry date', (Batch.expiry_date, Batch.id)),
+        'batch_number': Sort('Batch number', (Batch.batch_number, Batch.id)),
+    },
+    filters={
+        'q': lambda q: or_(Batch.batch_number.ilike(f'%{q}%'), Product.name.ilike(f'%{q}%')),
+        'qc_status': lambda status: Batch.qc_status == status,
+    },
+)
+
 @bp.route('/')
 @login_required
 def list_inventory():
-    """List inventory across all warehouses"""
-    inventory = Inventory.query.join(Product).join(Warehouse).all()
-    return render_template('inventory/list.html', inventory=inventory)
+    """List inventory across all warehouses, one keyset page at a time"""
+    inventory = inventory_list.page(request.args)
+    warehouses = [(w.id, w.name) for w in Warehouse.query.order_by(Warehouse.name)]
+    return render_template('inventory/list.html', inventory=inventory, warehouses=warehouses)
 
 @bp.route('/export-excel')
 @login_required
 def export_inventory_excel():
     """Export inventory to Excel"""
-    inventory = Inventory.query.join(Product).join(Warehouse).order_by(Product.sku).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Inventory"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = [
-        'SKU', 'Product Name', 'Warehouse', 'Location',
-        'Total Quantity', 'Reserved', 'Available',
-        'Min Stock', 'Reorder Level', 'Status'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, inv in enumerate(inventory, 2):
-        ws.cell(row=row_idx, column=1, value=inv.product.sku)
-        ws.cell(row=row_idx, column=2, value=inv.product.name)
-        ws.cell(row=row_idx, column=3, value=inv.warehouse.name)
-        ws.cell(row=row_idx, column=4, value=inv.warehouse.location)
-        ws.cell(row=row_idx, column=5, value=inv.quantity)
-        ws.cell(row=row_idx, column=6, value=inv.reserved_quantity)
-        ws.cell(row=row_idx, column=7, value=inv.available_quantity)
-        ws.cell(row=row_idx, column=8, value=inv.product.min_stock_level)
-        ws.cell(row=row_idx, column=9, value=inv.product.reorder_level)
-        
-        # Status based on stock level
+    inventory = (
+        Inventory.query.join(Product).join(Warehouse)
+        .options(contains_eager(Inventory.product), contains_eager(Inventory.warehouse))
+        .order_by(Product.sku)
+    )
+
+    def stock_status(inv):
         if inv.available_quantity <= 0:
-            status = 'Out of Stock'
-        elif inv.available_quantity <= inv.product.min_stock_level:
-            status = 'Low Stock'
-        elif inv.available_quantity <= inv.product.reorder_level:
-            status = 'Reorder'
-        else:
-            status = 'In Stock'
-        ws.cell(row=row_idx, column=10, value=status)
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 15
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 25
-    ws.column_dimensions['E'].width = 12
-    ws.column_dimensions['F'].width = 12
-    ws.column_dimensions['G'].width = 12
-    ws.column_dimensions['H'].width = 12
-    ws.column_dimensions['I'].width = 12
-    ws.column_dimensions['J'].width = 15
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'inventory_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+            return 'Out of Stock'
+        if inv.available_quantity <= inv.product.min_stock_level:
+            return 'Low Stock'
+        if inv.available_quantity <= inv.product.reorder_level:
+            return 'Reorder'
+        return 'In Stock'
+
+    return excel_response(
+        inventory,
+        [
+            Column('SKU', 'product.sku', width=15),
+            Column('Product Name', 'product.name', width=30),
+            Column('Warehouse', 'warehouse.name', width=20),
+            Column('Location', 'warehouse.location', width=25),
+            Column('Total Quantity', 'quantity', width=12),
+            Column('Reserved', 'reserved_quantity', width=12),
+            Column('Available', 'available_quantity', width=12),
+            Column('Min Stock', 'product.min_stock_level', width=12),
+            Column('Reorder Level', 'product.reorder_level', width=12),
+            Column('Status', stock_status, width=15),
+        ],
+        sheet_title='Inventory',
+        filename=timestamped_filename('inventory'),
     )
 
 @bp.route('/products')
@@ -108,76 +109,26 @@ def list_products():
 @login_required
 def export_products_excel():
     """Export products to Excel"""
-    products = Product.query.filter_by(is_active=True).order_by(Product.sku).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Products"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = [
-        'SKU', 'Product Name', 'Category', 'Unit', 'Pack Size',
-        'HSN Code', 'GST %', 'MRP', 'Base Price', 'Cost Price',
-        'Min Stock', 'Reorder Level', 'Shelf Life (Days)', 'Status'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, prod in enumerate(products, 2):
-        ws.cell(row=row_idx, column=1, value=prod.sku)
-        ws.cell(row=row_idx, column=2, value=prod.name)
-        ws.cell(row=row_idx, column=3, value=prod.category.name if prod.category else '')
-        ws.cell(row=row_idx, column=4, value=prod.unit)
-        ws.cell(row=row_idx, column=5, value=prod.pack_size)
-        ws.cell(row=row_idx, column=6, value=prod.hsn_code)
-        ws.cell(row=row_idx, column=7, value=prod.gst_rate)
-        ws.cell(row=row_idx, column=8, value=prod.mrp)
-        ws.cell(row=row_idx, column=9, value=prod.base_price)
-        ws.cell(row=row_idx, column=10, value=prod.cost_price)
-        ws.cell(row=row_idx, column=11, value=prod.min_stock_level)
-        ws.cell(row=row_idx, column=12, value=prod.reorder_level)
-        ws.cell(row=row_idx, column=13, value=prod.shelf_life_days)
-        ws.cell(row=row_idx, column=14, value='Active' if prod.is_active else 'Inactive')
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 15
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 10
-    ws.column_dimensions['E'].width = 12
-    ws.column_dimensions['F'].width = 12
-    ws.column_dimensions['G'].width = 10
-    ws.column_dimensions['H'].width = 12
-    ws.column_dimensions['I'].width = 12
-    ws.column_dimensions['J'].width = 12
-    ws.column_dimensions['K'].width = 12
-    ws.column_dimensions['L'].width = 12
-    ws.column_dimensions['M'].width = 15
-    ws.column_dimensions['N'].width = 10
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'products_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    return excel_response(
+        Product.query.filter_by(is_active=True).options(selectinload(Product.category)).order_by(Product.sku),
+        [
+            Column('SKU', 'sku', width=15),
+            Column('Product Name', 'name', width=30),
+            Column('Category', lambda p: p.category.name if p.category else '', width=20),
+            Column('Unit', 'unit', width=10),
+            Column('Pack Size', 'pack_size', width=12),
+            Column('HSN Code', 'hsn_code', width=12),
+            Column('GST %', 'gst_rate', width=10),
+            Column('MRP', 'mrp', width=12),
+            Column('Base Price', 'base_price', width=12),
+            Column('Cost Price', 'cost_price', width=12),
+            Column('Min Stock', 'min_stock_level', width=12),
+            Column('Reorder Level', 'reorder_level', width=12),
+            Column('Shelf Life (Days)', 'shelf_life_days', width=15),
+            Column('Status', lambda p: 'Active' if p.is_active else 'Inactive', width=10),
+        ],
+        sheet_title='Products',
+        filename=timestamped_filename('products'),
     )
 
 @bp.route('/products/add', methods=['GET', 'POST'])
@@ -286,19 +237,13 @@ def print_product_label(id):
     # Try to import barcode generator
     try:
         from app.utils.barcode_generator import BarcodeGenerator
-        from io import BytesIO
         import base64
 
         barcode_lib_available = True
 
-        # Generate professional label
-        label_img = BarcodeGenerator.generate_product_label(product, batch, label_size=(400, 600))
-
-        # Convert to base64 for embedding in HTML
-        img_io = BytesIO()
-        label_img.save(img_io, 'PNG')
-        img_io.seek(0)
-        label_image = base64.b64encode(img_io.read()).decode()
+        # Generate professional label (cached), base64 for embedding in HTML
+        label_png = BarcodeGenerator.product_label_png(product, batch, label_size=(400, 600))
+        label_image = base64.b64encode(label_png).decode()
     except ImportError:
         label_error = 'Barcode libraries are not installed on the server.'
     except Exception as e:
@@ -322,71 +267,33 @@ def print_product_label(id):
 @bp.route('/batches')
 @login_required
 def list_batches():
-    """List all batches"""
-    batches = Batch.query.join(Product).order_by(Batch.expiry_date).all()
+    """List batches by expiry, one keyset page at a time"""
+    batches = batch_list.page(request.args)
     return render_template('inventory/batches.html', batches=batches)
 
 @bp.route('/batches/export-excel')
 @login_required
 def export_batches_excel():
     """Export all batches to Excel"""
-    batches = Batch.query.join(Product).order_by(Batch.batch_number).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Batches"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = [
-        'Batch Number', 'Product', 'Mfg Date', 'Expiry Date',
-        'Qty Produced', 'Qty Available', 'Warehouse', 'QC Status'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, batch in enumerate(batches, 2):
-        ws.cell(row=row_idx, column=1, value=batch.batch_number)
-        ws.cell(row=row_idx, column=2, value=batch.product.name)
-        ws.cell(row=row_idx, column=3, value=batch.manufacturing_date.strftime('%d-%m-%Y'))
-        ws.cell(row=row_idx, column=4, value=batch.expiry_date.strftime('%d-%m-%Y'))
-        ws.cell(row=row_idx, column=5, value=batch.quantity_produced)
-        ws.cell(row=row_idx, column=6, value=batch.quantity_available)
-        ws.cell(row=row_idx, column=7, value=batch.warehouse.name if batch.warehouse else '')
-        ws.cell(row=row_idx, column=8, value=batch.qc_status)
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 18
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 12
-    ws.column_dimensions['D'].width = 12
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-    ws.column_dimensions['G'].width = 20
-    ws.column_dimensions['H'].width = 12
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'batches_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    batches = (
+        Batch.query.join(Product)
+        .options(contains_eager(Batch.product), selectinload(Batch.warehouse))
+        .order_by(Batch.batch_number)
+    )
+    return excel_response(
+        batches,
+        [
+            Column('Batch Number', 'batch_number', width=18),
+            Column('Product', 'product.name', width=30),
+            Column('Mfg Date', lambda b: format_date(b.manufacturing_date), width=12),
+            Column('Expiry Date', lambda b: format_date(b.expiry_date), width=12),
+            Column('Qty Produced', 'quantity_produced', width=15),
+            Column('Qty Available', 'quantity_available', width=15),
+            Column('Warehouse', lambda b: b.warehouse.name if b.warehouse else '', width=20),
+            Column('QC Status', 'qc_status', width=12),
+        ],
+        sheet_title='Batches',
+        filename=timestamped_filename('batches'),
     )
 
 @bp.route('/batches/expiring')
@@ -579,56 +486,18 @@ def list_warehouses():
 @login_required
 def export_warehouses_excel():
     """Export all warehouses to Excel"""
-    warehouses = Warehouse.query.order_by(Warehouse.code).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Warehouses"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = ['Code', 'Name', 'Location', 'City', 'State', 'Status']
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, wh in enumerate(warehouses, 2):
-        ws.cell(row=row_idx, column=1, value=wh.code)
-        ws.cell(row=row_idx, column=2, value=wh.name)
-        ws.cell(row=row_idx, column=3, value=wh.location)
-        ws.cell(row=row_idx, column=4, value=wh.city)
-        ws.cell(row=row_idx, column=5, value=wh.state)
-        ws.cell(row=row_idx, column=6, value='Active' if wh.is_active else 'Inactive')
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 25
-    ws.column_dimensions['C'].width = 30
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 10
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'warehouses_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    return excel_response(
+        Warehouse.query.order_by(Warehouse.code),
+        [
+            Column('Code', 'code', width=12),
+            Column('Name', 'name', width=25),
+            Column('Location', 'location', width=30),
+            Column('City', 'city', width=15),
+            Column('State', 'state', width=15),
+            Column('Status', lambda w: 'Active' if w.is_active else 'Inactive', width=10),
+        ],
+        sheet_title='Warehouses',
+        filename=timestamped_filename('warehouses'),
     )
 
 @bp.route('/warehouses/add', methods=['GET', 'POST'])
@@ -2,12 +2,11 @@
 
 from flask import Blueprint, render_template, send_from_directory, redirect, url_for
 from flask_login import login_required
-from app.models import Order, Distributor, Product, Inventory, Payment
-from app import db
-from sqlalchemy import func
+from app.models import Order
+from app.services.kpi_snapshot import dashboard_kpis, snapshot_age
+from sqlalchemy.orm import joinedload
 
 from pathlib import Path
-from datetime import datetime, timedelta
 
 bp = Blueprint('main', __name__)
 
@@ -31,45 +30,19 @@ def favicon():
 @bp.route('/')
 @login_required
 def dashboard():
-    # Dashboard stats
-    total_distributors = Distributor.query.filter_by(status='active').count()
-    total_products = Product.query.filter_by(is_active=True).count()
-    pending_orders = Order.query.filter_by(status='confirmed').count()
-    
-    # Recent orders
-    recent_orders = Order.query.order_by(Order.created_at.desc()).limit(10).all()
-
-    # Analytics snapshot (lightweight KPIs)
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    sales_last_30d = db.session.query(func.sum(Order.total_amount)).filter(
-        Order.order_date >= thirty_days_ago,
-        Order.status.in_(['confirmed', 'delivered', 'completed']),
-    ).scalar() or 0
+    # Dashboard stats, precomputed (see services.kpi_snapshot)
+    kpis = dashboard_kpis()
 
-    total_receivable = db.session.query(
-        func.sum(Order.total_amount - Order.paid_amount)
-    ).filter(
-        Order.payment_status.in_(['pending', 'partial'])
-    ).scalar() or 0
-
-    total_collected = db.session.query(
-        func.sum(Payment.amount)
-    ).filter(
-        Payment.status == 'cleared'
-    ).scalar() or 0
+    # Recent orders
+    recent_orders = Order.query.options(joinedload(Order.distributor)).order_by(Order.created_at.desc()).limit(10).all()
 
-    avg_satisfaction = db.session.query(
-        func.avg(Distributor.customer_satisfaction_score)
-    ).filter(
-        Distributor.status == 'active'
-    ).scalar() or 0
-    
     return render_template('dashboard.html',
-                         total_distributors=total_distributors,
-                         total_products=total_products,
-                         pending_orders=pending_orders,
+                         total_distributors=kpis.total_distributors,
+                         total_products=kpis.total_products,
+                         pending_orders=kpis.pending_orders,
                          recent_orders=recent_orders,
-                         sales_last_30d=sales_last_30d,
-                         total_receivable=total_receivable,
-                         total_collected=total_collected,
-                         avg_satisfaction=avg_satisfaction)
+                         sales_last_30d=kpis.sales_last_30d,
+                         total_receivable=kpis.total_receivable,
+                         total_collected=kpis.total_collected,
+                         avg_satisfaction=kpis.avg_satisfaction,
+                         kpis_updated=snapshot_age(kpis))
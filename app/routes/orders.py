@@ -1,10 +1,10 @@
 """
 Order Management Routes - Complete CRUD
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
-from flask_login import login_required
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_file
+from flask_login import current_user, login_required
 from app import db
-from app.models import Order, OrderItem, Distributor, Product, Warehouse
+from app.models import Order, OrderItem, Distributor, Product, Warehouse, InvoiceExportJob
 from app.services.accounting_utils import (
     create_accounting_entry,
     delete_posting,
@@ -14,11 +14,41 @@ from app.services.accounting_utils import (
     resolve_output_sgst,
     resolve_output_igst,
 )
+from app.services.document_numbers import allocate_number
+from app.services.invoice_export_jobs import create_export_job, export_progress, start_export_job
+from app.services.invoice_pdf import (
+    FORMATS as INVOICE_EXPORT_FORMATS,
+    UNINVOICED_STATUSES,
+    ensure_available as ensure_invoice_pdf_available,
+    invoice_filename,
+    render_invoice_pdf,
+)
+from app.services.list_view import ListView, Sort
+from app.services.notification_outbox import attachment_builder, enqueue_email
 from datetime import datetime, date
 from decimal import Decimal
+from io import BytesIO
+import os
+from sqlalchemy import func, or_
+from sqlalchemy.orm import contains_eager
 
 bp = Blueprint('orders', __name__, url_prefix='/orders')
 
+ORDER_STATUSES = ['draft', 'confirmed', 'processing', 'dispatched', 'delivered', 'cancelled']
+
+order_list = ListView(
+    lambda: Order.query.outerjoin(Order.distributor).options(contains_eager(Order.distributor)),
+    sorts={
+        'newest': Sort('Newest first', (Order.id,), descending=True),
+        'order_date': Sort('Order date', (Order.order_date, Order.id), descending=True),
+        'amount': Sort('Amount (high to low)', (func.coalesce(Order.total_amount, 0.0), Order.id), descending=True),
+    },
+    filters={
+        'q': lambda q: or_(Order.order_number.ilike(f'%{q}%'), Distributor.business_name.ilike(f'%{q}%')),
+        'status': lambda status: Order.status == status,
+    },
+)
+
 
 def _order_has_payments(order: Order) -> bool:
     try:
@@ -30,9 +60,9 @@ def _order_has_payments(order: Order) -> bool:
 @bp.route('/')
 @login_required
 def list_orders():
-    """List all orders"""
-    orders = Order.query.order_by(Order.created_at.desc()).all()
-    return render_template('orders/list.html', orders=orders)
+    """List orders, one keyset page at a time"""
+    orders = order_list.page(request.args)
+    return render_template('orders/list.html', orders=orders, statuses=ORDER_STATUSES)
 
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -55,15 +85,7 @@ def add_order():
                     return redirect(url_for('orders.add_order'))
             
             # Generate order number
-            today = date.today()
-            order_prefix = f'ORD{today.strftime("%Y%m%d")}'
-            last_order = Order.query.filter(Order.order_number.like(f'{order_prefix}%')).order_by(Order.id.desc()).first()
-            
-            if last_order:
-                last_num = int(last_order.order_number[-4:])
-                order_number = f'{order_prefix}{last_num+1:04d}'
-            else:
-                order_number = f'{order_prefix}0001'
+            order_number = allocate_number('order')
             
             # Create order
             order = Order(
@@ -321,10 +343,78 @@ def print_invoice(id):
 @bp.route('/<int:id>/export-pdf')
 @login_required
 def export_pdf(id):
-    """Export invoice as PDF - uses browser print-to-PDF"""
-    # Redirect to print page with auto-print
+    """Export invoice as PDF (WeasyPrint; browser print-to-PDF where it is unavailable)"""
     order = Order.query.get_or_404(id)
-    return render_template('orders/invoice_download.html', order=order)
+    try:
+        pdf_bytes = render_invoice_pdf(order)
+    except Exception as e:
+        current_app.logger.warning(f"Invoice PDF generation failed for {order.order_number}: {e}")
+        # Fall back to the print page with auto-print
+        return render_template('orders/invoice_download.html', order=order)
+    return send_file(BytesIO(pdf_bytes), mimetype='application/pdf', download_name=invoice_filename(order),
+                     as_attachment=True)
+
+@bp.route('/invoices/export', methods=['POST'])
+@login_required
+def export_invoices_range():
+    """Start a background export of a date range's invoices (ZIP of PDFs or one merged PDF)"""
+    try:
+        start = datetime.strptime(request.form.get('start_date', ''), '%Y-%m-%d').date()
+        end = datetime.strptime(request.form.get('end_date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        flash('Choose a start and end date for the invoice export.', 'error')
+        return redirect(url_for('orders.list_orders'))
+    fmt = request.form.get('format', 'zip')
+    if end < start or fmt not in INVOICE_EXPORT_FORMATS:
+        flash('Invalid invoice export range or format.', 'error')
+        return redirect(url_for('orders.list_orders'))
+
+    count = Order.query.filter(Order.order_date.between(start, end), Order.status.notin_(UNINVOICED_STATUSES)).count()
+    max_invoices = current_app.config.get('INVOICE_EXPORT_MAX', 2000)
+    if not count:
+        flash('No invoices in that date range.', 'warning')
+        return redirect(url_for('orders.list_orders'))
+    if count > max_invoices:
+        flash(f'{count} invoices in that range; export at most {max_invoices} at a time '
+              f'(or use `flask invoices export`).', 'error')
+        return redirect(url_for('orders.list_orders'))
+
+    try:
+        ensure_invoice_pdf_available()
+    except (ImportError, OSError) as e:
+        flash(f'Invoice PDF generation not available: {str(e)}', 'error')
+        return redirect(url_for('orders.list_orders'))
+    job = create_export_job(start, end, fmt, created_by=current_user.id)
+    start_export_job(job.id)
+    flash(f'Exporting {job.invoices_total} invoice(s) in the background.', 'info')
+    return redirect(url_for('orders.invoice_export_job', job_id=job.id))
+
+@bp.route('/invoices/export/<int:job_id>')
+@login_required
+def invoice_export_job(job_id):
+    """Progress and download link of a background invoice export"""
+    job = InvoiceExportJob.query.get_or_404(job_id)
+    recent_jobs = InvoiceExportJob.query.order_by(InvoiceExportJob.id.desc()).limit(5).all()
+    return render_template('orders/invoice_export.html', job=job, progress=export_progress(job),
+                           recent_jobs=recent_jobs)
+
+@bp.route('/invoices/export/<int:job_id>/status')
+@login_required
+def invoice_export_job_status(job_id):
+    """Live progress of a background invoice export (polled by the job page)"""
+    job = InvoiceExportJob.query.get_or_404(job_id)
+    return jsonify(export_progress(job))
+
+@bp.route('/invoices/export/<int:job_id>/download')
+@login_required
+def invoice_export_download(job_id):
+    """The finished export file"""
+    job = InvoiceExportJob.query.get_or_404(job_id)
+    if job.status != 'completed' or not job.file_path or not os.path.exists(job.file_path):
+        flash('This export is not available for download.', 'error')
+        return redirect(url_for('orders.invoice_export_job', job_id=job.id))
+    mimetype = 'application/zip' if job.format == 'zip' else 'application/pdf'
+    return send_file(job.file_path, mimetype=mimetype, download_name=job.filename, as_attachment=True)
 
 @bp.route('/<int:id>/export-excel')
 @login_required
@@ -515,13 +605,29 @@ def export_excel(id):
     
     return response
 
+@attachment_builder('order_invoice_pdf')
+def invoice_pdf_attachment(order_id, base_url=None):
+    """Invoice PDF for an outbox email, rendered when the worker sends it.
+
+    None (email goes without the attachment) if the order is gone or WeasyPrint is
+    unavailable; on Windows it may require the GTK runtime. `base_url` is accepted
+    for messages queued before the renderer stopped needing it.
+    """
+    order = db.session.get(Order, order_id)
+    if order is None:
+        return None
+    try:
+        pdf_bytes = render_invoice_pdf(order)
+    except Exception as e:
+        current_app.logger.warning(f"Invoice PDF generation failed for {order.order_number}: {e}")
+        return None
+    return invoice_filename(order), "application/pdf", pdf_bytes
+
+
 @bp.route('/<int:id>/send-email', methods=['POST'])
 @login_required
 def send_email(id):
-    """Send invoice via email"""
-    from flask_mail import Message, Mail
-    from flask import current_app
-    
+    """Queue invoice email; the PDF is rendered and attached by the notification worker"""
     order = Order.query.get_or_404(id)
     
     # Get email addresses
@@ -533,32 +639,10 @@ def send_email(id):
         return redirect(url_for('orders.view_order', id=order.id))
     
     try:
-        # Generate PDF (optional). On Windows, WeasyPrint may require GTK runtime.
-        pdf_bytes = None
-        pdf_error = None
-        try:
-            from weasyprint import HTML  # type: ignore
-
-            html_string = render_template('orders/invoice.html', order=order)
-            pdf_bytes = HTML(string=html_string, base_url=request.url_root).write_pdf()
-        except Exception as e:
-            pdf_error = str(e)
-        
-        # Create email
-        mail = Mail(current_app)
-        msg = Message(
-            subject=f'Invoice {order.order_number} - Mohi Industries',
-            sender=current_app.config.get('MAIL_DEFAULT_SENDER'),
-            recipients=[to_email]
-        )
-        
-        if cc_email:
-            msg.cc = [cc_email]
-        
         # Email body
         outstanding = order.total_amount - order.paid_amount
         invoice_link = url_for('orders.print_invoice', id=order.id, _external=True)
-        msg.body = f"""Dear {order.distributor.business_name},
+        body = f"""Dear {order.distributor.business_name},
 
 Please find attached invoice for your order.
 
@@ -587,28 +671,22 @@ Phone: +91 9262650010
 Email: info@mohiindustries.in
 """
 
-        # Attach PDF if available, otherwise send without attachment.
-        if pdf_bytes:
-            msg.attach(
-                f"Invoice_{order.order_number}.pdf",
-                "application/pdf",
-                pdf_bytes,
-            )
-        
-        # Send email
-        mail.send(msg)
-
-        if pdf_bytes:
-            flash(f'Invoice sent successfully to {to_email}!', 'success')
-        else:
-            flash(
-                'Invoice email sent, but PDF attachment was skipped. '
-                f'PDF generation error: {pdf_error}',
-                'warning',
-            )
+        enqueue_email(
+            to_email,
+            f'Invoice {order.order_number} - Mohi Industries',
+            text=body,
+            cc=cc_email or None,
+            attachments=[{
+                'builder': 'order_invoice_pdf',
+                'args': {'order_id': order.id},
+            }],
+        )
+        db.session.commit()
+        flash(f'Invoice email to {to_email} queued.', 'success')
         
     except Exception as e:
-        flash(f'Error sending email: {str(e)}', 'error')
+        db.session.rollback()
+        flash(f'Error queueing email: {str(e)}', 'error')
     
     return redirect(url_for('orders.view_order', id=order.id))
 
@@ -1,11 +1,10 @@
 """
 Payment Management Routes - Payment Tracking and Accounting
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app import db
 from app.models import Payment, Order
-from app.models.accounting import AccountingEntry
 from app.services.accounting_utils import (
     create_accounting_entry,
     delete_posting,
@@ -14,87 +13,73 @@ from app.services.accounting_utils import (
 )
 from datetime import datetime, date
 from decimal import Decimal
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from io import BytesIO
+from sqlalchemy import func, or_
+from sqlalchemy.orm import contains_eager, selectinload
+from app.models import Distributor
+from app.services.excel_export import Column, excel_response, format_date, timestamped_filename
+from app.services.document_numbers import allocate_number
+from app.services.list_view import ListView, Sort
 
 bp = Blueprint('payment', __name__, url_prefix='/payments')
 
+PAYMENT_STATUSES = ['pending', 'cleared', 'bounced', 'cancelled']
+PAYMENT_MODES = ['cash', 'cheque', 'bank_transfer', 'upi', 'card']
+
+payment_list = ListView(
+    lambda: (
+        Payment.query
+        .outerjoin(Payment.order).outerjoin(Order.distributor)
+        .options(contains_eager(Payment.order).contains_eager(Order.distributor))
+    ),
+    sorts={
+        'date': Sort('Payment date', (Payment.payment_date, Payment.id), descending=True),
+        'amount': Sort('Amount (high to low)', (func.coalesce(Payment.amount, 0.0), Payment.id), descending=True),
+    },
+    filters={
+        'q': lambda q: or_(
+            Payment.payment_number.ilike(f'%{q}%'),
+            Order.order_number.ilike(f'%{q}%'),
+            Distributor.business_name.ilike(f'%{q}%'),
+        ),
+        'status': lambda status: Payment.status == status,
+        'mode': lambda mode: Payment.payment_mode == mode,
+    },
+)
+
 @bp.route('/')
 @login_required
 def list_payments():
-    """List all payments"""
-    payments = Payment.query.order_by(Payment.payment_date.desc()).all()
-    return render_template('payments/list.html', payments=payments)
+    """List payments, one keyset page at a time"""
+    payments = payment_list.page(request.args)
+    return render_template('payments/list.html', payments=payments,
+                           statuses=PAYMENT_STATUSES, modes=PAYMENT_MODES)
 
 @bp.route('/export-excel')
 @login_required
 def export_excel():
     """Export all payments to Excel"""
-    payments = Payment.query.order_by(Payment.payment_date.desc()).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Payments"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = [
-        'Payment #', 'Date', 'Order #', 'Customer', 'Amount',
-        'Payment Mode', 'Reference #', 'Bank', 'Status',
-        'Clearance Date', 'Remarks'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, payment in enumerate(payments, 2):
-        ws.cell(row=row_idx, column=1, value=payment.payment_number)
-        ws.cell(row=row_idx, column=2, value=payment.payment_date.strftime('%d-%m-%Y'))
-        ws.cell(row=row_idx, column=3, value=payment.order.order_number)
-        ws.cell(row=row_idx, column=4, value=payment.order.distributor.business_name)
-        ws.cell(row=row_idx, column=5, value=payment.amount)
-        ws.cell(row=row_idx, column=6, value=payment.payment_mode)
-        ws.cell(row=row_idx, column=7, value=payment.reference_number or '')
-        ws.cell(row=row_idx, column=8, value=payment.bank_name or '')
-        ws.cell(row=row_idx, column=9, value=payment.status)
-        ws.cell(row=row_idx, column=10, value=payment.clearance_date.strftime('%d-%m-%Y') if payment.clearance_date else '')
-        ws.cell(row=row_idx, column=11, value=payment.remarks or '')
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 18
-    ws.column_dimensions['B'].width = 12
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 30
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-    ws.column_dimensions['G'].width = 18
-    ws.column_dimensions['H'].width = 20
-    ws.column_dimensions['I'].width = 12
-    ws.column_dimensions['J'].width = 15
-    ws.column_dimensions['K'].width = 30
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'payments_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    payments = (
+        Payment.query
+        .options(selectinload(Payment.order).selectinload(Order.distributor))
+        .order_by(Payment.payment_date.desc())
+    )
+    return excel_response(
+        payments,
+        [
+            Column('Payment #', 'payment_number', width=18),
+            Column('Date', lambda p: format_date(p.payment_date), width=12),
+            Column('Order #', 'order.order_number', width=15),
+            Column('Customer', 'order.distributor.business_name', width=30),
+            Column('Amount', 'amount', width=15),
+            Column('Payment Mode', 'payment_mode', width=15),
+            Column('Reference #', lambda p: p.reference_number or '', width=18),
+            Column('Bank', lambda p: p.bank_name or '', width=20),
+            Column('Status', 'status', width=12),
+            Column('Clearance Date', lambda p: format_date(p.clearance_date), width=15),
+            Column('Remarks', lambda p: p.remarks or '', width=30),
+        ],
+        sheet_title='Payments',
+        filename=timestamped_filename('payments'),
     )
 
 @bp.route('/<int:id>/print')
@@ -136,17 +121,7 @@ def add_payment(order_id):
                 return redirect(url_for('payment.add_payment', order_id=order_id))
             
             # Generate payment number
-            today = date.today()
-            payment_prefix = f'PAY{today.strftime("%Y%m%d")}'
-            last_payment = Payment.query.filter(
-                Payment.payment_number.like(f'{payment_prefix}%')
-            ).order_by(Payment.id.desc()).first()
-            
-            if last_payment:
-                last_num = int(last_payment.payment_number[-4:])
-                payment_number = f'{payment_prefix}{last_num+1:04d}'
-            else:
-                payment_number = f'{payment_prefix}0001'
+            payment_number = allocate_number('payment')
             
             # Create payment
             payment = Payment(
@@ -326,10 +301,7 @@ def delete_payment(id):
         payment_number = payment.payment_number
         
         # Delete accounting entries
-        AccountingEntry.query.filter_by(
-            reference_type='payment',
-            reference_id=payment.id
-        ).delete()
+        delete_posting('payment', payment.id)
         
         db.session.delete(payment)
         
@@ -0,0 +1,25 @@
+"""
+Performance Routes - Request profiling results (admin only)
+"""
+from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask_login import login_required
+from app.services.permissions import role_required
+from app.services.request_profiler import request_profiler
+
+bp = Blueprint('perf', __name__, url_prefix='/admin/perf')
+
+
+@bp.route('/', methods=['GET', 'POST'])
+@login_required
+@role_required(['admin'])
+def index():
+    """Rolling per-endpoint timings, slow statements and likely N+1s for this worker"""
+    if request.method == 'POST':
+        request_profiler.reset()
+        flash('Performance samples cleared for this worker.', 'success')
+        return redirect(url_for('perf.index'))
+    return render_template('perf/index.html',
+                         enabled=request_profiler.enabled,
+                         endpoints=request_profiler.endpoints(),
+                         sample_size=request_profiler.sample_size,
+                         repeat_threshold=request_profiler.repeat_threshold)
@@ -1,21 +1,37 @@
 """
 Purchasing Routes - Vendors, Purchase Orders, Vendor Bills
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app import db
 from app.models import Product
 from app.models.purchasing import Vendor, PurchaseOrder, PurchaseOrderItem, VendorBill, VendorBillItem, VendorPayment
 from app.models.accounting import AccountingEntry, ChartOfAccounts
+from app.services.accounting_utils import create_accounting_entry, delete_posting
 from datetime import datetime, date
 from app.services.permissions import role_required
-from sqlalchemy import func
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from io import BytesIO
+from sqlalchemy import func, or_
+from sqlalchemy.orm import contains_eager, selectinload
+from app.services.excel_export import Column, excel_response, format_date, timestamped_filename
+from app.services.document_numbers import allocate_number
+from app.services.list_view import ListView, Sort
 
 bp = Blueprint('purchasing', __name__, url_prefix='/purchasing')
 
+vendor_bill_list = ListView(
+    lambda: VendorBill.query.outerjoin(VendorBill.vendor).options(contains_eager(VendorBill.vendor)),
+    sorts={
+        'newest': Sort('Newest first', (VendorBill.id,), descending=True),
+        'bill_date': Sort('Bill date', (VendorBill.bill_date, VendorBill.id), descending=True),
+        'amount': Sort('Amount (high to low)', (func.coalesce(VendorBill.total_amount, 0.0), VendorBill.id), descending=True),
+    },
+    filters={
+        'q': lambda q: or_(VendorBill.bill_number.ilike(f'%{q}%'), Vendor.business_name.ilike(f'%{q}%')),
+        'status': lambda status: VendorBill.status == status,
+        'approval_status': lambda status: VendorBill.approval_status == status,
+    },
+)
+
 COMPANY_STATE_CODE = '27'
 
 
@@ -115,66 +131,26 @@ def create_vendor_bill_entries(bill):
 
     cgst, sgst, igst = _gst_split_for_vendor(bill.vendor.gstin, bill.tax_amount)
 
-    entries = [
-        AccountingEntry(
-            entry_date=bill.bill_date,
-            reference_type='vendor_bill',
-            reference_id=bill.id,
-            account_id=purchases_account.id,
-            account_head='Purchases',
-            debit=bill.subtotal,
-            credit=0.0,
-            description=f'Vendor bill {bill.bill_number} - Purchases'
-        )
-    ]
-
+    lines = [(purchases_account, 'Purchases', bill.subtotal, 0.0, f'Vendor bill {bill.bill_number} - Purchases')]
     if cgst > 0:
-        entries.append(AccountingEntry(
-            entry_date=bill.bill_date,
-            reference_type='vendor_bill',
-            reference_id=bill.id,
-            account_id=input_cgst.id,
-            account_head='Input CGST',
-            debit=cgst,
-            credit=0.0,
-            description=f'Vendor bill {bill.bill_number} - Input CGST'
-        ))
+        lines.append((input_cgst, 'Input CGST', cgst, 0.0, f'Vendor bill {bill.bill_number} - Input CGST'))
     if sgst > 0:
-        entries.append(AccountingEntry(
-            entry_date=bill.bill_date,
-            reference_type='vendor_bill',
-            reference_id=bill.id,
-            account_id=input_sgst.id,
-            account_head='Input SGST',
-            debit=sgst,
-            credit=0.0,
-            description=f'Vendor bill {bill.bill_number} - Input SGST'
-        ))
+        lines.append((input_sgst, 'Input SGST', sgst, 0.0, f'Vendor bill {bill.bill_number} - Input SGST'))
     if igst > 0:
-        entries.append(AccountingEntry(
+        lines.append((input_igst, 'Input IGST', igst, 0.0, f'Vendor bill {bill.bill_number} - Input IGST'))
+    lines.append((ap_account, 'Accounts Payable', 0.0, bill.total_amount, f'Vendor bill {bill.bill_number} - Payable'))
+
+    for account, head, debit, credit, description in lines:
+        create_accounting_entry(
             entry_date=bill.bill_date,
             reference_type='vendor_bill',
             reference_id=bill.id,
-            account_id=input_igst.id,
-            account_head='Input IGST',
-            debit=igst,
-            credit=0.0,
-            description=f'Vendor bill {bill.bill_number} - Input IGST'
-        ))
-
-    entries.append(AccountingEntry(
-        entry_date=bill.bill_date,
-        reference_type='vendor_bill',
-        reference_id=bill.id,
-        account_id=ap_account.id,
-        account_head='Accounts Payable',
-        debit=0.0,
-        credit=bill.total_amount,
-        description=f'Vendor bill {bill.bill_number} - Payable'
-    ))
-
-    for entry in entries:
-        db.session.add(entry)
+            account=account,
+            account_head=head,
+            debit=debit,
+            credit=credit,
+            description=description,
+        )
 
 
 def create_vendor_payment_entries(bill, payment):
@@ -197,26 +173,26 @@ def create_vendor_payment_entries(bill, payment):
     credit_account = cash_account if is_cash else bank_account
     credit_head = 'Cash' if is_cash else 'Bank'
 
-    db.session.add(AccountingEntry(
+    create_accounting_entry(
         entry_date=payment.payment_date,
         reference_type='vendor_payment',
         reference_id=payment.id,
-        account_id=ap_account.id,
+        account=ap_account,
         account_head='Accounts Payable',
         debit=amount,
         credit=0.0,
-        description=f'Vendor bill {bill.bill_number} - Payment'
-    ))
-    db.session.add(AccountingEntry(
+        description=f'Vendor bill {bill.bill_number} - Payment',
+    )
+    create_accounting_entry(
         entry_date=payment.payment_date,
         reference_type='vendor_payment',
         reference_id=payment.id,
-        account_id=credit_account.id,
+        account=credit_account,
         account_head=credit_head,
         debit=0.0,
         credit=amount,
-        description=f'Vendor bill {bill.bill_number} - Payment'
-    ))
+        description=f'Vendor bill {bill.bill_number} - Payment',
+    )
 
 # ==================== VENDORS ====================
 
@@ -230,69 +206,23 @@ def list_vendors():
 @login_required
 def export_vendors_excel():
     """Export all vendors to Excel"""
-    vendors = Vendor.query.order_by(Vendor.code).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Vendors"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = [
-        'Code', 'Business Name', 'Contact Person', 'Phone', 'Email',
-        'GSTIN', 'Address', 'City', 'State', 'Payment Terms', 'Status'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, vendor in enumerate(vendors, 2):
-        ws.cell(row=row_idx, column=1, value=vendor.code)
-        ws.cell(row=row_idx, column=2, value=vendor.business_name)
-        ws.cell(row=row_idx, column=3, value=vendor.contact_person)
-        ws.cell(row=row_idx, column=4, value=vendor.phone)
-        ws.cell(row=row_idx, column=5, value=vendor.email)
-        ws.cell(row=row_idx, column=6, value=vendor.gstin)
-        ws.cell(row=row_idx, column=7, value=vendor.address)
-        ws.cell(row=row_idx, column=8, value=vendor.city)
-        ws.cell(row=row_idx, column=9, value=vendor.state)
-        ws.cell(row=row_idx, column=10, value=vendor.payment_terms)
-        ws.cell(row=row_idx, column=11, value=vendor.status)
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 25
-    ws.column_dimensions['F'].width = 18
-    ws.column_dimensions['G'].width = 30
-    ws.column_dimensions['H'].width = 15
-    ws.column_dimensions['I'].width = 15
-    ws.column_dimensions['J'].width = 15
-    ws.column_dimensions['K'].width = 10
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'vendors_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    return excel_response(
+        Vendor.query.order_by(Vendor.code),
+        [
+            Column('Code', 'code', width=12),
+            Column('Business Name', 'business_name', width=30),
+            Column('Contact Person', 'contact_person', width=20),
+            Column('Phone', 'phone', width=15),
+            Column('Email', 'email', width=25),
+            Column('GSTIN', 'gstin', width=18),
+            Column('Address', 'address', width=30),
+            Column('City', 'city', width=15),
+            Column('State', 'state', width=15),
+            Column('Payment Terms', 'payment_terms', width=15),
+            Column('Status', 'status', width=10),
+        ],
+        sheet_title='Vendors',
+        filename=timestamped_filename('vendors'),
     )
 
 @bp.route('/vendors/add', methods=['GET', 'POST'])
@@ -392,65 +322,20 @@ def list_purchase_orders():
 @login_required
 def export_purchase_orders_excel():
     """Export all purchase orders to Excel"""
-    orders = PurchaseOrder.query.order_by(PurchaseOrder.po_number).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Purchase Orders"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = [
-        'PO Number', 'Date', 'Vendor', 'Subtotal', 'Tax', 'Total',
-        'Status', 'Approval Status', 'Created By'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, po in enumerate(orders, 2):
-        ws.cell(row=row_idx, column=1, value=po.po_number)
-        ws.cell(row=row_idx, column=2, value=po.po_date.strftime('%d-%m-%Y'))
-        ws.cell(row=row_idx, column=3, value=po.vendor.business_name)
-        ws.cell(row=row_idx, column=4, value=po.subtotal)
-        ws.cell(row=row_idx, column=5, value=po.tax_amount)
-        ws.cell(row=row_idx, column=6, value=po.total_amount)
-        ws.cell(row=row_idx, column=7, value=po.status)
-        ws.cell(row=row_idx, column=8, value=po.approval_status)
-        ws.cell(row=row_idx, column=9, value=po.creator.username if po.creator else '')
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 15
-    ws.column_dimensions['B'].width = 12
-    ws.column_dimensions['C'].width = 30
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-    ws.column_dimensions['G'].width = 12
-    ws.column_dimensions['H'].width = 15
-    ws.column_dimensions['I'].width = 15
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'purchase_orders_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    return excel_response(
+        PurchaseOrder.query.options(selectinload(PurchaseOrder.vendor)).order_by(PurchaseOrder.order_number),
+        [
+            Column('PO Number', 'order_number', width=15),
+            Column('Date', lambda po: format_date(po.order_date), width=12),
+            Column('Vendor', 'vendor.business_name', width=30),
+            Column('Subtotal', 'subtotal', width=15),
+            Column('Tax', 'tax_amount', width=15),
+            Column('Total', 'total_amount', width=15),
+            Column('Status', 'status', width=12),
+            Column('Expected Date', lambda po: format_date(po.expected_date), width=15),
+        ],
+        sheet_title='Purchase Orders',
+        filename=timestamped_filename('purchase_orders'),
     )
 
 @bp.route('/purchase-orders/add', methods=['GET', 'POST'])
@@ -466,17 +351,7 @@ def add_purchase_order():
             import json
             items_data = json.loads(items_data)
 
-            today = date.today()
-            order_prefix = f'PO{today.strftime("%Y%m%d")}'
-            last_order = PurchaseOrder.query.filter(
-                PurchaseOrder.order_number.like(f'{order_prefix}%')
-            ).order_by(PurchaseOrder.id.desc()).first()
-
-            if last_order:
-                last_num = int(last_order.order_number[-4:])
-                order_number = f'{order_prefix}{last_num+1:04d}'
-            else:
-                order_number = f'{order_prefix}0001'
+            order_number = allocate_number('purchase_order')
 
             order = PurchaseOrder(
                 order_number=order_number,
@@ -601,74 +476,29 @@ def delete_purchase_order(id):
 @bp.route('/vendor-bills')
 @login_required
 def list_vendor_bills():
-    bills = VendorBill.query.order_by(VendorBill.created_at.desc()).all()
+    bills = vendor_bill_list.page(request.args)
     return render_template('purchasing/vendor_bills.html', bills=bills)
 
 @bp.route('/vendor-bills/export-excel')
 @login_required
 def export_vendor_bills_excel():
     """Export all vendor bills to Excel"""
-    bills = VendorBill.query.order_by(VendorBill.bill_number).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Vendor Bills"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = [
-        'Bill Number', 'Bill Date', 'Vendor', 'Subtotal', 'Tax', 'Total',
-        'Paid Amount', 'Balance', 'Status', 'Approval Status'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, bill in enumerate(bills, 2):
-        ws.cell(row=row_idx, column=1, value=bill.bill_number)
-        ws.cell(row=row_idx, column=2, value=bill.bill_date.strftime('%d-%m-%Y'))
-        ws.cell(row=row_idx, column=3, value=bill.vendor.business_name)
-        ws.cell(row=row_idx, column=4, value=bill.subtotal)
-        ws.cell(row=row_idx, column=5, value=bill.tax_amount)
-        ws.cell(row=row_idx, column=6, value=bill.total_amount)
-        ws.cell(row=row_idx, column=7, value=bill.paid_amount)
-        ws.cell(row=row_idx, column=8, value=bill.total_amount - bill.paid_amount)
-        ws.cell(row=row_idx, column=9, value=bill.payment_status)
-        ws.cell(row=row_idx, column=10, value=bill.approval_status)
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 18
-    ws.column_dimensions['B'].width = 12
-    ws.column_dimensions['C'].width = 30
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-    ws.column_dimensions['G'].width = 15
-    ws.column_dimensions['H'].width = 15
-    ws.column_dimensions['I'].width = 12
-    ws.column_dimensions['J'].width = 15
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'vendor_bills_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    return excel_response(
+        VendorBill.query.options(selectinload(VendorBill.vendor)).order_by(VendorBill.bill_number),
+        [
+            Column('Bill Number', 'bill_number', width=18),
+            Column('Bill Date', lambda b: format_date(b.bill_date), width=12),
+            Column('Vendor', 'vendor.business_name', width=30),
+            Column('Subtotal', 'subtotal', width=15),
+            Column('Tax', 'tax_amount', width=15),
+            Column('Total', 'total_amount', width=15),
+            Column('Paid Amount', 'paid_amount', width=15),
+            Column('Balance', lambda b: (b.total_amount or 0) - (b.paid_amount or 0), width=15),
+            Column('Status', 'status', width=12),
+            Column('Approval Status', 'approval_status', width=15),
+        ],
+        sheet_title='Vendor Bills',
+        filename=timestamped_filename('vendor_bills'),
     )
 
 @bp.route('/vendor-bills/add', methods=['GET', 'POST'])
@@ -684,17 +514,7 @@ def add_vendor_bill():
             import json
             items_data = json.loads(items_data)
 
-            today = date.today()
-            bill_prefix = f'VB{today.strftime("%Y%m%d")}'
-            last_bill = VendorBill.query.filter(
-                VendorBill.bill_number.like(f'{bill_prefix}%')
-            ).order_by(VendorBill.id.desc()).first()
-
-            if last_bill:
-                last_num = int(last_bill.bill_number[-4:])
-                bill_number = f'{bill_prefix}{last_num+1:04d}'
-            else:
-                bill_number = f'{bill_prefix}0001'
+            bill_number = allocate_number('vendor_bill')
 
             approval_status = request.form.get('approval_status', 'pending')
             bill = VendorBill(
@@ -796,10 +616,7 @@ def edit_vendor_bill(id):
                 bill.approved_at = datetime.utcnow()
                 create_vendor_bill_entries(bill)
             elif new_approval in ['pending', 'rejected']:
-                AccountingEntry.query.filter_by(
-                    reference_type='vendor_bill',
-                    reference_id=bill.id
-                ).delete()
+                delete_posting('vendor_bill', bill.id)
 
             db.session.commit()
             flash(f'Vendor bill {bill.bill_number} updated successfully!', 'success')
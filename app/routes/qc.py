@@ -1,15 +1,15 @@
 """
 Quality Control Routes - Batch QC Workflow
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app import db
 from app.models import Batch, ProductCategory
 from app.models.qc import QualityCheckTemplate, QualityCheckItem, BatchQualityCheck
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from io import BytesIO
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+from app.services.excel_export import Column, excel_response, format_date, timestamped_filename
 
 bp = Blueprint('qc', __name__, url_prefix='/qc')
 
@@ -25,54 +25,28 @@ def templates():
 @login_required
 def export_templates_excel():
     """Export all QC templates to Excel"""
-    templates = QualityCheckTemplate.query.order_by(QualityCheckTemplate.name).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "QC Templates"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = ['Template Name', 'Category', 'Description', 'Check Items', 'Status']
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, template in enumerate(templates, 2):
-        ws.cell(row=row_idx, column=1, value=template.name)
-        ws.cell(row=row_idx, column=2, value=template.category.name if template.category else 'All')
-        ws.cell(row=row_idx, column=3, value=template.description or '')
-        ws.cell(row=row_idx, column=4, value=len(template.items))
-        ws.cell(row=row_idx, column=5, value='Active' if template.is_active else 'Inactive')
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 30
-    ws.column_dimensions['B'].width = 20
-    ws.column_dimensions['C'].width = 40
-    ws.column_dimensions['D'].width = 12
-    ws.column_dimensions['E'].width = 10
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'qc_templates_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    item_count = (
+        select(func.count(QualityCheckItem.id))
+        .where(QualityCheckItem.template_id == QualityCheckTemplate.id)
+        .correlate(QualityCheckTemplate)
+        .scalar_subquery()
+    )
+    rows = (
+        db.session.query(QualityCheckTemplate, item_count)
+        .options(selectinload(QualityCheckTemplate.category))
+        .order_by(QualityCheckTemplate.name)
+    )
+    return excel_response(
+        rows,
+        [
+            Column('Template Name', lambda r: r[0].name, width=30),
+            Column('Category', lambda r: r[0].category.name if r[0].category else 'All', width=20),
+            Column('Description', lambda r: r[0].description or '', width=40),
+            Column('Check Items', lambda r: r[1], width=12),
+            Column('Status', lambda r: 'Active' if r[0].is_active else 'Inactive', width=10),
+        ],
+        sheet_title='QC Templates',
+        filename=timestamped_filename('qc_templates'),
     )
 
 
@@ -147,60 +121,20 @@ def batches():
 @login_required
 def export_batches_excel():
     """Export all batches with QC status to Excel"""
-    batches = Batch.query.order_by(Batch.expiry_date).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Batch QC Report"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = ['Batch Number', 'Product', 'Quantity', 'Unit', 'Expiry Date', 'QC Status', 'QC Date', 'Remarks']
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, batch in enumerate(batches, 2):
-        ws.cell(row=row_idx, column=1, value=batch.batch_number)
-        ws.cell(row=row_idx, column=2, value=batch.product.name)
-        ws.cell(row=row_idx, column=3, value=batch.quantity)
-        ws.cell(row=row_idx, column=4, value=batch.product.unit)
-        ws.cell(row=row_idx, column=5, value=batch.expiry_date.strftime('%d-%m-%Y'))
-        ws.cell(row=row_idx, column=6, value=batch.qc_status.upper() if batch.qc_status else 'PENDING')
-        ws.cell(row=row_idx, column=7, value=batch.qc_date.strftime('%d-%m-%Y') if batch.qc_date else '')
-        ws.cell(row=row_idx, column=8, value=batch.qc_remarks or '')
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 18
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 12
-    ws.column_dimensions['D'].width = 10
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 12
-    ws.column_dimensions['G'].width = 15
-    ws.column_dimensions['H'].width = 40
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'batch_qc_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    return excel_response(
+        Batch.query.options(selectinload(Batch.product)).order_by(Batch.expiry_date),
+        [
+            Column('Batch Number', 'batch_number', width=18),
+            Column('Product', 'product.name', width=30),
+            Column('Quantity', 'quantity_available', width=12),
+            Column('Unit', 'product.unit', width=10),
+            Column('Expiry Date', lambda b: format_date(b.expiry_date), width=15),
+            Column('QC Status', lambda b: b.qc_status.upper() if b.qc_status else 'PENDING', width=12),
+            Column('QC Date', lambda b: format_date(b.qc_date), width=15),
+            Column('Remarks', lambda b: b.qc_remarks or '', width=40),
+        ],
+        sheet_title='Batch QC Report',
+        filename=timestamped_filename('batch_qc_report'),
     )
 
 
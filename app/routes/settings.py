@@ -5,6 +5,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from app import db
 from app.models.settings import AppSettings, UserSettings
+from app.services.settings_cache import invalidate_settings
 
 bp = Blueprint('settings', __name__, url_prefix='/settings')
 
@@ -179,6 +180,7 @@ def reset_theme():
             user_id=current_user.id,
             setting_key='theme_primary_light'
         ).delete()
+        invalidate_settings()
         
         db.session.commit()
         flash('Theme reset to company default!', 'success')
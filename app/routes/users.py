@@ -1,16 +1,13 @@
 """
 User Management Routes - Admin Only
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
-from flask_login import login_required, current_user
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, login_user, current_user
 from functools import wraps
 from app import db
 from app.models import User
-from datetime import datetime
 import re
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from io import BytesIO
+from app.services.excel_export import Column, excel_response, format_date, timestamped_filename
 
 bp = Blueprint('users', __name__, url_prefix='/users')
 
@@ -50,58 +47,19 @@ def list_users():
 @admin_required
 def export_users_excel():
     """Export all users to Excel"""
-    users = User.query.order_by(User.username).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Users"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = ['Username', 'Email', 'Full Name', 'Role', 'Status', 'Created At', 'Last Login']
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Data rows
-    for row_idx, user in enumerate(users, 2):
-        ws.cell(row=row_idx, column=1, value=user.username)
-        ws.cell(row=row_idx, column=2, value=user.email or '')
-        ws.cell(row=row_idx, column=3, value=user.full_name or '')
-        ws.cell(row=row_idx, column=4, value=user.role)
-        ws.cell(row=row_idx, column=5, value='Active' if user.is_active else 'Inactive')
-        ws.cell(row=row_idx, column=6, value=user.created_at.strftime('%d-%m-%Y %H:%M') if user.created_at else '')
-        ws.cell(row=row_idx, column=7, value=user.last_login.strftime('%d-%m-%Y %H:%M') if user.last_login else '')
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 15
-    ws.column_dimensions['B'].width = 25
-    ws.column_dimensions['C'].width = 25
-    ws.column_dimensions['D'].width = 12
-    ws.column_dimensions['E'].width = 10
-    ws.column_dimensions['F'].width = 18
-    ws.column_dimensions['G'].width = 18
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f'users_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    return excel_response(
+        User.query.order_by(User.username),
+        [
+            Column('Username', 'username', width=15),
+            Column('Email', lambda u: u.email or '', width=25),
+            Column('Full Name', lambda u: u.full_name or '', width=25),
+            Column('Role', 'role', width=12),
+            Column('Status', lambda u: 'Active' if u.is_active else 'Inactive', width=10),
+            Column('Created At', lambda u: format_date(u.created_at, '%d-%m-%Y %H:%M'), width=18),
+            Column('Updated At', lambda u: format_date(u.updated_at, '%d-%m-%Y %H:%M'), width=18),
+        ],
+        sheet_title='Users',
+        filename=timestamped_filename('users'),
     )
 
 @bp.route('/add', methods=['GET', 'POST'])
@@ -181,8 +139,13 @@ def edit_user(id):
             user.username = request.form.get('username')
             user.email = request.form.get('email')
             user.full_name = request.form.get('full_name')
-            user.role = request.form.get('role')
-            user.is_active = request.form.get('is_active') == 'on'
+            role = request.form.get('role')
+            is_active = request.form.get('is_active') == 'on'
+            if role != user.role or is_active != user.is_active:
+                # Sign the user out everywhere so the new role/status applies at once
+                user.bump_security_version()
+            user.role = role
+            user.is_active = is_active
             
             # Only update password if provided
             new_password = request.form.get('password')
@@ -194,6 +157,9 @@ def edit_user(id):
                 user.set_password(new_password)
             
             db.session.commit()
+            if user.id == current_user.id:
+                # Keep the editing admin's own session valid
+                login_user(user)
             flash(f'User {user.username} updated successfully!', 'success')
             return redirect(url_for('users.list_users'))
             
@@ -261,6 +227,8 @@ def profile():
             # Update password
             current_user.set_password(new_password)
             db.session.commit()
+            # Other sessions are signed out by the new security version; keep this one
+            login_user(current_user._get_current_object())
             
             flash('Password changed successfully!', 'success')
             return redirect(url_for('main.dashboard'))
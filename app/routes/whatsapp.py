@@ -6,6 +6,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from app import db
 from app.models import Distributor, Order, Product
+from app.services.batching import iter_keyset
 from app.services.whatsapp import WhatsAppService
 from datetime import datetime, date, timedelta
 
@@ -45,7 +46,7 @@ def send_product_availability():
     """Send daily product availability to distributors"""
     if request.method == 'POST':
         try:
-            service = WhatsAppService()
+            service = WhatsAppService(queued=True)
             
             # Get selected distributors
             distributor_ids = request.form.getlist('distributor_ids')
@@ -74,16 +75,19 @@ def send_product_availability():
                     failed_count += 1
                     failures.append(f"{distributor.business_name}: {msg_id}")
             
+            db.session.commit()
+
             if failed_count:
                 preview = "; ".join(failures[:3])
                 more = f" (+{len(failures) - 3} more)" if len(failures) > 3 else ""
-                flash(f"Messages sent: {success_count} successful, {failed_count} failed. Failed: {preview}{more}", 'error')
+                flash(f"Messages queued: {success_count}, {failed_count} failed. Failed: {preview}{more}", 'error')
             else:
-                flash(f'Messages sent: {success_count} successful, {failed_count} failed', 'success')
+                flash(f'Messages queued: {success_count}, {failed_count} failed', 'success')
             return redirect(url_for('whatsapp.dashboard'))
             
         except Exception as e:
-            flash(f'Error sending messages: {str(e)}', 'error')
+            db.session.rollback()
+            flash(f'Error queueing messages: {str(e)}', 'error')
     
     # GET request
     distributors = Distributor.query.filter_by(status='active').all()
@@ -100,7 +104,7 @@ def send_payment_reminders():
     """Send payment reminders to distributors with pending payments"""
     if request.method == 'POST':
         try:
-            service = WhatsAppService()
+            service = WhatsAppService(queued=True)
             
             # Get distributors with pending payments
             pending_orders = db.session.query(
@@ -108,13 +112,13 @@ def send_payment_reminders():
                 db.func.sum(Order.total_amount - Order.paid_amount).label('outstanding')
             ).join(Order).filter(
                 Order.payment_status.in_(['pending', 'partial'])
-            ).group_by(Distributor.id).all()
+            ).group_by(Distributor.id)
             
             success_count = 0
             failed_count = 0
             failures = []
             
-            for distributor, outstanding in pending_orders:
+            for distributor, outstanding in iter_keyset(pending_orders, key=Distributor.id):
                 # Get pending invoices
                 invoices = Order.query.filter(
                     Order.distributor_id == distributor.id,
@@ -133,16 +137,19 @@ def send_payment_reminders():
                     failed_count += 1
                     failures.append(f"{distributor.business_name}: {msg_id}")
             
+            db.session.commit()
+
             if failed_count:
                 preview = "; ".join(failures[:3])
                 more = f" (+{len(failures) - 3} more)" if len(failures) > 3 else ""
-                flash(f"Payment reminders sent: {success_count} successful, {failed_count} failed. Failed: {preview}{more}", 'error')
+                flash(f"Payment reminders queued: {success_count}, {failed_count} failed. Failed: {preview}{more}", 'error')
             else:
-                flash(f'Payment reminders sent: {success_count} successful, {failed_count} failed', 'success')
+                flash(f'Payment reminders queued: {success_count}, {failed_count} failed', 'success')
             return redirect(url_for('whatsapp.dashboard'))
             
         except Exception as e:
-            flash(f'Error sending reminders: {str(e)}', 'error')
+            db.session.rollback()
+            flash(f'Error queueing reminders: {str(e)}', 'error')
     
     # GET request - show preview
     pending_orders = db.session.query(
@@ -163,7 +170,7 @@ def send_bulk_message():
     """Send custom bulk message to selected distributors"""
     if request.method == 'POST':
         try:
-            service = WhatsAppService()
+            service = WhatsAppService(queued=True)
             
             # Get form data
             distributor_ids = request.form.getlist('distributor_ids')
@@ -181,25 +188,28 @@ def send_bulk_message():
             distributors = Distributor.query.filter(
                 Distributor.id.in_(distributor_ids),
                 Distributor.status == 'active'
-            ).all()
+            )
             
             # Send messages
-            results = service.send_bulk_message(distributors, message)
+            results = service.send_bulk_message(iter_keyset(distributors), message)
 
             success_count = sum(1 for r in results if r['success'])
             failures = [f"{r['distributor']}: {r.get('message_id')}" for r in results if not r['success']]
             failed_count = len(failures)
 
+            db.session.commit()
+
             if failed_count:
                 preview = "; ".join(failures[:3])
                 more = f" (+{len(failures) - 3} more)" if len(failures) > 3 else ""
-                flash(f"Messages sent: {success_count} successful, {failed_count} failed. Failed: {preview}{more}", 'error')
+                flash(f"Messages queued: {success_count}, {failed_count} failed. Failed: {preview}{more}", 'error')
             else:
-                flash(f'Messages sent: {success_count} successful, {failed_count} failed', 'success')
+                flash(f'Messages queued: {success_count}, {failed_count} failed', 'success')
             return redirect(url_for('whatsapp.dashboard'))
             
         except Exception as e:
-            flash(f'Error sending messages: {str(e)}', 'error')
+            db.session.rollback()
+            flash(f'Error queueing messages: {str(e)}', 'error')
     
     # GET request
     distributors = Distributor.query.filter_by(status='active').all()
@@ -222,7 +232,7 @@ def send_festival_offer():
     """Send festival offer to distributors"""
     if request.method == 'POST':
         try:
-            service = WhatsAppService()
+            service = WhatsAppService(queued=True)
             
             # Get form data
             distributor_ids = request.form.getlist('distributor_ids')
@@ -242,14 +252,14 @@ def send_festival_offer():
             distributors = Distributor.query.filter(
                 Distributor.id.in_(distributor_ids),
                 Distributor.status == 'active'
-            ).all()
+            )
             
             # Send messages
             success_count = 0
             failed_count = 0
             failures = []
             
-            for distributor in distributors:
+            for distributor in iter_keyset(distributors):
                 success, msg_id = service.send_festival_offer(distributor, offer_details)
                 if success:
                     success_count += 1
@@ -257,16 +267,19 @@ def send_festival_offer():
                     failed_count += 1
                     failures.append(f"{distributor.business_name}: {msg_id}")
             
+            db.session.commit()
+
             if failed_count:
                 preview = "; ".join(failures[:3])
                 more = f" (+{len(failures) - 3} more)" if len(failures) > 3 else ""
-                flash(f"Offers sent: {success_count} successful, {failed_count} failed. Failed: {preview}{more}", 'error')
+                flash(f"Offers queued: {success_count}, {failed_count} failed. Failed: {preview}{more}", 'error')
             else:
-                flash(f'Offers sent: {success_count} successful, {failed_count} failed', 'success')
+                flash(f'Offers queued: {success_count}, {failed_count} failed', 'success')
             return redirect(url_for('whatsapp.dashboard'))
             
         except Exception as e:
-            flash(f'Error sending offers: {str(e)}', 'error')
+            db.session.rollback()
+            flash(f'Error queueing offers: {str(e)}', 'error')
     
     # GET request
     distributors = Distributor.query.filter_by(status='active').all()
@@ -0,0 +1,252 @@
+"""Materialized per-account daily balances.
+
+`account_daily_balances` holds one row per (account, day) with the summed debit and
+credit of every `AccountingEntry` for that day. Posting helpers in
+`accounting_utils` keep it up to date in the same transaction as the entries, so
+"balance as of D" is a range sum over days instead of a scan over the whole ledger.
+
+`refresh_daily_balances` recomputes the rollup from `accounting_entries` and is the
+repair path (`flask ledger rebuild-balances`).
+
+Balance queries start from the latest closed fiscal year's snapshot
+(`account_balance_snapshots`) and only sum the rollup days after it, so their cost
+follows the open years' volume rather than the whole history (see `balance_rows`).
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, func, insert, or_, select, union_all, update
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models.accounting import Account, AccountBalanceSnapshot, AccountDailyBalance, AccountingEntry
+from app.services.fiscal_periods import latest_snapshot
+from app.services.report_cache import mark_ledger_changed
+
+
+def _dec(value) -> Decimal:
+    if value is None:
+        return Decimal('0')
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def to_money(value) -> Decimal:
+    """Round like the Numeric(15, 2) ledger columns do on insert."""
+    return _dec(value).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _upsert_insert(values: dict):
+    """Return an INSERT .. ON CONFLICT that adds onto an existing day row, if supported."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+
+    table = AccountDailyBalance.__table__
+    stmt = dialect_insert(table).values(**values)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.account_id, table.c.date],
+        set_={
+            'debit': table.c.debit + stmt.excluded.debit,
+            'credit': table.c.credit + stmt.excluded.credit,
+        },
+    )
+
+
+def apply_daily_delta(account_id: Optional[int], entry_date: date, debit, credit) -> None:
+    """Add (debit, credit) onto the rollup row for `account_id` on `entry_date`."""
+    if not account_id or entry_date is None:
+        return
+    debit = to_money(debit)
+    credit = to_money(credit)
+    if not debit and not credit:
+        return
+
+    values = {'account_id': account_id, 'date': entry_date, 'debit': debit, 'credit': credit}
+    stmt = _upsert_insert(values)
+    if stmt is not None:
+        db.session.execute(stmt)
+        return
+
+    table = AccountDailyBalance.__table__
+    result = db.session.execute(
+        update(table)
+        .where(table.c.account_id == account_id, table.c.date == entry_date)
+        .values(debit=table.c.debit + debit, credit=table.c.credit + credit)
+    )
+    if not result.rowcount:
+        db.session.execute(insert(table).values(**values))
+
+
+def apply_daily_deltas(rows: Iterable) -> None:
+    """Apply many `(account_id, entry_date, debit, credit)` deltas, one statement per day row."""
+    totals: dict[tuple, list[Decimal]] = {}
+    for account_id, entry_date, debit, credit in rows:
+        bucket = totals.setdefault((account_id, entry_date), [Decimal('0'), Decimal('0')])
+        bucket[0] += to_money(debit)
+        bucket[1] += to_money(credit)
+    for (account_id, entry_date), (debit, credit) in totals.items():
+        apply_daily_delta(account_id, entry_date, debit, credit)
+
+
+def subtract_entries(entry_query) -> None:
+    """Remove the amounts of the entries matched by `entry_query` from the rollup.
+
+    Call this before deleting those entries.
+    """
+    grouped = entry_query.with_entities(
+        AccountingEntry.account_id,
+        AccountingEntry.entry_date,
+        func.sum(AccountingEntry.debit),
+        func.sum(AccountingEntry.credit),
+    ).filter(
+        AccountingEntry.account_id.isnot(None),
+    ).group_by(
+        AccountingEntry.account_id,
+        AccountingEntry.entry_date,
+    ).order_by(None).all()
+
+    apply_daily_deltas(
+        (account_id, entry_date, -_dec(debit), -_dec(credit))
+        for account_id, entry_date, debit, credit in grouped
+    )
+
+
+def refresh_daily_balances(start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+    """Recompute rollup rows from `accounting_entries` for a date range (all dates when open).
+
+    Returns the number of rollup rows written. Does not commit.
+    """
+    table = AccountDailyBalance.__table__
+    entries = AccountingEntry.__table__
+
+    delete_stmt = table.delete()
+    if start_date:
+        delete_stmt = delete_stmt.where(table.c.date >= start_date)
+    if end_date:
+        delete_stmt = delete_stmt.where(table.c.date <= end_date)
+    db.session.execute(delete_stmt)
+
+    source = select(
+        entries.c.account_id,
+        entries.c.entry_date,
+        func.coalesce(func.sum(entries.c.debit), 0),
+        func.coalesce(func.sum(entries.c.credit), 0),
+    ).where(entries.c.account_id.isnot(None))
+    if start_date:
+        source = source.where(entries.c.entry_date >= start_date)
+    if end_date:
+        source = source.where(entries.c.entry_date <= end_date)
+    source = source.group_by(entries.c.account_id, entries.c.entry_date)
+
+    result = db.session.execute(
+        insert(table).from_select(['account_id', 'date', 'debit', 'credit'], source)
+    )
+    mark_ledger_changed()
+    return int(result.rowcount or 0)
+
+
+def balance_rows(
+    *,
+    before: Optional[date] = None,
+    as_of: Optional[date] = None,
+    account_id: Optional[int] = None,
+):
+    """Subquery of `(account_id, signed)` rows whose per-account sum is the balance
+    strictly before `before` / as of `as_of` (all dates when neither is given).
+
+    The rows are the latest applicable closed-year snapshot plus the rollup days after
+    it; without a snapshot, every rollup day in range.
+    """
+    day = AccountDailyBalance
+    rollup = select(day.account_id.label('account_id'), (day.debit - day.credit).label('signed'))
+    if before is not None:
+        rollup = rollup.where(day.date < before)
+    if as_of is not None:
+        rollup = rollup.where(day.date <= as_of)
+    if account_id is not None:
+        rollup = rollup.where(day.account_id == account_id)
+
+    period = latest_snapshot(before=before, as_of=as_of)
+    if period is None:
+        return rollup.subquery()
+
+    snapshot = AccountBalanceSnapshot
+    frozen = select(
+        snapshot.account_id.label('account_id'),
+        snapshot.balance.label('signed'),
+    ).where(snapshot.fiscal_year_id == period.fiscal_year_id)
+    if account_id is not None:
+        frozen = frozen.where(snapshot.account_id == account_id)
+    return union_all(frozen, rollup.where(day.date > period.end_date)).subquery()
+
+
+def _signed_balances(rows) -> dict[int, Decimal]:
+    result = db.session.execute(
+        select(rows.c.account_id, func.sum(rows.c.signed)).group_by(rows.c.account_id)
+    )
+    return {account_id: _dec(signed) for account_id, signed in result}
+
+
+def signed_balances_before(before_date: date) -> dict[int, Decimal]:
+    """Signed (debit - credit) balance per account from all days strictly before `before_date`."""
+    return _signed_balances(balance_rows(before=before_date))
+
+
+def signed_balances_as_of(as_of: date) -> dict[int, Decimal]:
+    """Signed (debit - credit) balance per account including `as_of`."""
+    return _signed_balances(balance_rows(as_of=as_of))
+
+
+def subtree_signed_balances_as_of(root_type: str, as_of: date) -> dict[int, Decimal]:
+    """Signed balance as of a date for every `root_type` account, rolled up over its subtree.
+
+    One grouped aggregate: each account joins the accounts inside its nested-set range
+    (`lft < member.lft` and `member.rgt < rgt`), so group accounts carry their subtotal.
+    Accounts without tree numbering (lft = 0) only count themselves.
+    """
+    node = aliased(Account)
+    member = aliased(Account)
+    rows = balance_rows(as_of=as_of)
+    result = db.session.execute(
+        select(node.id, func.sum(rows.c.signed))
+        .join(
+            member,
+            or_(
+                member.id == node.id,
+                and_(node.lft > 0, member.lft > node.lft, member.rgt < node.rgt),
+            ),
+        )
+        .join(rows, rows.c.account_id == member.id)
+        .where(node.root_type == root_type)
+        .group_by(node.id)
+    )
+    return {account_id: _dec(signed) for account_id, signed in result}
+
+
+def period_movements(start_date: date, end_date: date) -> dict[int, tuple[Decimal, Decimal]]:
+    """Total (debit, credit) per account for days within [start_date, end_date]."""
+    rows = db.session.query(
+        AccountDailyBalance.account_id,
+        func.sum(AccountDailyBalance.debit),
+        func.sum(AccountDailyBalance.credit),
+    ).filter(
+        AccountDailyBalance.date >= start_date,
+        AccountDailyBalance.date <= end_date,
+    ).group_by(AccountDailyBalance.account_id).all()
+    return {account_id: (_dec(debit), _dec(credit)) for account_id, debit, credit in rows}
+
+
+def account_signed_balance(account_id: int, *, before: Optional[date] = None, as_of: Optional[date] = None) -> Decimal:
+    """Signed balance of one account, optionally limited to days before/as of a date."""
+    rows = balance_rows(before=before, as_of=as_of, account_id=account_id)
+    return _dec(db.session.execute(select(func.sum(rows.c.signed))).scalar())
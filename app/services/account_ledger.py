@@ -0,0 +1,211 @@
+"""Account ledger queries: totals, running balances and keyset pages.
+
+Ledger views used to load every entry of the account and add up the running balance
+in Python. Here the running balance is a window function
+(`SUM(debit - credit) OVER (ORDER BY entry_date, id)`) on top of the balance brought
+forward, and the ledger page seeks on `(entry_date, id)` via
+`idx_accounting_entry_account_date`, so page N costs the same as page 1.
+
+Opening balance, period debit/credit and entry count come from one statement over
+the `account_daily_balances` rollup; balances brought forward start from the latest
+closed-year snapshot (see `account_balances.balance_rows`).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Iterator, Optional
+
+from sqlalchemy import and_, func, literal, or_, select
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models.accounting import AccountDailyBalance, AccountingEntry
+from app.services.account_balances import balance_rows, to_money
+
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 500
+
+
+@dataclass
+class LedgerTotals:
+    opening: Decimal
+    debit: Decimal
+    credit: Decimal
+    entries: int
+
+    @property
+    def closing(self) -> Decimal:
+        return self.opening + self.debit - self.credit
+
+
+@dataclass
+class LedgerPage:
+    rows: list[tuple[AccountingEntry, Decimal]] = field(default_factory=list)
+    brought_forward: Decimal = Decimal('0')
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    @property
+    def carried_forward(self) -> Decimal:
+        return self.rows[-1][1] if self.rows else self.brought_forward
+
+
+def encode_cursor(entry: AccountingEntry) -> str:
+    return f'{entry.entry_date.isoformat()}.{entry.id}'
+
+
+def decode_cursor(value: Optional[str]) -> Optional[tuple[date, int]]:
+    """Parse a cursor from `encode_cursor`; None for missing or malformed values."""
+    if not value:
+        return None
+    try:
+        day, entry_id = value.split('.', 1)
+        return date.fromisoformat(day), int(entry_id)
+    except ValueError:
+        return None
+
+
+def _range_filters(account_id: int, start_date: Optional[date], end_date: Optional[date]) -> list:
+    filters = [AccountingEntry.account_id == account_id]
+    if start_date:
+        filters.append(AccountingEntry.entry_date >= start_date)
+    if end_date:
+        filters.append(AccountingEntry.entry_date <= end_date)
+    return filters
+
+
+def _balance_sum(**bounds):
+    rows = balance_rows(**bounds)
+    return select(func.sum(rows.c.signed)).scalar_subquery()
+
+
+def ledger_totals(account_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None) -> LedgerTotals:
+    """Opening balance (before `start_date`), period debit/credit and entry count, in one query."""
+    day = AccountDailyBalance
+    in_period = [day.account_id == account_id]
+    if start_date:
+        in_period.append(day.date >= start_date)
+    if end_date:
+        in_period.append(day.date <= end_date)
+
+    opening = _balance_sum(before=start_date, account_id=account_id) if start_date else literal(0)
+    movements = select(func.sum(day.debit).label('debit'), func.sum(day.credit).label('credit')).where(*in_period).subquery()
+    entry_count = (
+        select(func.count(AccountingEntry.id))
+        .where(*_range_filters(account_id, start_date, end_date))
+        .scalar_subquery()
+    )
+    row = db.session.execute(
+        select(opening, movements.c.debit, movements.c.credit, entry_count)
+    ).one()
+    return LedgerTotals(opening=to_money(row[0]), debit=to_money(row[1]), credit=to_money(row[2]), entries=int(row[3] or 0))
+
+
+def balance_before(account_id: int, entry_date: date, entry_id: int) -> Decimal:
+    """Signed balance of every entry of the account ordered before `(entry_date, entry_id)`."""
+    earlier_days = _balance_sum(before=entry_date, account_id=account_id)
+    same_day = (
+        select(func.sum(AccountingEntry.debit - AccountingEntry.credit))
+        .where(
+            AccountingEntry.account_id == account_id,
+            AccountingEntry.entry_date == entry_date,
+            AccountingEntry.id < entry_id,
+        )
+        .scalar_subquery()
+    )
+    row = db.session.execute(select(earlier_days, same_day)).one()
+    return to_money(row[0]) + to_money(row[1])
+
+
+def _with_running_balance(entries_subquery):
+    entry = aliased(AccountingEntry, entries_subquery)
+    running = func.sum(entries_subquery.c.debit - entries_subquery.c.credit).over(
+        order_by=(entries_subquery.c.entry_date, entries_subquery.c.id)
+    )
+    return select(entry, running).order_by(entries_subquery.c.entry_date, entries_subquery.c.id)
+
+
+def ledger_page(
+    account_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    *,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    per_page: int = DEFAULT_PER_PAGE,
+) -> LedgerPage:
+    """One page of the ledger with running balances.
+
+    Pass the previous page's `next_cursor` as `after` (or `prev_cursor` as `before`).
+    Without a cursor the first page is returned.
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    filters = _range_filters(account_id, start_date, end_date)
+    key = (AccountingEntry.entry_date, AccountingEntry.id)
+
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+    if before_key is not None:
+        day, entry_id = before_key
+        filters.append(or_(AccountingEntry.entry_date < day, and_(AccountingEntry.entry_date == day, AccountingEntry.id < entry_id)))
+        order = [column.desc() for column in key]
+    else:
+        if after_key is not None:
+            day, entry_id = after_key
+            filters.append(or_(AccountingEntry.entry_date > day, and_(AccountingEntry.entry_date == day, AccountingEntry.id > entry_id)))
+        order = list(key)
+
+    # One extra row tells whether there is a page beyond this one.
+    fetched = select(AccountingEntry).where(*filters).order_by(*order).limit(per_page + 1).subquery()
+    rows = db.session.execute(_with_running_balance(fetched)).all()
+
+    has_more = len(rows) > per_page
+    if before_key is not None and not has_more:
+        # Paged back past the start: show a full first page instead of a short one.
+        return ledger_page(account_id, start_date, end_date, per_page=per_page)
+
+    page = LedgerPage()
+    if not rows:
+        return page
+
+    first = rows[0][0]
+    base = balance_before(account_id, first.entry_date, first.id)
+    balanced = [(entry, base + to_money(running)) for entry, running in rows]
+
+    if before_key is not None:
+        balanced = balanced[1:]
+        page.next_cursor = encode_cursor(balanced[-1][0])
+        page.prev_cursor = encode_cursor(balanced[0][0])
+    else:
+        if has_more:
+            balanced = balanced[:-1]
+        page.next_cursor = encode_cursor(balanced[-1][0]) if has_more else None
+        page.prev_cursor = encode_cursor(balanced[0][0]) if after_key is not None else None
+
+    page.rows = balanced
+    first_entry, first_balance = balanced[0]
+    page.brought_forward = first_balance - to_money(first_entry.debit) + to_money(first_entry.credit)
+    return page
+
+
+def iter_ledger(
+    account_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    *,
+    opening: Decimal = Decimal('0'),
+    chunk_size: int = 1000,
+) -> Iterator[tuple[AccountingEntry, Decimal]]:
+    """Every entry in the range with its running balance, streamed (for print/export).
+
+    `opening` is the balance brought forward into the range (see `ledger_totals`).
+    """
+    entries = select(AccountingEntry).where(*_range_filters(account_id, start_date, end_date)).subquery()
+    result = db.session.execute(
+        _with_running_balance(entries).execution_options(yield_per=chunk_size)
+    )
+    for entry, running in result:
+        yield entry, opening + to_money(running)
@@ -0,0 +1,118 @@
+"""Process-wide registry of resolved system accounts.
+
+`resolve_sales_account()` and friends used to run a name lookup (and for the
+settings-backed ones, a settings query plus a primary-key get) on every posting.
+The registry keeps a detached snapshot of each resolved account per process and
+hands it to the current session with `merge(load=False)`, which issues no SQL.
+
+Snapshots are tagged with the `system_accounts` version stamp. Chart-of-accounts
+changes call `invalidate_system_accounts()` and saving `AccountingSettings` bumps the
+stamp automatically, so other processes re-resolve on their next request.
+
+Accounts resolved inside a transaction are only promoted to the shared cache when
+that transaction commits, so an account created by a request that later rolls back
+never ends up cached.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app import db
+from app.models.accounting import Account, AccountingSettings
+from app.services.cache_versions import bump_version, get_version, on_bump
+
+VERSION_KEY = 'system_accounts'
+_PENDING_KEY = 'system_account_registry.pending'
+
+
+def detached_account(account: Account) -> Account:
+    """Detached copy of `account` holding its column values."""
+    values = {attr.key: getattr(account, attr.key) for attr in inspect(Account).column_attrs}
+    copy = Account(**values)
+    make_transient_to_detached(copy)
+    return copy
+
+
+class SystemAccountRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._accounts: dict[str, Account] = {}
+
+    def get(self, key: str, loader: Callable[[], Account]) -> Account:
+        """Return the account cached under `key`, calling `loader` on a miss."""
+        session = db.session()
+        pending = session.info.setdefault(_PENDING_KEY, {})
+        if key in pending:
+            return pending[key][0]
+
+        version = get_version(VERSION_KEY)
+        with self._lock:
+            if self._version != version:
+                self._accounts.clear()
+                self._version = version
+            snapshot = self._accounts.get(key)
+
+        if snapshot is not None:
+            existing = session.identity_map.get(inspect(snapshot).key)
+            if existing is not None:
+                return existing
+            return session.merge(snapshot, load=False)
+
+        account = loader()
+        pending[key] = (account, detached_account(account), version)
+        return account
+
+    def promote(self, pending: dict) -> None:
+        with self._lock:
+            for key, (_account, snapshot, version) in pending.items():
+                if version == self._version:
+                    self._accounts[key] = snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._accounts.clear()
+            self._version = None
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+
+system_accounts = SystemAccountRegistry()
+
+
+def invalidate_system_accounts() -> None:
+    """Drop cached system accounts in every process (in the caller's transaction)."""
+    bump_version(VERSION_KEY)
+
+
+def _clear_local() -> None:
+    system_accounts.clear()
+    if db.session.registry.has():
+        db.session().info.pop(_PENDING_KEY, None)
+
+
+on_bump(VERSION_KEY, _clear_local)
+
+
+@event.listens_for(Session, 'after_commit')
+def _promote_pending(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        system_accounts.promote(pending)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(AccountingSettings, 'after_insert')
+@event.listens_for(AccountingSettings, 'after_update')
+def _settings_saved(mapper, connection, target):
+    bump_version(VERSION_KEY, connection=connection)
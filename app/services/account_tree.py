@@ -0,0 +1,127 @@
+"""Chart of accounts tree helpers.
+
+`Account.lft` / `Account.rgt` hold a nested-set numbering of the chart so a group's
+subtree is the range `lft..rgt`. The chart is small, so it is simply renumbered after
+any structural change (add/edit/delete from the chart-of-accounts screens).
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import bindparam, update
+
+from app import db
+from app.models.accounting import Account
+
+ROOT_TYPE_ORDER = ['Asset', 'Liability', 'Equity', 'Income', 'Expense']
+
+
+def _sort_key(row):
+    root_rank = ROOT_TYPE_ORDER.index(row.root_type) if row.root_type in ROOT_TYPE_ORDER else len(ROOT_TYPE_ORDER)
+    return (root_rank, row.account_number or '', (row.name or '').lower(), row.id)
+
+
+def rebuild_account_tree() -> int:
+    """Renumber lft/rgt for the whole chart. Returns the number of accounts changed. Does not commit."""
+    db.session.flush()
+
+    rows = db.session.query(
+        Account.id,
+        Account.parent_account_id,
+        Account.root_type,
+        Account.account_number,
+        Account.name,
+        Account.lft,
+        Account.rgt,
+    ).all()
+    ids = {row.id for row in rows}
+
+    children: dict[Optional[int], list] = {}
+    for row in rows:
+        # Orphans (parent missing) are treated as top-level nodes.
+        parent_id = row.parent_account_id if row.parent_account_id in ids else None
+        children.setdefault(parent_id, []).append(row)
+    for siblings in children.values():
+        siblings.sort(key=_sort_key)
+
+    numbering: dict[int, tuple[int, int]] = {}
+    counter = 0
+    visited: set[int] = set()
+
+    # Iterative DFS so deep charts do not hit the recursion limit.
+    stack = [(row, False) for row in reversed(children.get(None, []))]
+    while stack:
+        row, closing = stack.pop()
+        if closing:
+            counter += 1
+            numbering[row.id] = (numbering[row.id][0], counter)
+            continue
+        if row.id in visited:
+            continue
+        visited.add(row.id)
+        counter += 1
+        numbering[row.id] = (counter, counter)
+        stack.append((row, True))
+        for child in reversed(children.get(row.id, [])):
+            stack.append((child, False))
+
+    changed = [
+        {'b_id': row.id, 'b_lft': numbering[row.id][0], 'b_rgt': numbering[row.id][1]}
+        for row in rows
+        if row.id in numbering and (row.lft, row.rgt) != numbering[row.id]
+    ]
+    if changed:
+        table = Account.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam('b_id'))
+            .values(lft=bindparam('b_lft'), rgt=bindparam('b_rgt')),
+            changed,
+        )
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, Account):
+                db.session.expire(obj, ['lft', 'rgt'])
+
+    return len(changed)
+
+
+def is_descendant(account: Account, candidate_parent: Account) -> bool:
+    """True when `candidate_parent` is `account` itself or sits inside its subtree."""
+    if candidate_parent.id == account.id:
+        return True
+    if account.lft and account.rgt and candidate_parent.lft:
+        return account.lft < candidate_parent.lft and candidate_parent.rgt < account.rgt
+
+    # Tree not numbered yet: walk up from the candidate instead.
+    seen = set()
+    node = candidate_parent
+    while node is not None and node.id not in seen:
+        if node.id == account.id:
+            return True
+        seen.add(node.id)
+        node = node.parent_account
+    return False
+
+
+def account_depths(accounts) -> dict[int, int]:
+    """Depth of each account in the tree (top-level accounts are 0)."""
+    by_id = {a.id: a for a in accounts}
+    depths: dict[int, int] = {}
+
+    def depth_of(account_id: int) -> int:
+        if account_id in depths:
+            return depths[account_id]
+        depth = 0
+        seen = {account_id}
+        parent_id = by_id[account_id].parent_account_id
+        while parent_id in by_id and parent_id not in seen:
+            seen.add(parent_id)
+            depth += 1
+            parent_id = by_id[parent_id].parent_account_id
+        depths[account_id] = depth
+        return depth
+
+    for account_id in by_id:
+        depth_of(account_id)
+    return depths
@@ -2,19 +2,30 @@
 
 This project currently uses `AccountingEntry` as the ledger table for most UI/reports.
 These helpers standardize how system accounts are resolved/created and how common
-postings are produced (sales, receipts, expenses, opening balances).
+postings are produced (sales, receipts, expenses, opening balances). Resolved system
+accounts are cached per process by `account_registry`.
+
+All ledger writes should go through `create_accounting_entry` / `bulk_create_entries` /
+`delete_posting` / `delete_entries` so the `account_daily_balances` rollup stays in step.
+They also refuse to touch closed fiscal years (`PeriodLockedError`, see `fiscal_periods`).
 """
 
 from __future__ import annotations
 
+import io
 from dataclasses import dataclass
+from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, Sequence
 
-from sqlalchemy import func
+from sqlalchemy import func, insert
 
 from app import db
 from app.models.accounting import AccountingEntry, Account, AccountingSettings
+from app.services.account_balances import apply_daily_delta, apply_daily_deltas, subtract_entries, to_money
+from app.services.account_registry import system_accounts
+from app.services.fiscal_periods import ensure_period_open, locked_through
+from app.services.report_cache import mark_ledger_changed
 
 
 @dataclass(frozen=True)
@@ -79,6 +90,10 @@ def get_or_create_settings() -> AccountingSettings:
 
 
 def resolve_cash_account() -> Account:
+    return system_accounts.get('cash', _load_cash_account)
+
+
+def _load_cash_account() -> Account:
     settings = get_or_create_settings()
     if settings.default_cash_account_id:
         account = Account.query.get(settings.default_cash_account_id)
@@ -88,6 +103,10 @@ def resolve_cash_account() -> Account:
 
 
 def resolve_bank_account() -> Account:
+    return system_accounts.get('bank', _load_bank_account)
+
+
+def _load_bank_account() -> Account:
     settings = get_or_create_settings()
     if settings.default_bank_account_id:
         account = Account.query.get(settings.default_bank_account_id)
@@ -97,6 +116,10 @@ def resolve_bank_account() -> Account:
 
 
 def resolve_receivable_account() -> Account:
+    return system_accounts.get('receivable', _load_receivable_account)
+
+
+def _load_receivable_account() -> Account:
     settings = get_or_create_settings()
     if settings.default_receivable_account_id:
         account = Account.query.get(settings.default_receivable_account_id)
@@ -107,6 +130,10 @@ def resolve_receivable_account() -> Account:
 
 def resolve_payable_account(vendor_name: Optional[str] = None) -> Account:
     """Resolve a generic AP account; vendor-specific AP should be separate if desired."""
+    return system_accounts.get(f'payable:{vendor_name or ""}', lambda: _load_payable_account(vendor_name))
+
+
+def _load_payable_account(vendor_name: Optional[str]) -> Account:
     settings = get_or_create_settings()
     if settings.default_payable_account_id:
         account = Account.query.get(settings.default_payable_account_id)
@@ -121,41 +148,48 @@ def resolve_payable_account(vendor_name: Optional[str] = None) -> Account:
     return get_or_create_account(name='Accounts Payable', root_type='Liability', account_type='Payable')
 
 
+def _system_account(key: str, name: str, root_type: str, account_type: str) -> Account:
+    return system_accounts.get(
+        key,
+        lambda: get_or_create_account(name=name, root_type=root_type, account_type=account_type),
+    )
+
+
 def resolve_sales_account() -> Account:
-    return get_or_create_account(name='Sales', root_type='Income', account_type='Sales')
+    return _system_account('sales', 'Sales', 'Income', 'Sales')
 
 
 def resolve_purchases_account() -> Account:
-    return get_or_create_account(name='Purchases', root_type='Expense', account_type='Purchases')
+    return _system_account('purchases', 'Purchases', 'Expense', 'Purchases')
 
 
 def resolve_output_cgst() -> Account:
-    return get_or_create_account(name='Output CGST', root_type='Liability', account_type='Tax')
+    return _system_account('output_cgst', 'Output CGST', 'Liability', 'Tax')
 
 
 def resolve_output_sgst() -> Account:
-    return get_or_create_account(name='Output SGST', root_type='Liability', account_type='Tax')
+    return _system_account('output_sgst', 'Output SGST', 'Liability', 'Tax')
 
 
 def resolve_output_igst() -> Account:
-    return get_or_create_account(name='Output IGST', root_type='Liability', account_type='Tax')
+    return _system_account('output_igst', 'Output IGST', 'Liability', 'Tax')
 
 
 def resolve_input_cgst() -> Account:
-    return get_or_create_account(name='Input CGST', root_type='Asset', account_type='Tax')
+    return _system_account('input_cgst', 'Input CGST', 'Asset', 'Tax')
 
 
 def resolve_input_sgst() -> Account:
-    return get_or_create_account(name='Input SGST', root_type='Asset', account_type='Tax')
+    return _system_account('input_sgst', 'Input SGST', 'Asset', 'Tax')
 
 
 def resolve_input_igst() -> Account:
-    return get_or_create_account(name='Input IGST', root_type='Asset', account_type='Tax')
+    return _system_account('input_igst', 'Input IGST', 'Asset', 'Tax')
 
 
 def resolve_opening_balance_offset_account() -> Account:
     # Standard offset for opening balances.
-    return get_or_create_account(name='Opening Balance Equity', root_type='Equity', account_type='Equity')
+    return _system_account('opening_balance_offset', 'Opening Balance Equity', 'Equity', 'Equity')
 
 
 def resolve_payment_account(payment_mode: Optional[str]) -> Account:
@@ -178,23 +212,129 @@ def create_accounting_entry(
     description: str = '',
     created_by: Optional[int] = None,
 ) -> AccountingEntry:
+    ensure_period_open(entry_date)
     entry = AccountingEntry(
         entry_date=entry_date,
         reference_type=reference_type,
         reference_id=reference_id,
         account_id=account.id,
         account_head=account_head or account.name,
-        debit=float(debit),
-        credit=float(credit),
+        debit=to_money(debit),
+        credit=to_money(credit),
         description=description,
         created_by=created_by,
     )
     db.session.add(entry)
+    apply_daily_delta(account.id, entry_date, debit, credit)
     return entry
 
 
+_BULK_ENTRY_COLUMNS = (
+    'entry_date',
+    'reference_type',
+    'reference_id',
+    'account_id',
+    'account_head',
+    'debit',
+    'credit',
+    'description',
+    'created_by',
+    'created_at',
+)
+
+
+def _copy_field(value) -> str:
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_entries(rows: Sequence[dict]) -> bool:
+    """Stream rows into accounting_entries with COPY (psycopg2 only). Returns False if unavailable."""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return False
+    dbapi_conn = db.session.connection().connection
+    cursor = dbapi_conn.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        cursor.close()
+        return False
+
+    # NULL is an unquoted empty field (the CSV default); every other value is quoted,
+    # so no text value (not even '' or '\N') can be read back as NULL.
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(_copy_field(row[col]) for col in _BULK_ENTRY_COLUMNS))
+        buffer.write('\n')
+    buffer.seek(0)
+    try:
+        cursor.copy_expert(
+            f"COPY accounting_entries ({', '.join(_BULK_ENTRY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+    return True
+
+
+def bulk_create_entries(rows: Sequence[dict]) -> int:
+    """Insert many ledger lines at once and update the rollup.
+
+    Each row carries the `AccountingEntry` columns (`entry_date`, `reference_type`,
+    `reference_id`, `account_id`, `account_head`, `debit`, `credit`, `description`,
+    `created_by`). Uses COPY on PostgreSQL and a multi-row INSERT elsewhere; no ORM
+    objects are created. Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    ensure_period_open(min(row['entry_date'] for row in rows))
+
+    now = datetime.utcnow()
+    prepared = []
+    for row in rows:
+        prepared.append({
+            'entry_date': row['entry_date'],
+            'reference_type': row.get('reference_type'),
+            'reference_id': row.get('reference_id'),
+            'account_id': row.get('account_id'),
+            'account_head': row.get('account_head'),
+            'debit': to_money(row.get('debit')),
+            'credit': to_money(row.get('credit')),
+            'description': row.get('description'),
+            'created_by': row.get('created_by'),
+            'created_at': row.get('created_at') or now,
+        })
+
+    # Make pending ORM changes visible to the raw connection first.
+    db.session.flush()
+    if not _copy_entries(prepared):
+        db.session.execute(insert(AccountingEntry.__table__), prepared)
+
+    apply_daily_deltas(
+        (row['account_id'], row['entry_date'], row['debit'], row['credit'])
+        for row in prepared
+        if row['account_id']
+    )
+    mark_ledger_changed()
+    return len(prepared)
+
+
+def delete_entries(entry_query, *, synchronize_session='auto') -> int:
+    """Delete the `AccountingEntry` rows matched by `entry_query`, keeping the rollup in step."""
+    locked = locked_through()
+    if locked is not None:
+        closed = entry_query.filter(AccountingEntry.entry_date <= locked).order_by(None)
+        first = closed.with_entities(AccountingEntry.entry_date).first()
+        if first is not None:
+            ensure_period_open(first[0])
+    subtract_entries(entry_query)
+    deleted = entry_query.delete(synchronize_session=synchronize_session)
+    if deleted:
+        mark_ledger_changed()
+    return deleted
+
+
 def delete_posting(reference_type: str, reference_id: int) -> None:
-    AccountingEntry.query.filter_by(reference_type=reference_type, reference_id=reference_id).delete()
+    delete_entries(AccountingEntry.query.filter_by(reference_type=reference_type, reference_id=reference_id))
 
 
 def post_opening_balance(*, account: Account, amount_natural: Decimal, as_of_date, created_by: Optional[int] = None) -> None:
@@ -0,0 +1,203 @@
+"""Receivables and payables aging, bucketed in SQL.
+
+The aging reports used to load every open order (or vendor bill), lazy-load its
+distributor (or vendor) one row at a time and bucket the outstanding amounts in
+Python. Here one grouped query per report does it all:
+
+- outstanding per document = total - payments dated on or before the as-of date,
+  so the report can be run for any past date, not just today;
+- the age bucket is a CASE on the document date against precomputed cut-off dates
+  (portable, no date arithmetic in SQL);
+- amounts are summed per bucket and grouped by party, with the party name joined in.
+
+Buckets are given as ascending upper bounds in days: `(30, 60, 90)` gives
+`0-30`, `31-60`, `61-90` and `90+`. The default comes from `AGING_BUCKETS`.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Optional, Sequence
+
+from flask import current_app
+from sqlalchemy import case, func, literal, select
+
+from app import db
+from app.models.distributor import Distributor
+from app.models.order import Order
+from app.models.payment import Payment
+from app.models.purchasing import Vendor, VendorBill, VendorPayment
+from app.services.account_balances import to_money
+
+DEFAULT_BUCKETS = (30, 60, 90)
+
+# Below this an open document counts as settled (float rounding on paid amounts).
+_SETTLED = 0.005
+
+
+@dataclass
+class AgingRow:
+    party_id: int
+    name: str
+    amounts: list[Decimal]
+
+    @property
+    def total(self) -> Decimal:
+        return sum(self.amounts, Decimal('0'))
+
+
+@dataclass
+class AgingReport:
+    as_of: date
+    bounds: tuple[int, ...]
+    rows: list[AgingRow] = field(default_factory=list)
+
+    @property
+    def labels(self) -> list[str]:
+        return bucket_labels(self.bounds)
+
+    @property
+    def totals(self) -> list[Decimal]:
+        return [sum((row.amounts[i] for row in self.rows), Decimal('0')) for i in range(len(self.labels))]
+
+    @property
+    def buckets(self) -> dict[str, Decimal]:
+        """Bucket label -> total outstanding."""
+        return dict(zip(self.labels, self.totals))
+
+    @property
+    def total(self) -> Decimal:
+        return sum(self.totals, Decimal('0'))
+
+
+def bucket_labels(bounds: Sequence[int]) -> list[str]:
+    labels = []
+    lower = 0
+    for upper in bounds:
+        labels.append(f'{lower}-{upper}')
+        lower = upper + 1
+    labels.append(f'{bounds[-1]}+' if bounds else '0+')
+    return labels
+
+
+def parse_bucket_bounds(value: Optional[str]) -> tuple[int, ...]:
+    """Parse `'30,60,90'` into ascending bounds; the configured default when empty.
+
+    Raises ValueError for non-numeric, non-positive or unordered bounds.
+    """
+    if not value or not value.strip():
+        return default_bucket_bounds()
+    message = 'Aging buckets must be increasing positive day counts, e.g. 30,60,90.'
+    try:
+        bounds = tuple(int(part) for part in value.split(',') if part.strip())
+    except ValueError:
+        raise ValueError(message) from None
+    if not bounds or bounds[0] <= 0 or any(b <= a for a, b in zip(bounds, bounds[1:])):
+        raise ValueError(message)
+    return bounds
+
+
+def default_bucket_bounds() -> tuple[int, ...]:
+    return tuple(current_app.config.get('AGING_BUCKETS') or DEFAULT_BUCKETS)
+
+
+def _aging(
+    *,
+    as_of: date,
+    bounds: Sequence[int],
+    document_id,
+    document_date,
+    document_total,
+    document_filters: list,
+    party_column,
+    party_model,
+    payment_document_id,
+    payment_date,
+    payment_amount,
+    payment_filters: list,
+) -> AgingReport:
+    paid = (
+        select(payment_document_id.label('document_id'), func.sum(payment_amount).label('paid'))
+        .where(payment_date <= as_of, *payment_filters)
+        .group_by(payment_document_id)
+        .subquery()
+    )
+    outstanding = func.coalesce(document_total, 0) - func.coalesce(paid.c.paid, 0)
+
+    # Bucket i holds documents dated after as_of - bounds[i] days; the last one the rest.
+    bucket = case(
+        *[(document_date >= as_of - timedelta(days=upper), index) for index, upper in enumerate(bounds)],
+        else_=len(bounds),
+    )
+    documents = (
+        select(
+            party_column.label('party_id'),
+            outstanding.label('outstanding'),
+            bucket.label('bucket'),
+        )
+        .select_from(document_id.class_)
+        .outerjoin(paid, paid.c.document_id == document_id)
+        .where(document_date <= as_of, outstanding > _SETTLED, *document_filters)
+        .subquery()
+    )
+
+    bucket_sums = [
+        func.sum(case((documents.c.bucket == index, documents.c.outstanding), else_=literal(0)))
+        for index in range(len(bounds) + 1)
+    ]
+    total = func.sum(documents.c.outstanding)
+    result = db.session.execute(
+        select(party_model.id, party_model.business_name, *bucket_sums)
+        .join(documents, documents.c.party_id == party_model.id)
+        .group_by(party_model.id, party_model.business_name)
+        .order_by(total.desc(), party_model.business_name)
+    )
+
+    report = AgingReport(as_of=as_of, bounds=tuple(bounds))
+    for party_id, name, *amounts in result:
+        report.rows.append(AgingRow(party_id=party_id, name=name, amounts=[to_money(a) for a in amounts]))
+    return report
+
+
+def receivables_aging(as_of: Optional[date] = None, bounds: Optional[Sequence[int]] = None) -> AgingReport:
+    """Outstanding order amounts per distributor, aged by order date.
+
+    Counts cleared customer payments dated on or before `as_of`.
+    """
+    return _aging(
+        as_of=as_of or date.today(),
+        bounds=bounds or default_bucket_bounds(),
+        document_id=Order.id,
+        document_date=Order.order_date,
+        document_total=Order.total_amount,
+        document_filters=[func.coalesce(Order.status, '') != 'cancelled'],
+        party_column=Order.distributor_id,
+        party_model=Distributor,
+        payment_document_id=Payment.order_id,
+        payment_date=Payment.payment_date,
+        payment_amount=Payment.amount,
+        payment_filters=[Payment.status == 'cleared'],
+    )
+
+
+def payables_aging(as_of: Optional[date] = None, bounds: Optional[Sequence[int]] = None) -> AgingReport:
+    """Outstanding vendor bill amounts per vendor, aged by bill date.
+
+    Counts vendor payments (except bounced ones) dated on or before `as_of`.
+    """
+    return _aging(
+        as_of=as_of or date.today(),
+        bounds=bounds or default_bucket_bounds(),
+        document_id=VendorBill.id,
+        document_date=VendorBill.bill_date,
+        document_total=VendorBill.total_amount,
+        document_filters=[func.coalesce(VendorBill.approval_status, '') != 'rejected'],
+        party_column=VendorBill.vendor_id,
+        party_model=Vendor,
+        payment_document_id=VendorPayment.vendor_bill_id,
+        payment_date=VendorPayment.payment_date,
+        payment_amount=VendorPayment.amount,
+        payment_filters=[func.coalesce(VendorPayment.status, '') != 'bounced'],
+    )
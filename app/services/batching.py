@@ -0,0 +1,94 @@
+"""Keyset (id-cursor) iteration over large queries.
+
+`LIMIT/OFFSET` paging re-scans every skipped row, so a full pass is quadratic, and it
+skips or repeats rows when the underlying set changes mid-run. These helpers page on
+an increasing unique key instead (`WHERE id > :last ORDER BY id LIMIT n`), stream
+each page with `yield_per`, and flush + expunge the page's objects before fetching
+the next one so the session's identity map stays flat.
+
+Usage:
+
+    for order in iter_keyset(Order.query.filter(...)):
+        ...
+
+    for orders in iter_keyset_chunks(Order.query.filter(...), chunk_size=1000):
+        ...
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Row
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _default_key(query):
+    entity = query.column_descriptions[0]['entity']
+    mapper = inspect(entity)
+    column = mapper.primary_key[0]
+    return getattr(mapper.class_, mapper.get_property_by_column(column).key)
+
+
+def _key_value(row, key):
+    owner = key.class_
+    if isinstance(row, Row):
+        for element in row:
+            if isinstance(element, owner):
+                return getattr(element, key.key)
+        raise ValueError(f'Keyset key {key} is not an entity selected by the query')
+    return getattr(row, key.key)
+
+
+def _instances(row):
+    if isinstance(row, Row):
+        return [element for element in row if hasattr(element, '_sa_instance_state')]
+    return [row] if hasattr(row, '_sa_instance_state') else []
+
+
+def iter_keyset_chunks(
+    query,
+    *,
+    key=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    expunge: bool = True,
+) -> Iterator[list]:
+    """Yield the rows of `query` in lists of up to `chunk_size`, paging on `key`.
+
+    `key` must be a unique, sortable mapped attribute of an entity selected by the
+    query (defaults to the first entity's primary key); any existing ORDER BY is
+    replaced. With `expunge=True` the page's objects are flushed and removed from the
+    session once the caller is done with the page, so keep no references you still
+    need to lazy-load from.
+    """
+    key = key if key is not None else _default_key(query)
+    session = query.session
+    base = query.order_by(None).order_by(key)
+    last_value: Optional[object] = None
+
+    while True:
+        page = base if last_value is None else base.filter(key > last_value)
+        rows = list(page.limit(chunk_size).yield_per(chunk_size))
+        if not rows:
+            break
+
+        last_value = _key_value(rows[-1], key)
+        yield rows
+
+        if expunge:
+            session.flush()
+            for row in rows:
+                for instance in _instances(row):
+                    if instance in session:
+                        session.expunge(instance)
+
+        if len(rows) < chunk_size:
+            break
+
+
+def iter_keyset(query, *, key=None, chunk_size: int = DEFAULT_CHUNK_SIZE, expunge: bool = True) -> Iterator:
+    """Row-at-a-time variant of `iter_keyset_chunks`."""
+    for rows in iter_keyset_chunks(query, key=key, chunk_size=chunk_size, expunge=expunge):
+        yield from rows
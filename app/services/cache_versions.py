@@ -0,0 +1,111 @@
+"""Cross-process cache invalidation via version stamps.
+
+Each gunicorn worker keeps its own in-memory caches. A cache is tagged with the
+version of a key in `cache_versions`; writers call `bump_version(key)` in the same
+transaction as the change, and every process drops its copy the next time it sees a
+different version. Versions are read at most once per app context (i.e. once per
+request), so a cache hit costs a single primary-key lookup per request at most.
+
+`on_bump(key, callback)` registers a callback that runs in the bumping process right
+away, so that process does not serve stale data for the rest of its request.
+
+`bump_on_write(key, *models)` bumps a key once per committed transaction that wrote
+any of the given models; `bump_on_commit(key)` does the same for writes that skip the
+ORM (bulk statements).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from itertools import chain
+from typing import Callable, Optional
+
+from flask import g, has_app_context
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models.settings import CacheVersion
+
+_callbacks: dict[str, list[Callable[[], None]]] = {}
+_watched: dict[str, tuple[type, ...]] = {}
+_PENDING_KEY = 'cache_versions.pending'
+
+
+def _memo() -> dict:
+    if not has_app_context():
+        return {}
+    if '_cache_versions' not in g:
+        g._cache_versions = {}
+    return g._cache_versions
+
+
+def get_version(key: str) -> int:
+    """Current version of `key` (0 if never bumped), read once per app context."""
+    memo = _memo()
+    if key in memo:
+        return memo[key]
+    table = CacheVersion.__table__
+    version = db.session.execute(select(table.c.version).where(table.c.key == key)).scalar() or 0
+    memo[key] = version
+    return version
+
+
+def bump_version(key: str, *, connection=None) -> None:
+    """Invalidate every process's cache for `key`. Runs in the caller's transaction.
+
+    Pass `connection` when calling from inside a flush (mapper events).
+    """
+    table = CacheVersion.__table__
+    execute = connection.execute if connection is not None else db.session.execute
+    now = datetime.utcnow()
+    result = execute(
+        update(table).where(table.c.key == key).values(version=table.c.version + 1, updated_at=now)
+    )
+    if not result.rowcount:
+        execute(insert(table).values(key=key, version=1, updated_at=now))
+
+    _memo().pop(key, None)
+    for callback in _callbacks.get(key, []):
+        callback()
+
+
+def on_bump(key: str, callback: Callable[[], None]) -> None:
+    """Run `callback` in this process whenever it bumps `key`."""
+    _callbacks.setdefault(key, []).append(callback)
+
+
+def bump_on_commit(key: str, session: Optional[Session] = None) -> None:
+    """Bump `key` when the session's current transaction commits."""
+    (session or db.session()).info.setdefault(_PENDING_KEY, set()).add(key)
+
+
+def bump_on_write(key: str, *models: type, events=('after_insert', 'after_update', 'after_delete')) -> None:
+    """Bump `key` once per committed transaction that flushed a write to any of `models`."""
+    def _row_written(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            bump_on_commit(key, session)
+
+    for model in models:
+        for name in events:
+            event.listen(model, name, _row_written)
+    _watched[key] = _watched.get(key, ()) + models
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_pending(session):
+    keys = set(session.info.pop(_PENDING_KEY, ()))
+    # before_commit runs ahead of the final flush, so also look at pending objects.
+    pending = list(chain(session.new, session.dirty, session.deleted))
+    if pending:
+        keys.update(key for key, models in _watched.items() if any(isinstance(obj, models) for obj in pending))
+    # Bumped as late as possible so version row locks are held only for the commit,
+    # and in a fixed order so two committing transactions cannot deadlock on them.
+    for key in sorted(keys):
+        bump_version(key, connection=session.connection())
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
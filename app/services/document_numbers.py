@@ -0,0 +1,113 @@
+"""Document number allocation (orders, payments, expenses, purchase orders, ...).
+
+Numbers used to be derived by finding the last `LIKE 'ORD20261018%'` row and adding
+one, which scans the table and lets two concurrent requests pick the same number
+(the second then fails on the unique constraint). Now each (series, period) has a
+row in `document_counters`:
+
+- `UPDATE ... SET value = value + 1 ... RETURNING value` increments it and locks the
+  row until the caller's transaction ends, so concurrent allocations for the same
+  series queue up instead of colliding;
+- the counter is part of the document's transaction: if the document is rolled back
+  so is its number, so numbers stay gapless;
+- a missing row is created on first use, starting after the highest number already
+  issued in that period (numbers from before the counters existed keep counting on).
+
+`allocate_number('order')` returns e.g. `ORD202610180001`.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.accounting import Expense
+from app.models.distributor import Distributor
+from app.models.order import Order
+from app.models.payment import Payment
+from app.models.purchasing import PurchaseOrder, VendorBill
+from app.models.settings import DocumentCounter
+
+
+@dataclass(frozen=True)
+class NumberSeries:
+    prefix: str
+    column: object  # unique number column, used to seed a new counter
+    width: int = 4
+    daily: bool = True  # period is the document date (YYYYMMDD); otherwise one running counter
+
+    def period(self, on: date) -> str:
+        return on.strftime('%Y%m%d') if self.daily else ''
+
+    def format(self, period: str, value: int) -> str:
+        return f'{self.prefix}{period}{value:0{self.width}d}'
+
+    def issued_max(self, session: Session, period: str) -> int:
+        """Highest number already issued in `period`, 0 if none."""
+        stem = f'{self.prefix}{period}'
+        last = session.execute(
+            select(self.column).where(self.column.like(f'{stem}%'), func.length(self.column) == len(stem) + self.width)
+            .order_by(self.column.desc()).limit(1)
+        ).scalar()
+        suffix = last[len(stem):] if last else ''
+        return int(suffix) if suffix.isdigit() else 0
+
+
+SERIES = {
+    'order': NumberSeries('ORD', Order.order_number),
+    'payment': NumberSeries('PAY', Payment.payment_number),
+    'expense': NumberSeries('EXP', Expense.expense_number),
+    'purchase_order': NumberSeries('PO', PurchaseOrder.order_number),
+    'vendor_bill': NumberSeries('VB', VendorBill.bill_number),
+    'distributor': NumberSeries('DIST', Distributor.code, daily=False),
+}
+
+
+def next_value(session: Session, series: str, period: str, start: Callable[[], int] = lambda: 0,
+               step: int = 1) -> int:
+    """Increment and return the (series, period) counter in the session's transaction.
+
+    `start()` gives the value a new counter starts after. With `step` > 1 the values
+    `result - step + 1 .. result` are all reserved by the one update.
+    """
+    table = DocumentCounter.__table__
+    increment = (
+        update(table)
+        .where(table.c.series == series, table.c.period == period)
+        .values(value=table.c.value + step)
+        .returning(table.c.value)
+    )
+    value = session.execute(increment).scalar()
+    if value is not None:
+        return value
+
+    value = start() + step
+    try:
+        with session.begin_nested():
+            session.execute(insert(table).values(series=series, period=period, value=value))
+    except IntegrityError:
+        # Another transaction created the counter first; queue up behind it.
+        value = session.execute(increment).scalar()
+    return value
+
+
+def allocate_number(series: str, on: Optional[date] = None, session: Optional[Session] = None) -> str:
+    """Next document number in `series` for the date `on` (today by default).
+
+    Call it in the transaction that inserts the document, as late as practical: the
+    counter row stays locked until that transaction commits or rolls back.
+    Raises ValueError for an unknown series.
+    """
+    spec = SERIES.get(series)
+    if spec is None:
+        raise ValueError(f'Unknown document number series: {series}')
+    session = session or db.session()
+    period = spec.period(on or date.today())
+    value = next_value(session, series, period, start=lambda: spec.issued_max(session, period))
+    return spec.format(period, value)
@@ -0,0 +1,71 @@
+"""EAN-13 allocation for product barcodes.
+
+Barcodes used to be found by probing candidate codes one by one, each with its own
+`Product.query.filter_by(ean_barcode=...)` (up to 2000 per product), so a bulk run
+made thousands of round-trips. Now:
+
+- product codes under a company prefix come from a `document_counters` row (series
+  `ean13`, period = the prefix), reserved `count` at a time by one row-locked
+  `UPDATE` (`document_numbers.next_value`); a new counter starts after the highest
+  code already in use under the prefix;
+- the EANs already assigned under the prefix are loaded once, and reserved codes that
+  are taken (e.g. entered by hand) are skipped and topped up from the counter.
+
+`allocate_eans('890123456', 2)` returns e.g. `['8901234560013', '8901234560020']`.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.product import Product
+from app.services.document_numbers import next_value
+from app.utils.barcode_generator import BarcodeGenerator
+
+SERIES = 'ean13'
+
+
+def _used_eans(session: Session, company_prefix: str) -> set[str]:
+    return set(session.execute(
+        select(Product.ean_barcode).where(Product.ean_barcode.startswith(company_prefix))
+    ).scalars())
+
+
+def _highest_code(used: set[str], company_prefix: str) -> int:
+    """Highest product code (digits between prefix and check digit) among `used`, 0 if none."""
+    codes = [ean[len(company_prefix):12] for ean in used if len(ean) == 13 and ean.isdigit()]
+    return max((int(code) for code in codes), default=0)
+
+
+def allocate_eans(company_prefix: str, count: int, session: Optional[Session] = None) -> list[str]:
+    """Reserve `count` unused, check-digited EAN-13 codes under `company_prefix`, ascending.
+
+    Call it in the transaction that assigns the codes: the counter row stays locked
+    until that transaction ends, and a rollback gives the codes back.
+    Raises ValueError for a prefix that is not 1-11 digits or when the prefix is full.
+    """
+    company_prefix = str(company_prefix or '').strip()
+    if not company_prefix.isdigit() or len(company_prefix) > 11:
+        raise ValueError(f'Company prefix must be 1-11 digits, got {company_prefix!r}')
+    if count <= 0:
+        return []
+
+    session = session or db.session()
+    width = 12 - len(company_prefix)
+    used = _used_eans(session, company_prefix)
+    eans: list[str] = []
+    while len(eans) < count:
+        step = count - len(eans)
+        last = next_value(session, SERIES, company_prefix,
+                          start=lambda: _highest_code(used, company_prefix), step=step)
+        if last >= 10 ** width:
+            raise ValueError(f'No EAN-13 codes left under company prefix {company_prefix}')
+        for value in range(last - step + 1, last + 1):
+            ean = BarcodeGenerator.generate_ean13(company_prefix, str(value).zfill(width))
+            if ean not in used:
+                eans.append(ean)
+    return eans
@@ -1,59 +1,62 @@
-"""Email Service - Automated Email Notifications."""
+"""Email Service - Automated Email Notifications.
+
+send_email / send_html_email queue the message in the notification outbox (the
+caller commits); `flask notifications worker` sends it.
+
+The bulk senders load every recipient's data in one keyset-paged query and render
+from the compiled template directly (no per-message template lookup or context
+processors); the worker then sends the emails in batches over one SMTP connection.
+"""
 
 from flask import current_app, render_template
 from flask_mail import Message
 from app.models import Order, Distributor, Product, Inventory, Payment
 from app import db
 from app import mail
+from app.services.batching import iter_keyset
+from sqlalchemy.orm import contains_eager, joinedload
+from app.services.notification_outbox import enqueue_email
 from datetime import datetime, timedelta
 from sqlalchemy import func
 import os
 
 class EmailService:
     
+    @staticmethod
+    def _template(name):
+        """Compiled email template (cached by the Jinja environment)"""
+        return current_app.jinja_env.get_template(f'emails/{name}.html')
+
+    @staticmethod
+    def _company_context():
+        return {
+            'company_name': current_app.config['COMPANY_NAME'],
+            'company_phone': current_app.config['COMPANY_PHONE'],
+            'company_email': current_app.config['COMPANY_EMAIL'],
+        }
+    
     @staticmethod
     def send_email(to, subject, template, **kwargs):
-        """Send email using template"""
+        """Queue email using template"""
         try:
-            msg = Message(
-                subject=subject,
-                recipients=[to] if isinstance(to, str) else to,
-                sender=current_app.config['MAIL_DEFAULT_SENDER']
-            )
-            
-            msg.html = render_template(f'emails/{template}.html', **kwargs)
-            
-            mail.send(msg)
+            html = render_template(f'emails/{template}.html', **kwargs)
+            enqueue_email(to, subject, html=html)
             return True
         except Exception as e:
-            print(f"Error sending email: {e}")
+            print(f"Error queueing email: {e}")
             return False
 
     @staticmethod
     def send_html_email(to, subject, html, attachments=None):
-        """Send an HTML email; optionally attach files.
+        """Queue an HTML email; optionally attach files.
 
         attachments: list of dicts with keys: filename, content_type, data(bytes)
         """
         try:
-            msg = Message(
-                subject=subject,
-                recipients=[to] if isinstance(to, str) else to,
-                sender=current_app.config['MAIL_DEFAULT_SENDER'],
-            )
-            msg.html = html
-
-            for att in attachments or []:
-                msg.attach(
-                    att['filename'],
-                    att.get('content_type', 'application/octet-stream'),
-                    att['data'],
-                )
-
-            mail.send(msg)
+            enqueue_email(to, subject, html=html, attachments=attachments)
             return True
         except Exception as e:
-            print(f"Error sending email: {e}")
+            print(f"Error queueing email: {e}")
             return False
     
     @staticmethod
@@ -194,36 +197,63 @@ class EmailService:
     
     @staticmethod
     def send_bulk_payment_reminders():
-        """Send payment reminders to all overdue orders"""
+        """Queue payment reminders for all overdue orders"""
+        if not current_app.config.get('SEND_PAYMENT_REMINDERS'):
+            return 0
+        
+        today = datetime.now().date()
         reminder_days = current_app.config.get('PAYMENT_REMINDER_DAYS', 7)
-        cutoff_date = datetime.now().date() - timedelta(days=reminder_days)
+        cutoff_date = today - timedelta(days=reminder_days)
         
-        overdue_orders = Order.query.filter(
+        overdue_orders = Order.query.join(Order.distributor).options(
+            contains_eager(Order.distributor)
+        ).filter(
             Order.payment_status.in_(['pending', 'partial']),
-            Order.order_date <= cutoff_date
-        ).all()
+            Order.order_date <= cutoff_date,
+            Distributor.email.isnot(None),
+            Distributor.email != ''
+        )
+        
+        template = EmailService._template('payment_reminder')
+        company = EmailService._company_context()
         
         sent_count = 0
-        for order in overdue_orders:
-            if EmailService.send_payment_reminder(order.id):
-                sent_count += 1
+        for order in iter_keyset(overdue_orders):
+            html = template.render(
+                order=order,
+                outstanding=order.total_amount - order.paid_amount,
+                days_overdue=(today - order.order_date).days,
+                **company
+            )
+            enqueue_email(order.distributor.email, f'Payment Reminder - {order.order_number}', html=html)
+            sent_count += 1
         
         return sent_count
     
     @staticmethod
     def send_bulk_low_stock_alerts():
-        """Send low stock alerts for all products below reorder level"""
+        """Queue low stock alerts for all products below reorder level"""
+        if not current_app.config.get('SEND_LOW_STOCK_ALERTS'):
+            return 0
+        
         low_stock_items = db.session.query(
             Product, Inventory
-        ).join(Inventory).filter(
+        ).join(Inventory).options(
+            joinedload(Product.category)
+        ).filter(
             Inventory.current_stock < Inventory.reorder_level,
             Product.is_active == True
-        ).all()
+        )
+        
+        template = EmailService._template('low_stock_alert')
+        admin_email = current_app.config['COMPANY_EMAIL']
+        company_name = current_app.config['COMPANY_NAME']
         
         sent_count = 0
-        for product, inventory in low_stock_items:
-            if EmailService.send_low_stock_alert(product.id):
-                sent_count += 1
+        for product, inventory in iter_keyset(low_stock_items, key=Inventory.id):
+            html = template.render(product=product, inventory=inventory, company_name=company_name)
+            enqueue_email(admin_email, f'Low Stock Alert - {product.name}', html=html)
+            sent_count += 1
         
         return sent_count
     
@@ -0,0 +1,254 @@
+"""Streaming Excel exports.
+
+The `export_*_excel` routes used to load every row with `.all()`, build a full
+openpyxl workbook in memory and save it to a `BytesIO`, so a large ledger or order
+export held the whole result set and the whole workbook in the worker at once.
+
+`excel_response` takes a declarative list of `Column`s and a query, streams the rows
+with `yield_per`, writes them through an openpyxl write-only workbook into a temp
+file and sends that file back in chunks. Memory stays flat regardless of row count.
+
+Usage:
+
+    return excel_response(
+        Payment.query.options(selectinload(Payment.order)).order_by(Payment.payment_date.desc()),
+        [
+            Column('Payment #', 'payment_number', width=18),
+            Column('Date', lambda p: format_date(p.payment_date), width=12),
+            Column('Amount', 'amount', width=15, total=True),
+        ],
+        sheet_title='Payments',
+        filename=timestamped_filename('payments'),
+    )
+
+`rows` may be a query (streamed with `yield_per`) or any iterable, e.g. a generator
+that carries a running balance. Title/subtitle rows, a totals row for columns marked
+`total=True` and free-form footer rows are optional. Use `Styled` for one-off
+formatting in subtitle or footer rows.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Optional, Sequence, Union
+
+from flask import send_file
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+STREAM_CHUNK_SIZE = 1000
+
+HEADER_FILL = PatternFill(start_color="D00000", end_color="D00000", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="FFFFFF", size=12)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+TITLE_FONT = Font(bold=True, size=16, color="D00000")
+BOLD_FONT = Font(bold=True)
+TOTAL_FONT = Font(bold=True, color="D00000")
+CENTER = Alignment(horizontal="center")
+
+
+@dataclass(frozen=True)
+class Column:
+    """One exported column.
+
+    `value` is an attribute path on the row (`'order.distributor.business_name'`,
+    None-safe) or a callable taking the row.
+    """
+
+    header: str
+    value: Union[str, Callable[[Any], Any]]
+    width: Optional[float] = None
+    number_format: Optional[str] = None
+    total: bool = False
+
+    def extract(self, row: Any) -> Any:
+        if callable(self.value):
+            return self.value(row)
+        current = row
+        for part in self.value.split('.'):
+            if current is None:
+                return None
+            current = getattr(current, part)
+        return current
+
+
+@dataclass(frozen=True)
+class Styled:
+    """A cell value with formatting, for subtitle/footer rows."""
+
+    value: Any
+    font: Optional[Font] = None
+    alignment: Optional[Alignment] = None
+    number_format: Optional[str] = None
+
+
+def format_date(value: Optional[Union[date, datetime]], fmt: str = '%d-%m-%Y') -> str:
+    return value.strftime(fmt) if value else ''
+
+
+def timestamped_filename(prefix: str) -> str:
+    return f'{prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+
+
+def stream_rows(rows: Any, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterable[Any]:
+    """Iterate a query in `chunk_size` batches; other iterables pass through.
+
+    Collections must be loaded with `selectinload` (not `joinedload`), which works
+    per batch under `yield_per`.
+    """
+    if hasattr(rows, 'yield_per'):
+        return rows.yield_per(chunk_size)
+    return rows
+
+
+def _cell(ws, value: Any, *, font=None, fill=None, alignment=None, number_format=None):
+    if isinstance(value, Styled):
+        font = value.font or font
+        alignment = value.alignment or alignment
+        number_format = value.number_format or number_format
+        value = value.value
+    if font is None and fill is None and alignment is None and number_format is None:
+        return value
+    cell = WriteOnlyCell(ws, value=value)
+    if font is not None:
+        cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    if alignment is not None:
+        cell.alignment = alignment
+    if number_format is not None:
+        cell.number_format = number_format
+    return cell
+
+
+class _RowCounter:
+    """Write-only sheets do not track their row count until saved; merges need it."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.rows = 0
+
+    def append(self, values) -> None:
+        self.ws.append(values)
+        self.rows += 1
+
+    def merged(self, value: Any, width: int, *, font=None) -> None:
+        self.append([_cell(self.ws, value, font=font, alignment=CENTER)])
+        if width > 1:
+            self.ws.merged_cells.add(f'A{self.rows}:{get_column_letter(width)}{self.rows}')
+
+
+def write_sheet(
+    ws,
+    rows: Any,
+    columns: Sequence[Column],
+    *,
+    title: Optional[str] = None,
+    subtitles: Sequence[Any] = (),
+    preamble: Sequence[Sequence[Any]] = (),
+    totals_label: str = 'TOTAL',
+    footer: Optional[Callable[[dict], Iterable[Sequence[Any]]]] = None,
+) -> int:
+    """Write one write-only worksheet. Returns the number of data rows.
+
+    Layout: title, subtitles (both merged across the columns), `preamble` rows, the
+    header, the data, then a totals row (if any column has `total=True`) and the rows
+    returned by `footer(totals)`, where `totals` maps header -> sum.
+    """
+    for index, column in enumerate(columns, start=1):
+        if column.width:
+            ws.column_dimensions[get_column_letter(index)].width = column.width
+
+    out = _RowCounter(ws)
+    width = len(columns)
+    if title:
+        out.merged(title, width, font=TITLE_FONT)
+    for subtitle in subtitles:
+        out.merged(subtitle, width)
+    for values in preamble:
+        out.append([_cell(ws, value) for value in values])
+
+    out.append([
+        _cell(ws, column.header, font=HEADER_FONT, fill=HEADER_FILL, alignment=HEADER_ALIGNMENT)
+        for column in columns
+    ])
+
+    totals = {column.header: 0 for column in columns if column.total}
+    count = 0
+    for row in stream_rows(rows):
+        values = []
+        for column in columns:
+            value = column.extract(row)
+            if isinstance(value, Decimal):
+                value = float(value)
+            if column.total and isinstance(value, (int, float)):
+                totals[column.header] += value
+            values.append(_cell(ws, value, number_format=column.number_format) if column.number_format else value)
+        out.append(values)
+        count += 1
+
+    if totals:
+        out.append([])
+        totals_row = []
+        for index, column in enumerate(columns):
+            if column.total:
+                totals_row.append(_cell(ws, totals[column.header], font=TOTAL_FONT, number_format=column.number_format))
+            elif index == 0:
+                totals_row.append(_cell(ws, totals_label, font=BOLD_FONT))
+            else:
+                totals_row.append(None)
+        out.append(totals_row)
+
+    if footer is not None:
+        for values in footer(totals):
+            out.append([_cell(ws, value) for value in values])
+
+    return count
+
+
+def excel_response(
+    rows: Any,
+    columns: Sequence[Column],
+    *,
+    filename: str,
+    sheet_title: str = 'Sheet',
+    **layout,
+):
+    """Stream `rows` into an .xlsx attachment. See `write_sheet` for `layout`."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    write_sheet(ws, rows, columns, **layout)
+    return workbook_response(wb, filename)
+
+
+class _TemporaryExport(io.FileIO):
+    """Read handle on a temp file that deletes the file once the response closes it."""
+
+    def close(self) -> None:
+        super().close()
+        # Deleted after closing; Windows cannot delete an open file.
+        try:
+            os.unlink(self.name)
+        except OSError:
+            pass
+
+
+def workbook_response(wb: Workbook, filename: str):
+    """Save a (write-only) workbook to a temp file and stream it, deleting it afterwards."""
+    fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='export_')
+    os.close(fd)
+    try:
+        wb.save(path)
+        handle = _TemporaryExport(path, 'rb')
+    except Exception:
+        os.unlink(path)
+        raise
+    return send_file(handle, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=filename)
@@ -0,0 +1,201 @@
+"""Financial statement data shared by the view, Excel, print and email endpoints.
+
+Each function computes one statement for its parameters and is cached per ledger
+version (see `report_cache`), so opening a report and then exporting, printing or
+emailing it computes it once. Results hold plain values and detached account copies
+only; treat them as read-only.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import func
+
+from app import db
+from app.models.accounting import Account, AccountingEntry, Expense
+from app.models.distributor import Distributor
+from app.models.order import Order
+from app.models.payment import Payment
+from app.services.account_balances import period_movements, signed_balances_before, subtree_signed_balances_as_of
+from app.services.account_registry import detached_account
+from app.services.account_tree import account_depths
+from app.services.report_cache import cached_report
+
+
+@cached_report('trial_balance')
+def trial_balance_data(start_date: date, end_date: date) -> dict:
+    """Opening, period movement and closing balance per active account."""
+    accounts = Account.query.filter_by(is_active=True).order_by(Account.root_type, Account.name).all()
+
+    # Opening balances from all entries before start_date
+    opening_signed_map = {k: float(v) for k, v in signed_balances_before(start_date).items()}
+
+    # Period movement within range
+    movements = period_movements(start_date, end_date)
+    debit_map = {k: float(d) for k, (d, c) in movements.items()}
+    credit_map = {k: float(c) for k, (d, c) in movements.items()}
+
+    rows = []
+    total_debit = 0.0
+    total_credit = 0.0
+    for account in accounts:
+        opening = float(opening_signed_map.get(account.id, 0.0))
+        debits = debit_map.get(account.id, 0.0)
+        credits = credit_map.get(account.id, 0.0)
+        closing = opening + debits - credits
+
+        debit_balance = closing if closing >= 0 else 0.0
+        credit_balance = abs(closing) if closing < 0 else 0.0
+
+        total_debit += debit_balance
+        total_credit += credit_balance
+
+        rows.append({
+            'account': detached_account(account),
+            'opening': opening,
+            'debit': debits,
+            'credit': credits,
+            'closing': closing,
+            'debit_balance': debit_balance,
+            'credit_balance': credit_balance,
+        })
+
+    return {'rows': rows, 'total_debit': total_debit, 'total_credit': total_credit}
+
+
+def _head_totals(root_type: str, start_date: date, end_date: date, amount) -> list:
+    return db.session.query(
+        AccountingEntry.account_head,
+        func.sum(amount).label('amount'),
+    ).join(Account, AccountingEntry.account_id == Account.id).filter(
+        Account.root_type == root_type,
+        AccountingEntry.entry_date >= start_date,
+        AccountingEntry.entry_date <= end_date,
+    ).group_by(AccountingEntry.account_head).all()
+
+
+@cached_report('profit_loss')
+def profit_loss_data(start_date: date, end_date: date) -> dict:
+    """Income and expense totals per account head for the period."""
+    income_entries = _head_totals('Income', start_date, end_date, AccountingEntry.credit - AccountingEntry.debit)
+    expense_entries = _head_totals('Expense', start_date, end_date, AccountingEntry.debit - AccountingEntry.credit)
+    total_income = sum(entry.amount for entry in income_entries)
+    total_expenses = sum(entry.amount for entry in expense_entries)
+    return {
+        'income_entries': income_entries,
+        'expense_entries': expense_entries,
+        'total_income': total_income,
+        'total_expenses': total_expenses,
+        'net_profit': total_income - total_expenses,
+    }
+
+
+@cached_report('balance_sheet')
+def balance_sheet_data(as_on_date: date) -> dict:
+    """Balance sheet sections as on a date.
+
+    Each root type is one nested-set aggregate over the daily rollup, so group accounts
+    carry their subtree subtotal; section totals add up the top-level accounts only.
+    The chart must already be numbered (see `account_tree.rebuild_account_tree`).
+    """
+    data = {}
+    for key, root_type, sign in (
+        ('assets', 'Asset', Decimal('1')),
+        ('liabilities', 'Liability', Decimal('-1')),
+        ('equity', 'Equity', Decimal('-1')),
+    ):
+        accounts = Account.query.filter_by(
+            root_type=root_type,
+            is_active=True
+        ).order_by(Account.lft, Account.name).all()
+        subtree_map = subtree_signed_balances_as_of(root_type, as_on_date)
+        depths = account_depths(accounts)
+        active_ids = {account.id for account in accounts}
+
+        items = []
+        total = Decimal('0')
+        for account in accounts:
+            balance = sign * subtree_map.get(account.id, Decimal('0'))
+            items.append({
+                'account': detached_account(account),
+                'balance': balance,
+                'depth': depths.get(account.id, 0),
+                'is_group': bool(account.is_group),
+            })
+            if account.parent_account_id not in active_ids:
+                total += balance
+
+        data[key] = items
+        data[f'total_{key}'] = total
+    return data
+
+
+@dataclass(frozen=True)
+class CashReceipt:
+    payment_number: str
+    payment_date: date
+    payment_mode: Optional[str]
+    amount: float
+    customer: Optional[str]
+
+
+@dataclass(frozen=True)
+class CashPayment:
+    expense_number: str
+    expense_date: date
+    payment_mode: Optional[str]
+    total_amount: Decimal
+    description: Optional[str]
+    vendor_name: Optional[str]
+    account_name: Optional[str]
+
+
+@cached_report('cash_flow')
+def cash_flow_data(start_date: date, end_date: date) -> dict:
+    """Cleared customer receipts and paid expenses in the period, names joined in."""
+    # Cash Inflows (Payments received)
+    receipts = db.session.query(
+        Payment.payment_number,
+        Payment.payment_date,
+        Payment.payment_mode,
+        Payment.amount,
+        Distributor.business_name,
+    ).outerjoin(Order, Payment.order_id == Order.id).outerjoin(
+        Distributor, Order.distributor_id == Distributor.id
+    ).filter(
+        Payment.payment_date >= start_date,
+        Payment.payment_date <= end_date,
+        Payment.status == 'cleared'
+    ).order_by(Payment.payment_date, Payment.id).all()
+    cash_inflows = [CashReceipt(*row) for row in receipts]
+
+    # Cash Outflows (Expenses)
+    expenses = db.session.query(
+        Expense.expense_number,
+        Expense.expense_date,
+        Expense.payment_mode,
+        Expense.total_amount,
+        Expense.description,
+        Expense.vendor_name,
+        Account.name,
+    ).outerjoin(Account, Expense.account_id == Account.id).filter(
+        Expense.expense_date >= start_date,
+        Expense.expense_date <= end_date,
+        Expense.payment_status == 'paid'
+    ).order_by(Expense.expense_date, Expense.id).all()
+    cash_outflows = [CashPayment(*row) for row in expenses]
+
+    total_inflow = float(sum(p.amount or 0 for p in cash_inflows))
+    total_outflow = float(sum(e.total_amount or 0 for e in cash_outflows))
+    return {
+        'cash_inflows': cash_inflows,
+        'cash_outflows': cash_outflows,
+        'total_inflow': total_inflow,
+        'total_outflow': total_outflow,
+        # Net Cash Flow
+        'net_cash_flow': total_inflow - total_outflow,
+    }
@@ -0,0 +1,84 @@
+"""Fiscal-year close and reopen.
+
+`close_fiscal_year` freezes every account's cumulative signed balance at the year end
+into `account_balance_snapshots` and marks the year closed, which locks postings dated
+in it (see `fiscal_periods`). The snapshot is computed from the previous year's
+snapshot plus that year's rollup days, so closing a year only reads one year of data.
+
+Years are closed in order and reopened in reverse order, so the snapshots always form
+an unbroken chain from the first closed year to the last.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert
+
+from app import db
+from app.models.accounting import AccountBalanceSnapshot, FiscalYear
+from app.services.account_balances import signed_balances_as_of, to_money
+from app.services.fiscal_periods import invalidate_fiscal_periods, locked_through
+
+
+def close_fiscal_year(fiscal_year: FiscalYear, *, closed_by: Optional[int] = None) -> int:
+    """Snapshot balances at `fiscal_year.end_date` and lock the year.
+
+    Every earlier fiscal year must already be closed. Returns the number of snapshot
+    rows written (accounts with a zero balance are left out). Does not commit.
+    """
+    if fiscal_year.is_closed:
+        raise ValueError(f'{fiscal_year.name} is already closed.')
+
+    earlier_open = FiscalYear.query.filter(
+        FiscalYear.start_date < fiscal_year.start_date,
+        FiscalYear.is_closed.is_(False),
+    ).order_by(FiscalYear.start_date).first()
+    if earlier_open is not None:
+        raise ValueError(f'Close {earlier_open.name} before {fiscal_year.name}.')
+
+    locked = locked_through()
+    if locked is not None and fiscal_year.start_date <= locked:
+        raise ValueError(f'{fiscal_year.name} overlaps a closed fiscal year.')
+
+    balances = signed_balances_as_of(fiscal_year.end_date)
+    rows = [
+        {
+            'fiscal_year_id': fiscal_year.id,
+            'account_id': account_id,
+            'as_of': fiscal_year.end_date,
+            'balance': to_money(balance),
+        }
+        for account_id, balance in sorted(balances.items())
+        if account_id is not None and to_money(balance)
+    ]
+    if rows:
+        db.session.execute(insert(AccountBalanceSnapshot.__table__), rows)
+
+    fiscal_year.is_closed = True
+    fiscal_year.closed_at = datetime.utcnow()
+    fiscal_year.closed_by = closed_by
+    db.session.flush()
+    invalidate_fiscal_periods()
+    return len(rows)
+
+
+def reopen_fiscal_year(fiscal_year: FiscalYear) -> None:
+    """Unlock the latest closed fiscal year and drop its snapshot. Does not commit."""
+    if not fiscal_year.is_closed:
+        raise ValueError(f'{fiscal_year.name} is not closed.')
+
+    later_closed = FiscalYear.query.filter(
+        FiscalYear.start_date > fiscal_year.start_date,
+        FiscalYear.is_closed.is_(True),
+    ).order_by(FiscalYear.start_date.desc()).first()
+    if later_closed is not None:
+        raise ValueError(f'Reopen {later_closed.name} before {fiscal_year.name}.')
+
+    AccountBalanceSnapshot.query.filter_by(fiscal_year_id=fiscal_year.id).delete(synchronize_session=False)
+    fiscal_year.is_closed = False
+    fiscal_year.closed_at = None
+    fiscal_year.closed_by = None
+    db.session.flush()
+    invalidate_fiscal_periods()
@@ -0,0 +1,120 @@
+"""Closed fiscal periods: the posting lock and the balance snapshot lookup.
+
+Closing a fiscal year (see `fiscal_close`) freezes every account's balance at the
+year end into `account_balance_snapshots` and marks the year `is_closed`. From then on:
+
+- postings dated on or before the last closed year end are rejected with
+  `PeriodLockedError` (`ensure_period_open`, called by `accounting_utils`);
+- balance queries start from the latest snapshot before their date and only add the
+  rollup days after it (`latest_snapshot`, used by `account_balances`).
+
+The closed years are cached per process and tagged with the `fiscal_periods` version
+stamp, so the lookups cost no SQL on a hit. Closing or reopening a year bumps it.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+
+from app.models.accounting import FiscalYear
+from app.services.cache_versions import bump_version, get_version, on_bump
+
+VERSION_KEY = 'fiscal_periods'
+
+
+class PeriodLockedError(ValueError):
+    """A posting or deletion touches a closed fiscal year."""
+
+
+@dataclass(frozen=True)
+class ClosedPeriod:
+    fiscal_year_id: int
+    name: str
+    start_date: date
+    end_date: date
+
+
+class _ClosedPeriods:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._periods: tuple[ClosedPeriod, ...] = ()
+
+    def get(self) -> tuple[ClosedPeriod, ...]:
+        version = get_version(VERSION_KEY)
+        with self._lock:
+            if self._version == version:
+                return self._periods
+
+        rows = (
+            FiscalYear.query.filter(FiscalYear.is_closed.is_(True))
+            .order_by(FiscalYear.end_date)
+            .with_entities(FiscalYear.id, FiscalYear.name, FiscalYear.start_date, FiscalYear.end_date)
+            .all()
+        )
+        periods = tuple(ClosedPeriod(*row) for row in rows)
+        with self._lock:
+            self._periods = periods
+            self._version = version
+        return periods
+
+    def clear(self) -> None:
+        with self._lock:
+            self._periods = ()
+            self._version = None
+
+
+_closed = _ClosedPeriods()
+
+
+def closed_periods() -> tuple[ClosedPeriod, ...]:
+    """Closed fiscal years, oldest first."""
+    return _closed.get()
+
+
+def locked_through() -> Optional[date]:
+    """Last day of the latest closed fiscal year, or None when nothing is closed."""
+    periods = closed_periods()
+    return periods[-1].end_date if periods else None
+
+
+def ensure_period_open(entry_date: Optional[date]) -> None:
+    """Raise `PeriodLockedError` if `entry_date` falls in a closed fiscal year."""
+    if entry_date is None:
+        return
+    if isinstance(entry_date, datetime):
+        entry_date = entry_date.date()
+    periods = closed_periods()
+    if not periods or entry_date > periods[-1].end_date:
+        return
+    for period in reversed(periods):
+        if period.start_date <= entry_date <= period.end_date:
+            raise PeriodLockedError(
+                f'{entry_date:%d-%m-%Y} falls in closed fiscal year {period.name}; reopen it to post there.'
+            )
+    raise PeriodLockedError(
+        f'{entry_date:%d-%m-%Y} is on or before the last closed year end ({periods[-1].end_date:%d-%m-%Y}).'
+    )
+
+
+def latest_snapshot(*, before: Optional[date] = None, as_of: Optional[date] = None) -> Optional[ClosedPeriod]:
+    """Latest closed year whose snapshot covers only days strictly before `before` /
+    on or before `as_of` (the latest one overall when neither is given)."""
+    for period in reversed(closed_periods()):
+        if before is not None and period.end_date >= before:
+            continue
+        if as_of is not None and period.end_date > as_of:
+            continue
+        return period
+    return None
+
+
+def invalidate_fiscal_periods() -> None:
+    """Drop cached closed periods in every process (in the caller's transaction)."""
+    bump_version(VERSION_KEY)
+
+
+on_bump(VERSION_KEY, _closed.clear)
@@ -0,0 +1,191 @@
+"""Background invoice exports for the web UI.
+
+Rendering a date range of invoices takes far longer than a request may run, so the
+orders page creates an `InvoiceExportJob` and `start_export_job` runs
+`invoice_pdf.export_invoices` in a background thread of the web process; that call
+starts its own render process pool for the job and shuts it down at the end. The
+ZIP/PDF is written to `INVOICE_EXPORT_DIR`; the job page polls `export_progress` and
+links the download once the job completes. Files older than
+`INVOICE_EXPORT_RETENTION_HOURS` are deleted when the next job is created.
+
+A deploy or worker restart kills the thread mid-export. The job's `heartbeat_at`
+moves with every rendered chunk, and `fail_stale_exports` marks a job that has made
+no progress for `INVOICE_EXPORT_STALE_SECONDS` as failed, so the page stops polling
+and the export can be started again.
+
+`flask invoices export` remains the way to export ranges above `INVOICE_EXPORT_MAX`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from flask import current_app
+
+from app import db
+from app.models.order import InvoiceExportJob
+from app.services.invoice_pdf import FORMATS, export_invoices, invoice_order_ids
+
+logger = logging.getLogger(__name__)
+
+
+def export_dir() -> Path:
+    path = Path(current_app.config.get('INVOICE_EXPORT_DIR')
+                or os.path.join(current_app.instance_path, 'invoice_exports'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _is_stale(job: InvoiceExportJob, cutoff: datetime) -> bool:
+    return job.status in ('pending', 'running') and (job.heartbeat_at or job.started_at or job.created_at) < cutoff
+
+
+def fail_stale_exports(jobs: Optional[list[InvoiceExportJob]] = None) -> int:
+    """Mark pending/running exports with no progress for `INVOICE_EXPORT_STALE_SECONDS` as failed.
+
+    Checks `jobs`, or every unfinished job. Commits if any changed; returns how many did.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=current_app.config.get('INVOICE_EXPORT_STALE_SECONDS', 600))
+    if jobs is None:
+        jobs = InvoiceExportJob.query.filter(InvoiceExportJob.status.in_(('pending', 'running'))).all()
+    stale = [job for job in jobs if _is_stale(job, cutoff)]
+    for job in stale:
+        logger.warning('Invoice export job %s was interrupted', job.id)
+        job.status = 'failed'
+        job.error = 'Interrupted (the export stopped making progress); start the export again.'
+        job.finished_at = now
+        (export_dir() / f'invoice-export-{job.id}.{job.format}').unlink(missing_ok=True)
+    if stale:
+        db.session.commit()
+    return len(stale)
+
+
+def prune_exports(max_age_hours: Optional[float] = None) -> int:
+    """Fail interrupted exports and delete export files of jobs finished more than
+    `max_age_hours` ago. Commits; returns the number of files deleted."""
+    fail_stale_exports()
+    if max_age_hours is None:
+        max_age_hours = current_app.config.get('INVOICE_EXPORT_RETENTION_HOURS', 24)
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+    jobs = InvoiceExportJob.query.filter(
+        InvoiceExportJob.file_path.isnot(None), InvoiceExportJob.finished_at < cutoff,
+    ).all()
+    for job in jobs:
+        try:
+            os.remove(job.file_path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.exception('Could not delete invoice export %s', job.file_path)
+            continue
+        job.file_path = None
+    db.session.commit()
+    return len(jobs)
+
+
+def create_export_job(start: date, end: date, fmt: str = 'zip',
+                      created_by: Optional[int] = None) -> InvoiceExportJob:
+    """Create a pending export of the invoices dated in [start, end]. Commits.
+
+    Raises ValueError for an unknown format.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown invoice export format: {fmt}')
+    prune_exports()
+    job = InvoiceExportJob(
+        start_date=start,
+        end_date=end,
+        format=fmt,
+        status='pending',
+        invoices_total=len(invoice_order_ids(start, end)),
+        invoices_done=0,
+        created_by=created_by,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def run_export_job(job_id: int) -> InvoiceExportJob:
+    """Render the job's invoices to its export file. Blocking."""
+    job = db.session.get(InvoiceExportJob, job_id)
+    job.status = 'running'
+    job.invoices_done = 0
+    job.started_at = job.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+    path = export_dir() / f'invoice-export-{job.id}.{job.format}'
+
+    def progress(handled: int) -> None:
+        job.invoices_done = (job.invoices_done or 0) + handled
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+    try:
+        with open(path, 'wb') as output:
+            export = export_invoices(job.start_date, job.end_date, job.format, output=output, progress=progress)
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Invoice export job %s failed', job_id)
+        path.unlink(missing_ok=True)
+        job = db.session.get(InvoiceExportJob, job_id)
+        job.status = 'failed'
+        job.error = str(e) or e.__class__.__name__
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return job
+
+    job = db.session.get(InvoiceExportJob, job_id)
+    job.invoices_done = export.rendered + len(export.failed)
+    job.failed = '\n'.join(export.failed) or None
+    job.filename = export.filename
+    if export.rendered:
+        job.status = 'completed'
+        job.file_path = str(path)
+    else:
+        path.unlink(missing_ok=True)
+        job.status = 'failed'
+        job.error = 'No invoice could be rendered.' if export.failed else 'No invoices in that date range.'
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def start_export_job(job_id: int) -> threading.Thread:
+    """Run `run_export_job` in a background thread of this process."""
+    app = current_app._get_current_object()
+
+    def _target():
+        with app.app_context():
+            try:
+                run_export_job(job_id)
+            except Exception:
+                logger.exception('Invoice export job %s failed', job_id)
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=_target, name=f'invoice-export-{job_id}', daemon=True)
+    thread.start()
+    return thread
+
+
+def export_progress(job: InvoiceExportJob) -> dict:
+    """Progress snapshot for the job page (JSON-serialisable)."""
+    fail_stale_exports([job])
+    total = job.invoices_total or 0
+    done = job.invoices_done or 0
+    return {
+        'id': job.id,
+        'status': job.status,
+        'invoices_total': total,
+        'invoices_done': done,
+        'percent': round(100.0 * done / total, 1) if total else (100.0 if job.status == 'completed' else 0.0),
+        'failed': job.failed.splitlines() if job.failed else [],
+        'error': job.error,
+        'download': bool(job.status == 'completed' and job.file_path),
+    }
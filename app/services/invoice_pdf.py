@@ -0,0 +1,232 @@
+"""Server-side tax invoice PDFs (WeasyPrint) and date-range invoice exports.
+
+`render_invoice_pdf(order)` renders `orders/invoice_pdf.html`, the same markup as the
+browser invoice (`orders/_invoice_body.html`), straight to PDF. What is the same for
+every invoice is prepared once per process and reused for each document: the parsed
+invoice stylesheet (`orders/_invoice_styles.css`), the font configuration and the
+image cache (the logo is decoded once). Jinja keeps the compiled template.
+
+`export_invoices(start, end)` renders every invoice dated in the range (drafts and
+cancelled orders excluded) and returns one ZIP (a PDF per invoice) or one merged PDF
+in a spooled temporary file. Orders are rendered in chunks of `INVOICE_PDF_CHUNK`
+across a process pool of `INVOICE_PDF_WORKERS` (each worker has its own app and DB
+connection, like the ledger rebuild); chunk results are written out in order as they
+arrive. An invoice that fails to render is left out and reported in `failed`.
+The web UI runs exports as background jobs (services/invoice_export_jobs.py);
+`flask invoices export` runs them in the foreground for any size of range.
+
+WeasyPrint needs Pango at runtime; where it is missing, `ensure_available()` raises
+OSError/ImportError.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import tempfile
+import threading
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from io import BytesIO
+from pathlib import Path
+from typing import IO, Callable, Optional
+
+from flask import current_app
+from sqlalchemy.orm import joinedload, selectinload
+
+from app import db
+from app.models.order import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+INVOICE_TEMPLATE = 'orders/invoice_pdf.html'
+STYLESHEET_TEMPLATE = 'orders/_invoice_styles.css'
+FORMATS = ('zip', 'pdf')
+UNINVOICED_STATUSES = ('draft', 'cancelled')
+
+# Exports larger than this spill from memory to a temporary file.
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def ensure_available() -> None:
+    """Raise ImportError/OSError if WeasyPrint (or its Pango libraries) can't be loaded."""
+    import weasyprint  # noqa: F401  # type: ignore
+
+
+def _shared_resources():
+    """(stylesheets, font config, image cache) shared by every invoice this process renders."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            from weasyprint import CSS  # type: ignore
+            from weasyprint.text.fonts import FontConfiguration  # type: ignore
+
+            font_config = FontConfiguration()
+            css = current_app.jinja_env.get_template(STYLESHEET_TEMPLATE).render()
+            _shared = ([CSS(string=css, font_config=font_config)], font_config, {})
+        return _shared
+
+
+def _logo_src() -> str:
+    logo = Path(current_app.static_folder, 'logo.png')
+    return logo.as_uri() if logo.exists() else ''
+
+
+def invoice_filename(order: Order) -> str:
+    return f'Invoice_{order.order_number}.pdf'
+
+
+def render_invoice_pdf(order: Order, items: Optional[list[OrderItem]] = None) -> bytes:
+    """PDF of `order`'s tax invoice. No request context needed.
+
+    `items` (with products loaded) saves the per-order item queries in batch runs.
+    """
+    from weasyprint import HTML  # type: ignore
+
+    stylesheets, font_config, image_cache = _shared_resources()
+    context = {'order': order, 'logo_src': _logo_src()}
+    if items is not None:
+        context['items'] = items
+    html = current_app.jinja_env.get_template(INVOICE_TEMPLATE).render(**context)
+    return HTML(string=html, base_url=current_app.static_folder).write_pdf(
+        stylesheets=stylesheets, font_config=font_config, cache=image_cache,
+    )
+
+
+def invoice_order_ids(start: date, end: date) -> list[int]:
+    """Invoiced orders dated in [start, end], in invoice order."""
+    return list(db.session.execute(
+        db.select(Order.id)
+        .where(Order.order_date.between(start, end), Order.status.notin_(UNINVOICED_STATUSES))
+        .order_by(Order.order_date, Order.order_number)
+    ).scalars())
+
+
+def render_invoices(order_ids: list[int]) -> list[tuple[str, Optional[bytes], Optional[str]]]:
+    """(filename, pdf, error) per order, loading the orders, items and products in three queries."""
+    orders = {
+        order.id: order
+        for order in Order.query.options(joinedload(Order.distributor), selectinload(Order.payments))
+        .filter(Order.id.in_(order_ids))
+    }
+    items = defaultdict(list)
+    for item in (OrderItem.query.options(joinedload(OrderItem.product))
+                 .filter(OrderItem.order_id.in_(order_ids)).order_by(OrderItem.id)):
+        items[item.order_id].append(item)
+
+    results = []
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        if order is None:
+            continue
+        try:
+            results.append((invoice_filename(order), render_invoice_pdf(order, items[order_id]), None))
+        except Exception as e:
+            logger.warning('Invoice PDF for %s failed: %s', order.order_number, e)
+            results.append((invoice_filename(order), None, str(e) or e.__class__.__name__))
+    return results
+
+
+_worker_app = None
+
+
+def _init_worker(config_overrides: dict) -> None:
+    from app import create_app
+    from config import Config
+
+    global _worker_app
+    worker_config = type('InvoicePdfWorkerConfig', (Config,), config_overrides)
+    _worker_app = create_app(worker_config)
+
+
+def _render_in_worker(order_ids: list[int]):
+    with _worker_app.app_context():
+        try:
+            return render_invoices(order_ids)
+        finally:
+            db.session.remove()
+
+
+@dataclass
+class InvoiceExport:
+    file: IO[bytes]
+    filename: str
+    mimetype: str
+    rendered: int = 0
+    failed: list[str] = field(default_factory=list)  # "Invoice_ORD...pdf: error"
+
+
+def export_invoices(start: date, end: date, fmt: str = 'zip', workers: Optional[int] = None,
+                    chunk_size: Optional[int] = None, output: Optional[IO[bytes]] = None,
+                    progress: Optional[Callable[[int], None]] = None) -> InvoiceExport:
+    """All invoices dated in [start, end] as one ZIP or merged PDF (file positioned at the start).
+
+    Written to `output` if given (a seekable binary file), else to a spooled temporary
+    file. `progress(n)` is called after each chunk with the number of invoices handled.
+    Raises ValueError for an unknown format and ImportError/OSError without WeasyPrint.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown invoice export format: {fmt}')
+    ensure_available()
+
+    config = current_app.config
+    workers = workers or config.get('INVOICE_PDF_WORKERS', 1)
+    chunk_size = max(chunk_size or config.get('INVOICE_PDF_CHUNK', 25), 1)
+    order_ids = invoice_order_ids(start, end)
+    chunks = [order_ids[i:i + chunk_size] for i in range(0, len(order_ids), chunk_size)]
+    workers = min(workers, len(chunks))
+    if db.engine.url.get_backend_name() == 'sqlite' and db.engine.url.database in (None, '', ':memory:'):
+        workers = 1  # workers can't see an in-memory database
+
+    stem = f'Invoices_{start.strftime("%Y%m%d")}_{end.strftime("%Y%m%d")}'
+    if output is None:
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    if fmt == 'zip':
+        export = InvoiceExport(output, f'{stem}.zip', 'application/zip')
+        archive = zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED)
+    else:
+        from pypdf import PdfWriter
+
+        export = InvoiceExport(output, f'{stem}.pdf', 'application/pdf')
+        writer = PdfWriter()
+
+    def collect(results):
+        for filename, pdf, error in results:
+            if pdf is None:
+                export.failed.append(f'{filename}: {error}')
+            elif fmt == 'zip':
+                archive.writestr(filename, pdf)
+            else:
+                writer.append(BytesIO(pdf))
+            export.rendered += pdf is not None
+        if progress is not None:
+            progress(len(results))
+
+    if workers <= 1:
+        for chunk in chunks:
+            collect(render_invoices(chunk))
+    else:
+        overrides = {'SQLALCHEMY_DATABASE_URI': config['SQLALCHEMY_DATABASE_URI']}
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(overrides,),
+        ) as pool:
+            for results in pool.map(_render_in_worker, chunks):
+                collect(results)
+
+    if fmt == 'zip':
+        if export.failed:
+            archive.writestr('FAILED.txt', '\n'.join(export.failed) + '\n')
+        archive.close()
+    else:
+        writer.write(output)
+    output.seek(0)
+    return export
@@ -0,0 +1,134 @@
+"""Precomputed KPIs for the main dashboard.
+
+The dashboard is every user's landing page and used to run seven aggregates per load.
+They now live in one `kpi_snapshots` row:
+
+- `compute_kpis()` gets all of them in one statement, one aggregate per table
+  (distributors, products, orders, payments) cross-joined into a single row;
+- the row records when it was computed and the `dashboard_kpis` version it reflects.
+  That version is bumped by every committed write to orders, payments, distributors
+  or products (see `cache_versions.bump_on_write`);
+- `dashboard_kpis()` reads the row and the current version in one lookup and only
+  recomputes when either changed data or `KPI_SNAPSHOT_MAX_AGE` (the 30-day sales
+  window moves with the clock) make it stale.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import case, func, select, true
+
+from app import db
+from app.models.distributor import Distributor
+from app.models.order import Order
+from app.models.payment import Payment
+from app.models.product import Product
+from app.models.settings import CacheVersion, KpiSnapshot
+from app.services.cache_versions import bump_on_write, get_version
+
+VERSION_KEY = 'dashboard_kpis'
+SNAPSHOT_KEY = 'dashboard'
+DEFAULT_MAX_AGE = 300
+
+KPI_FIELDS = (
+    'total_distributors', 'total_products', 'pending_orders',
+    'sales_last_30d', 'total_receivable', 'total_collected', 'avg_satisfaction',
+)
+
+bump_on_write(VERSION_KEY, Order, Payment, Distributor, Product)
+
+
+def compute_kpis(today: Optional[date] = None) -> dict:
+    """All dashboard KPIs from one statement."""
+    since = (today or date.today()) - timedelta(days=30)
+
+    distributors = select(
+        func.count(Distributor.id).label('total_distributors'),
+        func.avg(Distributor.customer_satisfaction_score).label('avg_satisfaction'),
+    ).where(Distributor.status == 'active').subquery()
+
+    products = select(
+        func.count(Product.id).label('total_products'),
+    ).where(Product.is_active.is_(True)).subquery()
+
+    orders = select(
+        func.count(case((Order.status == 'confirmed', Order.id))).label('pending_orders'),
+        func.sum(case((
+            (Order.order_date >= since) & Order.status.in_(['confirmed', 'delivered', 'completed']),
+            Order.total_amount,
+        ))).label('sales_last_30d'),
+        func.sum(case((
+            Order.payment_status.in_(['pending', 'partial']),
+            Order.total_amount - Order.paid_amount,
+        ))).label('total_receivable'),
+    ).subquery()
+
+    payments = select(
+        func.sum(Payment.amount).label('total_collected'),
+    ).where(Payment.status == 'cleared').subquery()
+
+    # Each aggregate is a single row, so the joins just put them side by side.
+    row = db.session.execute(
+        select(distributors, products, orders, payments)
+        .select_from(distributors)
+        .join(products, true())
+        .join(orders, true())
+        .join(payments, true())
+    ).mappings().one()
+    return {name: row[name] or 0 for name in KPI_FIELDS}
+
+
+def refresh_kpi_snapshot(source_version: int, snapshot: Optional[KpiSnapshot] = None) -> KpiSnapshot:
+    """Recompute the dashboard snapshot in place. Does not commit."""
+    snapshot = snapshot or db.session.get(KpiSnapshot, SNAPSHOT_KEY) or KpiSnapshot(key=SNAPSHOT_KEY)
+    for name, value in compute_kpis().items():
+        setattr(snapshot, name, value)
+    snapshot.source_version = source_version
+    snapshot.computed_at = datetime.utcnow()
+    db.session.add(snapshot)
+    return snapshot
+
+
+def _is_stale(snapshot: Optional[KpiSnapshot], version: int) -> bool:
+    if snapshot is None or snapshot.computed_at is None or snapshot.source_version != version:
+        return True
+    max_age = current_app.config.get('KPI_SNAPSHOT_MAX_AGE', DEFAULT_MAX_AGE)
+    return datetime.utcnow() - snapshot.computed_at > timedelta(seconds=max_age)
+
+
+def dashboard_kpis() -> KpiSnapshot:
+    """The dashboard snapshot, refreshed (and committed) first if stale."""
+    row = db.session.execute(
+        select(KpiSnapshot, func.coalesce(CacheVersion.version, 0))
+        .outerjoin(CacheVersion, CacheVersion.key == VERSION_KEY)
+        .where(KpiSnapshot.key == SNAPSHOT_KEY)
+    ).first()
+    snapshot, version = row if row else (None, get_version(VERSION_KEY))
+    if not _is_stale(snapshot, version):
+        return snapshot
+
+    # Tag with the version read before computing: a write committed meanwhile makes
+    # the next load recompute instead of being missed.
+    snapshot = refresh_kpi_snapshot(version, snapshot)
+    try:
+        db.session.commit()
+    except Exception:
+        # Another worker stored its refresh first; show ours, keep theirs.
+        db.session.rollback()
+        current_app.logger.warning('KPI snapshot refresh not stored', exc_info=True)
+    return snapshot
+
+
+def snapshot_age(snapshot: KpiSnapshot) -> str:
+    """Human-readable age of a snapshot, e.g. 'just now' or '4 min ago'."""
+    if snapshot.computed_at is None:
+        return 'never'
+    seconds = max(0, int((datetime.utcnow() - snapshot.computed_at).total_seconds()))
+    if seconds < 60:
+        return 'just now'
+    if seconds < 3600:
+        return f'{seconds // 60} min ago'
+    return f'{seconds // 3600} h ago'
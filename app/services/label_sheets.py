@@ -0,0 +1,224 @@
+"""A4 label sheets and multi-product print jobs.
+
+A print job is a list of `LabelRun`s (a label and how many copies), filled into
+consecutive cells of a `SheetLayout`. Each distinct label is rendered once
+(`BarcodeGenerator.product_label_png`) and embedded once per PDF as a form XObject;
+every cell is just a reference to it, instead of drawing the image again per cell.
+
+Large jobs are cut into chunks of `LABEL_PRINT_PAGES_PER_CHUNK` pages, rendered in
+a process pool (`LABEL_PRINT_WORKERS`) and merged with pypdf. Chunks only carry
+plain label fields (`LabelSpec`), so the workers need no app or database. The pool
+is started on the first large job and kept for the life of the process, as worker
+start-up costs about a second. If a worker dies (OOM kill, crash in reportlab/PIL)
+the broken pool is dropped and the job retried once on a fresh one, then rendered
+in-process.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import date
+from io import BytesIO
+from itertools import repeat
+from types import SimpleNamespace
+from typing import IO, Optional
+
+from pypdf import PdfWriter
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from app.utils.barcode_generator import BarcodeGenerator
+
+logger = logging.getLogger(__name__)
+
+# Merged PDFs larger than this spill from memory to a temporary file.
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class LabelSpec:
+    """Everything printed on one label; plain values, so it can go to a worker process."""
+    name: str
+    mrp: float
+    pack_size: Optional[str] = None
+    ean_barcode: Optional[str] = None
+    batch_number: Optional[str] = None
+    manufacturing_date: Optional[date] = None
+    expiry_date: Optional[date] = None
+
+    @classmethod
+    def for_product(cls, product, batch=None) -> 'LabelSpec':
+        return cls(
+            name=product.name,
+            mrp=product.mrp,
+            pack_size=product.pack_size,
+            ean_barcode=product.ean_barcode,
+            batch_number=batch.batch_number if batch else None,
+            manufacturing_date=batch.manufacturing_date if batch else None,
+            expiry_date=batch.expiry_date if batch else None,
+        )
+
+    def render_png(self, label_size: tuple[int, int]) -> bytes:
+        product = SimpleNamespace(name=self.name, mrp=self.mrp, pack_size=self.pack_size, ean_barcode=self.ean_barcode)
+        batch = None
+        if self.batch_number:
+            batch = SimpleNamespace(batch_number=self.batch_number, manufacturing_date=self.manufacturing_date,
+                                    expiry_date=self.expiry_date)
+        return BarcodeGenerator.product_label_png(product, batch, label_size)
+
+
+@dataclass(frozen=True)
+class LabelRun:
+    spec: LabelSpec
+    count: int
+
+
+@dataclass(frozen=True)
+class SheetLayout:
+    """Label grid on a page (defaults: 40 x 25 mm labels on A4, 10 mm margins)."""
+    page_size: tuple[float, float] = A4
+    label_width: float = 40 * mm
+    label_height: float = 25 * mm
+    margin_x: float = 10 * mm
+    margin_y: float = 10 * mm
+    pixels_per_point: float = 2.83  # label image resolution
+
+    @property
+    def per_row(self) -> int:
+        return int((self.page_size[0] - 2 * self.margin_x) / self.label_width)
+
+    @property
+    def per_col(self) -> int:
+        return int((self.page_size[1] - 2 * self.margin_y) / self.label_height)
+
+    @property
+    def per_page(self) -> int:
+        return self.per_row * self.per_col
+
+    @property
+    def label_pixels(self) -> tuple[int, int]:
+        return int(self.label_width * self.pixels_per_point), int(self.label_height * self.pixels_per_point)
+
+    def position(self, cell: int) -> tuple[float, float]:
+        """Bottom-left corner of `cell` (0-based, row by row from the top left)."""
+        row, col = divmod(cell, self.per_row)
+        return (self.margin_x + col * self.label_width,
+                self.page_size[1] - self.margin_y - (row + 1) * self.label_height)
+
+    def pages_for(self, labels: int) -> int:
+        return -(-labels // self.per_page)
+
+
+DEFAULT_LAYOUT = SheetLayout()
+
+
+def _segments(runs: list[LabelRun], start: int, end: int) -> list[tuple[LabelSpec, int]]:
+    """(label, copies) pieces of the job covering label slots [start, end)."""
+    segments = []
+    offset = 0
+    for run in runs:
+        lo, hi = max(offset, start), min(offset + run.count, end)
+        if lo < hi:
+            segments.append((run.spec, hi - lo))
+        offset += run.count
+    return segments
+
+
+def render_sheets(runs: list[LabelRun], layout: SheetLayout = DEFAULT_LAYOUT,
+                  first_page: int = 0, pages: Optional[int] = None) -> bytes:
+    """PDF of pages [first_page, first_page + pages) of the job (all pages by default)."""
+    total = sum(run.count for run in runs)
+    if pages is None:
+        pages = layout.pages_for(total) - first_page
+    segments = _segments(runs, first_page * layout.per_page, (first_page + pages) * layout.per_page)
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=layout.page_size)
+
+    # Each distinct label once, as a form XObject; cells only reference it.
+    forms: dict[LabelSpec, str] = {}
+    for spec, _ in segments:
+        if spec not in forms:
+            forms[spec] = f'label{len(forms)}'
+            c.beginForm(forms[spec])
+            image = ImageReader(BytesIO(spec.render_png(layout.label_pixels)))
+            c.drawImage(image, 0, 0, width=layout.label_width, height=layout.label_height)
+            c.endForm()
+
+    cell = 0
+    for spec, copies in segments:
+        for _ in range(copies):
+            if cell == layout.per_page:
+                c.showPage()
+                cell = 0
+            x, y = layout.position(cell)
+            c.saveState()
+            c.translate(x, y)
+            c.doForm(forms[spec])
+            c.restoreState()
+            cell += 1
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Forget `pool` (if it is still the current one) so the next job starts a new pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_print_job(runs: list[LabelRun], layout: SheetLayout = DEFAULT_LAYOUT,
+                     workers: int = 1, pages_per_chunk: int = 25) -> IO[bytes]:
+    """The whole job as one PDF, returned as a binary file positioned at the start.
+
+    Jobs of more than one chunk are rendered in the process pool when `workers` > 1.
+    """
+    pages = layout.pages_for(sum(run.count for run in runs))
+    firsts = list(range(0, pages, max(pages_per_chunk, 1)))
+    if workers <= 1 or len(firsts) <= 1:
+        return BytesIO(render_sheets(runs, layout))
+
+    sizes = [min(pages_per_chunk, pages - first) for first in firsts]
+    for attempt in range(2):
+        pool = _get_pool(workers)
+        try:
+            parts = list(pool.map(render_sheets, repeat(runs), repeat(layout), firsts, sizes))
+            break
+        except BrokenProcessPool:
+            logger.warning('Label print pool broken (attempt %s); starting a new one', attempt + 1, exc_info=True)
+            _discard_pool(pool)
+    else:
+        logger.error('Label print pool failed twice; rendering %s pages in-process', pages)
+        return BytesIO(render_sheets(runs, layout))
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(BytesIO(part))
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    writer.write(output)
+    output.seek(0)
+    return output
@@ -9,14 +9,21 @@ Safety defaults:
 - Does not touch unknown/manual reference types.
 
 This is intended as an admin repair tool when the posting logic evolves.
+
+`rebuild_ledger` posts in batches: the entries for the range are deleted once, each
+keyset-paged chunk of source documents is turned into posting lines in memory (system accounts are
+resolved once per run), and the lines are written with `bulk_create_entries`. The
+single-document `post_*` functions build the same lines and are kept for ad-hoc use.
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from datetime import date
 from decimal import Decimal
-from typing import Iterable, Optional
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy.orm import selectinload
 
 from app import db
 from app.models.accounting import AccountingEntry, Expense
@@ -25,7 +32,10 @@ from app.models.order import Order
 from app.models.payment import Payment
 from app.models.purchasing import VendorBill, VendorPayment
 from app.services.accounting_utils import (
+    PostingLine,
+    bulk_create_entries,
     create_accounting_entry,
+    delete_entries,
     delete_posting,
     resolve_input_cgst,
     resolve_input_igst,
@@ -39,6 +49,8 @@ from app.services.accounting_utils import (
     resolve_sales_account,
     get_or_create_account,
 )
+from app.services.batching import iter_keyset, iter_keyset_chunks
+from app.services.fiscal_periods import ensure_period_open
 
 
 @dataclass
@@ -62,6 +74,15 @@ class LedgerRebuildSummary:
     vendor_payments_skipped: int = 0
 
 
+def merge_summaries(summaries: Iterable[LedgerRebuildSummary]) -> LedgerRebuildSummary:
+    """Add up the counts of several (e.g. per-partition) summaries."""
+    merged = LedgerRebuildSummary()
+    for summary in summaries:
+        for field in fields(LedgerRebuildSummary):
+            setattr(merged, field.name, getattr(merged, field.name) + getattr(summary, field.name))
+    return merged
+
+
 SUPPORTED_REFERENCE_TYPES = {
     'order',
     'payment',
@@ -130,308 +151,321 @@ def _resolve_vendor_ap_account(bill: VendorBill):
     return account
 
 
-def post_order(order: Order, *, created_by: Optional[int] = None) -> int:
-    if not order or (order.status or '').lower() == 'cancelled':
-        return 0
+class _PostingAccounts:
+    """Resolves the accounts a posting needs, memoized for the lifetime of the instance.
 
-    delete_posting('order', order.id)
+    A rebuild creates one instance per run, so each `resolve_*` lookup (and its
+    settings query) happens once instead of once per document.
+    """
 
-    ar = resolve_receivable_account()
-    sales = resolve_sales_account()
-    out_cgst = resolve_output_cgst()
-    out_sgst = resolve_output_sgst()
-    out_igst = resolve_output_igst()
+    def __init__(self):
+        self._cache: dict[tuple, object] = {}
 
-    customer = order.distributor.business_name if getattr(order, 'distributor', None) else 'Customer'
-    desc = f'Sale {order.order_number} to {customer}'
+    def _get(self, key: tuple, resolver: Callable):
+        if key not in self._cache:
+            self._cache[key] = resolver()
+        return self._cache[key]
 
-    created = 0
-    create_accounting_entry(
-        entry_date=order.order_date,
-        reference_type='order',
-        reference_id=order.id,
-        account=ar,
-        debit=_dec(order.total_amount),
-        credit=Decimal('0'),
-        description=desc,
-        created_by=created_by,
-    )
-    created += 1
-    create_accounting_entry(
-        entry_date=order.order_date,
-        reference_type='order',
-        reference_id=order.id,
-        account=sales,
-        debit=Decimal('0'),
-        credit=_dec(order.taxable_amount),
-        description=desc,
-        created_by=created_by,
+    def receivable(self):
+        return self._get(('receivable',), resolve_receivable_account)
+
+    def sales(self):
+        return self._get(('sales',), resolve_sales_account)
+
+    def purchases(self):
+        return self._get(('purchases',), resolve_purchases_account)
+
+    def output_cgst(self):
+        return self._get(('output_cgst',), resolve_output_cgst)
+
+    def output_sgst(self):
+        return self._get(('output_sgst',), resolve_output_sgst)
+
+    def output_igst(self):
+        return self._get(('output_igst',), resolve_output_igst)
+
+    def input_cgst(self):
+        return self._get(('input_cgst',), resolve_input_cgst)
+
+    def input_sgst(self):
+        return self._get(('input_sgst',), resolve_input_sgst)
+
+    def input_igst(self):
+        return self._get(('input_igst',), resolve_input_igst)
+
+    def payment(self, payment_mode: Optional[str]):
+        # resolve_payment_account only distinguishes cash from everything else.
+        kind = 'cash' if (payment_mode or '').strip().lower() == 'cash' else 'bank'
+        return self._get(('payment', kind), lambda: resolve_payment_account(kind))
+
+    def vendor_payable(self, bill: VendorBill):
+        return self._get(('vendor_ap', bill.vendor_id if bill.vendor else None), lambda: _resolve_vendor_ap_account(bill))
+
+    def company_state_code(self) -> str:
+        return self._get(('company_state_code',), _company_state_code)
+
+
+def _line(account, debit, credit, description: str) -> PostingLine:
+    return PostingLine(
+        account=account,
+        debit=debit,
+        credit=credit,
+        account_head=account.name,
+        description=description,
     )
-    created += 1
 
-    if _dec(order.cgst_amount) > 0:
-        create_accounting_entry(
-            entry_date=order.order_date,
-            reference_type='order',
-            reference_id=order.id,
-            account=out_cgst,
-            debit=Decimal('0'),
-            credit=_dec(order.cgst_amount),
-            description=f'{desc} - CGST',
-            created_by=created_by,
-        )
-        created += 1
-    if _dec(order.sgst_amount) > 0:
-        create_accounting_entry(
-            entry_date=order.order_date,
-            reference_type='order',
-            reference_id=order.id,
-            account=out_sgst,
-            debit=Decimal('0'),
-            credit=_dec(order.sgst_amount),
-            description=f'{desc} - SGST',
-            created_by=created_by,
-        )
-        created += 1
-    if _dec(order.igst_amount) > 0:
-        create_accounting_entry(
-            entry_date=order.order_date,
-            reference_type='order',
-            reference_id=order.id,
-            account=out_igst,
-            debit=Decimal('0'),
-            credit=_dec(order.igst_amount),
-            description=f'{desc} - IGST',
-            created_by=created_by,
-        )
-        created += 1
 
-    return created
+# Line builders. Each returns the posting lines for one document, or None when the
+# document must be left alone entirely (its existing entries are not replaced).
 
 
-def post_payment(payment: Payment, *, created_by: Optional[int] = None) -> int:
-    if not payment:
-        return 0
+def _order_lines(order: Order, accounts: _PostingAccounts) -> Optional[list[PostingLine]]:
+    if (order.status or '').lower() == 'cancelled':
+        return None
 
-    delete_posting('payment', payment.id)
+    customer = order.distributor.business_name if getattr(order, 'distributor', None) else 'Customer'
+    desc = f'Sale {order.order_number} to {customer}'
+
+    lines = [
+        _line(accounts.receivable(), _dec(order.total_amount), Decimal('0'), desc),
+        _line(accounts.sales(), Decimal('0'), _dec(order.taxable_amount), desc),
+    ]
+    if _dec(order.cgst_amount) > 0:
+        lines.append(_line(accounts.output_cgst(), Decimal('0'), _dec(order.cgst_amount), f'{desc} - CGST'))
+    if _dec(order.sgst_amount) > 0:
+        lines.append(_line(accounts.output_sgst(), Decimal('0'), _dec(order.sgst_amount), f'{desc} - SGST'))
+    if _dec(order.igst_amount) > 0:
+        lines.append(_line(accounts.output_igst(), Decimal('0'), _dec(order.igst_amount), f'{desc} - IGST'))
+    return lines
 
+
+def _payment_lines(payment: Payment, accounts: _PostingAccounts) -> list[PostingLine]:
     if (payment.status or '').lower() != 'cleared':
-        return 0
+        return []
 
     amount = _dec(payment.amount)
     if amount <= 0:
-        return 0
-
-    debit_account = resolve_payment_account(payment.payment_mode)
-    ar_account = resolve_receivable_account()
+        return []
 
     order = payment.order
     customer = order.distributor.business_name if order and getattr(order, 'distributor', None) else 'Customer'
     order_number = order.order_number if order else ''
     desc = f'Payment received from {customer} for {order_number}'.strip()
 
-    create_accounting_entry(
-        entry_date=payment.payment_date,
-        reference_type='payment',
-        reference_id=payment.id,
-        account=debit_account,
-        debit=amount,
-        credit=Decimal('0'),
-        description=desc,
-        created_by=created_by,
-    )
-    create_accounting_entry(
-        entry_date=payment.payment_date,
-        reference_type='payment',
-        reference_id=payment.id,
-        account=ar_account,
-        debit=Decimal('0'),
-        credit=amount,
-        description=desc,
-        created_by=created_by,
-    )
-    return 2
-
+    return [
+        _line(accounts.payment(payment.payment_mode), amount, Decimal('0'), desc),
+        _line(accounts.receivable(), Decimal('0'), amount, desc),
+    ]
 
-def post_expense(expense: Expense, *, created_by: Optional[int] = None) -> int:
-    if not expense:
-        return 0
-
-    delete_posting('expense', expense.id)
 
+def _expense_lines(expense: Expense, accounts: _PostingAccounts) -> list[PostingLine]:
     amount = _dec(expense.total_amount)
     if amount <= 0:
-        return 0
+        return []
 
     if not expense.account:
-        return 0
-
-    payment_account = resolve_payment_account(expense.payment_mode)
-    desc_debit = f'Expense: {expense.description or expense.vendor_name or expense.expense_number}'
-    desc_credit = f'Payment for: {expense.description or expense.vendor_name or expense.expense_number}'
-
-    create_accounting_entry(
-        entry_date=expense.expense_date,
-        reference_type='expense',
-        reference_id=expense.id,
-        account=expense.account,
-        debit=amount,
-        credit=Decimal('0'),
-        description=desc_debit,
-        created_by=created_by,
-    )
-    create_accounting_entry(
-        entry_date=expense.expense_date,
-        reference_type='expense',
-        reference_id=expense.id,
-        account=payment_account,
-        debit=Decimal('0'),
-        credit=amount,
-        description=desc_credit,
-        created_by=created_by,
-    )
-    return 2
-
+        return []
 
-def post_vendor_bill(bill: VendorBill, *, created_by: Optional[int] = None) -> int:
-    if not bill:
-        return 0
+    label = expense.description or expense.vendor_name or expense.expense_number
+    return [
+        _line(expense.account, amount, Decimal('0'), f'Expense: {label}'),
+        _line(accounts.payment(expense.payment_mode), Decimal('0'), amount, f'Payment for: {label}'),
+    ]
 
-    delete_posting('vendor_bill', bill.id)
 
+def _vendor_bill_lines(bill: VendorBill, accounts: _PostingAccounts) -> list[PostingLine]:
     if (bill.approval_status or '').lower() != 'approved':
-        return 0
-
-    purchases_account = resolve_purchases_account()
-    input_cgst = resolve_input_cgst()
-    input_sgst = resolve_input_sgst()
-    input_igst = resolve_input_igst()
-    ap_account = _resolve_vendor_ap_account(bill)
+        return []
 
-    company_state_code = _company_state_code()
     tax_amount = _dec(bill.tax_amount)
-    cgst, sgst, igst = _gst_split_by_gstin(getattr(bill.vendor, 'gstin', None), tax_amount, company_state_code)
-
-    created = 0
-
-    create_accounting_entry(
-        entry_date=bill.bill_date,
-        reference_type='vendor_bill',
-        reference_id=bill.id,
-        account=purchases_account,
-        debit=_dec(bill.subtotal),
-        credit=Decimal('0'),
-        description=f'Vendor bill {bill.bill_number} - Purchases',
-        created_by=created_by,
-    )
-    created += 1
+    cgst, sgst, igst = _gst_split_by_gstin(getattr(bill.vendor, 'gstin', None), tax_amount, accounts.company_state_code())
 
+    lines = [
+        _line(accounts.purchases(), _dec(bill.subtotal), Decimal('0'), f'Vendor bill {bill.bill_number} - Purchases'),
+    ]
     if cgst > 0:
-        create_accounting_entry(
-            entry_date=bill.bill_date,
-            reference_type='vendor_bill',
-            reference_id=bill.id,
-            account=input_cgst,
-            debit=cgst,
-            credit=Decimal('0'),
-            description=f'Vendor bill {bill.bill_number} - Input CGST',
-            created_by=created_by,
-        )
-        created += 1
+        lines.append(_line(accounts.input_cgst(), cgst, Decimal('0'), f'Vendor bill {bill.bill_number} - Input CGST'))
     if sgst > 0:
-        create_accounting_entry(
-            entry_date=bill.bill_date,
-            reference_type='vendor_bill',
-            reference_id=bill.id,
-            account=input_sgst,
-            debit=sgst,
-            credit=Decimal('0'),
-            description=f'Vendor bill {bill.bill_number} - Input SGST',
-            created_by=created_by,
-        )
-        created += 1
+        lines.append(_line(accounts.input_sgst(), sgst, Decimal('0'), f'Vendor bill {bill.bill_number} - Input SGST'))
     if igst > 0:
+        lines.append(_line(accounts.input_igst(), igst, Decimal('0'), f'Vendor bill {bill.bill_number} - Input IGST'))
+    lines.append(
+        _line(accounts.vendor_payable(bill), Decimal('0'), _dec(bill.total_amount), f'Vendor bill {bill.bill_number} - Payable')
+    )
+    return lines
+
+
+def _vendor_payment_lines(vp: VendorPayment, accounts: _PostingAccounts) -> list[PostingLine]:
+    if (vp.status or '').lower() != 'cleared':
+        return []
+
+    amount = _dec(vp.amount)
+    if amount <= 0:
+        return []
+
+    bill = vp.vendor_bill
+    if not bill or not bill.vendor:
+        return []
+
+    desc = f'Vendor bill {bill.bill_number} - Payment'
+    return [
+        _line(accounts.vendor_payable(bill), amount, Decimal('0'), desc),
+        _line(accounts.payment(vp.payment_mode), Decimal('0'), amount, desc),
+    ]
+
+
+def _post_lines(
+    reference_type: str,
+    reference_id: int,
+    entry_date,
+    lines: Optional[list[PostingLine]],
+    *,
+    created_by: Optional[int] = None,
+) -> int:
+    if lines is None:
+        return 0
+    delete_posting(reference_type, reference_id)
+    for line in lines:
         create_accounting_entry(
-            entry_date=bill.bill_date,
-            reference_type='vendor_bill',
-            reference_id=bill.id,
-            account=input_igst,
-            debit=igst,
-            credit=Decimal('0'),
-            description=f'Vendor bill {bill.bill_number} - Input IGST',
+            entry_date=entry_date,
+            reference_type=reference_type,
+            reference_id=reference_id,
+            account=line.account,
+            debit=line.debit,
+            credit=line.credit,
+            description=line.description,
             created_by=created_by,
         )
-        created += 1
-
-    create_accounting_entry(
-        entry_date=bill.bill_date,
-        reference_type='vendor_bill',
-        reference_id=bill.id,
-        account=ap_account,
-        debit=Decimal('0'),
-        credit=_dec(bill.total_amount),
-        description=f'Vendor bill {bill.bill_number} - Payable',
-        created_by=created_by,
-    )
-    created += 1
+    return len(lines)
 
-    return created
 
+def post_order(order: Order, *, created_by: Optional[int] = None) -> int:
+    if not order:
+        return 0
+    return _post_lines('order', order.id, order.order_date, _order_lines(order, _PostingAccounts()), created_by=created_by)
 
-def post_vendor_payment(vp: VendorPayment, *, created_by: Optional[int] = None) -> int:
-    if not vp:
+
+def post_payment(payment: Payment, *, created_by: Optional[int] = None) -> int:
+    if not payment:
         return 0
+    lines = _payment_lines(payment, _PostingAccounts())
+    return _post_lines('payment', payment.id, payment.payment_date, lines, created_by=created_by)
 
-    delete_posting('vendor_payment', vp.id)
 
-    if (vp.status or '').lower() != 'cleared':
+def post_expense(expense: Expense, *, created_by: Optional[int] = None) -> int:
+    if not expense:
         return 0
+    lines = _expense_lines(expense, _PostingAccounts())
+    return _post_lines('expense', expense.id, expense.expense_date, lines, created_by=created_by)
 
-    amount = _dec(vp.amount)
-    if amount <= 0:
+
+def post_vendor_bill(bill: VendorBill, *, created_by: Optional[int] = None) -> int:
+    if not bill:
         return 0
+    lines = _vendor_bill_lines(bill, _PostingAccounts())
+    return _post_lines('vendor_bill', bill.id, bill.bill_date, lines, created_by=created_by)
 
-    bill = vp.vendor_bill
-    if not bill or not bill.vendor:
+
+def post_vendor_payment(vp: VendorPayment, *, created_by: Optional[int] = None) -> int:
+    if not vp:
         return 0
+    lines = _vendor_payment_lines(vp, _PostingAccounts())
+    return _post_lines('vendor_payment', vp.id, vp.payment_date, lines, created_by=created_by)
 
-    ap_account = _resolve_vendor_ap_account(bill)
-    credit_account = resolve_payment_account(vp.payment_mode)
 
-    desc = f'Vendor bill {bill.bill_number} - Payment'
+@dataclass(frozen=True)
+class _SourceSpec:
+    reference_type: str
+    summary_prefix: str
+    model: type
+    date_column: str
+    build_lines: Callable
+    load_options: tuple
 
-    create_accounting_entry(
-        entry_date=vp.payment_date,
-        reference_type='vendor_payment',
-        reference_id=vp.id,
-        account=ap_account,
-        debit=amount,
-        credit=Decimal('0'),
-        description=desc,
-        created_by=created_by,
-    )
-    create_accounting_entry(
-        entry_date=vp.payment_date,
-        reference_type='vendor_payment',
-        reference_id=vp.id,
-        account=credit_account,
-        debit=Decimal('0'),
-        credit=amount,
-        description=desc,
-        created_by=created_by,
-    )
-    return 2
 
+def _source_specs(include_orders: bool, include_payments: bool, include_expenses: bool, include_vendor: bool) -> list[_SourceSpec]:
+    specs = []
+    if include_orders:
+        specs.append(_SourceSpec('order', 'orders', Order, 'order_date', _order_lines,
+                                 (selectinload(Order.distributor),)))
+    if include_payments:
+        specs.append(_SourceSpec('payment', 'payments', Payment, 'payment_date', _payment_lines,
+                                 (selectinload(Payment.order).selectinload(Order.distributor),)))
+    if include_expenses:
+        specs.append(_SourceSpec('expense', 'expenses', Expense, 'expense_date', _expense_lines,
+                                 (selectinload(Expense.account),)))
+    if include_vendor:
+        specs.append(_SourceSpec('vendor_bill', 'vendor_bills', VendorBill, 'bill_date', _vendor_bill_lines,
+                                 (selectinload(VendorBill.vendor),)))
+        specs.append(_SourceSpec('vendor_payment', 'vendor_payments', VendorPayment, 'payment_date', _vendor_payment_lines,
+                                 (selectinload(VendorPayment.vendor_bill).selectinload(VendorBill.vendor),)))
+    return specs
+
+
+def _rebuild_source(
+    spec: _SourceSpec,
+    *,
+    start_date: date,
+    end_date: date,
+    accounts: _PostingAccounts,
+    summary: LedgerRebuildSummary,
+    dry_run: bool,
+    created_by: Optional[int],
+    chunk_size: int,
+    progress: Optional[Callable[[int], None]],
+) -> None:
+    date_col = getattr(spec.model, spec.date_column)
+    q = spec.model.query.options(*spec.load_options).filter(
+        date_col >= start_date,
+        date_col <= end_date,
+    )
 
-def _iter_query_in_chunks(query, chunk_size: int = 500) -> Iterable:
-    offset = 0
-    while True:
-        rows = query.limit(chunk_size).offset(offset).all()
-        if not rows:
-            break
-        for row in rows:
-            yield row
-        offset += chunk_size
+    processed = skipped = 0
+    for docs in iter_keyset_chunks(q, chunk_size=chunk_size):
+        rows = []
+        replaced_ids = []
+        for doc in docs:
+            lines = spec.build_lines(doc, accounts)
+            if lines is not None:
+                replaced_ids.append(doc.id)
+            if not lines:
+                skipped += 1
+                continue
+            processed += 1
+            entry_date = getattr(doc, spec.date_column)
+            for line in lines:
+                rows.append({
+                    'entry_date': entry_date,
+                    'reference_type': spec.reference_type,
+                    'reference_id': doc.id,
+                    'account_id': line.account.id,
+                    'account_head': line.account_head,
+                    'debit': line.debit,
+                    'credit': line.credit,
+                    'description': line.description,
+                    'created_by': created_by,
+                })
+        summary.created_entries += len(rows)
+        if progress:
+            progress(len(docs))
+
+        if dry_run:
+            continue
+
+        # The range delete already removed in-range entries; this catches postings a
+        # document left on other dates (e.g. after its date was edited).
+        if replaced_ids:
+            delete_entries(
+                AccountingEntry.query.filter(
+                    AccountingEntry.reference_type == spec.reference_type,
+                    AccountingEntry.reference_id.in_(replaced_ids),
+                ),
+                synchronize_session=False,
+            )
+        bulk_create_entries(rows)
+
+    setattr(summary, f'{spec.summary_prefix}_processed', getattr(summary, f'{spec.summary_prefix}_processed') + processed)
+    setattr(summary, f'{spec.summary_prefix}_skipped', getattr(summary, f'{spec.summary_prefix}_skipped') + skipped)
 
 
 def rebuild_ledger(
@@ -444,92 +478,109 @@ def rebuild_ledger(
     include_vendor: bool = True,
     dry_run: bool = True,
     run_as_user_id: Optional[int] = None,
+    chunk_size: int = 500,
+    progress: Optional[Callable[[int], None]] = None,
+    commit: bool = True,
 ) -> LedgerRebuildSummary:
     """Rebuild auto-posted ledger entries for a date range.
 
-    When `dry_run=True`, no DB changes are committed, but the summary reflects what
-    would be deleted/created.
+    When `dry_run=True`, no DB changes are made, but the summary reflects what
+    would be deleted/created. `progress` is called with the number of source
+    documents handled after each chunk. With `commit=False` a real run leaves its
+    transaction open for the caller to commit or roll back. A real run into a closed
+    fiscal year raises `PeriodLockedError`.
     """
 
     summary = LedgerRebuildSummary()
+    if not dry_run:
+        ensure_period_open(start_date)
 
-    reference_types = set()
-    if include_orders:
-        reference_types.add('order')
-    if include_payments:
-        reference_types.add('payment')
-    if include_expenses:
-        reference_types.add('expense')
-    if include_vendor:
-        reference_types.update({'vendor_bill', 'vendor_payment'})
-
-    if not reference_types:
+    specs = _source_specs(include_orders, include_payments, include_expenses, include_vendor)
+    if not specs:
         return summary
 
     delete_q = AccountingEntry.query.filter(
         AccountingEntry.entry_date >= start_date,
         AccountingEntry.entry_date <= end_date,
-        AccountingEntry.reference_type.in_(sorted(reference_types)),
+        AccountingEntry.reference_type.in_(sorted(spec.reference_type for spec in specs)),
     )
 
     summary.deleted_entries = int(delete_q.count())
 
     if not dry_run:
-        delete_q.delete(synchronize_session=False)
+        delete_entries(delete_q, synchronize_session=False)
 
     # Recreate postings from source docs
-    if include_orders:
-        q = Order.query.filter(Order.order_date >= start_date, Order.order_date <= end_date)
-        for order in _iter_query_in_chunks(q):
-            created = post_order(order, created_by=run_as_user_id)
-            if created:
-                summary.orders_processed += 1
-                summary.created_entries += created
-            else:
-                summary.orders_skipped += 1
-
-    if include_payments:
-        q = Payment.query.filter(Payment.payment_date >= start_date, Payment.payment_date <= end_date)
-        for payment in _iter_query_in_chunks(q):
-            created = post_payment(payment, created_by=run_as_user_id)
-            if created:
-                summary.payments_processed += 1
-                summary.created_entries += created
-            else:
-                summary.payments_skipped += 1
-
-    if include_expenses:
-        q = Expense.query.filter(Expense.expense_date >= start_date, Expense.expense_date <= end_date)
-        for expense in _iter_query_in_chunks(q):
-            created = post_expense(expense, created_by=run_as_user_id)
-            if created:
-                summary.expenses_processed += 1
-                summary.created_entries += created
-            else:
-                summary.expenses_skipped += 1
-
-    if include_vendor:
-        q = VendorBill.query.filter(VendorBill.bill_date >= start_date, VendorBill.bill_date <= end_date)
-        for bill in _iter_query_in_chunks(q):
-            created = post_vendor_bill(bill, created_by=run_as_user_id)
-            if created:
-                summary.vendor_bills_processed += 1
-                summary.created_entries += created
-            else:
-                summary.vendor_bills_skipped += 1
-
-        q = VendorPayment.query.filter(VendorPayment.payment_date >= start_date, VendorPayment.payment_date <= end_date)
-        for vp in _iter_query_in_chunks(q):
-            created = post_vendor_payment(vp, created_by=run_as_user_id)
-            if created:
-                summary.vendor_payments_processed += 1
-                summary.created_entries += created
-            else:
-                summary.vendor_payments_skipped += 1
+    accounts = _PostingAccounts()
+    for spec in specs:
+        _rebuild_source(
+            spec,
+            start_date=start_date,
+            end_date=end_date,
+            accounts=accounts,
+            summary=summary,
+            dry_run=dry_run,
+            created_by=run_as_user_id,
+            chunk_size=chunk_size,
+            progress=progress,
+        )
 
     if dry_run:
         db.session.rollback()
-    else:
+    elif commit:
         db.session.commit()
 
     return summary
+
+
+def count_source_documents(
+    *,
+    start_date: date,
+    end_date: date,
+    include_orders: bool = True,
+    include_payments: bool = True,
+    include_expenses: bool = True,
+    include_vendor: bool = True,
+) -> int:
+    """Number of source documents `rebuild_ledger` would read for these options."""
+    total = 0
+    for spec in _source_specs(include_orders, include_payments, include_expenses, include_vendor):
+        date_col = getattr(spec.model, spec.date_column)
+        total += spec.model.query.filter(date_col >= start_date, date_col <= end_date).count()
+    return total
+
+
+def prepare_posting_accounts(*, start_date: date, end_date: date, include_vendor: bool = True) -> None:
+    """Create the system and vendor payable accounts a rebuild will post to, up front.
+
+    Concurrent partition workers would otherwise race to create the same accounts.
+    Does not commit.
+    """
+    accounts = _PostingAccounts()
+    for resolver in (
+        accounts.receivable,
+        accounts.sales,
+        accounts.purchases,
+        accounts.output_cgst,
+        accounts.output_sgst,
+        accounts.output_igst,
+        accounts.input_cgst,
+        accounts.input_sgst,
+        accounts.input_igst,
+    ):
+        resolver()
+    accounts.payment('cash')
+    accounts.payment('bank')
+
+    if include_vendor:
+        bills = VendorBill.query.options(selectinload(VendorBill.vendor)).filter(
+            db.or_(
+                db.and_(VendorBill.bill_date >= start_date, VendorBill.bill_date <= end_date),
+                VendorBill.payments.any(db.and_(
+                    VendorPayment.payment_date >= start_date,
+                    VendorPayment.payment_date <= end_date,
+                )),
+            )
+        )
+        for bill in iter_keyset(bills):
+            accounts.vendor_payable(bill)
@@ -0,0 +1,392 @@
+"""Partitioned, parallel ledger rebuilds.
+
+A `LedgerRebuildJob` splits the requested date range into month partitions. Each
+partition is rebuilt by `rebuild_ledger` in a worker process with its own app, DB
+connection and transaction, so a failing partition rolls back alone and can be
+retried from the admin page. Workers write their document counts to
+`ledger_rebuild_partitions` as they go; `job_progress` turns those into docs/sec
+and an ETA for the admin page.
+
+The job itself is driven from a background thread of the web process (see
+`start_rebuild_job`), which owns the process pool and marks the job finished.
+A deploy or worker restart kills that thread mid-run, so running partitions keep a
+`heartbeat_at` (bumped with each progress write); `fail_stale_partitions` marks
+partitions silent for `LEDGER_REBUILD_STALE_SECONDS`, and a job left without live
+partitions, as failed so they can be retried.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import update
+
+from app import db
+from app.models.accounting import LedgerRebuildJob, LedgerRebuildPartition
+from app.services.fiscal_periods import ensure_period_open
+from app.services.ledger_rebuild import (
+    LedgerRebuildSummary,
+    count_source_documents,
+    merge_summaries,
+    prepare_posting_accounts,
+    rebuild_ledger,
+)
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress writes from one worker.
+PROGRESS_INTERVAL = 1.0
+
+
+def month_partitions(start_date: date, end_date: date) -> list[tuple[date, date]]:
+    """Split [start_date, end_date] into calendar-month ranges."""
+    partitions = []
+    current = start_date
+    while current <= end_date:
+        next_month = date(current.year + (current.month == 12), current.month % 12 + 1, 1)
+        partition_end = min(end_date, next_month - timedelta(days=1))
+        partitions.append((current, partition_end))
+        current = next_month
+    return partitions
+
+
+def partition_summary(partition: LedgerRebuildPartition) -> Optional[LedgerRebuildSummary]:
+    if not partition.summary:
+        return None
+    return LedgerRebuildSummary(**json.loads(partition.summary))
+
+
+def job_summary(job: LedgerRebuildJob) -> Optional[LedgerRebuildSummary]:
+    """Merged summary of the job's completed partitions (None if none completed)."""
+    summaries = [s for s in (partition_summary(p) for p in job.partitions) if s is not None]
+    return merge_summaries(summaries) if summaries else None
+
+
+def create_rebuild_job(
+    *,
+    start_date: date,
+    end_date: date,
+    include_orders: bool = True,
+    include_payments: bool = True,
+    include_expenses: bool = True,
+    include_vendor: bool = True,
+    dry_run: bool = True,
+    created_by: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> LedgerRebuildJob:
+    """Create a job with one partition per month in the range. Commits.
+
+    Raises `PeriodLockedError` for a real run that reaches into a closed fiscal year.
+    """
+    if not dry_run:
+        ensure_period_open(start_date)
+    job = LedgerRebuildJob(
+        start_date=start_date,
+        end_date=end_date,
+        include_orders=include_orders,
+        include_payments=include_payments,
+        include_expenses=include_expenses,
+        include_vendor=include_vendor,
+        dry_run=dry_run,
+        workers=workers or current_app.config.get('LEDGER_REBUILD_WORKERS', 4),
+        status='pending',
+        created_by=created_by,
+    )
+    for partition_start, partition_end in month_partitions(start_date, end_date):
+        job.partitions.append(LedgerRebuildPartition(
+            start_date=partition_start,
+            end_date=partition_end,
+            status='pending',
+            attempts=0,
+            docs_total=count_source_documents(
+                start_date=partition_start,
+                end_date=partition_end,
+                include_orders=include_orders,
+                include_payments=include_payments,
+                include_expenses=include_expenses,
+                include_vendor=include_vendor,
+            ),
+            docs_done=0,
+        ))
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+class _ProgressReporter:
+    """Writes a partition's `docs_done` outside the rebuild transaction, throttled."""
+
+    def __init__(self, partition_id: int):
+        self.partition_id = partition_id
+        self.done = 0
+        self._last_write = 0.0
+        # SQLite allows a single writer, which the rebuild transaction already is.
+        self.enabled = db.engine.dialect.name != 'sqlite'
+
+    def __call__(self, docs: int) -> None:
+        self.done += docs
+        now = time.monotonic()
+        if not self.enabled or now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        try:
+            table = LedgerRebuildPartition.__table__
+            with db.engine.begin() as conn:
+                conn.execute(update(table).where(table.c.id == self.partition_id)
+                             .values(docs_done=self.done, heartbeat_at=datetime.utcnow()))
+        except Exception:
+            logger.exception('Could not record progress for ledger rebuild partition %s', self.partition_id)
+
+
+def run_partition(partition_id: int) -> bool:
+    """Rebuild one partition in the current app context. Returns True on success.
+
+    The rebuild and the partition's completed status commit together; on error the
+    rebuild is rolled back and the partition is marked failed with the message.
+    """
+    partition = db.session.get(LedgerRebuildPartition, partition_id)
+    job = partition.job
+    partition.status = 'running'
+    partition.attempts = (partition.attempts or 0) + 1
+    partition.docs_done = 0
+    partition.error = None
+    partition.started_at = datetime.utcnow()
+    partition.heartbeat_at = partition.started_at
+    partition.finished_at = None
+    db.session.commit()
+
+    reporter = _ProgressReporter(partition_id)
+    try:
+        summary = rebuild_ledger(
+            start_date=partition.start_date,
+            end_date=partition.end_date,
+            include_orders=job.include_orders,
+            include_payments=job.include_payments,
+            include_expenses=job.include_expenses,
+            include_vendor=job.include_vendor,
+            dry_run=job.dry_run,
+            run_as_user_id=job.created_by,
+            progress=reporter,
+            commit=False,
+        )
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Ledger rebuild partition %s failed', partition_id)
+        partition = db.session.get(LedgerRebuildPartition, partition_id)
+        partition.status = 'failed'
+        partition.error = str(e)
+        partition.finished_at = datetime.utcnow()
+        db.session.commit()
+        return False
+
+    partition = db.session.get(LedgerRebuildPartition, partition_id)
+    partition.status = 'completed'
+    partition.docs_done = reporter.done
+    partition.summary = json.dumps(asdict(summary))
+    partition.finished_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+_worker_app = None
+
+
+def _init_worker(config_overrides: dict) -> None:
+    from app import create_app
+    from config import Config
+
+    global _worker_app
+    worker_config = type('LedgerRebuildWorkerConfig', (Config,), config_overrides)
+    _worker_app = create_app(worker_config)
+
+
+def _run_partition_in_worker(partition_id: int) -> bool:
+    with _worker_app.app_context():
+        try:
+            return run_partition(partition_id)
+        finally:
+            db.session.remove()
+
+
+def run_rebuild_job(job_id: int, partition_ids: Optional[list[int]] = None) -> LedgerRebuildJob:
+    """Run the job's pending partitions (or just `partition_ids`) to completion. Blocking."""
+    job = db.session.get(LedgerRebuildJob, job_id)
+    todo = [
+        p.id for p in job.partitions
+        if (p.id in partition_ids if partition_ids is not None else p.status == 'pending')
+    ]
+
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    job.finished_at = None
+    db.session.commit()
+
+    try:
+        if not job.dry_run:
+            # Shared accounts are created once here instead of racing in the workers.
+            prepare_posting_accounts(start_date=job.start_date, end_date=job.end_date, include_vendor=job.include_vendor)
+            db.session.commit()
+
+        workers = min(job.workers or 1, len(todo))
+        if db.engine.dialect.name == 'sqlite':
+            workers = 1
+
+        if workers <= 1:
+            for partition_id in todo:
+                run_partition(partition_id)
+        else:
+            overrides = {'SQLALCHEMY_DATABASE_URI': current_app.config['SQLALCHEMY_DATABASE_URI']}
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(overrides,),
+            ) as pool:
+                futures = {pool.submit(_run_partition_in_worker, partition_id): partition_id for partition_id in todo}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # The worker process itself died; record it on the partition.
+                        logger.exception('Ledger rebuild worker for partition %s crashed', futures[future])
+                        partition = db.session.get(LedgerRebuildPartition, futures[future])
+                        partition.status = 'failed'
+                        partition.error = str(e) or e.__class__.__name__
+                        partition.finished_at = datetime.utcnow()
+                        db.session.commit()
+    finally:
+        db.session.rollback()
+        db.session.expire_all()
+        job = db.session.get(LedgerRebuildJob, job_id)
+        statuses = {p.status for p in job.partitions}
+        job.status = 'completed' if statuses == {'completed'} else 'failed'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    return job
+
+
+def start_rebuild_job(job_id: int, partition_ids: Optional[list[int]] = None) -> threading.Thread:
+    """Run `run_rebuild_job` in a background thread of this process."""
+    app = current_app._get_current_object()
+
+    def _target():
+        with app.app_context():
+            try:
+                run_rebuild_job(job_id, partition_ids)
+            except Exception:
+                logger.exception('Ledger rebuild job %s failed', job_id)
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=_target, name=f'ledger-rebuild-{job_id}', daemon=True)
+    thread.start()
+    return thread
+
+
+def fail_stale_partitions(job: LedgerRebuildJob) -> bool:
+    """Mark partitions (and the job) interrupted by a worker restart as failed. Commits if any.
+
+    A running partition is stale once its heartbeat is older than
+    `LEDGER_REBUILD_STALE_SECONDS`; a running job is stale once none of its partitions
+    is running and nothing has happened for that long. Returns True if anything changed.
+    """
+    if job.status != 'running':
+        return False
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=current_app.config.get('LEDGER_REBUILD_STALE_SECONDS', 900))
+    last_activity = max(
+        [job.started_at or now]
+        + [max(t for t in (p.started_at, p.heartbeat_at, p.finished_at) if t) for p in job.partitions if p.started_at]
+    )
+
+    changed = False
+    for partition in job.partitions:
+        if partition.status == 'running' and (partition.heartbeat_at or partition.started_at or now) < cutoff:
+            partition.status = 'failed'
+            partition.error = 'Interrupted (no progress since the worker stopped); retry to run it again.'
+            partition.finished_at = now
+            changed = True
+    if all(p.status != 'running' for p in job.partitions) and last_activity < cutoff:
+        job.status = 'failed'
+        job.finished_at = now
+        changed = True
+    if changed:
+        logger.warning('Ledger rebuild job %s was interrupted; marked stale partitions failed', job.id)
+        db.session.commit()
+    return changed
+
+
+def retry_failed_partitions(job_id: int) -> list[int]:
+    """Reset the job's failed (and never-run) partitions to pending and run them again. Returns their ids."""
+    job = db.session.get(LedgerRebuildJob, job_id)
+    fail_stale_partitions(job)
+    failed = [p for p in job.partitions if p.status in ('failed', 'pending')]
+    for partition in failed:
+        partition.status = 'pending'
+        partition.error = None
+    job.status = 'pending'
+    db.session.commit()
+
+    partition_ids = [p.id for p in failed]
+    if partition_ids:
+        start_rebuild_job(job_id, partition_ids)
+    return partition_ids
+
+
+def job_progress(job: LedgerRebuildJob) -> dict:
+    """Progress snapshot for the admin page (JSON-serialisable)."""
+    fail_stale_partitions(job)
+    docs_total = sum(p.docs_total or 0 for p in job.partitions)
+    docs_done = sum(
+        (p.docs_total or 0) if p.status == 'completed' else (p.docs_done or 0)
+        for p in job.partitions
+    )
+
+    # Rate from the partitions of the current run only (a retry restarts the clock).
+    docs_per_sec = 0.0
+    eta_seconds = None
+    if job.started_at:
+        end = job.finished_at or datetime.utcnow()
+        elapsed = max((end - job.started_at).total_seconds(), 0.001)
+        current_run_docs = sum(
+            (p.docs_total or 0) if p.status == 'completed' else (p.docs_done or 0)
+            for p in job.partitions
+            if p.started_at and p.started_at >= job.started_at
+        )
+        docs_per_sec = current_run_docs / elapsed
+        if job.status == 'running' and docs_per_sec > 0:
+            eta_seconds = int(max(docs_total - docs_done, 0) / docs_per_sec)
+
+    return {
+        'id': job.id,
+        'status': job.status,
+        'dry_run': bool(job.dry_run),
+        'docs_total': docs_total,
+        'docs_done': docs_done,
+        'percent': round(100.0 * docs_done / docs_total, 1) if docs_total else (100.0 if job.status == 'completed' else 0.0),
+        'docs_per_sec': round(docs_per_sec, 1),
+        'eta_seconds': eta_seconds,
+        'partitions': [
+            {
+                'id': p.id,
+                'start_date': p.start_date.isoformat(),
+                'end_date': p.end_date.isoformat(),
+                'status': p.status,
+                'attempts': p.attempts or 0,
+                'docs_total': p.docs_total or 0,
+                'docs_done': (p.docs_total or 0) if p.status == 'completed' else (p.docs_done or 0),
+                'error': p.error,
+            }
+            for p in job.partitions
+        ],
+    }
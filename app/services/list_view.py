@@ -0,0 +1,169 @@
+"""Keyset-paginated, filtered and sorted list pages.
+
+The order, payment, vendor bill, batch and inventory lists used to load their whole
+table and lazy-load a relationship or two per row in the template. A `ListView`
+describes one list page instead:
+
+- `query` builds the base query, with the joins and loader options
+  (`contains_eager` / `selectinload`) the template needs;
+- `sorts` are the orderings offered; each one ends in a unique column so it is a
+  total order and pages can seek on it (keyset pagination: `WHERE (sort values) >
+  (last row's values)`, no OFFSET), keeping every page as cheap as the first;
+- `filters` map query-string arguments to WHERE clauses.
+
+`ListView.page(request.args)` returns a `ListPage` with the rows and opaque
+`next` / `prev` cursors. Sort expressions must not be NULL (wrap nullable columns in
+`coalesce`) and must name their type (`coalesce(col, 0)` keeps the column's).
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+@dataclass(frozen=True)
+class Sort:
+    label: str
+    columns: tuple  # sort expressions, the last one unique (usually the primary key)
+    descending: bool = False
+
+
+@dataclass
+class ListPage:
+    items: list
+    sort: str
+    sorts: dict[str, Sort]
+    args: dict[str, str] = field(default_factory=dict)  # active filters, sort and per_page
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __bool__(self) -> bool:
+        return bool(self.items)
+
+
+class ListView:
+    def __init__(
+        self,
+        query: Callable[[], Query],
+        sorts: Mapping[str, Sort],
+        filters: Optional[Mapping[str, Callable[[str], Any]]] = None,
+        per_page: int = DEFAULT_PER_PAGE,
+    ):
+        self.query = query
+        self.sorts = dict(sorts)
+        self.default_sort = next(iter(self.sorts))
+        self.filters = dict(filters or {})
+        self.per_page = per_page
+
+    def page(self, args: Mapping[str, str]) -> ListPage:
+        """One page for the query-string `args` (`sort`, `per_page`, `after`/`before`, filters)."""
+        sort_key = args.get('sort') if args.get('sort') in self.sorts else self.default_sort
+        sort = self.sorts[sort_key]
+        try:
+            per_page = min(max(int(args.get('per_page', self.per_page)), 1), MAX_PER_PAGE)
+        except ValueError:
+            per_page = self.per_page
+
+        query = self.query()
+        active = {}
+        for name, build in self.filters.items():
+            value = (args.get(name) or '').strip()
+            if value:
+                clause = build(value)
+                if clause is not None:
+                    query = query.filter(clause)
+                    active[name] = value
+
+        after = _decode_cursor(args.get('after'), sort)
+        before = _decode_cursor(args.get('before'), sort) if after is None else None
+        # Walking backwards: seek the other way in reverse order, then flip the rows.
+        backwards = before is not None
+        if after is not None or before is not None:
+            query = query.filter(_seek(sort, after if after is not None else before, forward=not backwards))
+        query = query.order_by(*_ordering(sort, reverse=backwards))
+
+        # The sort values ride along with each row, so cursors need no per-model code.
+        query = query.add_columns(*[column.label(f'_sort_{i}') for i, column in enumerate(sort.columns)])
+        rows = query.limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if backwards:
+            rows.reverse()
+
+        page = ListPage(
+            items=[row[0] for row in rows],
+            sort=sort_key,
+            sorts=self.sorts,
+            args=dict(active, sort=sort_key, per_page=str(per_page)),
+        )
+        if rows:
+            first, last = _encode_cursor(rows[0][1:]), _encode_cursor(rows[-1][1:])
+            if backwards:
+                page.prev_cursor = first if has_more else None
+                page.next_cursor = last
+            else:
+                page.prev_cursor = first if after is not None else None
+                page.next_cursor = last if has_more else None
+        return page
+
+
+def _ordering(sort: Sort, reverse: bool = False) -> list:
+    descending = sort.descending != reverse
+    return [column.desc() if descending else column.asc() for column in sort.columns]
+
+
+def _seek(sort: Sort, key: Sequence, forward: bool):
+    """Rows after `key` in the sort order (before it when not `forward`)."""
+    greater = sort.descending != forward
+    clauses = []
+    for index, column in enumerate(sort.columns):
+        equal = [sort.columns[i] == key[i] for i in range(index)]
+        beyond = column > key[index] if greater else column < key[index]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def _encode_cursor(values: Sequence) -> str:
+    # Dates as ISO strings, Decimals via str(); `_coerce` turns both back.
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(value: Optional[str], sort: Sort) -> Optional[list]:
+    """Parse a cursor for `sort`; None for missing or malformed values."""
+    if not value:
+        return None
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        if not isinstance(raw, list) or len(raw) != len(sort.columns):
+            return None
+        return [_coerce(column, item) for column, item in zip(sort.columns, raw)]
+    except (ValueError, TypeError):
+        return None
+
+
+def _coerce(column, value):
+    python_type = column.type.python_type
+    if value is None:
+        raise ValueError('NULL sort value')
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
@@ -0,0 +1,528 @@
+"""Notification outbox: queue WhatsApp messages and emails, send them from a worker.
+
+Request handlers used to call the WhatsApp provider and SMTP inline, one message at a
+time, so a bulk action (payment reminders to every debtor) could outlast the gunicorn
+timeout. Now:
+
+- `enqueue_whatsapp` / `enqueue_email` add an `OutboxMessage` to the session. It
+  commits (or rolls back) with the business change that triggered it, so a reminder
+  is never sent for an order that was not saved, and a saved order never loses its
+  notification;
+- `flask notifications worker` (`OutboxWorker`) claims due messages in batches,
+  sends them on a thread pool (`NOTIFICATION_WORKERS`; emails go out
+  `NOTIFICATION_EMAIL_BATCH` at a time over one SMTP connection instead of one
+  connection per message), spaced out per provider
+  (`NOTIFICATION_RATE_LIMITS`, messages/sec per worker process), and records each
+  outcome. Failures are retried with exponential backoff and jitter
+  (`NOTIFICATION_RETRY_BASE` doubling up to `NOTIFICATION_RETRY_MAX`); after
+  `NOTIFICATION_MAX_ATTEMPTS` the message is dead-lettered (status `dead`, with the
+  last error) until requeued with `flask notifications requeue`.
+
+Claiming is one `UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED)`, so
+several worker processes can drain the same outbox. A claim expires after
+`NOTIFICATION_LEASE` seconds, which recovers messages from a worker that died
+mid-send; delivery is therefore at-least-once.
+
+Attachments are either stored with the message (bytes, base64 in the payload) or
+built at send time by a function registered with `attachment_builder`, which keeps
+slow work such as PDF rendering out of the request too.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import random
+import smtplib
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from flask import Flask, current_app, has_request_context
+from flask_login import current_user
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.notification import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_RETRY_BASE = 30
+DEFAULT_RETRY_MAX = 3600
+DEFAULT_LEASE = 300
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_EMAIL_BATCH = 20
+
+STATUSES = ('pending', 'sending', 'sent', 'dead')
+
+
+class DeliveryError(Exception):
+    """A provider refused or failed to take a message; it will be retried."""
+
+
+@dataclass(frozen=True)
+class QueuedMessage:
+    """A claimed outbox row, detached from the session so send threads can share it."""
+    id: int
+    channel: str
+    recipient: str
+    subject: Optional[str]
+    body: str
+    payload: dict
+    attempts: int
+    claim_token: str
+
+
+@dataclass(frozen=True)
+class Outcome:
+    ok: bool
+    provider: Optional[str] = None
+    provider_message_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class WorkerStats:
+    sent: int = 0
+    retried: int = 0
+    dead: int = 0
+    by_provider: dict[str, int] = field(default_factory=dict)
+
+
+# ---------------------------------------------------------------------------
+# Enqueueing
+
+def _created_by() -> Optional[int]:
+    if has_request_context() and current_user and current_user.is_authenticated:
+        return current_user.id
+    return None
+
+
+def enqueue(
+    channel: str,
+    recipient: str,
+    body: str,
+    *,
+    subject: Optional[str] = None,
+    payload: Optional[dict] = None,
+    session: Optional[Session] = None,
+) -> OutboxMessage:
+    """Add a message to the outbox in the session's transaction; the caller commits.
+
+    Raises ValueError for an unknown channel or a missing recipient.
+    """
+    if channel not in SENDERS:
+        raise ValueError(f'Unknown notification channel: {channel}')
+    if not recipient:
+        raise ValueError('Notification recipient is required')
+    message = OutboxMessage(
+        channel=channel,
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        payload=json.dumps(payload) if payload else None,
+        status='pending',
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+        created_by=_created_by(),
+    )
+    (session or db.session).add(message)
+    return message
+
+
+def enqueue_whatsapp(phone: str, message: str, media_url: Optional[str] = None, session: Optional[Session] = None) -> OutboxMessage:
+    return enqueue('whatsapp', str(phone or ''), message, payload={'media_url': media_url} if media_url else None, session=session)
+
+
+def enqueue_email(
+    to,
+    subject: str,
+    *,
+    html: Optional[str] = None,
+    text: Optional[str] = None,
+    cc=None,
+    attachments=None,
+    session: Optional[Session] = None,
+) -> OutboxMessage:
+    """Queue an email with an HTML or plain-text body.
+
+    `attachments` items are either `{'filename', 'content_type', 'data': bytes}` or
+    `{'builder': name, 'args': {...}}` for an `attachment_builder` run at send time.
+    """
+    if (html is None) == (text is None):
+        raise ValueError('Pass exactly one of html or text')
+    recipients = [to] if isinstance(to, str) else list(to or [])
+    payload = {'format': 'html' if html is not None else 'text'}
+    if cc:
+        payload['cc'] = [cc] if isinstance(cc, str) else list(cc)
+    if attachments:
+        payload['attachments'] = [_stored_attachment(att) for att in attachments]
+    return enqueue(
+        'email',
+        ', '.join(address for address in recipients if address),
+        html if html is not None else text,
+        subject=subject,
+        payload=payload,
+        session=session,
+    )
+
+
+def _stored_attachment(attachment: dict) -> dict:
+    if 'builder' in attachment:
+        if attachment['builder'] not in ATTACHMENT_BUILDERS:
+            raise ValueError(f"Unknown attachment builder: {attachment['builder']}")
+        return {'builder': attachment['builder'], 'args': attachment.get('args', {})}
+    return {
+        'filename': attachment['filename'],
+        'content_type': attachment.get('content_type', 'application/octet-stream'),
+        'data': base64.b64encode(attachment['data']).decode('ascii'),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Sending
+
+# name -> function(**args) returning (filename, content_type, bytes), or None to skip
+ATTACHMENT_BUILDERS: dict[str, Callable[..., Optional[tuple[str, str, bytes]]]] = {}
+
+
+def attachment_builder(name: str):
+    """Register a function that builds an attachment when the email is sent."""
+    def register(function):
+        ATTACHMENT_BUILDERS[name] = function
+        return function
+    return register
+
+
+def provider_for(channel: str) -> str:
+    if channel == 'whatsapp':
+        return current_app.config.get('WHATSAPP_PROVIDER', 'twilio')
+    return 'smtp'
+
+
+def _send_whatsapp(message: QueuedMessage) -> Optional[str]:
+    from app.services.whatsapp import WhatsAppService
+
+    ok, result = WhatsAppService().send_message(message.recipient, message.body, message.payload.get('media_url'))
+    if not ok:
+        raise DeliveryError(result)
+    return result
+
+
+def _email_attachments(message: QueuedMessage):
+    for attachment in message.payload.get('attachments', []):
+        if 'builder' not in attachment:
+            yield attachment['filename'], attachment['content_type'], base64.b64decode(attachment['data'])
+            continue
+        built = ATTACHMENT_BUILDERS[attachment['builder']](**attachment['args'])
+        if built is None:
+            logger.warning('Outbox message %s: attachment %s skipped', message.id, attachment['builder'])
+        else:
+            yield built
+
+
+def _email_message(message: QueuedMessage):
+    from flask_mail import Message
+
+    email = Message(
+        subject=message.subject or '',
+        recipients=[address.strip() for address in message.recipient.split(',') if address.strip()],
+        cc=message.payload.get('cc'),
+        sender=current_app.config.get('MAIL_DEFAULT_SENDER'),
+    )
+    if message.payload.get('format') == 'text':
+        email.body = message.body
+    else:
+        email.html = message.body
+    for filename, content_type, data in _email_attachments(message):
+        email.attach(filename, content_type, data)
+    return email
+
+
+def _send_email(message: QueuedMessage) -> Optional[str]:
+    from app import mail
+
+    email = _email_message(message)
+    mail.send(email)
+    return email.msgId
+
+
+def _send_email_batch(messages: list[QueuedMessage], pace: Callable[[], None]) -> list:
+    """Send emails over one SMTP connection; the message id or the exception per message.
+
+    A refused message does not end the batch; a dropped connection fails the rest,
+    which are then retried like any other failure.
+    """
+    from app import mail
+
+    results = []
+    try:
+        with mail.connect() as connection:
+            for message in messages:
+                pace()
+                try:
+                    email = _email_message(message)
+                    connection.send(email)
+                    results.append(email.msgId)
+                except (smtplib.SMTPServerDisconnected, OSError) as e:
+                    results.extend([e] * (len(messages) - len(results)))
+                    break
+                except Exception as e:
+                    results.append(e)
+    except (smtplib.SMTPException, OSError):
+        # Could not connect; once messages went out, a failed QUIT changes nothing.
+        if not results:
+            raise
+    return results
+
+
+SENDERS: dict[str, Callable[[QueuedMessage], Optional[str]]] = {
+    'whatsapp': _send_whatsapp,
+    'email': _send_email,
+}
+
+# Channels whose messages the worker sends in batches over one connection
+BATCH_SENDERS: dict[str, Callable[[list[QueuedMessage], Callable[[], None]], list]] = {
+    'email': _send_email_batch,
+}
+
+
+class RateLimiter:
+    """Spaces sends to each provider at most `rate` per second (shared by a worker's threads)."""
+
+    def __init__(self, rates: dict[str, float]):
+        self.rates = dict(rates)
+        self._lock = threading.Lock()
+        self._next_slot: dict[str, float] = {}
+
+    def wait(self, provider: str) -> None:
+        rate = self.rates.get(provider)
+        if not rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(provider, now))
+            self._next_slot[provider] = slot + 1.0 / rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def retry_delay(attempts: int, base: float, cap: float) -> float:
+    """Seconds before retry number `attempts` + 1: exponential, capped, with jitter."""
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+
+# ---------------------------------------------------------------------------
+# Claiming and recording
+
+def _due(now: datetime, lease: int):
+    table = OutboxMessage.__table__
+    return or_(
+        and_(table.c.status == 'pending', table.c.next_attempt_at <= now),
+        and_(table.c.status == 'sending', table.c.claimed_at < now - timedelta(seconds=lease)),
+    )
+
+
+def claim_batch(limit: int, lease: int = DEFAULT_LEASE) -> list[QueuedMessage]:
+    """Claim up to `limit` due messages for this worker and commit the claim."""
+    table = OutboxMessage.__table__
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    candidates = (
+        select(table.c.id)
+        .where(_due(now, lease))
+        .order_by(table.c.next_attempt_at, table.c.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.session.execute(
+        update(table)
+        .where(table.c.id.in_(candidates.scalar_subquery()))
+        .values(status='sending', claim_token=token, claimed_at=now, attempts=table.c.attempts + 1)
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return []
+
+    rows = db.session.execute(select(table).where(table.c.claim_token == token).order_by(table.c.id)).mappings()
+    return [
+        QueuedMessage(
+            id=row['id'],
+            channel=row['channel'],
+            recipient=row['recipient'],
+            subject=row['subject'],
+            body=row['body'],
+            payload=json.loads(row['payload']) if row['payload'] else {},
+            attempts=row['attempts'],
+            claim_token=token,
+        )
+        for row in rows
+    ]
+
+
+def record_outcome(
+    message: QueuedMessage,
+    outcome: Outcome,
+    *,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    retry_base: float = DEFAULT_RETRY_BASE,
+    retry_max: float = DEFAULT_RETRY_MAX,
+) -> Optional[str]:
+    """Mark a claimed message sent, due for retry or dead; returns the new status.
+
+    Ignored (returns None) if the claim expired and another worker took the message over.
+    """
+    table = OutboxMessage.__table__
+    now = datetime.utcnow()
+    values = {'claim_token': None, 'claimed_at': None, 'provider': outcome.provider}
+    if outcome.ok:
+        status = 'sent'
+        values.update(sent_at=now, provider_message_id=outcome.provider_message_id, last_error=None)
+    elif message.attempts >= max_attempts:
+        status = 'dead'
+        values.update(last_error=outcome.error)
+        logger.warning('Outbox message %s dead after %s attempts: %s', message.id, message.attempts, outcome.error)
+    else:
+        status = 'pending'
+        delay = retry_delay(message.attempts, retry_base, retry_max)
+        values.update(last_error=outcome.error, next_attempt_at=now + timedelta(seconds=delay))
+    recorded = db.session.execute(
+        update(table)
+        .where(table.c.id == message.id, table.c.claim_token == message.claim_token)
+        .values(status=status, **values)
+    ).rowcount
+    db.session.commit()
+    return status if recorded else None
+
+
+def outbox_counts() -> dict[str, int]:
+    """Number of outbox messages per status."""
+    rows = db.session.execute(select(OutboxMessage.status, func.count()).group_by(OutboxMessage.status)).all()
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update({status: count for status, count in rows})
+    return counts
+
+
+def requeue_dead(ids=None) -> int:
+    """Move dead messages (all, or those in `ids`) back to pending with fresh attempts. Commits."""
+    table = OutboxMessage.__table__
+    statement = update(table).where(table.c.status == 'dead')
+    if ids:
+        statement = statement.where(table.c.id.in_(list(ids)))
+    count = db.session.execute(
+        statement.values(status='pending', attempts=0, next_attempt_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+# ---------------------------------------------------------------------------
+# Worker
+
+class OutboxWorker:
+    """Drains the outbox: claims due messages and sends them on a thread pool.
+
+    Claims and outcomes are written from the calling thread only; send threads get
+    their own app context (and so their own DB session for attachment builders).
+    """
+
+    def __init__(self, app: Flask, concurrency: Optional[int] = None, poll_interval: Optional[float] = None):
+        config = app.config
+        self.app = app
+        self.concurrency = concurrency or config.get('NOTIFICATION_WORKERS', DEFAULT_WORKERS)
+        self.poll_interval = poll_interval if poll_interval is not None else config.get('NOTIFICATION_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+        self.lease = config.get('NOTIFICATION_LEASE', DEFAULT_LEASE)
+        self.max_attempts = config.get('NOTIFICATION_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        self.retry_base = config.get('NOTIFICATION_RETRY_BASE', DEFAULT_RETRY_BASE)
+        self.retry_max = config.get('NOTIFICATION_RETRY_MAX', DEFAULT_RETRY_MAX)
+        self.batch_size = config.get('NOTIFICATION_EMAIL_BATCH', DEFAULT_EMAIL_BATCH)
+        self.limiter = RateLimiter(config.get('NOTIFICATION_RATE_LIMITS', {}))
+        self.stop_event = threading.Event()
+
+    def stop(self) -> None:
+        """Stop claiming; messages already claimed are still sent and recorded."""
+        self.stop_event.set()
+
+    def run(self, once: bool = False) -> WorkerStats:
+        """Send until stopped, or with `once` until nothing is due."""
+        stats = WorkerStats()
+        in_flight = {}  # future -> the messages it sends
+        # Claim ahead (two messages per thread, or two email batches) so the pool never
+        # idles between claims; top up once half of that has been sent.
+        capacity = max(self.concurrency, self.batch_size) * 2
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix='outbox') as pool:
+            while True:
+                claimed = sum(len(messages) for messages in in_flight.values())
+                if not self.stop_event.is_set() and claimed <= capacity // 2:
+                    for messages in self._tasks(claim_batch(capacity - claimed, self.lease)):
+                        in_flight[pool.submit(self._deliver, messages)] = messages
+                if not in_flight:
+                    if once or self.stop_event.is_set():
+                        break
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                done, _ = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    messages = in_flight.pop(future)
+                    for message, outcome in zip(messages, future.result()):
+                        self._record(message, outcome, stats)
+        return stats
+
+    def _tasks(self, messages: list[QueuedMessage]):
+        """Group claimed messages into send tasks: batches for batch channels, else one each."""
+        batched: dict[str, list[QueuedMessage]] = {}
+        for message in messages:
+            if message.channel in BATCH_SENDERS:
+                batched.setdefault(message.channel, []).append(message)
+            else:
+                yield [message]
+        for group in batched.values():
+            for start in range(0, len(group), self.batch_size):
+                yield group[start:start + self.batch_size]
+
+    def _deliver(self, messages: list[QueuedMessage]) -> list[Outcome]:
+        with self.app.app_context():
+            channel = messages[0].channel
+            provider = provider_for(channel)
+            try:
+                if channel in BATCH_SENDERS:
+                    results = BATCH_SENDERS[channel](messages, lambda: self.limiter.wait(provider))
+                else:
+                    self.limiter.wait(provider)
+                    results = [SENDERS[channel](messages[0])]
+            except Exception as e:
+                results = [e] * len(messages)
+
+        outcomes = []
+        for message, result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.info('Outbox message %s (%s) failed: %s', message.id, provider, result)
+                outcomes.append(Outcome(False, provider, error=str(result) or result.__class__.__name__))
+            else:
+                outcomes.append(Outcome(True, provider, result))
+        return outcomes
+
+    def _record(self, message: QueuedMessage, outcome: Outcome, stats: WorkerStats) -> None:
+        status = record_outcome(
+            message,
+            outcome,
+            max_attempts=self.max_attempts,
+            retry_base=self.retry_base,
+            retry_max=self.retry_max,
+        )
+        if status == 'sent':
+            stats.sent += 1
+            stats.by_provider[outcome.provider] = stats.by_provider.get(outcome.provider, 0) + 1
+        elif status == 'dead':
+            stats.dead += 1
+        elif status == 'pending':
+            stats.retried += 1
@@ -0,0 +1,149 @@
+"""Per-process cache of computed financial statements.
+
+Trial balance, P&L, balance sheet and cash flow are opened many times a day for the
+same period, and each view, Excel export, print and email variant used to recompute
+from scratch. `cached_report(name)` wraps a report function so its result is kept
+under `(name, arguments, ledger version)` in a size-bounded LRU shared by the
+whole process.
+
+The `ledger` version stamp (see `cache_versions`) is bumped once per committed
+transaction that inserted or deleted `AccountingEntry` rows, or changed accounts,
+customer payments or expenses (the inputs of these reports). Every process then
+misses on its next lookup and old entries age out of the LRU. Bulk paths that skip
+the ORM (`bulk_create_entries`, `delete_entries`, `refresh_daily_balances`) call
+`mark_ledger_changed()` themselves.
+
+Cached results are shared between requests: report functions must return plain
+values or detached objects, and callers must not mutate them.
+"""
+
+from __future__ import annotations
+
+import functools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy.orm import Session
+
+from app.models.accounting import Account, AccountingEntry, Expense
+from app.models.payment import Payment
+from app.services.cache_versions import bump_on_commit, bump_on_write, get_version
+
+VERSION_KEY = 'ledger'
+DEFAULT_MAX_ENTRIES = 128
+
+
+@dataclass
+class ReportStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass
+class CacheStats:
+    entries: int
+    max_entries: int
+    evictions: int
+    ledger_version: int
+    reports: dict[str, ReportStats] = field(default_factory=dict)
+
+    @property
+    def hits(self) -> int:
+        return sum(stats.hits for stats in self.reports.values())
+
+    @property
+    def misses(self) -> int:
+        return sum(stats.misses for stats in self.reports.values())
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ReportCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._stats: dict[str, ReportStats] = {}
+        self._evictions = 0
+        self.max_entries = max_entries
+
+    def get_or_compute(self, report: str, params: Hashable, compute: Callable[[], Any]) -> Any:
+        # Read the version before computing: a result computed from newer data than
+        # its tag is only ever replaced early, never served stale.
+        key = (report, params, get_version(VERSION_KEY))
+        with self._lock:
+            stats = self._stats.setdefault(report, ReportStats())
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                stats.hits += 1
+                return self._entries[key]
+            stats.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+            self._evictions = 0
+
+    def stats(self) -> CacheStats:
+        ledger_version = get_version(VERSION_KEY)
+        with self._lock:
+            return CacheStats(
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                evictions=self._evictions,
+                ledger_version=ledger_version,
+                reports={name: ReportStats(s.hits, s.misses) for name, s in sorted(self._stats.items())},
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+report_cache = ReportCache()
+
+
+def cached_report(name: str):
+    """Cache a report function's result per (arguments, ledger version).
+
+    Arguments must be hashable (dates, ids, tuples).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if has_app_context():
+                report_cache.max_entries = current_app.config.get('REPORT_CACHE_SIZE', DEFAULT_MAX_ENTRIES)
+            params = (args, tuple(sorted(kwargs.items())))
+            return report_cache.get_or_compute(name, params, lambda: func(*args, **kwargs))
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def mark_ledger_changed(session: Optional[Session] = None) -> None:
+    """Bump the ledger version when the current transaction commits."""
+    bump_on_commit(VERSION_KEY, session)
+
+
+# Models whose writes change report output.
+bump_on_write(VERSION_KEY, AccountingEntry, events=('after_insert', 'after_delete'))
+bump_on_write(VERSION_KEY, Account, Payment, Expense)
@@ -0,0 +1,194 @@
+"""Opt-in per-request SQL profiling (`PERF_PROFILING=true`).
+
+When enabled, SQLAlchemy cursor events time every statement run while serving a
+request and Flask request hooks turn them into:
+
+- a `Server-Timing` header (`db` time with the query count, `app` total time), shown
+  by the browser dev tools' network panel;
+- rolling per-endpoint samples (`PERF_SAMPLE_SIZE` most recent requests) with
+  p50/p95/p99 of total time, DB time and query count, the slowest statements and the
+  statements repeated `PERF_REPEAT_THRESHOLD`+ times in one request, the usual sign
+  of an N+1 (one query per row of a list). See `/admin/perf`.
+
+Statements are grouped by their SQL text, which SQLAlchemy renders with bound
+parameter placeholders, so the same query for different rows counts as a repeat.
+Nothing is registered when profiling is off, so it then costs nothing.
+Figures are per worker process.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_SAMPLE_SIZE = 200
+DEFAULT_REPEAT_THRESHOLD = 5
+SLOWEST_KEPT = 5
+# Requests that matched no route (404s, scanners) share one bucket, so unknown
+# URLs cannot grow the per-endpoint table.
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+
+@dataclass
+class StatementStats:
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+@dataclass
+class RequestProfile:
+    started: float = field(default_factory=time.perf_counter)
+    query_count: int = 0
+    db_ms: float = 0.0
+    statements: dict[str, StatementStats] = field(default_factory=dict)
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.query_count += 1
+        self.db_ms += elapsed_ms
+        stats = self.statements.setdefault(statement, StatementStats())
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+
+
+@dataclass
+class EndpointStats:
+    """Rolling samples and findings for one endpoint."""
+    sample_size: int
+    requests: int = 0
+    durations: deque = field(init=False)
+    db_times: deque = field(init=False)
+    query_counts: deque = field(init=False)
+    slowest: list[tuple[float, str]] = field(default_factory=list)  # (ms, sql), slowest first
+    repeated: dict[str, int] = field(default_factory=dict)  # sql -> most executions in one request
+
+    def __post_init__(self):
+        self.durations = deque(maxlen=self.sample_size)
+        self.db_times = deque(maxlen=self.sample_size)
+        self.query_counts = deque(maxlen=self.sample_size)
+
+    def add(self, total_ms: float, profile: RequestProfile, repeat_threshold: int) -> None:
+        self.requests += 1
+        self.durations.append(total_ms)
+        self.db_times.append(profile.db_ms)
+        self.query_counts.append(profile.query_count)
+        for statement, stats in profile.statements.items():
+            if stats.count >= repeat_threshold:
+                self.repeated[statement] = max(self.repeated.get(statement, 0), stats.count)
+            if len(self.slowest) < SLOWEST_KEPT or stats.max_ms > self.slowest[-1][0]:
+                self.slowest = [item for item in self.slowest if item[1] != statement]
+                self.slowest.append((stats.max_ms, statement))
+                self.slowest.sort(key=lambda item: item[0], reverse=True)
+                del self.slowest[SLOWEST_KEPT:]
+
+    def summary(self) -> 'EndpointSummary':
+        return EndpointSummary(
+            requests=self.requests,
+            duration_ms=_percentiles(self.durations),
+            db_ms=_percentiles(self.db_times),
+            queries=_percentiles(self.query_counts),
+            slowest=list(self.slowest),
+            repeated=sorted(self.repeated.items(), key=lambda item: item[1], reverse=True),
+        )
+
+
+@dataclass(frozen=True)
+class EndpointSummary:
+    """Point-in-time view of an endpoint's samples; percentiles are (p50, p95, p99)."""
+    requests: int
+    duration_ms: tuple[float, float, float]
+    db_ms: tuple[float, float, float]
+    queries: tuple[float, float, float]
+    slowest: list[tuple[float, str]]
+    repeated: list[tuple[str, int]]
+
+
+def _percentiles(samples) -> tuple[float, float, float]:
+    values = sorted(samples)
+    if not values:
+        return (0.0, 0.0, 0.0)
+    last = len(values) - 1
+    return tuple(values[min(last, int(round(pct / 100 * last)))] for pct in (50, 95, 99))
+
+
+class RequestProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, EndpointStats] = {}
+        self.enabled = False
+        self.sample_size = DEFAULT_SAMPLE_SIZE
+        self.repeat_threshold = DEFAULT_REPEAT_THRESHOLD
+
+    def init_app(self, app: Flask) -> None:
+        if not app.config.get('PERF_PROFILING'):
+            return
+        self.sample_size = app.config.get('PERF_SAMPLE_SIZE', DEFAULT_SAMPLE_SIZE)
+        self.repeat_threshold = app.config.get('PERF_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)
+        if not self.enabled:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _discard_timer)
+            self.enabled = True
+        app.before_request(_start_profile)
+        app.after_request(self._finish_profile)
+
+    def _finish_profile(self, response):
+        profile: Optional[RequestProfile] = g.pop('_request_profile', None)
+        if profile is None:
+            return response
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={profile.db_ms:.1f};desc="{profile.query_count} queries", app;dur={total_ms:.1f}',
+        )
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats(self.sample_size)
+            stats.add(total_ms, profile, self.repeat_threshold)
+        return response
+
+    def endpoints(self) -> dict[str, EndpointSummary]:
+        """Per-endpoint summaries, slowest p95 first."""
+        with self._lock:
+            summaries = {endpoint: stats.summary() for endpoint, stats in self._endpoints.items()}
+        return dict(sorted(summaries.items(), key=lambda item: item[1].duration_ms[1], reverse=True))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+
+
+request_profiler = RequestProfiler()
+
+
+def _start_profile():
+    g._request_profile = RequestProfile()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_profile_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['_profile_started'].pop()
+    if has_request_context():
+        profile = g.get('_request_profile')
+        if profile is not None:
+            profile.record(statement, (time.perf_counter() - started) * 1000)
+
+
+def _discard_timer(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time.
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('_profile_started'):
+        conn.info['_profile_started'].pop()
@@ -0,0 +1,86 @@
+"""Per-process cache of `AppSettings` / `UserSettings` values.
+
+Every rendered page resolves the active theme from settings, which used to cost two
+queries per render. `AppSettings.get` and `UserSettings.get` now go through this
+cache, which keeps typed values (and misses) per process:
+
+- within `SETTINGS_CACHE_TTL` seconds of its last check the cache is trusted as is,
+  so settings lookups issue no SQL at all;
+- after that, one read of the `settings` version stamp (see `cache_versions`) either
+  confirms the cache for another TTL or drops it.
+
+`AppSettings.set` / `UserSettings.set` bump the stamp in their own transaction, so the
+writing process sees the change immediately and the others within one TTL. Code that
+changes settings rows some other way calls `invalidate_settings()`.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy.orm import Session
+
+from app.services.cache_versions import bump_on_commit, get_version, on_bump
+
+VERSION_KEY = 'settings'
+DEFAULT_TTL = 60
+
+# Loader result for "no such setting"; cached too, so absent keys are not re-queried.
+MISSING = object()
+_UNSET = object()
+
+
+class SettingsCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: dict[Hashable, Any] = {}
+        self._version: Optional[int] = None
+        self._checked_at: Optional[float] = None
+
+    def get(self, key: Hashable, loader: Callable[[], Any], default=None) -> Any:
+        """Cached value for `key`; `loader` returns the value or `MISSING`."""
+        self._revalidate()
+        with self._lock:
+            value = self._values.get(key, _UNSET)
+            version = self._version
+        if value is _UNSET:
+            value = loader()
+            with self._lock:
+                # Dropped if the cache was invalidated while loading.
+                if version == self._version:
+                    self._values[key] = value
+        return default if value is MISSING else value
+
+    def _revalidate(self) -> None:
+        ttl = current_app.config.get('SETTINGS_CACHE_TTL', DEFAULT_TTL) if has_app_context() else DEFAULT_TTL
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < ttl:
+            return
+        version = get_version(VERSION_KEY)
+        with self._lock:
+            if version != self._version:
+                self._values.clear()
+                self._version = version
+            self._checked_at = now
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._version = None
+            self._checked_at = None
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+settings_cache = SettingsCache()
+
+on_bump(VERSION_KEY, settings_cache.clear)
+
+
+def invalidate_settings(session: Optional[Session] = None) -> None:
+    """Drop cached settings in every process when the current transaction commits."""
+    bump_on_commit(VERSION_KEY, session)
@@ -0,0 +1,99 @@
+"""Per-process cache of the logged-in user for Flask-Login's `user_loader`.
+
+Every request (AJAX search and chart endpoints included) used to load its user row.
+The cache keeps a compact record per user (id, username, role, active flag, security
+version, ...; not the password hash) and rebuilds a detached `User` from it, handed
+to the session with `merge(load=False)`, which issues no SQL.
+
+Records are tagged with the `users` version stamp, bumped by every committed write to
+`users`, so a deactivation, role or password change or a deletion reaches all workers
+on their next request. The session token carries the user's `security_version`
+(bumped on password, role and active-flag changes), so sessions issued before such
+a change stop authenticating everywhere at once.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app import db
+from app.models.user import User
+from app.services.cache_versions import bump_on_write, get_version, on_bump
+
+VERSION_KEY = 'users'
+
+# Columns kept per user; anything else (the password hash) loads on access.
+_CACHED_COLUMNS = tuple(
+    attr.key for attr in inspect(User).column_attrs if attr.key != 'password_hash'
+)
+
+
+class UserCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._records: dict[int, dict] = {}
+
+    def get(self, user_id: int) -> Optional[User]:
+        """The user with `user_id`, or None if there is no such user."""
+        session = db.session()
+        existing = session.identity_map.get(inspect(User).identity_key_from_primary_key((user_id,)))
+        if existing is not None:
+            return existing
+
+        version = get_version(VERSION_KEY)
+        with self._lock:
+            if self._version != version:
+                self._records.clear()
+                self._version = version
+            record = self._records.get(user_id)
+
+        if record is None:
+            user = session.get(User, user_id)
+            if user is not None:
+                with self._lock:
+                    if self._version == version:
+                        self._records[user_id] = {key: getattr(user, key) for key in _CACHED_COLUMNS}
+            return user
+
+        user = User(**record)
+        make_transient_to_detached(user)
+        return session.merge(user, load=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._version = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+user_cache = UserCache()
+
+on_bump(VERSION_KEY, user_cache.clear)
+bump_on_write(VERSION_KEY, User)
+
+
+def parse_session_token(token: str) -> tuple[Optional[int], int]:
+    """`'<id>:<security_version>'` -> (id, version); tokens from before versioning count as version 0."""
+    user_id, _, version = str(token).partition(':')
+    try:
+        return int(user_id), int(version or 0)
+    except ValueError:
+        return None, 0
+
+
+def load_session_user(token: str) -> Optional[User]:
+    """The active user a session token belongs to, or None if it was revoked."""
+    user_id, security_version = parse_session_token(token)
+    if user_id is None:
+        return None
+    user = user_cache.get(user_id)
+    if user is None or not user.is_active or (user.security_version or 0) != security_version:
+        return None
+    return user
@@ -1,22 +1,68 @@
 """
 WhatsApp Business Integration Service
 Supports multiple providers: Twilio, Gupshup, Interakt
+
+WhatsAppService(queued=True) puts messages in the notification outbox instead of
+calling the provider; `flask notifications worker` sends them.
+
+Provider HTTP calls go through one keep-alive session per provider, shared by all
+threads in the process, so consecutive messages reuse the TLS connection instead of
+handshaking per message. send_bulk_message sends on a thread pool.
 """
 import requests
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app, url_for
 from datetime import datetime
 import json
+from requests.adapters import HTTPAdapter
+
+from app.services.notification_outbox import RateLimiter, enqueue_whatsapp
 
 logger = logging.getLogger(__name__)
 
+_http_sessions = {}
+_twilio_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _http_session(provider, pool_size):
+    """Keep-alive requests session for a provider (shared across threads)"""
+    with _clients_lock:
+        session = _http_sessions.get(provider)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_sessions[provider] = session
+        return session
+
+
+def _twilio_client(account_sid, auth_token):
+    """Twilio client per account; it keeps its own pooled HTTP session"""
+    from twilio.rest import Client
+
+    with _clients_lock:
+        client = _twilio_clients.get((account_sid, auth_token))
+        if client is None:
+            client = Client(account_sid, auth_token)
+            _twilio_clients[(account_sid, auth_token)] = client
+        return client
+
 
 class WhatsAppService:
     """WhatsApp Business API Service"""
     
-    def __init__(self):
+    def __init__(self, queued=False):
+        self.queued = queued
         self.provider = current_app.config.get('WHATSAPP_PROVIDER', 'twilio')
         self.enabled = current_app.config.get('WHATSAPP_ENABLED', False)
+        self.timeout = current_app.config.get('WHATSAPP_TIMEOUT', 15)
+        self.pool_size = current_app.config.get('WHATSAPP_POOL_SIZE', 16)
+        self.bulk_concurrency = current_app.config.get('WHATSAPP_BULK_CONCURRENCY', 8)
+        self.rate_limit = current_app.config.get('NOTIFICATION_RATE_LIMITS', {}).get(self.provider)
         
         # Provider-specific configuration
         if self.provider == 'twilio':
@@ -26,6 +72,7 @@ class WhatsAppService:
         elif self.provider == 'gupshup':
             self.api_key = current_app.config.get('GUPSHUP_API_KEY')
             self.app_name = current_app.config.get('GUPSHUP_APP_NAME')
+            self.api_url = current_app.config.get('GUPSHUP_API_URL', 'https://api.gupshup.io/sm/api/v1/msg')
         elif self.provider == 'interakt':
             self.api_key = current_app.config.get('INTERAKT_API_KEY')
             self.base_url = current_app.config.get('INTERAKT_BASE_URL', 'https://api.interakt.ai/v1')
@@ -92,9 +139,7 @@ class WhatsAppService:
     def _send_twilio(self, to, message, media_url=None):
         """Send message via Twilio"""
         try:
-            from twilio.rest import Client
-            
-            client = Client(self.account_sid, self.auth_token)
+            client = _twilio_client(self.account_sid, self.auth_token)
             
             params = {
                 'from_': f'whatsapp:{self.from_number}',
@@ -117,7 +162,7 @@ class WhatsAppService:
     def _send_gupshup(self, to, message, media_url=None):
         """Send message via Gupshup"""
         try:
-            url = "https://api.gupshup.io/sm/api/v1/msg"
+            url = self.api_url
             
             headers = {
                 'apikey': self.api_key,
@@ -132,7 +177,7 @@ class WhatsAppService:
                 'src.name': self.app_name
             }
             
-            response = requests.post(url, headers=headers, data=data)
+            response = _http_session('gupshup', self.pool_size).post(url, headers=headers, data=data, timeout=self.timeout)
             
             if response.status_code == 200:
                 result = response.json()
@@ -172,7 +217,7 @@ class WhatsAppService:
                     'filename': 'document.pdf'
                 }
             
-            response = requests.post(url, headers=headers, json=data)
+            response = _http_session('interakt', self.pool_size).post(url, headers=headers, json=data, timeout=self.timeout)
             
             if response.status_code == 200:
                 result = response.json()
@@ -210,6 +255,27 @@ class WhatsAppService:
             logger.error(f"Unknown provider: {self.provider}")
             return False, "Unknown provider"
     
+    def queue_message(self, phone, message, media_url=None):
+        """Add message to the notification outbox; sent after the caller commits"""
+        if not self.enabled:
+            return False, "WhatsApp disabled"
+
+        missing = self.missing_env_keys()
+        if missing:
+            return False, f"Missing required config: {', '.join(missing)}"
+
+        if not self._format_phone(phone):
+            return False, "No phone number"
+
+        enqueue_whatsapp(phone, message, media_url)
+        return True, None
+
+    def _deliver(self, phone, message, media_url=None):
+        """Queue or send, per self.queued"""
+        if self.queued:
+            return self.queue_message(phone, message, media_url)
+        return self.send_message(phone, message, media_url)
+    
     def send_order_confirmation(self, order):
         """Send order confirmation message"""
         try:
@@ -231,7 +297,7 @@ Thank you for your order! 🙏
 📞 9262650010
 Mohi Industries"""
             
-            return self.send_message(order.distributor.phone, message)
+            return self._deliver(order.distributor.phone, message)
             
         except Exception as e:
             logger.error(f"Error sending order confirmation: {str(e)}")
@@ -255,7 +321,7 @@ Thank you for your business! 🙏
 📞 9262650010
 Mohi Industries"""
             
-            return self.send_message(order.distributor.phone, message, pdf_url)
+            return self._deliver(order.distributor.phone, message, pdf_url)
             
         except Exception as e:
             logger.error(f"Error sending invoice: {str(e)}")
@@ -289,7 +355,7 @@ Branch: Hajipur
 📞 9262650010
 Mohi Industries"""
             
-            return self.send_message(distributor.phone, message)
+            return self._deliver(distributor.phone, message)
             
         except Exception as e:
             logger.error(f"Error sending payment reminder: {str(e)}")
@@ -314,7 +380,7 @@ For queries, call:
 Thank you! 🙏
 Mohi Industries"""
             
-            return self.send_message(order.distributor.phone, message)
+            return self._deliver(order.distributor.phone, message)
             
         except Exception as e:
             logger.error(f"Error sending delivery update: {str(e)}")
@@ -345,7 +411,7 @@ Example: Bread 400g, 50 pcs
 Thank you! 🙏
 Mohi Industries"""
             
-            return self.send_message(distributor.phone, message)
+            return self._deliver(distributor.phone, message)
             
         except Exception as e:
             logger.error(f"Error sending product availability: {str(e)}")
@@ -371,7 +437,7 @@ Order now!
 Thank you! 🙏
 Mohi Industries"""
             
-            return self.send_message(distributor.phone, message)
+            return self._deliver(distributor.phone, message)
             
         except Exception as e:
             logger.error(f"Error sending new product launch: {str(e)}")
@@ -395,26 +461,51 @@ Please clear pending payments to continue ordering.
 📞 9262650010
 Mohi Industries"""
             
-            return self.send_message(distributor.phone, message)
+            return self._deliver(distributor.phone, message)
             
         except Exception as e:
             logger.error(f"Error sending credit limit warning: {str(e)}")
             return False, str(e)
     
-    def send_bulk_message(self, distributors, message):
-        """Send bulk message to multiple distributors"""
-        results = []
+    def send_many(self, messages, concurrency=None):
+        """Send (phone, message[, media_url]) tuples concurrently
+
+        Uses up to WHATSAPP_BULK_CONCURRENCY threads, paced to the provider's
+        NOTIFICATION_RATE_LIMITS rate. Returns (success, message_id_or_error) per
+        message, in order.
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+
+        limiter = RateLimiter({self.provider: self.rate_limit} if self.rate_limit else {})
+
+        def send(item):
+            limiter.wait(self.provider)
+            return self.send_message(*item)
+
+        workers = max(1, min(concurrency or self.bulk_concurrency, len(messages)))
+        with ThreadPoolExecutor(workers, thread_name_prefix='whatsapp') as pool:
+            return list(pool.map(send, messages))
+
+    def send_bulk_message(self, distributors, message, concurrency=None):
+        """Send bulk message to multiple distributors (concurrently unless queued)"""
+        recipients = [(distributor.business_name, distributor.phone) for distributor in distributors]
+        
+        if self.queued:
+            outcomes = [self._deliver(phone, message) for _, phone in recipients]
+        else:
+            outcomes = self.send_many([(phone, message) for _, phone in recipients], concurrency)
         
-        for distributor in distributors:
-            success, msg_id = self.send_message(distributor.phone, message)
-            results.append({
-                'distributor': distributor.business_name,
-                'phone': distributor.phone,
+        return [
+            {
+                'distributor': name,
+                'phone': phone,
                 'success': success,
                 'message_id': msg_id
-            })
-        
-        return results
+            }
+            for (name, phone), (success, msg_id) in zip(recipients, outcomes)
+        ]
     
     def send_festival_offer(self, distributor, offer_details):
         """Send festival offer message"""
@@ -434,7 +525,7 @@ Order now!
 Thank you! 🙏
 Mohi Industries"""
             
-            return self.send_message(distributor.phone, message)
+            return self._deliver(distributor.phone, message)
             
         except Exception as e:
             logger.error(f"Error sending festival offer: {str(e)}")
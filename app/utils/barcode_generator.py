@@ -5,7 +5,101 @@ import barcode
 from barcode.writer import ImageWriter, SVGWriter
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont
+from collections import OrderedDict
+import functools
+import hashlib
 import os
+import threading
+
+
+# Label fonts: name -> (TrueType file, size)
+LABEL_FONTS = {
+    'company': ('arialbd.ttf', 20),  # Bold for company
+    'title': ('arialbd.ttf', 24),    # Bold for product
+    'mrp': ('arialbd.ttf', 32),      # Large bold for MRP
+    'normal': ('arial.ttf', 16),
+    'small': ('arial.ttf', 12),
+    'tiny': ('arial.ttf', 10),
+}
+LABEL_COMPANY_NAME = "MOHI INDUSTRIES"
+LABEL_COMPANY_DETAILS = [
+    "FSSAI Lic: 12345678901234",
+    "Mfd by: Mohi Industries",
+    "B-61, P-1, BIADA, Hajipur,",
+    "Vaishali, Bihar - 844102",
+    "Customer Care: 1800-XXX-XXXX"
+]
+LABEL_BODY_TOP = 60  # below the company header and separator
+LABEL_CACHE_SIZE = 256  # finished label and barcode PNGs kept per process
+LABEL_RENDER_VERSION = 1  # part of every cache key / ETag; bump when the label or barcode drawing changes
+
+_png_cache = OrderedDict()
+_png_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _label_fonts():
+    """Label fonts, loaded from disk once per process (PIL default if Arial is missing)"""
+    try:
+        return {name: ImageFont.truetype(path, size) for name, (path, size) in LABEL_FONTS.items()}
+    except OSError:
+        default = ImageFont.load_default()
+        return dict.fromkeys(LABEL_FONTS, default)
+
+
+def _draw_centered(draw, center_x, y, text, font, fill):
+    bbox = draw.textbbox((0, 0), text, font=font)
+    draw.text((center_x - (bbox[2] - bbox[0])//2, y), text, fill=fill, font=font)
+
+
+@functools.lru_cache(maxsize=16)
+def _label_template(width, height):
+    """Blank label of this size with the company header and separator (copy before drawing)"""
+    img = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(img)
+    _draw_centered(draw, width // 2, 15, LABEL_COMPANY_NAME, _label_fonts()['company'], 'black')
+    draw.line([(20, 45), (width-20, 45)], fill='#d00000', width=2)
+    return img
+
+
+@functools.lru_cache(maxsize=16)
+def _label_footer(width, height):
+    """Mask of the company details footer for this label size"""
+    mask = Image.new('L', (width, height), 0)
+    draw = ImageDraw.Draw(mask)
+    y_offset = height - 120  # Fixed position from bottom
+    for detail in LABEL_COMPANY_DETAILS:
+        _draw_centered(draw, width // 2, y_offset, detail, _label_fonts()['tiny'], 255)
+        y_offset += 12
+    return mask
+
+
+def _cached_png(key, render):
+    """PNG bytes for `key` from the process LRU, rendering them with `render()` on a miss"""
+    with _png_cache_lock:
+        png = _png_cache.get(key)
+        if png is not None:
+            _png_cache.move_to_end(key)
+            return png
+    
+    png = render()
+    with _png_cache_lock:
+        _png_cache[key] = png
+        while len(_png_cache) > LABEL_CACHE_SIZE:
+            _png_cache.popitem(last=False)
+    return png
+
+
+def _fields_key(*fields):
+    return hashlib.sha1(repr((LABEL_RENDER_VERSION,) + fields).encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=128)
+def _fitted_barcode(ean_code, width):
+    """Barcode image for `ean_code` scaled to `width` pixels (shared; paste, don't draw on it)"""
+    barcode_img = Image.open(BarcodeGenerator.generate_barcode_image(ean_code))
+    height = int(barcode_img.height * (width / barcode_img.width))
+    return barcode_img.resize((width, height), Image.Resampling.LANCZOS)
 
 
 class BarcodeGenerator:
@@ -112,6 +206,10 @@ class BarcodeGenerator:
         Generate professional retail product label with barcode, MRP, batch info
         Meets Indian retail standards (FSSAI, Legal Metrology Act)
         
+        Fonts, the static header/footer per label size and scaled barcodes are
+        cached per process; only the product and batch fields are drawn per call.
+        Use `product_label_png` when PNG bytes are wanted (cached labels).
+        
         Args:
             product: Product model instance
             batch: Optional Batch model instance
@@ -121,42 +219,14 @@ class BarcodeGenerator:
             PIL Image object
         """
         width, height = label_size
-        
-        # Create white background
-        img = Image.new('RGB', (width, height), 'white')
-        draw = ImageDraw.Draw(img)
-        
-        # Try to load fonts with fallback
-        try:
-            # Professional fonts for retail labels
-            company_font = ImageFont.truetype("arialbd.ttf", 20)  # Bold for company
-            title_font = ImageFont.truetype("arialbd.ttf", 24)    # Bold for product
-            mrp_font = ImageFont.truetype("arialbd.ttf", 32)      # Large bold for MRP
-            normal_font = ImageFont.truetype("arial.ttf", 16)
-            small_font = ImageFont.truetype("arial.ttf", 12)
-            tiny_font = ImageFont.truetype("arial.ttf", 10)
-        except:
-            # Fallback to default
-            company_font = ImageFont.load_default()
-            title_font = ImageFont.load_default()
-            mrp_font = ImageFont.load_default()
-            normal_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-            tiny_font = ImageFont.load_default()
-        
-        y_offset = 15
         center_x = width // 2
+        fonts = _label_fonts()
+        small_font = fonts['small']
         
-        # === COMPANY HEADER ===
-        company_name = "MOHI INDUSTRIES"
-        bbox = draw.textbbox((0, 0), company_name, font=company_font)
-        text_width = bbox[2] - bbox[0]
-        draw.text((center_x - text_width//2, y_offset), company_name, fill='black', font=company_font)
-        y_offset += 30
-        
-        # Separator line
-        draw.line([(20, y_offset), (width-20, y_offset)], fill='#d00000', width=2)
-        y_offset += 15
+        # Static header and separator come pre-rendered for this size
+        img = _label_template(width, height).copy()
+        draw = ImageDraw.Draw(img)
+        y_offset = LABEL_BODY_TOP
         
         # === PRODUCT NAME ===
         product_name = product.name
@@ -171,35 +241,26 @@ class BarcodeGenerator:
                 else:
                     line2 += word + " "
             
-            bbox = draw.textbbox((0, 0), line1.strip(), font=title_font)
-            text_width = bbox[2] - bbox[0]
-            draw.text((center_x - text_width//2, y_offset), line1.strip(), fill='black', font=title_font)
+            _draw_centered(draw, center_x, y_offset, line1.strip(), fonts['title'], 'black')
             y_offset += 28
             
             if line2:
-                bbox = draw.textbbox((0, 0), line2.strip(), font=title_font)
-                text_width = bbox[2] - bbox[0]
-                draw.text((center_x - text_width//2, y_offset), line2.strip(), fill='black', font=title_font)
+                _draw_centered(draw, center_x, y_offset, line2.strip(), fonts['title'], 'black')
                 y_offset += 28
         else:
-            bbox = draw.textbbox((0, 0), product_name, font=title_font)
-            text_width = bbox[2] - bbox[0]
-            draw.text((center_x - text_width//2, y_offset), product_name, fill='black', font=title_font)
+            _draw_centered(draw, center_x, y_offset, product_name, fonts['title'], 'black')
             y_offset += 30
         
         # === PACK SIZE ===
         if product.pack_size:
-            pack_text = f"Net Wt: {product.pack_size}"
-            bbox = draw.textbbox((0, 0), pack_text, font=normal_font)
-            text_width = bbox[2] - bbox[0]
-            draw.text((center_x - text_width//2, y_offset), pack_text, fill='black', font=normal_font)
+            _draw_centered(draw, center_x, y_offset, f"Net Wt: {product.pack_size}", fonts['normal'], 'black')
             y_offset += 25
         
         y_offset += 10
         
         # === MRP (PROMINENT) ===
         mrp_text = f"MRP: ₹{product.mrp:.2f}"
-        bbox = draw.textbbox((0, 0), mrp_text, font=mrp_font)
+        bbox = draw.textbbox((0, 0), mrp_text, font=fonts['mrp'])
         text_width = bbox[2] - bbox[0]
         # MRP box with border
         mrp_box_padding = 10
@@ -210,31 +271,20 @@ class BarcodeGenerator:
             y_offset + 35
         ]
         draw.rectangle(mrp_box, outline='#d00000', width=3)
-        draw.text((center_x - text_width//2, y_offset), mrp_text, fill='#d00000', font=mrp_font)
+        draw.text((center_x - text_width//2, y_offset), mrp_text, fill='#d00000', font=fonts['mrp'])
         y_offset += 45
         
         # Legal requirement
-        incl_text = "(Incl. of all taxes)"
-        bbox = draw.textbbox((0, 0), incl_text, font=small_font)
-        text_width = bbox[2] - bbox[0]
-        draw.text((center_x - text_width//2, y_offset), incl_text, fill='gray', font=small_font)
+        _draw_centered(draw, center_x, y_offset, "(Incl. of all taxes)", small_font, 'gray')
         y_offset += 25
         
         # === BARCODE ===
         if product.ean_barcode:
             try:
-                barcode_img_io = BarcodeGenerator.generate_barcode_image(product.ean_barcode)
-                barcode_img = Image.open(barcode_img_io)
-                
-                # Resize barcode to fit label (standard size)
-                barcode_width = width - 40
-                barcode_height = int(barcode_img.height * (barcode_width / barcode_img.width))
-                barcode_img = barcode_img.resize((barcode_width, barcode_height), Image.Resampling.LANCZOS)
-                
-                # Center barcode
-                barcode_x = (width - barcode_width) // 2
-                img.paste(barcode_img, (barcode_x, y_offset))
-                y_offset += barcode_height + 10
+                # Standard size: label width less margins, centered
+                barcode_img = _fitted_barcode(product.ean_barcode, width - 40)
+                img.paste(barcode_img, ((width - barcode_img.width) // 2, y_offset))
+                y_offset += barcode_img.height + 10
             except Exception as e:
                 draw.text((20, y_offset), f"Barcode error: {str(e)}", fill='red', font=small_font)
                 y_offset += 20
@@ -247,7 +297,6 @@ class BarcodeGenerator:
         # === BATCH INFORMATION ===
         if batch:
             # Batch box
-            batch_y_start = y_offset
             draw.rectangle([(15, y_offset), (width-15, y_offset + 75)], outline='#333', width=1)
             y_offset += 8
             
@@ -260,28 +309,60 @@ class BarcodeGenerator:
             for info in batch_info:
                 draw.text((25, y_offset), info, fill='black', font=small_font)
                 y_offset += 20
-            
-            y_offset += 10
         
         # === COMPANY DETAILS (Footer) ===
-        y_offset = height - 120  # Fixed position from bottom
-        
-        company_details = [
-            "FSSAI Lic: 12345678901234",
-            "Mfd by: Mohi Industries",
-            "B-61, P-1, BIADA, Hajipur,",
-            "Vaishali, Bihar - 844102",
-            "Customer Care: 1800-XXX-XXXX"
-        ]
-        
-        for detail in company_details:
-            bbox = draw.textbbox((0, 0), detail, font=tiny_font)
-            text_width = bbox[2] - bbox[0]
-            draw.text((center_x - text_width//2, y_offset), detail, fill='#333', font=tiny_font)
-            y_offset += 12
+        # Pre-rendered text mask, stamped last so it stays on top as before
+        img.paste('#333', (0, 0), _label_footer(width, height))
         
         return img
     
+    @staticmethod
+    def label_key(product, batch=None, label_size=(400, 600)):
+        """
+        Hash of everything printed on a label
+        
+        Two labels with the same key are identical images, so it serves as the
+        cache key of `product_label_png` and as the label's HTTP ETag. Editing
+        any printed field changes the key.
+        """
+        return _fields_key(
+            'label',
+            product.name, product.pack_size, f"{product.mrp:.2f}", product.ean_barcode,
+            batch.batch_number if batch else None,
+            batch.manufacturing_date.isoformat() if batch else None,
+            batch.expiry_date.isoformat() if batch else None,
+            tuple(label_size),
+        )
+    
+    @staticmethod
+    def product_label_png(product, batch=None, label_size=(400, 600)):
+        """
+        Product label as PNG bytes, cached per process
+        
+        Same arguments as `generate_product_label`. The last LABEL_CACHE_SIZE
+        labels and barcodes are kept, keyed by `label_key`, so reprints and
+        label sheets only render a label once.
+        """
+        def render():
+            output = BytesIO()
+            BarcodeGenerator.generate_product_label(product, batch, label_size).save(output, 'PNG')
+            return output.getvalue()
+        
+        return _cached_png(BarcodeGenerator.label_key(product, batch, label_size), render)
+    
+    @staticmethod
+    def barcode_key(ean_code):
+        """Cache key / HTTP ETag of the PNG from `barcode_png`"""
+        return _fields_key('barcode', ean_code)
+    
+    @staticmethod
+    def barcode_png(ean_code):
+        """`generate_barcode_image` PNG bytes, cached per process like labels"""
+        return _cached_png(
+            BarcodeGenerator.barcode_key(ean_code),
+            lambda: BarcodeGenerator.generate_barcode_image(ean_code).getvalue(),
+        )
+
     @staticmethod
     def generate_next_product_code(company_prefix, last_product_code=None):
         """
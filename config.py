@@ -74,6 +74,11 @@ class Config:
     # Barcode / EAN-13
     # Set this to your GS1 company prefix (7-9 digits). For internal testing you can keep a dummy.
     BARCODE_COMPANY_PREFIX = os.environ.get('BARCODE_COMPANY_PREFIX', '890123456')
+
+    # Label print jobs (/barcode/print-job): large jobs are rendered in chunks by a process pool
+    LABEL_PRINT_WORKERS = int(os.environ.get('LABEL_PRINT_WORKERS', min(4, os.cpu_count() or 1)))  # 1 = in-process
+    LABEL_PRINT_PAGES_PER_CHUNK = int(os.environ.get('LABEL_PRINT_PAGES_PER_CHUNK', 25))
+    LABEL_PRINT_MAX_LABELS = int(os.environ.get('LABEL_PRINT_MAX_LABELS', 20000))
     
     # GST Rates (can be configured)
     GST_RATES = {
@@ -91,6 +96,37 @@ class Config:
     MIN_ORDER_VALUE = 25000  # Minimum order ₹25,000
     DISTRIBUTOR_MARGIN_MIN = 12
     DISTRIBUTOR_MARGIN_MAX = 18
+
+    # Invoice PDF exports (background jobs from /orders, `flask invoices export`)
+    INVOICE_PDF_WORKERS = int(os.environ.get('INVOICE_PDF_WORKERS', min(4, os.cpu_count() or 1)))  # render processes
+    INVOICE_PDF_CHUNK = int(os.environ.get('INVOICE_PDF_CHUNK', 25))  # invoices per worker task
+    INVOICE_EXPORT_MAX = int(os.environ.get('INVOICE_EXPORT_MAX', 2000))  # per web export job; the CLI has no limit
+    INVOICE_EXPORT_DIR = os.environ.get('INVOICE_EXPORT_DIR')  # default: <instance>/invoice_exports
+    INVOICE_EXPORT_RETENTION_HOURS = float(os.environ.get('INVOICE_EXPORT_RETENTION_HOURS', 24))
+    INVOICE_EXPORT_STALE_SECONDS = int(os.environ.get('INVOICE_EXPORT_STALE_SECONDS', 600))  # no progress = interrupted
+
+    # Ledger rebuild (partitioned by month, one process per partition)
+    LEDGER_REBUILD_WORKERS = int(os.environ.get('LEDGER_REBUILD_WORKERS', 4))
+    # A running partition with no heartbeat for this long is treated as interrupted (worker restart).
+    # SQLite can't record progress mid-partition, so keep this above the longest month there.
+    LEDGER_REBUILD_STALE_SECONDS = int(os.environ.get('LEDGER_REBUILD_STALE_SECONDS', 900))
+
+    # Computed financial statements kept per process (LRU, keyed by ledger version)
+    REPORT_CACHE_SIZE = int(os.environ.get('REPORT_CACHE_SIZE', 128))
+
+    # AR/AP aging bucket upper bounds in days (30,60,90 -> 0-30, 31-60, 61-90, 90+)
+    AGING_BUCKETS = tuple(int(days) for days in os.environ.get('AGING_BUCKETS', '30,60,90').split(','))
+
+    # Dashboard KPI snapshot: recomputed when older than this (seconds) or after order/payment changes
+    KPI_SNAPSHOT_MAX_AGE = int(os.environ.get('KPI_SNAPSHOT_MAX_AGE', 300))
+
+    # App/user settings cached per process; other processes pick up changes within this many seconds
+    SETTINGS_CACHE_TTL = int(os.environ.get('SETTINGS_CACHE_TTL', 60))
+
+    # Request SQL profiling (Server-Timing header, /admin/perf); off by default
+    PERF_PROFILING = os.environ.get('PERF_PROFILING', 'false').lower() in ['true', 'on', '1']
+    PERF_SAMPLE_SIZE = int(os.environ.get('PERF_SAMPLE_SIZE', 200))  # recent requests kept per endpoint
+    PERF_REPEAT_THRESHOLD = int(os.environ.get('PERF_REPEAT_THRESHOLD', 5))  # same statement this often = likely N+1
     
     # Email Configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -106,9 +142,30 @@ class Config:
     SEND_ORDER_CONFIRMATIONS = os.environ.get('SEND_ORDER_CONFIRMATIONS', 'true').lower() in ['true', 'on', '1']
     PAYMENT_REMINDER_DAYS = int(os.environ.get('PAYMENT_REMINDER_DAYS', 7))  # Days after due date
 
+    # Notification outbox worker (`flask notifications worker`)
+    NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', 8))  # concurrent sends per worker process
+    NOTIFICATION_MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_MAX_ATTEMPTS', 6))  # then dead-lettered
+    NOTIFICATION_RETRY_BASE = int(os.environ.get('NOTIFICATION_RETRY_BASE', 30))  # seconds, doubled per attempt
+    NOTIFICATION_RETRY_MAX = int(os.environ.get('NOTIFICATION_RETRY_MAX', 3600))
+    NOTIFICATION_LEASE = int(os.environ.get('NOTIFICATION_LEASE', 300))  # claimed messages are retried after this
+    NOTIFICATION_POLL_INTERVAL = float(os.environ.get('NOTIFICATION_POLL_INTERVAL', 2))
+    NOTIFICATION_EMAIL_BATCH = int(os.environ.get('NOTIFICATION_EMAIL_BATCH', 20))  # emails per SMTP connection
+    # Messages per second per provider (provider=rate,...)
+    NOTIFICATION_RATE_LIMITS = {
+        provider.strip(): float(rate)
+        for provider, rate in (
+            item.split('=') for item in os.environ.get(
+                'NOTIFICATION_RATE_LIMITS', 'twilio=10,gupshup=20,interakt=10,smtp=5'
+            ).split(',')
+        )
+    }
+
     # WhatsApp Configuration
     WHATSAPP_ENABLED = os.environ.get('WHATSAPP_ENABLED', 'false').lower() in ['true', 'on', '1']
     WHATSAPP_PROVIDER = os.environ.get('WHATSAPP_PROVIDER', 'twilio')
+    WHATSAPP_TIMEOUT = int(os.environ.get('WHATSAPP_TIMEOUT', 15))  # seconds per provider request
+    WHATSAPP_POOL_SIZE = int(os.environ.get('WHATSAPP_POOL_SIZE', 16))  # kept-alive connections per provider
+    WHATSAPP_BULK_CONCURRENCY = int(os.environ.get('WHATSAPP_BULK_CONCURRENCY', 8))  # parallel sends in bulk messages
     
     # Twilio Configuration
     TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
@@ -118,6 +175,7 @@ class Config:
     # Gupshup Configuration
     GUPSHUP_API_KEY = os.environ.get('GUPSHUP_API_KEY')
     GUPSHUP_APP_NAME = os.environ.get('GUPSHUP_APP_NAME', 'MohiIndustries')
+    GUPSHUP_API_URL = os.environ.get('GUPSHUP_API_URL', 'https://api.gupshup.io/sm/api/v1/msg')
     
     # Interakt Configuration
     INTERAKT_API_KEY = os.environ.get('INTERAKT_API_KEY')
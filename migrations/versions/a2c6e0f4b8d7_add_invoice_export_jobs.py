@@ -0,0 +1,42 @@
+"""add invoice export jobs
+
+Revision ID: a2c6e0f4b8d7
+Revises: f3a1c7e5b9d8
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2c6e0f4b8d7'
+down_revision = 'f3a1c7e5b9d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'invoice_export_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('invoices_total', sa.Integer(), nullable=True),
+        sa.Column('invoices_done', sa.Integer(), nullable=True),
+        sa.Column('failed', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('file_path', sa.String(length=500), nullable=True),
+        sa.Column('filename', sa.String(length=100), nullable=True),
+        sa.Column('created_by', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('invoice_export_jobs')
@@ -0,0 +1,24 @@
+"""seed the ledger cache version
+
+Revision ID: a8d3f5b7c9e1
+Revises: f7c2d4e8a1b6
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d3f5b7c9e1'
+down_revision = 'f7c2d4e8a1b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("INSERT INTO cache_versions (key, version) VALUES ('ledger', 0)")
+
+
+def downgrade():
+    op.execute("DELETE FROM cache_versions WHERE key = 'ledger'")
@@ -0,0 +1,41 @@
+"""add kpi snapshots
+
+Revision ID: b3e7a9c1d5f2
+Revises: a8d3f5b7c9e1
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e7a9c1d5f2'
+down_revision = 'a8d3f5b7c9e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'kpi_snapshots',
+        sa.Column('key', sa.String(length=64), primary_key=True),
+        sa.Column('total_distributors', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_products', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pending_orders', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sales_last_30d', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('total_receivable', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('total_collected', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('avg_satisfaction', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('source_version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('computed_at', sa.DateTime(), nullable=True),
+    )
+    # Seeded empty (computed_at NULL): the first dashboard load fills it in.
+    op.execute("INSERT INTO kpi_snapshots (key) VALUES ('dashboard')")
+    op.execute("INSERT INTO cache_versions (key, version) VALUES ('dashboard_kpis', 0)")
+
+
+def downgrade():
+    op.execute("DELETE FROM cache_versions WHERE key = 'dashboard_kpis'")
+    op.drop_table('kpi_snapshots')
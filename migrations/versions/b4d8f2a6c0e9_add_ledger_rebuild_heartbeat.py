@@ -0,0 +1,25 @@
+"""add ledger rebuild partition heartbeat
+
+Revision ID: b4d8f2a6c0e9
+Revises: a2c6e0f4b8d7
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d8f2a6c0e9'
+down_revision = 'a2c6e0f4b8d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('ledger_rebuild_partitions', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('ledger_rebuild_partitions', 'heartbeat_at')
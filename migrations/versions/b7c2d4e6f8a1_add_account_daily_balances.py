@@ -0,0 +1,46 @@
+"""add account daily balances rollup
+
+Revision ID: b7c2d4e6f8a1
+Revises: 4f0775cc462c
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c2d4e6f8a1'
+down_revision = '4f0775cc462c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'account_daily_balances',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('account_id', sa.Integer(), sa.ForeignKey('accounts.id'), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('debit', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('credit', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.UniqueConstraint('account_id', 'date', name='uq_account_daily_balance'),
+    )
+    op.create_index('idx_account_daily_balance_date', 'account_daily_balances', ['date'], unique=False)
+
+    # Backfill from the existing ledger.
+    op.execute(
+        """
+        INSERT INTO account_daily_balances (account_id, date, debit, credit)
+        SELECT account_id, entry_date, COALESCE(SUM(debit), 0), COALESCE(SUM(credit), 0)
+        FROM accounting_entries
+        WHERE account_id IS NOT NULL
+        GROUP BY account_id, entry_date
+        """
+    )
+
+
+def downgrade():
+    op.drop_index('idx_account_daily_balance_date', table_name='account_daily_balances')
+    op.drop_table('account_daily_balances')
@@ -0,0 +1,59 @@
+"""add ledger rebuild jobs
+
+Revision ID: c4e8f1a2b3d5
+Revises: b7c2d4e6f8a1
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8f1a2b3d5'
+down_revision = 'b7c2d4e6f8a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ledger_rebuild_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('include_orders', sa.Boolean(), nullable=True),
+        sa.Column('include_payments', sa.Boolean(), nullable=True),
+        sa.Column('include_expenses', sa.Boolean(), nullable=True),
+        sa.Column('include_vendor', sa.Boolean(), nullable=True),
+        sa.Column('dry_run', sa.Boolean(), nullable=True),
+        sa.Column('workers', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_by', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'ledger_rebuild_partitions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('job_id', sa.Integer(), sa.ForeignKey('ledger_rebuild_jobs.id'), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('docs_total', sa.Integer(), nullable=True),
+        sa.Column('docs_done', sa.Integer(), nullable=True),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_ledger_rebuild_partitions_job_id', 'ledger_rebuild_partitions', ['job_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_ledger_rebuild_partitions_job_id', table_name='ledger_rebuild_partitions')
+    op.drop_table('ledger_rebuild_partitions')
+    op.drop_table('ledger_rebuild_jobs')
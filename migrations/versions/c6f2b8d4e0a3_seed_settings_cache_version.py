@@ -0,0 +1,24 @@
+"""seed the settings cache version
+
+Revision ID: c6f2b8d4e0a3
+Revises: b3e7a9c1d5f2
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f2b8d4e0a3'
+down_revision = 'b3e7a9c1d5f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("INSERT INTO cache_versions (key, version) VALUES ('settings', 0)")
+
+
+def downgrade():
+    op.execute("DELETE FROM cache_versions WHERE key = 'settings'")
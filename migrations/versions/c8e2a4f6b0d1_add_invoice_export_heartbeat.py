@@ -0,0 +1,25 @@
+"""add invoice export job heartbeat
+
+Revision ID: c8e2a4f6b0d1
+Revises: b4d8f2a6c0e9
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e2a4f6b0d1'
+down_revision = 'b4d8f2a6c0e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('invoice_export_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('invoice_export_jobs', 'heartbeat_at')
@@ -0,0 +1,31 @@
+"""add cache versions
+
+Revision ID: d2f6a8c0e1b3
+Revises: c4e8f1a2b3d5
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6a8c0e1b3'
+down_revision = 'c4e8f1a2b3d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'cache_versions',
+        sa.Column('key', sa.String(length=64), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    op.execute("INSERT INTO cache_versions (key, version) VALUES ('system_accounts', 0)")
+
+
+def downgrade():
+    op.drop_table('cache_versions')
@@ -0,0 +1,29 @@
+"""add user security version
+
+Revision ID: d8a4c0e2f6b5
+Revises: c6f2b8d4e0a3
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a4c0e2f6b5'
+down_revision = 'c6f2b8d4e0a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('security_version', sa.Integer(), nullable=False, server_default='0'))
+    op.execute("INSERT INTO cache_versions (key, version) VALUES ('users', 0)")
+
+
+def downgrade():
+    op.execute("DELETE FROM cache_versions WHERE key = 'users'")
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('security_version')
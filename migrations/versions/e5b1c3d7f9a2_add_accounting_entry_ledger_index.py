@@ -0,0 +1,30 @@
+"""add accounting entry ledger index
+
+Revision ID: e5b1c3d7f9a2
+Revises: d2f6a8c0e1b3
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1c3d7f9a2'
+down_revision = 'd2f6a8c0e1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'idx_accounting_entry_account_date',
+        'accounting_entries',
+        ['account_id', 'entry_date', 'id'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('idx_accounting_entry_account_date', table_name='accounting_entries')
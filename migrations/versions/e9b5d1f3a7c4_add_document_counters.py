@@ -0,0 +1,31 @@
+"""add document counters
+
+Revision ID: e9b5d1f3a7c4
+Revises: d8a4c0e2f6b5
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b5d1f3a7c4'
+down_revision = 'd8a4c0e2f6b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are created on first use, seeded from the numbers already issued.
+    op.create_table(
+        'document_counters',
+        sa.Column('series', sa.String(length=32), primary_key=True),
+        sa.Column('period', sa.String(length=16), primary_key=True),
+        sa.Column('value', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    op.drop_table('document_counters')
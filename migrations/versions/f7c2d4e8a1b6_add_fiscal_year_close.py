@@ -0,0 +1,50 @@
+"""add fiscal year close and balance snapshots
+
+Revision ID: f7c2d4e8a1b6
+Revises: e5b1c3d7f9a2
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c2d4e8a1b6'
+down_revision = 'e5b1c3d7f9a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('fiscal_years', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_closed', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column('closed_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('closed_by', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_fiscal_years_closed_by_users', 'users', ['closed_by'], ['id'])
+
+    op.create_table(
+        'account_balance_snapshots',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('fiscal_year_id', sa.Integer(), sa.ForeignKey('fiscal_years.id'), nullable=False),
+        sa.Column('account_id', sa.Integer(), sa.ForeignKey('accounts.id'), nullable=False),
+        sa.Column('as_of', sa.Date(), nullable=False),
+        sa.Column('balance', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.UniqueConstraint('fiscal_year_id', 'account_id', name='uq_account_balance_snapshot'),
+    )
+    op.create_index('idx_account_balance_snapshot_as_of', 'account_balance_snapshots', ['as_of'], unique=False)
+
+    op.execute("INSERT INTO cache_versions (key, version) VALUES ('fiscal_periods', 0)")
+
+
+def downgrade():
+    op.execute("DELETE FROM cache_versions WHERE key = 'fiscal_periods'")
+    op.drop_index('idx_account_balance_snapshot_as_of', table_name='account_balance_snapshots')
+    op.drop_table('account_balance_snapshots')
+
+    with op.batch_alter_table('fiscal_years', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_fiscal_years_closed_by_users', type_='foreignkey')
+        batch_op.drop_column('closed_by')
+        batch_op.drop_column('closed_at')
+        batch_op.drop_column('is_closed')
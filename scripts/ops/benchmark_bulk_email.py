@@ -0,0 +1,204 @@
+"""
+Benchmark: bulk payment-reminder emails, per-message SMTP vs the batched pipeline
+
+Starts a local SMTP sink that charges --handshake-ms per new connection (standing in
+for STARTTLS + AUTH against the real server), seeds N overdue orders in a throwaway
+SQLite database and sends a payment reminder for each:
+
+    per-message   the old path: query each order, render_template, mail.send
+                  (a new SMTP conversation per email)
+    batched       EmailService.send_bulk_payment_reminders (one query, compiled
+                  template) + the outbox worker (NOTIFICATION_EMAIL_BATCH emails
+                  per SMTP connection)
+
+and prints render/queue time, send time, emails/sec and SMTP connections.
+
+    python scripts/ops/benchmark_bulk_email.py
+    python scripts/ops/benchmark_bulk_email.py --orders 1000 --batch 50 --handshake-ms 150
+
+The sink doubles as a local debugging SMTP server: it prints every message it
+receives, so a dev instance or worker can be pointed at it.
+
+    python scripts/ops/benchmark_bulk_email.py --serve 1025
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=false flask --app run:app notifications worker
+"""
+import argparse
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from email import message_from_bytes
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+class SMTPSink(socketserver.StreamRequestHandler):
+    """Accepts everything; counts connections and messages."""
+    handshake = 0.0
+    verbose = False
+    connections = 0
+    messages = 0
+    lock = threading.Lock()
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        with SMTPSink.lock:
+            SMTPSink.connections += 1
+        time.sleep(self.handshake)
+        self.reply('220 localhost benchmark sink')
+        for raw in self.rfile:
+            command = raw.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif command.startswith('DATA'):
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = b''.join(iter(lambda: self.rfile.readline(), b'.\r\n'))
+                with SMTPSink.lock:
+                    SMTPSink.messages += 1
+                if self.verbose:
+                    message = message_from_bytes(data)
+                    print(f"{message['From']} -> {message['To']}: {message['Subject']}", flush=True)
+                self.reply('250 OK')
+            elif command.startswith('QUIT'):
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def seed(db, orders):
+    from app.models import Distributor, Order
+
+    db.drop_all()
+    db.create_all()
+    distributors = [
+        Distributor(code=f'D{i:03d}', business_name=f'Distributor {i}', contact_person='Owner', phone='9999999999',
+                    email=f'd{i}@example.com', status='active')
+        for i in range(20)
+    ]
+    db.session.add_all(distributors)
+    db.session.flush()
+    old = date.today() - timedelta(days=30)
+    db.session.add_all([
+        Order(order_number=f'ORD{i:06d}', distributor_id=distributors[i % 20].id, order_date=old,
+              subtotal=1000, taxable_amount=1000, cgst_amount=25, sgst_amount=25, total_amount=1050,
+              status='confirmed', payment_status='pending', paid_amount=0)
+        for i in range(orders)
+    ])
+    db.session.commit()
+
+
+def per_message(app):
+    """The pre-outbox path, one order at a time."""
+    from flask import render_template
+    from flask_mail import Message
+
+    from app import db, mail
+    from app.models import Order
+
+    ids = [order_id for (order_id,) in db.session.query(Order.id).all()]
+    for order_id in ids:
+        with app.test_request_context():  # the old reminders were sent from a request
+            order = Order.query.get(order_id)
+            msg = Message(subject=f'Payment Reminder - {order.order_number}', recipients=[order.distributor.email],
+                          sender=app.config['MAIL_DEFAULT_SENDER'])
+            msg.html = render_template('emails/payment_reminder.html', order=order,
+                                       outstanding=order.total_amount - order.paid_amount,
+                                       days_overdue=(date.today() - order.order_date).days,
+                                       company_name=app.config['COMPANY_NAME'],
+                                       company_phone=app.config['COMPANY_PHONE'],
+                                       company_email=app.config['COMPANY_EMAIL'])
+            mail.send(msg)
+    return len(ids)
+
+
+def report(label, count, queue_s, send_s, connections):
+    total = queue_s + send_s
+    print(f"{label:<12} {count:>6,} emails  render/queue {queue_s:>6.2f}s  send {send_s:>6.2f}s  "
+          f"{count / total:>8,.1f} emails/s  {connections:>5,} SMTP connections")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=300)
+    parser.add_argument('--batch', type=int, default=20, help='NOTIFICATION_EMAIL_BATCH')
+    parser.add_argument('--workers', type=int, default=4, help='NOTIFICATION_WORKERS')
+    parser.add_argument('--handshake-ms', type=float, default=100, help='cost of each new SMTP connection')
+    parser.add_argument('--serve', type=int, metavar='PORT', help='only run the sink on PORT, printing messages')
+    args = parser.parse_args()
+
+    SMTPSink.handshake = args.handshake_ms / 1000
+    if args.serve:
+        SMTPSink.handshake = 0
+        SMTPSink.verbose = True
+        print(f'SMTP sink listening on localhost:{args.serve}')
+        SinkServer(('127.0.0.1', args.serve), SMTPSink).serve_forever()
+        return
+
+    server = SinkServer(('127.0.0.1', 0), SMTPSink)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    scratch.close()
+
+    from config import Config
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{scratch.name}'
+        MAIL_SERVER = '127.0.0.1'
+        MAIL_PORT = server.server_address[1]
+        MAIL_USE_TLS = False
+        MAIL_USERNAME = None
+        MAIL_PASSWORD = None
+        SEND_PAYMENT_REMINDERS = True
+        NOTIFICATION_EMAIL_BATCH = args.batch
+        NOTIFICATION_WORKERS = args.workers
+        NOTIFICATION_RATE_LIMITS = {}
+
+    from app import create_app, db
+    from app.services.email_service import EmailService
+    from app.services.notification_outbox import OutboxWorker
+
+    app = create_app(BenchConfig)
+    print(f"{args.orders} overdue orders, {args.handshake_ms:.0f} ms per SMTP connection\n")
+    try:
+        with app.app_context():
+            seed(db, args.orders)
+
+            before = SMTPSink.connections
+            started = time.perf_counter()
+            count = per_message(app)
+            baseline = report('per-message', count, 0, time.perf_counter() - started, SMTPSink.connections - before)
+
+            before = SMTPSink.connections
+            started = time.perf_counter()
+            count = EmailService.send_bulk_payment_reminders()
+            db.session.commit()
+            queued = time.perf_counter() - started
+            started = time.perf_counter()
+            stats = OutboxWorker(app).run(once=True)
+            sent = time.perf_counter() - started
+            batched = report('batched', stats.sent, queued, sent, SMTPSink.connections - before)
+            if stats.sent != count:
+                sys.exit(f'{count - stats.sent} email(s) not sent')
+        print(f"\nbatched vs per-message: {baseline / batched:.1f}x faster ({SMTPSink.messages:,} messages received)")
+    finally:
+        server.shutdown()
+        os.unlink(scratch.name)
+
+
+if __name__ == '__main__':
+    main()
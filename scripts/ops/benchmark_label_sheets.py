@@ -0,0 +1,125 @@
+"""
+Benchmark: A4 label sheets for a multi-product print job
+
+Prints --labels labels spread over --products x --batches distinct labels (a day's
+production) three ways:
+
+    per-cell      the old print_product_labels loop: render each label, then
+                  drawImage into every cell of the sheet
+    form-xobject  label_sheets.render_sheets: each label rendered once and embedded
+                  once as a form XObject, cells reference it (one process)
+    pool          label_sheets.render_print_job: chunks of --pages-per-chunk pages
+                  rendered by --workers processes and merged (pool already started)
+
+and prints wall time, labels/sec and PDF size. No database is needed.
+
+    python scripts/ops/benchmark_label_sheets.py
+    python scripts/ops/benchmark_label_sheets.py --labels 20000 --products 50 --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from io import BytesIO
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from app.services import label_sheets
+from app.services.label_sheets import DEFAULT_LAYOUT, LabelRun, LabelSpec, render_print_job, render_sheets
+from app.utils import barcode_generator
+from app.utils.barcode_generator import BarcodeGenerator
+
+
+def make_job(labels, products, batches, tag=''):
+    distinct = products * batches
+    today = date.today()
+    runs = []
+    for i in range(distinct):
+        product, batch = divmod(i, batches)
+        spec = LabelSpec(
+            name=f'{tag}Product {product} Premium Pack', mrp=20 + product, pack_size='500g',
+            ean_barcode=BarcodeGenerator.generate_ean13('890123456', f'{product + 1:03d}'),
+            batch_number=f'{tag}B{product:03d}{batch:02d}', manufacturing_date=today,
+            expiry_date=today + timedelta(days=90),
+        )
+        runs.append(LabelRun(spec, labels // distinct + (i < labels % distinct)))
+    return runs
+
+
+def per_cell(runs, layout=DEFAULT_LAYOUT):
+    """The pre-form-XObject sheet: label rendered per run, image drawn per cell."""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=layout.page_size)
+    cell = 0
+    for run in runs:
+        label_img = BarcodeGenerator.generate_product_label(*_objects(run.spec), label_size=layout.label_pixels)
+        img_buffer = BytesIO()
+        label_img.save(img_buffer, format='PNG')
+        img_buffer.seek(0)
+        img_reader = ImageReader(img_buffer)
+        for _ in range(run.count):
+            if cell == layout.per_page:
+                c.showPage()
+                cell = 0
+            x, y = layout.position(cell)
+            c.drawImage(img_reader, x, y, width=layout.label_width, height=layout.label_height)
+            cell += 1
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _objects(spec):
+    from types import SimpleNamespace
+    product = SimpleNamespace(name=spec.name, mrp=spec.mrp, pack_size=spec.pack_size, ean_barcode=spec.ean_barcode)
+    batch = SimpleNamespace(batch_number=spec.batch_number, manufacturing_date=spec.manufacturing_date,
+                            expiry_date=spec.expiry_date)
+    return product, batch
+
+
+def run(label, render, labels):
+    barcode_generator._png_cache.clear()
+    started = time.perf_counter()
+    pdf = render()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<13} {elapsed:>7.2f}s  {labels / elapsed:>10,.0f} labels/s  {len(pdf) / 1024:>8,.0f} KB")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--labels', type=int, default=5000)
+    parser.add_argument('--products', type=int, default=20)
+    parser.add_argument('--batches', type=int, default=5, help='batches per product')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--pages-per-chunk', type=int, default=25)
+    args = parser.parse_args()
+
+    runs = make_job(args.labels, args.products, args.batches)
+    pages = DEFAULT_LAYOUT.pages_for(args.labels)
+    print(f"{args.labels:,} labels, {len(runs)} distinct, {pages} A4 pages of {DEFAULT_LAYOUT.per_page}\n")
+
+    baseline = run('per-cell', lambda: per_cell(runs), args.labels)
+    single = run('form-xobject', lambda: render_sheets(runs), args.labels)
+
+    # Start the pool (and warm its per-process font caches) on a different job
+    started = time.perf_counter()
+    render_print_job(make_job(args.workers * args.pages_per_chunk * DEFAULT_LAYOUT.per_page, 2, 1, tag='warm '),
+                     workers=args.workers, pages_per_chunk=args.pages_per_chunk)
+    print(f"{'(pool start)':<13} {time.perf_counter() - started:>7.2f}s")
+    pooled = run(f'pool x{args.workers}', lambda: render_print_job(
+        runs, workers=args.workers, pages_per_chunk=args.pages_per_chunk).read(), args.labels)
+
+    print(f"\nform-xobject vs per-cell: {baseline / single:.1f}x faster; "
+          f"pool x{args.workers} vs per-cell: {baseline / pooled:.1f}x faster")
+    label_sheets._get_pool(args.workers).shutdown()
+
+
+if __name__ == '__main__':
+    main()
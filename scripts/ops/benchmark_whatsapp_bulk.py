@@ -0,0 +1,137 @@
+"""
+Benchmark: WhatsApp bulk sends against a local mock provider
+
+Starts a mock Interakt-style HTTP endpoint on localhost that answers each message
+after --latency-ms and charges --handshake-ms for every new connection (standing in
+for the TLS handshake to the real provider), then sends N messages three ways:
+
+    per-request   requests.post per message, sequential (the old transport)
+    pooled        WhatsAppService.send_many with one thread (keep-alive session)
+    concurrent    WhatsAppService.send_bulk_message (keep-alive session, thread pool)
+
+and prints wall time, messages/sec and how many connections the provider saw.
+
+    python scripts/ops/benchmark_whatsapp_bulk.py
+    python scripts/ops/benchmark_whatsapp_bulk.py --messages 500 --concurrency 16 --latency-ms 80
+    python scripts/ops/benchmark_whatsapp_bulk.py --rate 20    # pace to 20 msg/s like NOTIFICATION_RATE_LIMITS
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import requests
+from flask import Flask
+
+from app.services.whatsapp import WhatsAppService
+
+
+class MockProvider(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # else small keep-alive writes stall on delayed ACKs
+    latency = 0.0
+    handshake = 0.0
+    connections = 0
+    messages = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with MockProvider.lock:
+            MockProvider.connections += 1
+        time.sleep(self.handshake)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.latency)
+        with MockProvider.lock:
+            MockProvider.messages += 1
+            message_id = MockProvider.messages
+        body = json.dumps({'result': {'messageId': f'mock-{message_id}'}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def per_request(base_url, recipients, message):
+    results = []
+    for recipient in recipients:
+        response = requests.post(
+            f'{base_url}/public/message/',
+            headers={'Authorization': 'Basic bench', 'Content-Type': 'application/json'},
+            json={'countryCode': '+91', 'phoneNumber': recipient.phone[-10:], 'type': 'Text', 'data': {'message': message}},
+        )
+        results.append(response.status_code == 200)
+    return results
+
+
+def run(label, send, total):
+    before = MockProvider.connections
+    started = time.perf_counter()
+    outcomes = send()
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for outcome in outcomes if outcome)
+    print(f"{label:<12} {ok:>6,}/{total:<6,} ok  {elapsed:>8.2f}s  {total / elapsed:>9,.1f} msg/s  "
+          f"{MockProvider.connections - before:>5,} connections")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=40, help='provider response time per message')
+    parser.add_argument('--handshake-ms', type=float, default=60, help='cost of each new connection')
+    parser.add_argument('--rate', type=float, default=0, help='messages/sec limit for the concurrent run (0 = none)')
+    args = parser.parse_args()
+
+    MockProvider.latency = args.latency_ms / 1000
+    MockProvider.handshake = args.handshake_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockProvider)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    app = Flask('benchmark_whatsapp_bulk')
+    app.config.update(
+        WHATSAPP_ENABLED=True,
+        WHATSAPP_PROVIDER='interakt',
+        INTERAKT_API_KEY='bench',
+        INTERAKT_BASE_URL=base_url,
+        WHATSAPP_POOL_SIZE=max(args.concurrency, 1),
+        WHATSAPP_BULK_CONCURRENCY=args.concurrency,
+        NOTIFICATION_RATE_LIMITS={'interakt': args.rate} if args.rate else {},
+    )
+    recipients = [SimpleNamespace(business_name=f'Distributor {i}', phone=f'9{i:09d}') for i in range(args.messages)]
+    message = 'Benchmark broadcast'
+
+    print(f"{args.messages} messages, {args.latency_ms:.0f} ms provider latency, "
+          f"{args.handshake_ms:.0f} ms per new connection\n")
+    try:
+        with app.app_context():
+            baseline = run('per-request', lambda: per_request(base_url, recipients, message), args.messages)
+            service = WhatsAppService()
+            run('pooled', lambda: [ok for ok, _ in service.send_many(
+                [(r.phone, message) for r in recipients], concurrency=1)], args.messages)
+            concurrent = run('concurrent', lambda: [r['success'] for r in service.send_bulk_message(
+                recipients, message)], args.messages)
+        print(f"\nconcurrent x{args.concurrency} vs per-request: {baseline / concurrent:.1f}x faster")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
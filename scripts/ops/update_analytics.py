@@ -11,6 +11,7 @@ if PROJECT_ROOT not in sys.path:
 
 from app import create_app, db
 from app.models import Distributor, Order
+from app.services.batching import iter_keyset
 from sqlalchemy import func
 from datetime import datetime
 
@@ -19,11 +20,11 @@ app = create_app()
 def update_distributor_analytics():
     """Update analytics fields for all distributors"""
     with app.app_context():
-        distributors = Distributor.query.all()
+        total_distributors = Distributor.query.count()
         
-        print(f"Updating analytics for {len(distributors)} distributors...")
+        print(f"Updating analytics for {total_distributors} distributors...")
         
-        for dist in distributors:
+        for dist in iter_keyset(Distributor.query):
             # Get all completed orders
             orders = Order.query.filter_by(distributor_id=dist.id)\
                 .filter(Order.status.in_(['confirmed', 'delivered', 'completed']))\
@@ -64,7 +65,7 @@ def update_distributor_analytics():
                 print(f"- Skipped {dist.business_name}: No orders")
         
         db.session.commit()
-        print(f"\nAnalytics updated successfully for {len(distributors)} distributors.")
+        print(f"\nAnalytics updated successfully for {total_distributors} distributors.")
 
 if __name__ == '__main__':
     update_distributor_analytics()